@@ -5,13 +5,15 @@
 
 from __future__ import annotations
 
+from collections import defaultdict
 from decimal import Decimal
 from typing import TYPE_CHECKING
 
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import Case, F, IntegerField, Q, When
+from django.db.models.functions import Greatest
 
 if TYPE_CHECKING:
     from django.db.models import QuerySet
@@ -78,9 +80,36 @@ class Cart(models.Model):
             total += item.total_price
         return total
 
-    def clear(self):
-        """Очистить корзину"""
-        self.items.all().delete()
+    def clear(self, reserved: dict[int, int] | None = None):
+        """
+        Очистить корзину, сняв резерв всех вариантов одним UPDATE.
+
+        reserved — количества позиций по вариантам, если вызывающий их уже
+        прочитал (оформление заказа); иначе они читаются из корзины.
+        """
+        from apps.products.models import ProductVariant
+
+        from .signals import bulk_reservation_release
+
+        released: dict[int, int] = defaultdict(int)
+        if reserved is None:
+            for variant_id, quantity in self.items.values_list("variant_id", "quantity"):
+                released[variant_id] += quantity
+        else:
+            released.update(reserved)
+        with transaction.atomic(savepoint=False), bulk_reservation_release():
+            if released:
+                ProductVariant.objects.filter(pk__in=released).update(
+                    reserved_quantity=Greatest(
+                        F("reserved_quantity")
+                        - Case(
+                            *[When(pk=variant_id, then=quantity) for variant_id, quantity in released.items()],
+                            output_field=IntegerField(),
+                        ),
+                        0,
+                    )
+                )
+            self.items.all().delete()
         # Обновляем только updated_at без лишнего save()
         self.save(update_fields=["updated_at"])
 
@@ -2,12 +2,29 @@
 Сигналы для корзины покупок
 """
 
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
 from django.contrib.auth import get_user_model
 from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
 from .models import Cart, CartItem
 
+# Резерв снимается одним UPDATE (Cart.clear), а не по каждой удаленной позиции
+_bulk_release = ContextVar("cart_bulk_reservation_release", default=False)
+
+
+@contextmanager
+def bulk_reservation_release() -> Iterator[None]:
+    """Удаление позиций корзины без снятия резерва в post_delete: вызывающий снимает его сам."""
+    token = _bulk_release.set(True)
+    try:
+        yield
+    finally:
+        _bulk_release.reset(token)
+
 
 @receiver(pre_save, sender=CartItem)
 def update_reserved_quantity_on_save(sender, instance, **kwargs):
@@ -33,6 +50,8 @@ def update_reserved_quantity_on_delete(sender, instance, **kwargs):
     """
     Уменьшает зарезервированное количество варианта товара после удаления CartItem.
     """
+    if _bulk_release.get():
+        return
     variant = instance.variant
     variant.reserved_quantity -= instance.quantity
     # Убедимся, что резерв не станет отрицательным
@@ -11,6 +11,8 @@ from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from apps.common.services.query_budget import query_budget
+
 if TYPE_CHECKING:
     pass  # Пока не используем TYPE_CHECKING импорты
 
@@ -18,6 +20,7 @@ from .models import Cart, CartItem
 from .serializers import CartItemCreateSerializer, CartItemSerializer, CartItemUpdateSerializer, CartSerializer
 
 
+@query_budget(15)
 class CartViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     """
     ViewSet для управления корзиной пользователя
@@ -77,6 +80,7 @@ class CartViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+@query_budget(20)
 class CartItemViewSet(viewsets.ModelViewSet):
     """
     ViewSet для управления элементами корзины
@@ -188,6 +192,7 @@ class CartItemViewSet(viewsets.ModelViewSet):
         ),
         tags=["Cart Items"],
     )
+    @query_budget(30)
     def create(self, request, *args, **kwargs):
         """Добавить товар в корзину"""
         serializer = self.get_serializer(data=request.data)
@@ -49,3 +49,11 @@ class CommonConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.common"
     verbose_name = "Общие утилиты"
+
+    def ready(self) -> None:
+        import apps.common.signals  # noqa: F401
+        from apps.common.services.log_buffer import install_flush_hooks
+        from apps.common.services.prometheus import install_celery_metrics_hooks
+
+        install_flush_hooks()
+        install_celery_metrics_hooks()
@@ -0,0 +1,38 @@
+"""
+Management команда для пересборки предагрегированных метрик синхронизации
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.common.services.sync_metrics import SyncMetricsAggregator
+
+
+class Command(BaseCommand):
+    """Пересобирает бакеты метрик CustomerSyncLog в Redis по таблице логов"""
+
+    help = "Пересобирает метрики синхронизации за последние N суток (после включения агрегатора или сбоя Redis)"
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды"""
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=2,
+            help="Сколько последних суток пересобрать (по умолчанию 2)",
+        )
+
+    def handle(self, *args, **options):
+        """Основная логика команды"""
+        days = options["days"]
+        if days < 1:
+            raise CommandError("--days должен быть положительным числом")
+        if not SyncMetricsAggregator.is_enabled():
+            raise CommandError("Предагрегация метрик выключена (SYNC_METRICS['ENABLED'])")
+
+        since = timezone.now() - timedelta(days=days - 1)
+        processed = SyncMetricsAggregator().rebuild(since)
+
+        self.stdout.write(self.style.SUCCESS(f"Метрики пересобраны: учтено {processed} логов за {days} сут."))
@@ -0,0 +1,143 @@
+"""
+Middleware общего приложения.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from typing import Any
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+from apps.common.services.monitoring import PrometheusMetrics
+from apps.common.services.prometheus import (
+    HTTP_REQUEST_DB_DURATION,
+    HTTP_REQUEST_DB_QUERIES,
+    HTTP_REQUEST_DURATION,
+    UNRESOLVED_VIEW,
+)
+from apps.common.services.query_budget import (
+    DEFAULT_DUPLICATE_THRESHOLD,
+    DEFAULT_SAMPLE_RATE,
+    DEFAULT_STACK_DEPTH,
+    QueryRecorder,
+    budget_settings,
+    get_query_budget,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _QueryStats:
+    """execute_wrapper, считающий SQL-запросы и их суммарное время."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute: Callable[..., Any], sql: str, params: Any, many: bool, context: dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def resolve_view_labels(request: HttpRequest) -> tuple[str, str]:
+    """
+    Метки view/action для запроса.
+
+    Для DRF view — имя класса (для @api_view DRF подставляет имя функции),
+    для ViewSet — ещё и действие по HTTP-методу. Прочие Django view
+    обозначаются именем маршрута.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNRESOLVED_VIEW, ""
+
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None:
+        return match.view_name or getattr(match.func, "__name__", UNRESOLVED_VIEW), ""
+
+    actions = getattr(match.func, "actions", None) or {}
+    return view_class.__name__, actions.get((request.method or "").lower(), "")
+
+
+class PrometheusMiddleware:
+    """
+    Гистограммы длительности HTTP-запросов и SQL-нагрузки на запрос.
+
+    Подключается первым в MIDDLEWARE, чтобы учитывать время всей цепочки.
+    Отключается вместе с остальными метриками (PROMETHEUS_METRICS_ENABLED).
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        if not PrometheusMetrics.is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        queries = _QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(queries))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        view, action = resolve_view_labels(request)
+        HTTP_REQUEST_DURATION.labels(
+            view=view, action=action, method=request.method, status=str(response.status_code)
+        ).observe(duration)
+        HTTP_REQUEST_DB_QUERIES.labels(view=view, action=action).observe(queries.count)
+        HTTP_REQUEST_DB_DURATION.labels(view=view, action=action).observe(queries.duration)
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Контроль бюджета SQL-запросов и повторяющихся запросов (N+1) на запрос.
+
+    Режим задаётся QUERY_BUDGET["MODE"]: "enforce" — превышение бюджета из
+    @query_budget поднимает QueryBudgetExceeded (тесты), "log" — выборочная
+    запись нарушителей в лог с образцами стека, "off" — отключено.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        config = budget_settings()
+        self.mode = config.get("MODE", "off")
+        if self.mode not in ("log", "enforce"):
+            raise MiddlewareNotUsed
+        self.sample_rate = float(config.get("SAMPLE_RATE", DEFAULT_SAMPLE_RATE))
+        self.duplicate_threshold = int(config.get("DUPLICATE_THRESHOLD", DEFAULT_DUPLICATE_THRESHOLD))
+        self.stack_depth = int(config.get("STACK_DEPTH", DEFAULT_STACK_DEPTH))
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.mode == "log" and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        with QueryRecorder(capture_stacks=True, stack_depth=self.stack_depth) as recorder:
+            response = self.get_response(request)
+
+        budget = get_query_budget(request)
+        view, action = resolve_view_labels(request)
+        label = f"{request.method} {request.path} ({view}{'.' + action if action else ''})"
+
+        if self.mode == "enforce":
+            if budget is not None:
+                recorder.assert_within(budget, label=label)
+            return response
+
+        over_budget = budget is not None and recorder.count > budget
+        if over_budget or recorder.duplicates(self.duplicate_threshold):
+            reason = f"exceeded query budget of {budget}" if over_budget else "repeats queries"
+            logger.warning(f"{label} {reason}: {recorder.report()}")
+        return response
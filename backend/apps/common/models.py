@@ -400,22 +400,28 @@ class AuditLog(TimeStampedModel):
             user_agent: User Agent строка
 
         Returns:
-            Созданный объект AuditLog
+            Объект AuditLog; при включённом LOG_BUFFER запись сохраняется
+            пакетом после фиксации текущей транзакции (pk появится при сбросе
+            буфера), при откате транзакции не сохраняется
         """
+        from apps.common.services.log_buffer import get_log_writer
+
         if details is None:
             details = {}
 
         if changes:
             details["changes"] = changes
 
-        return AuditLog.objects.create(
-            user=user,
-            action=action,
-            resource_type=resource_type,
-            resource_id=str(resource_id),
-            details=details,
-            ip_address=ip_address,
-            user_agent=user_agent,
+        return get_log_writer(AuditLog).add(
+            AuditLog(
+                user=user,
+                action=action,
+                resource_type=resource_type,
+                resource_id=str(resource_id),
+                details=details,
+                ip_address=ip_address,
+                user_agent=user_agent,
+            )
         )
 
 
@@ -4,9 +4,11 @@
 
 from .alerting import AlertManager, RealTimeAlertMonitor
 from .customer_sync_monitor import CustomerSyncMonitor, IntegrationHealthCheck
+from .log_buffer import BufferedLogWriter, flush_log_buffers, get_log_writer
 from .monitoring import PrometheusMetrics, StructuredLogger, WebhookAlerts
 from .reporting import SyncReportGenerator
 from .sync_logger import CustomerSyncLogger
+from .sync_metrics import DurationSketch, SyncMetricsAggregator
 
 __all__ = [
     "SyncReportGenerator",
@@ -18,4 +20,9 @@ __all__ = [
     "IntegrationHealthCheck",
     "AlertManager",
     "RealTimeAlertMonitor",
+    "BufferedLogWriter",
+    "get_log_writer",
+    "flush_log_buffers",
+    "SyncMetricsAggregator",
+    "DurationSketch",
 ]
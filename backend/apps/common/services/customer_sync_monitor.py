@@ -9,7 +9,7 @@ import logging
 import os
 import shutil
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, Any, cast
+from typing import Any, cast
 
 import requests
 from django.core.cache import cache
@@ -19,10 +19,8 @@ from django.db.models.functions import TruncDate, TruncHour
 from django.utils import timezone
 from requests.exceptions import RequestException
 
-if TYPE_CHECKING:
-    from django.db.models import QuerySet
-
 from apps.common.models import CustomerSyncLog
+from apps.common.services.sync_metrics import SyncMetricsAggregator
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +45,14 @@ class CustomerSyncMonitor:
         Returns:
             Словарь с метриками операций
         """
+        if SyncMetricsAggregator.is_enabled():
+            try:
+                aggregator = SyncMetricsAggregator()
+                if aggregator.covers(start_date):
+                    return aggregator.get_operation_metrics(start_date, end_date)
+            except Exception as e:
+                logger.warning("Предагрегированные метрики недоступны, считаем по БД: %s", e)
+
         cache_key = f"metrics:operations:{start_date.isoformat()}:{end_date.isoformat()}"
         cached = cache.get(cache_key)
 
@@ -85,8 +91,8 @@ class CustomerSyncMonitor:
         )
 
         # Percentiles (приблизительные через PostgreSQL)
-        p95_duration = self._calculate_percentile(logs, 95)
-        p99_duration = self._calculate_percentile(logs, 99)
+        p95_duration = self._calculate_percentile(start_date, end_date, 95)
+        p99_duration = self._calculate_percentile(start_date, end_date, 99)
 
         metrics = {
             "total_operations": total_operations,
@@ -116,23 +122,19 @@ class CustomerSyncMonitor:
 
         return metrics
 
-    def _calculate_percentile(self, queryset: QuerySet, percentile: int) -> float:
+    def _calculate_percentile(self, start_date: datetime, end_date: datetime, percentile: int) -> float:
         """
         Рассчитывает percentile для duration_ms используя PostgreSQL.
 
         Args:
-            queryset: QuerySet с CustomerSyncLog
+            start_date: Начало периода
+            end_date: Конец периода
             percentile: Процентиль (например, 95 или 99)
 
         Returns:
             Значение percentile или 0 если данных нет
         """
-        logs_with_duration = queryset.exclude(duration_ms__isnull=True)
-
-        if not logs_with_duration.exists():
-            return 0.0
-
-        # Используем window function для расчета percentile
+        # PERCENTILE_CONT по пустой выборке возвращает NULL
         table_name = CustomerSyncLog._meta.db_table
         with connection.cursor() as cursor:
             cursor.execute(
@@ -142,11 +144,7 @@ class CustomerSyncMonitor:
                 WHERE created_at >= %s AND created_at < %s
                 AND duration_ms IS NOT NULL
                 """,
-                [
-                    percentile / 100.0,
-                    queryset.query.where.children[0].rhs,  # type: ignore[union-attr]
-                    queryset.query.where.children[1].rhs,  # type: ignore[union-attr]
-                ],
+                [percentile / 100.0, start_date, end_date],
             )
             result = cursor.fetchone()
             return float(round(result[0], 2)) if result and result[0] else 0.0
@@ -332,16 +330,8 @@ class CustomerSyncMonitor:
             logger.debug("Возвращены кэшированные realtime метрики")
             return cast("dict[str, Any]", cached)
 
-        recent_logs = CustomerSyncLog.objects.filter(created_at__gte=start_time)
-
         # Текущая активность
-        operations_last_5min = recent_logs.count()
-        errors_last_5min = recent_logs.filter(
-            status__in=[
-                CustomerSyncLog.StatusType.ERROR,
-                CustomerSyncLog.StatusType.FAILED,
-            ]
-        ).count()
+        operations_last_5min, errors_last_5min = self._count_recent_operations(start_time, now)
 
         # Текущий error rate
         current_error_rate = (
@@ -368,6 +358,26 @@ class CustomerSyncMonitor:
 
         return metrics
 
+    def _count_recent_operations(self, start_time: datetime, now: datetime) -> tuple[int, int]:
+        """Количество операций и ошибок за период: из минутных бакетов или по БД."""
+        if SyncMetricsAggregator.is_enabled():
+            try:
+                aggregator = SyncMetricsAggregator()
+                if aggregator.covers(start_time):
+                    metrics = aggregator.get_operation_metrics(start_time, now)
+                    return metrics["total_operations"], metrics["error_count"]
+            except Exception as e:
+                logger.warning("Предагрегированные метрики недоступны, считаем по БД: %s", e)
+
+        recent_logs = CustomerSyncLog.objects.filter(created_at__gte=start_time)
+        errors = recent_logs.filter(
+            status__in=[
+                CustomerSyncLog.StatusType.ERROR,
+                CustomerSyncLog.StatusType.FAILED,
+            ]
+        ).count()
+        return recent_logs.count(), errors
+
     def get_hourly_breakdown(self, start_date: datetime, end_date: datetime) -> list[dict[str, Any]]:
         """
         Получает почасовую разбивку метрик.
@@ -379,6 +389,14 @@ class CustomerSyncMonitor:
         Returns:
             Список с метриками по часам
         """
+        if SyncMetricsAggregator.is_enabled():
+            try:
+                aggregator = SyncMetricsAggregator()
+                if aggregator.covers(start_date):
+                    return aggregator.get_hourly_breakdown(start_date, end_date)
+            except Exception as e:
+                logger.warning("Предагрегированные метрики недоступны, считаем по БД: %s", e)
+
         logs = CustomerSyncLog.objects.filter(created_at__gte=start_date, created_at__lt=end_date)
 
         hourly_data = (
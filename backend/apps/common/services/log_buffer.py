@@ -0,0 +1,300 @@
+"""
+Буферизованная запись журналов CustomerSyncLog и AuditLog.
+
+Записи журнала копятся в памяти потока (запроса, задачи) и пишутся одним
+bulk_create:
+- при накоплении BATCH_SIZE записей;
+- если с первой записи в буфере прошло FLUSH_INTERVAL_SECONDS;
+- в конце HTTP-запроса и Celery-задачи, в конце сессии импорта (flush());
+- при остановке процесса (atexit, worker_process_shutdown Celery) — буферы
+  всех потоков.
+
+Журнал не пишется внутри чужой транзакции: запись, сделанная внутри
+transaction.atomic, попадает в буфер только после фиксации транзакции
+(transaction.on_commit) и пропадает вместе с ее откатом; сброс внутри
+atomic-блока откладывается до фиксации. Сам bulk_create выполняется в
+отдельном atomic-блоке и без удержания блокировки буфера.
+
+Запись «не менее одного раза»: если bulk_create не удался из-за недоступной
+БД, записи возвращаются в буфер и повторяются при следующем сбросе; строки,
+нарушающие ограничения целостности, пишутся поштучно, невалидные — в лог
+приложения. При LOG_BUFFER["ENABLED"] = False (тесты) каждая запись
+сохраняется сразу.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, TypeVar
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, models, router, transaction
+
+from apps.common.signals import log_records_bulk_created
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL_SECONDS = 5.0
+# Сколько пакетов можно удерживать при недоступной БД, прежде чем отбрасывать старые записи
+MAX_PENDING_BATCHES = 10
+
+ModelT = TypeVar("ModelT", bound=models.Model)
+
+
+def _buffer_settings() -> dict[str, Any]:
+    return getattr(settings, "LOG_BUFFER", {})
+
+
+@dataclass
+class _PendingRecords:
+    """Несохранённые записи одного потока."""
+
+    records: list[models.Model] = field(default_factory=list)
+    first_added_at: float | None = None
+
+
+class BufferedLogWriter:
+    """Буфер несохранённых записей одной модели журнала (отдельный для каждого потока)."""
+
+    def __init__(
+        self,
+        model: type[models.Model],
+        batch_size: int | None = None,
+        flush_interval: float | None = None,
+        enabled: bool | None = None,
+    ):
+        self.model = model
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._enabled = enabled
+        self._pending: dict[int, _PendingRecords] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def batch_size(self) -> int:
+        if self._batch_size is not None:
+            return self._batch_size
+        return int(_buffer_settings().get("BATCH_SIZE", DEFAULT_BATCH_SIZE))
+
+    @property
+    def flush_interval(self) -> float:
+        if self._flush_interval is not None:
+            return self._flush_interval
+        return float(_buffer_settings().get("FLUSH_INTERVAL_SECONDS", DEFAULT_FLUSH_INTERVAL_SECONDS))
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is not None:
+            return self._enabled
+        return bool(_buffer_settings().get("ENABLED", True))
+
+    @property
+    def using(self) -> str:
+        return router.db_for_write(self.model)
+
+    def __len__(self) -> int:
+        """Количество записей в буфере текущего потока."""
+        with self._lock:
+            pending = self._pending.get(threading.get_ident())
+            return len(pending.records) if pending else 0
+
+    def __enter__(self) -> "BufferedLogWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.flush()
+
+    def add(self, record: ModelT) -> ModelT:
+        """
+        Поставить запись в очередь на запись.
+
+        В синхронном режиме запись сохраняется сразу (в транзакции вызывающего
+        кода). В буферизованном возвращается несохранённый объект: pk
+        проставит bulk_create при сбросе. Внутри transaction.atomic запись
+        встаёт в буфер только после фиксации транзакции.
+        """
+        if not self.enabled:
+            record.save()
+            return record
+
+        if transaction.get_connection(self.using).in_atomic_block:
+            transaction.on_commit(partial(self._enqueue, record), using=self.using)
+        else:
+            self._enqueue(record)
+        return record
+
+    def extend(self, records: Iterable[models.Model]) -> None:
+        """Поставить в очередь несколько записей."""
+        for record in records:
+            self.add(record)
+
+    def flush_if_due(self) -> int:
+        """Сбросить буфер текущего потока, если он заполнен или истёк интервал."""
+        with self._lock:
+            pending = self._pending.get(threading.get_ident())
+            if not pending or not pending.records:
+                return 0
+            full = len(pending.records) >= self.batch_size
+            expired = (
+                pending.first_added_at is not None and time.monotonic() - pending.first_added_at >= self.flush_interval
+            )
+        if full or expired:
+            return self.flush()
+        return 0
+
+    def flush(self) -> int:
+        """
+        Записать накопленные записи текущего потока.
+
+        Внутри transaction.atomic сброс откладывается до фиксации транзакции.
+
+        Returns:
+            int: Количество записанных строк.
+        """
+        if transaction.get_connection(self.using).in_atomic_block:
+            transaction.on_commit(self.flush, using=self.using)
+            return 0
+        return self._write(self._take(threading.get_ident()))
+
+    def flush_all(self) -> int:
+        """Записать буферы всех потоков (остановка процесса)."""
+        with self._lock:
+            thread_ids = list(self._pending)
+        return sum(self._write(self._take(thread_id)) for thread_id in thread_ids)
+
+    def discard(self) -> None:
+        """Очистить буферы без записи (после fork в дочернем процессе)."""
+        with self._lock:
+            self._pending = {}
+
+    def _enqueue(self, record: models.Model) -> None:
+        with self._lock:
+            pending = self._pending.setdefault(threading.get_ident(), _PendingRecords())
+            if not pending.records:
+                pending.first_added_at = time.monotonic()
+            pending.records.append(record)
+        self.flush_if_due()
+
+    def _take(self, thread_id: int) -> list[models.Model]:
+        with self._lock:
+            pending = self._pending.pop(thread_id, None)
+        return pending.records if pending else []
+
+    def _write(self, records: list[models.Model]) -> int:
+        if not records:
+            return 0
+        try:
+            with transaction.atomic(using=self.using):
+                self.model._default_manager.bulk_create(records)
+            log_records_bulk_created.send(sender=self.model, records=records)
+            return len(records)
+        except IntegrityError:
+            logger.warning(
+                f"Bulk flush of {len(records)} {self.model.__name__} records violated a constraint, "
+                f"falling back to row-by-row writes",
+                exc_info=True,
+            )
+            return self._save_one_by_one(records)
+        except DatabaseError:
+            logger.exception(f"Bulk flush of {len(records)} {self.model.__name__} records failed, will retry")
+            self._requeue(records)
+            return 0
+
+    def _save_one_by_one(self, records: list[models.Model]) -> int:
+        saved = 0
+        for record in records:
+            try:
+                with transaction.atomic(using=self.using):
+                    record.save(force_insert=True)
+                saved += 1
+            except IntegrityError as e:
+                logger.error(f"Dropped {self.model.__name__} record that violates a constraint: {e}")
+        return saved
+
+    def _requeue(self, records: list[models.Model]) -> None:
+        with self._lock:
+            pending = self._pending.setdefault(threading.get_ident(), _PendingRecords())
+            pending.records = records + pending.records
+            pending.first_added_at = time.monotonic()
+            limit = self.batch_size * MAX_PENDING_BATCHES
+            if len(pending.records) > limit:
+                dropped = len(pending.records) - limit
+                pending.records = pending.records[dropped:]
+                logger.error(f"{self.model.__name__} log buffer overflow: dropped {dropped} oldest records")
+
+
+_writers: dict[type[models.Model], BufferedLogWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_log_writer(model: type[models.Model]) -> BufferedLogWriter:
+    """Буфер записей модели журнала (общий объект, записи — по потокам)."""
+    with _writers_lock:
+        writer = _writers.get(model)
+        if writer is None:
+            writer = _writers[model] = BufferedLogWriter(model)
+        return writer
+
+
+def flush_log_buffers(**kwargs: Any) -> int:
+    """Сбросить буферы журналов текущего потока (конец запроса, задачи, сессии)."""
+    total = 0
+    for writer in list(_writers.values()):
+        try:
+            total += writer.flush()
+        except Exception:
+            logger.exception(f"Failed to flush {writer.model.__name__} log buffer")
+    return total
+
+
+def flush_all_log_buffers(**kwargs: Any) -> int:
+    """Сбросить буферы журналов всех потоков (остановка процесса)."""
+    total = 0
+    for writer in list(_writers.values()):
+        try:
+            total += writer.flush_all()
+        except Exception:
+            logger.exception(f"Failed to flush {writer.model.__name__} log buffers")
+    return total
+
+
+def _discard_after_fork() -> None:
+    # Копия буфера родителя будет записана родителем — дочерний процесс её не дублирует
+    for writer in _writers.values():
+        writer.discard()
+
+
+_hooks_installed = False
+
+
+def install_flush_hooks() -> None:
+    """Подключить сброс буферов к завершению запросов, задач и процесса."""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    _hooks_installed = True
+
+    from django.core.signals import request_finished
+
+    request_finished.connect(flush_log_buffers, dispatch_uid="log_buffer_request_finished")
+    atexit.register(flush_all_log_buffers)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_discard_after_fork)
+
+    try:
+        from celery.signals import task_postrun, worker_process_shutdown, worker_shutdown
+    except ImportError:
+        return
+    task_postrun.connect(flush_log_buffers, weak=False, dispatch_uid="log_buffer_task_postrun")
+    worker_process_shutdown.connect(
+        flush_all_log_buffers, weak=False, dispatch_uid="log_buffer_worker_process_shutdown"
+    )
+    worker_shutdown.connect(flush_all_log_buffers, weak=False, dispatch_uid="log_buffer_worker_shutdown")
@@ -11,10 +11,12 @@ from typing import Any
 
 import requests
 from django.conf import settings
-from django.db.models import Avg, Count
+from django.db.models import Avg, Count, Q
 from django.utils import timezone
 
 from apps.common.models import CustomerSyncLog
+from apps.common.services.prometheus import render_latest
+from apps.common.services.sync_metrics import SyncMetricsAggregator
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +24,10 @@ logger = logging.getLogger(__name__)
 class PrometheusMetrics:
     """
     Сбор метрик для Prometheus.
-    В production используется библиотека prometheus_client.
+
+    Метрики производительности (HTTP, SQL, кеши, Celery, импорт) ведёт
+    prometheus_client (apps.common.services.prometheus); сюда добавляются
+    сводные показатели синхронизации клиентов за последние 24 часа.
     """
 
     @staticmethod
@@ -43,30 +48,52 @@ class PrometheusMetrics:
             return {}
 
         # Метрики за последние 24 часа
-        since = timezone.now() - timedelta(hours=24)
-        recent_logs = CustomerSyncLog.objects.filter(created_at__gte=since)
+        now = timezone.now()
+        since = now - timedelta(hours=24)
+
+        if SyncMetricsAggregator.is_enabled():
+            try:
+                aggregator = SyncMetricsAggregator()
+                if aggregator.covers(since):
+                    operations = aggregator.get_operation_metrics(since, now)
+                    return {
+                        "sync_operations_total": operations["total_operations"],
+                        "sync_operations_by_type": operations["operations_by_type"],
+                        "sync_errors_total": operations["error_count"],
+                        "sync_success_total": operations["success_count"],
+                        "sync_duration_avg_ms": operations["duration_avg_ms"],
+                        "sync_success_rate": operations["success_rate"],
+                        "timestamp": now.isoformat(),
+                    }
+            except Exception as e:
+                logger.warning("Предагрегированные метрики недоступны, считаем по БД: %s", e)
 
-        # Общее количество операций
-        total_operations = recent_logs.count()
+        recent_logs = CustomerSyncLog.objects.filter(created_at__gte=since)
 
         # Количество по типам операций
         operations_by_type = {}
         for item in recent_logs.values("operation_type").annotate(count=Count("id")):
             operations_by_type[item["operation_type"]] = item["count"]
 
-        # Количество ошибок
-        error_count = recent_logs.filter(
-            status__in=[
-                CustomerSyncLog.StatusType.ERROR,
-                CustomerSyncLog.StatusType.FAILED,
-            ]
-        ).count()
-
-        # Средняя длительность операций
-        avg_duration = recent_logs.aggregate(avg=Avg("duration_ms"))["avg"] or 0
-
-        # Количество успешных операций
-        success_count = recent_logs.filter(status=CustomerSyncLog.StatusType.SUCCESS).count()
+        # Итоги, ошибки, успехи и средняя длительность — одним запросом
+        totals = recent_logs.aggregate(
+            total=Count("id"),
+            errors=Count(
+                "id",
+                filter=Q(
+                    status__in=[
+                        CustomerSyncLog.StatusType.ERROR,
+                        CustomerSyncLog.StatusType.FAILED,
+                    ]
+                ),
+            ),
+            success=Count("id", filter=Q(status=CustomerSyncLog.StatusType.SUCCESS)),
+            avg=Avg("duration_ms"),
+        )
+        total_operations = totals["total"]
+        error_count = totals["errors"]
+        success_count = totals["success"]
+        avg_duration = totals["avg"] or 0
 
         return {
             "sync_operations_total": total_operations,
@@ -83,6 +110,9 @@ class PrometheusMetrics:
         """
         Экспортирует метрики в текстовом формате Prometheus.
 
+        Содержит реестр prometheus_client (в режиме multiprocess — сводно по
+        всем воркерам) и показатели синхронизации клиентов.
+
         Returns:
             Строка с метриками в формате Prometheus
         """
@@ -118,7 +148,7 @@ class PrometheusMetrics:
         for op_type, count in metrics["sync_operations_by_type"].items():
             lines.append(f'sync_operations_by_type{{type="{op_type}"}} {count}')
 
-        return "\n".join(lines) + "\n"
+        return render_latest().decode("utf-8") + "\n".join(lines) + "\n"
 
 
 class WebhookAlerts:
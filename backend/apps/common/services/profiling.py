@@ -0,0 +1,269 @@
+"""
+Профилирование обменов с 1С (импорт каталога, статусы и выгрузка заказов).
+
+ExchangeProfiler включается по требованию и собирает по фазам обмена
+(goods, offers, prices, parse, apply, read, build...):
+- wall time и CPU time потока, выполнявшего фазу;
+- число и суммарное время SQL-запросов (QueryRecorder);
+- счётчики обработанных строк, которые фаза заполняет сама.
+
+В режиме ProfilingMode.SAMPLING дополнительно работает сэмплирующий профайлер:
+фоновый поток с интервалом SAMPLE_INTERVAL снимает стек профилируемого потока
+(sys._current_frames) и считает одинаковые стеки. При finish() сэмплы пишутся
+рядом с журналами обмена в двух форматах: collapsed stacks (flamegraph.pl,
+speedscope, inferno) и JSON speedscope (https://www.speedscope.app).
+
+Сводка report() сохраняется в ImportSession.report_details["profile"].
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from types import FrameType
+from typing import Any, ContextManager
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from apps.common.services.query_budget import QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_INTERVAL = 0.01
+# Глубже стек обрезается со стороны корня: горячие кадры находятся у вершины
+MAX_STACK_DEPTH = 128
+
+
+class ProfilingMode(models.TextChoices):
+    OFF = "off", "Выключено"
+    PHASES = "phases", "Фазы: время, CPU, SQL, строки"
+    SAMPLING = "sampling", "Фазы + сэмплирующий профиль"
+
+
+class PhaseRecord:
+    """Накопленные показатели одной фазы (фаза может выполняться многократно)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows: Counter[str] = Counter()
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "wall_s": round(self.wall, 3),
+            "cpu_s": round(self.cpu, 3),
+            "queries": self.queries,
+            "db_s": round(self.db_time, 3),
+            "rows": dict(self.rows),
+        }
+
+
+def _frame_key(frame: FrameType) -> tuple[str, str, int]:
+    code = frame.f_code
+    filename = code.co_filename
+    base_dir = str(settings.BASE_DIR)
+    if filename.startswith(base_dir):
+        filename = filename[len(base_dir) :].lstrip("/")
+    elif "site-packages/" in filename:
+        filename = filename.split("site-packages/", 1)[1]
+    return code.co_name, filename, code.co_firstlineno
+
+
+class StackSampler(threading.Thread):
+    """Фоновый поток, периодически снимающий стек указанного потока."""
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        super().__init__(name="exchange-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[tuple[tuple[str, str, int], ...]] = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        """Стеки в формате collapsed: «корень;...;вершина <число сэмплов>»."""
+        lines = []
+        for stack, count in self.samples.most_common():
+            names = ";".join(f"{name} ({filename}:{line})".replace(";", ",") for name, filename, line in stack)
+            lines.append(f"{names} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str) -> dict[str, Any]:
+        """Профиль типа sampled в формате speedscope (вес сэмпла — интервал в секундах)."""
+        frames: dict[tuple[str, str, int], int] = {}
+        samples = []
+        weights = []
+        for stack, count in self.samples.items():
+            samples.append([frames.setdefault(key, len(frames)) for key in stack])
+            weights.append(round(count * self.interval, 6))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "freesport",
+            "shared": {"frames": [{"name": n, "file": f, "line": line} for n, f, line in frames]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": round(sum(weights), 6),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+
+class ExchangeProfiler:
+    """
+    Профиль одного обмена: фазы и (опционально) сэмплы стека.
+
+    Usage::
+
+        profiler = ExchangeProfiler.from_mode(session.profiling, label=f"import_session_{session.pk}")
+        profiler.start()
+        with profiler.phase("goods") as phase:
+            phase.rows["products"] += parse_goods()
+        session.report_details["profile"] = profiler.finish(log_dir)
+    """
+
+    def __init__(self, label: str, sampling: bool = False, interval: float | None = None):
+        self.label = label
+        self.sampling = sampling
+        self.interval = interval or profiling_settings().get("SAMPLE_INTERVAL", DEFAULT_SAMPLE_INTERVAL)
+        self.phases: dict[str, PhaseRecord] = {}
+        self.files: list[str] = []
+        self.samples = 0
+        self._sampler: StackSampler | None = None
+        self._started_wall: float | None = None
+        self._started_cpu = 0.0
+        self._wall = 0.0
+        self._cpu = 0.0
+
+    @classmethod
+    def from_mode(cls, mode: str | None, label: str) -> ExchangeProfiler | None:
+        """Профайлер для режима ProfilingMode; None, если профилирование выключено."""
+        if mode not in (ProfilingMode.PHASES, ProfilingMode.SAMPLING):
+            return None
+        return cls(label, sampling=mode == ProfilingMode.SAMPLING)
+
+    @property
+    def mode(self) -> str:
+        return ProfilingMode.SAMPLING if self.sampling else ProfilingMode.PHASES
+
+    def start(self) -> None:
+        """Начать замер общего времени (и сэмплирование текущего потока)."""
+        if self._started_wall is not None:
+            return
+        self._started_wall = time.perf_counter()
+        self._started_cpu = time.thread_time()
+        if self.sampling:
+            self._sampler = StackSampler(threading.get_ident(), self.interval)
+            self._sampler.start()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseRecord]:
+        """Замер фазы; повторные входы в фазу с тем же именем суммируются."""
+        record = self.phases.setdefault(name, PhaseRecord(name))
+        recorder = QueryRecorder()
+        started_wall = time.perf_counter()
+        started_cpu = time.thread_time()
+        try:
+            with recorder:
+                yield record
+        finally:
+            record.calls += 1
+            record.wall += time.perf_counter() - started_wall
+            record.cpu += time.thread_time() - started_cpu
+            record.queries += recorder.count
+            record.db_time += recorder.duration
+
+    def report(self) -> dict[str, Any]:
+        """Сводка для report_details; до finish() общее время — на текущий момент."""
+        wall, cpu = self._wall, self._cpu
+        if self._started_wall is not None:
+            wall = time.perf_counter() - self._started_wall
+            cpu = time.thread_time() - self._started_cpu
+        report: dict[str, Any] = {
+            "mode": str(self.mode),
+            "wall_s": round(wall, 3),
+            "cpu_s": round(cpu, 3),
+            "phases": {name: record.as_dict() for name, record in self.phases.items()},
+        }
+        if self.sampling:
+            report["sampling"] = {
+                "interval_ms": round(self.interval * 1000, 3),
+                "samples": self.samples,
+                "files": self.files,
+            }
+        return report
+
+    def finish(self, directory: Path | None = None) -> dict[str, Any]:
+        """
+        Остановить замер и вернуть сводку.
+
+        Сэмплы стека сохраняются в directory (обычно каталог журналов обмена);
+        ошибка записи не прерывает обмен. Повторный вызов возвращает ту же сводку.
+        """
+        if self._started_wall is not None:
+            self._wall = time.perf_counter() - self._started_wall
+            self._cpu = time.thread_time() - self._started_cpu
+            self._started_wall = None
+            if self._sampler is not None:
+                self._sampler.stop()
+                self.samples = sum(self._sampler.samples.values())
+                if directory is not None:
+                    self._save_samples(directory)
+        return self.report()
+
+    def _save_samples(self, directory: Path) -> None:
+        assert self._sampler is not None
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            prefix = directory / f"{timezone.now().strftime('%Y%m%d_%H%M%S')}_{self.label}"
+            collapsed = prefix.with_name(f"{prefix.name}.collapsed")
+            collapsed.write_text(self._sampler.collapsed(), encoding="utf-8")
+            speedscope = prefix.with_name(f"{prefix.name}.speedscope.json")
+            speedscope.write_text(json.dumps(self._sampler.speedscope(self.label)), encoding="utf-8")
+            self.files = [collapsed.name, speedscope.name]
+        except OSError as e:
+            logger.error(f"[PROFILING] Failed to save profile {self.label}: {e}")
+
+
+def profile_phase(profiler: ExchangeProfiler | None, name: str) -> ContextManager[PhaseRecord]:
+    """Фаза профайлера или пустой контекст, если профилирование выключено."""
+    if profiler is None:
+        return nullcontext(PhaseRecord(name))
+    return profiler.phase(name)
+
+
+def profiling_settings() -> dict[str, Any]:
+    return getattr(settings, "EXCHANGE_PROFILING", {})
@@ -0,0 +1,171 @@
+"""
+Метрики производительности приложения в формате Prometheus.
+
+Собираются в процессе, где происходит работа:
+- HTTP: длительность запроса по DRF view/action и статусу, число и время
+  SQL-запросов на запрос (PrometheusMiddleware);
+- кеши каталога: попадания и промахи (record_cache_lookup);
+- Celery: длительность задач и задержка в очереди (install_celery_metrics_hooks);
+- импорт из 1С: длительность фаз VariantImportProcessor (observe_import_phase);
+- обмен с 1С: ожидание блокировки файла загрузки (observe_file_lock_wait).
+
+Под gunicorn каждый воркер — отдельный процесс, поэтому при заданной переменной
+окружения PROMETHEUS_MULTIPROC_DIR значения пишутся в файлы этого каталога и
+при выгрузке объединяются MultiProcessCollector. Каталог задаётся и очищается
+при старте gunicorn (gunicorn.conf.py). Метрики Celery попадают в выгрузку
+веб-сервера, если воркеры запущены с тем же каталогом (общий том).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+# Заголовок сообщения Celery с моментом публикации (unix time)
+PUBLISHED_AT_HEADER = "freesport_published_at"
+
+# Метка для запросов, не дошедших до view (404 при резолве, ответ middleware)
+UNRESOLVED_VIEW = "<unresolved>"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "freesport_http_request_duration_seconds",
+    "HTTP request latency by view, action and status",
+    ["view", "action", "method", "status"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "freesport_http_request_db_queries",
+    "Number of SQL queries executed per HTTP request",
+    ["view", "action"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+HTTP_REQUEST_DB_DURATION = Histogram(
+    "freesport_http_request_db_duration_seconds",
+    "Total SQL time per HTTP request",
+    ["view", "action"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+CACHE_REQUESTS = Counter(
+    "freesport_cache_requests_total",
+    "Catalog cache lookups by result",
+    ["cache", "result"],
+)
+CELERY_TASK_DURATION = Histogram(
+    "freesport_celery_task_duration_seconds",
+    "Celery task run time by final state",
+    ["task", "state"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 1800.0, 3600.0),
+)
+CELERY_TASK_QUEUE_LAG = Histogram(
+    "freesport_celery_task_queue_lag_seconds",
+    "Time between publishing a Celery task and a worker starting it",
+    ["task", "queue"],
+    buckets=(0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0),
+)
+IMPORT_PHASE_DURATION = Histogram(
+    "freesport_import_phase_duration_seconds",
+    "Duration of 1C import phases",
+    ["phase"],
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0, 3600.0),
+)
+
+FILE_LOCK_WAIT = Histogram(
+    "freesport_onec_file_lock_wait_seconds",
+    "Time spent waiting for a 1C upload file lock by outcome (free, contended, timeout)",
+    ["outcome"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+
+def is_multiprocess_mode() -> bool:
+    """Включён ли режим нескольких процессов (gunicorn, Celery prefork)."""
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render_latest() -> bytes:
+    """Выгрузить все метрики в текстовом формате Prometheus."""
+    if is_multiprocess_mode():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def record_cache_lookup(cache_name: str, hit: bool) -> None:
+    """Учесть обращение к кешу каталога."""
+    CACHE_REQUESTS.labels(cache=cache_name, result="hit" if hit else "miss").inc()
+
+
+def observe_import_phase(phase: str, duration: float) -> None:
+    """Учесть длительность фазы импорта в секундах."""
+    IMPORT_PHASE_DURATION.labels(phase=phase).observe(duration)
+
+
+def observe_file_lock_wait(outcome: str, duration: float) -> None:
+    """Учесть ожидание блокировки файла обмена: free — без ожидания, contended, timeout."""
+    FILE_LOCK_WAIT.labels(outcome=outcome).observe(duration)
+
+
+# ============================================================================
+# Celery
+# ============================================================================
+
+_task_started_at: dict[str, float] = {}
+_task_started_lock = threading.Lock()
+
+
+def _add_published_at_header(headers: dict[str, Any] | None = None, **kwargs: Any) -> None:
+    if headers is not None:
+        headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+def _on_task_prerun(task_id: str | None = None, task: Any = None, **kwargs: Any) -> None:
+    if task_id is None or task is None:
+        return
+    with _task_started_lock:
+        _task_started_at[task_id] = time.monotonic()
+
+    request = task.request
+    published_at = getattr(request, PUBLISHED_AT_HEADER, None)
+    if published_at is None:
+        return
+    try:
+        lag = max(time.time() - float(published_at), 0.0)
+    except (TypeError, ValueError):
+        return
+    delivery_info = getattr(request, "delivery_info", None) or {}
+    queue = delivery_info.get("routing_key") or "default"
+    CELERY_TASK_QUEUE_LAG.labels(task=task.name, queue=queue).observe(lag)
+
+
+def _on_task_postrun(task_id: str | None = None, task: Any = None, state: str | None = None, **kwargs: Any) -> None:
+    if task_id is None:
+        return
+    with _task_started_lock:
+        started_at = _task_started_at.pop(task_id, None)
+    if started_at is None or task is None:
+        return
+    CELERY_TASK_DURATION.labels(task=task.name, state=state or "UNKNOWN").observe(time.monotonic() - started_at)
+
+
+_celery_hooks_installed = False
+
+
+def install_celery_metrics_hooks() -> None:
+    """Подключить учёт длительности и задержки Celery-задач к сигналам Celery."""
+    global _celery_hooks_installed
+    if _celery_hooks_installed:
+        return
+    _celery_hooks_installed = True
+
+    try:
+        from celery.signals import before_task_publish, task_postrun, task_prerun
+    except ImportError:
+        return
+    before_task_publish.connect(_add_published_at_header, weak=False, dispatch_uid="prometheus_task_publish")
+    task_prerun.connect(_on_task_prerun, weak=False, dispatch_uid="prometheus_task_prerun")
+    task_postrun.connect(_on_task_postrun, weak=False, dispatch_uid="prometheus_task_postrun")
@@ -0,0 +1,175 @@
+"""
+Бюджет SQL-запросов на HTTP-запрос и обнаружение N+1.
+
+QueryRecorder через execute_wrapper считает запросы, их суммарное время и
+«отпечатки» SQL (текст без литералов и с IN-списками любой длины,
+сведёнными к одному виду). Многократно повторённый отпечаток — признак N+1:
+prefetch не сработал, и запрос выполняется на каждый объект.
+
+View объявляет бюджет декоратором @query_budget(N) — на классе, на методе
+действия ViewSet (приоритетнее класса) или поверх @api_view.
+QueryBudgetMiddleware работает в режимах QUERY_BUDGET["MODE"]:
+- "enforce" (тесты): превышение бюджета — исключение QueryBudgetExceeded
+  с отчётом о повторяющихся запросах;
+- "log" (production): выборочно (SAMPLE_RATE) пишет в лог превышения бюджета
+  и повторы с образцами стека;
+- "off": middleware не подключается.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import time
+import traceback
+from collections import Counter
+from collections.abc import Callable
+from contextlib import ExitStack
+from typing import Any, TypeVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest
+
+QUERY_BUDGET_ATTR = "query_budget"
+
+DEFAULT_SAMPLE_RATE = 0.01
+DEFAULT_DUPLICATE_THRESHOLD = 10
+DEFAULT_STACK_DEPTH = 8
+
+ViewT = TypeVar("ViewT")
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+# Кадры самого счётчика в образцах стека не нужны
+_OWN_FILES = (os.path.join("common", "services", "query_budget.py"), os.path.join("common", "middleware.py"))
+
+
+class QueryBudgetExceeded(AssertionError):
+    """View выполнил больше SQL-запросов, чем объявлено в @query_budget."""
+
+
+def query_budget(max_queries: int) -> Callable[[ViewT], ViewT]:
+    """
+    Объявить бюджет SQL-запросов для view или действия ViewSet.
+
+    Для функций с @api_view декоратор ставится над @api_view.
+    """
+
+    def decorator(view: ViewT) -> ViewT:
+        setattr(view, QUERY_BUDGET_ATTR, max_queries)
+        return view
+
+    return decorator
+
+
+def get_query_budget(request: HttpRequest) -> int | None:
+    """Бюджет, объявленный для view, обработавшего запрос."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+
+    budget = getattr(match.func, QUERY_BUDGET_ATTR, None)
+    if budget is not None:
+        return budget
+
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None:
+        return None
+
+    method = (request.method or "").lower()
+    actions = getattr(match.func, "actions", None) or {}
+    handler = getattr(view_class, actions.get(method, method), None)
+    budget = getattr(handler, QUERY_BUDGET_ATTR, None)
+    if budget is not None:
+        return budget
+    return getattr(view_class, QUERY_BUDGET_ATTR, None)
+
+
+def fingerprint(sql: str) -> str:
+    """Нормализованный SQL: без литералов, IN-списки любой длины одинаковы."""
+    sql = _STRING_LITERAL_RE.sub("?", sql)
+    sql = _NUMBER_LITERAL_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _WHITESPACE_RE.sub(" ", sql).strip()
+
+
+def _stack_sample(depth: int) -> list[str]:
+    """Кадры стека кода проекта (без Django и сторонних библиотек)."""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        f"{frame.filename}:{frame.lineno} in {frame.name}"
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and "site-packages" not in frame.filename
+        and not frame.filename.endswith(_OWN_FILES)
+    ]
+    return frames[-depth:]
+
+
+class QueryRecorder:
+    """
+    Счётчик SQL-запросов для блока кода (все подключения к БД).
+
+    Используется как контекст-менеджер в middleware и в тестах::
+
+        with QueryRecorder(capture_stacks=True) as recorder:
+            client.get(url)
+        recorder.assert_within(12)
+    """
+
+    def __init__(self, capture_stacks: bool = False, stack_depth: int = DEFAULT_STACK_DEPTH):
+        self.capture_stacks = capture_stacks
+        self.stack_depth = stack_depth
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints: Counter[str] = Counter()
+        self.stacks: dict[str, list[str]] = {}
+        self._exit_stack: ExitStack | None = None
+
+    def __enter__(self) -> "QueryRecorder":
+        self._exit_stack = ExitStack()
+        for alias in connections:
+            self._exit_stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._exit_stack is not None:
+            self._exit_stack.close()
+            self._exit_stack = None
+
+    def __call__(self, execute: Callable[..., Any], sql: str, params: Any, many: bool, context: dict[str, Any]) -> Any:
+        key = fingerprint(sql)
+        if self.capture_stacks and key not in self.stacks:
+            self.stacks[key] = _stack_sample(self.stack_depth)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+            self.fingerprints[key] += 1
+
+    def duplicates(self, threshold: int = 2) -> list[tuple[str, int]]:
+        """Отпечатки, повторённые не менее threshold раз, по убыванию."""
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n >= threshold]
+
+    def report(self, limit: int = 5) -> str:
+        """Сводка для лога или сообщения об ошибке теста."""
+        lines = [f"{self.count} queries in {self.duration * 1000:.1f} ms"]
+        for sql, n in self.duplicates()[:limit]:
+            lines.append(f"  {n}x {sql[:300]}")
+            for frame in self.stacks.get(sql, []):
+                lines.append(f"      {frame}")
+        return "\n".join(lines)
+
+    def assert_within(self, max_queries: int, label: str = "block") -> None:
+        """Бросить QueryBudgetExceeded, если запросов больше бюджета."""
+        if self.count > max_queries:
+            raise QueryBudgetExceeded(f"{label} exceeded query budget of {max_queries}: {self.report()}")
+
+
+def budget_settings() -> dict[str, Any]:
+    return getattr(settings, "QUERY_BUDGET", {})
@@ -10,6 +10,7 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 
 from apps.common.models import CustomerSyncLog
+from apps.common.services.log_buffer import get_log_writer
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -32,6 +33,25 @@ class CustomerSyncLogger:
         """Генерирует уникальный correlation ID"""
         return str(uuid.uuid4())
 
+    def __enter__(self) -> "CustomerSyncLogger":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.flush()
+
+    def flush(self) -> int:
+        """Записывает накопленные записи лога (конец сессии синхронизации)."""
+        return get_log_writer(CustomerSyncLog).flush()
+
+    def _write(self, record: CustomerSyncLog) -> CustomerSyncLog:
+        """
+        Ставит запись в буфер журнала (см. apps.common.services.log_buffer).
+
+        В буферизованном режиме запись сохраняется пакетом позже, поэтому
+        возвращаемый объект может ещё не иметь pk.
+        """
+        return get_log_writer(CustomerSyncLog).add(record)
+
     def log_customer_import(
         self,
         customer_data: dict[str, Any],
@@ -69,15 +89,17 @@ class CustomerSyncLogger:
                 }
             )
 
-        return CustomerSyncLog.objects.create(
-            operation_type=CustomerSyncLog.OperationType.IMPORT_FROM_1C,
-            customer=customer if success else None,
-            onec_id=customer_data.get("id", ""),
-            status=(CustomerSyncLog.StatusType.SUCCESS if success else CustomerSyncLog.StatusType.ERROR),
-            details=details,
-            error_message=result.get("error_message", ""),
-            duration_ms=duration_ms,
-            correlation_id=self.correlation_id,
+        return self._write(
+            CustomerSyncLog(
+                operation_type=CustomerSyncLog.OperationType.IMPORT_FROM_1C,
+                customer=customer if success else None,
+                onec_id=customer_data.get("id", ""),
+                status=(CustomerSyncLog.StatusType.SUCCESS if success else CustomerSyncLog.StatusType.ERROR),
+                details=details,
+                error_message=result.get("error_message", ""),
+                duration_ms=duration_ms,
+                correlation_id=self.correlation_id,
+            )
         )
 
     def log_customer_export(
@@ -116,15 +138,17 @@ class CustomerSyncLogger:
                 }
             )
 
-        return CustomerSyncLog.objects.create(
-            operation_type=CustomerSyncLog.OperationType.EXPORT_TO_1C,
-            customer=platform_customer,
-            onec_id=result.get("onec_id", platform_customer.onec_id or ""),
-            status=(CustomerSyncLog.StatusType.SUCCESS if success else CustomerSyncLog.StatusType.ERROR),
-            details=details,
-            error_message=result.get("error_message", ""),
-            duration_ms=duration_ms,
-            correlation_id=self.correlation_id,
+        return self._write(
+            CustomerSyncLog(
+                operation_type=CustomerSyncLog.OperationType.EXPORT_TO_1C,
+                customer=platform_customer,
+                onec_id=result.get("onec_id", platform_customer.onec_id or ""),
+                status=(CustomerSyncLog.StatusType.SUCCESS if success else CustomerSyncLog.StatusType.ERROR),
+                details=details,
+                error_message=result.get("error_message", ""),
+                duration_ms=duration_ms,
+                correlation_id=self.correlation_id,
+            )
         )
 
     def log_customer_identification(
@@ -155,14 +179,16 @@ class CustomerSyncLogger:
             "customer_id": customer.id if customer else None,
         }
 
-        return CustomerSyncLog.objects.create(
-            operation_type=CustomerSyncLog.OperationType.CUSTOMER_IDENTIFICATION,
-            customer=customer,
-            onec_id=onec_data.get("onec_id", ""),
-            status=(CustomerSyncLog.StatusType.SUCCESS if found else CustomerSyncLog.StatusType.SKIPPED),
-            details=details,
-            duration_ms=duration_ms,
-            correlation_id=self.correlation_id,
+        return self._write(
+            CustomerSyncLog(
+                operation_type=CustomerSyncLog.OperationType.CUSTOMER_IDENTIFICATION,
+                customer=customer,
+                onec_id=onec_data.get("onec_id", ""),
+                status=(CustomerSyncLog.StatusType.SUCCESS if found else CustomerSyncLog.StatusType.SKIPPED),
+                details=details,
+                duration_ms=duration_ms,
+                correlation_id=self.correlation_id,
+            )
         )
 
     def log_conflict_resolution(
@@ -199,15 +225,17 @@ class CustomerSyncLogger:
             "sync_conflict_id": resolution_result.get("sync_conflict_id"),
         }
 
-        return CustomerSyncLog.objects.create(
-            operation_type=CustomerSyncLog.OperationType.CONFLICT_RESOLUTION,
-            customer=existing_customer,
-            onec_id=onec_data.get("onec_id", ""),
-            status=(CustomerSyncLog.StatusType.SUCCESS if success else CustomerSyncLog.StatusType.ERROR),
-            details=details,
-            error_message=resolution_result.get("error_message", ""),
-            duration_ms=duration_ms,
-            correlation_id=self.correlation_id,
+        return self._write(
+            CustomerSyncLog(
+                operation_type=CustomerSyncLog.OperationType.CONFLICT_RESOLUTION,
+                customer=existing_customer,
+                onec_id=onec_data.get("onec_id", ""),
+                status=(CustomerSyncLog.StatusType.SUCCESS if success else CustomerSyncLog.StatusType.ERROR),
+                details=details,
+                error_message=resolution_result.get("error_message", ""),
+                duration_ms=duration_ms,
+                correlation_id=self.correlation_id,
+            )
         )
 
     def log_sync_changes(
@@ -237,15 +265,17 @@ class CustomerSyncLogger:
             "customer_id": customer.id,
         }
 
-        return CustomerSyncLog.objects.create(
-            operation_type=CustomerSyncLog.OperationType.SYNC_CHANGES,
-            customer=customer,
-            onec_id=customer.onec_id or "",
-            status=(CustomerSyncLog.StatusType.SUCCESS if success else CustomerSyncLog.StatusType.ERROR),
-            details=details,
-            error_message=error_message,
-            duration_ms=duration_ms,
-            correlation_id=self.correlation_id,
+        return self._write(
+            CustomerSyncLog(
+                operation_type=CustomerSyncLog.OperationType.SYNC_CHANGES,
+                customer=customer,
+                onec_id=customer.onec_id or "",
+                status=(CustomerSyncLog.StatusType.SUCCESS if success else CustomerSyncLog.StatusType.ERROR),
+                details=details,
+                error_message=error_message,
+                duration_ms=duration_ms,
+                correlation_id=self.correlation_id,
+            )
         )
 
     def log_batch_operation(
@@ -285,15 +315,17 @@ class CustomerSyncLogger:
             else:
                 status = CustomerSyncLog.StatusType.WARNING
 
-        return CustomerSyncLog.objects.create(
-            operation_type=CustomerSyncLog.OperationType.BATCH_OPERATION,
-            customer=None,
-            onec_id="",
-            status=status,
-            details=details,
-            error_message=(f"{error_count} ошибок из {total_count}" if error_count > 0 else ""),
-            duration_ms=duration_ms,
-            correlation_id=self.correlation_id,
+        return self._write(
+            CustomerSyncLog(
+                operation_type=CustomerSyncLog.OperationType.BATCH_OPERATION,
+                customer=None,
+                onec_id="",
+                status=status,
+                details=details,
+                error_message=(f"{error_count} ошибок из {total_count}" if error_count > 0 else ""),
+                duration_ms=duration_ms,
+                correlation_id=self.correlation_id,
+            )
         )
 
     def log_data_validation(
@@ -327,13 +359,15 @@ class CustomerSyncLogger:
             "validated_fields": validation_result.get("validated_fields", []),
         }
 
-        return CustomerSyncLog.objects.create(
-            operation_type=CustomerSyncLog.OperationType.DATA_VALIDATION,
-            customer=None,
-            onec_id=onec_id,
-            status=(CustomerSyncLog.StatusType.SUCCESS if is_valid else CustomerSyncLog.StatusType.ERROR),
-            details=details,
-            error_message="; ".join(errors) if errors else "",
-            duration_ms=duration_ms,
-            correlation_id=self.correlation_id,
+        return self._write(
+            CustomerSyncLog(
+                operation_type=CustomerSyncLog.OperationType.DATA_VALIDATION,
+                customer=None,
+                onec_id=onec_id,
+                status=(CustomerSyncLog.StatusType.SUCCESS if is_valid else CustomerSyncLog.StatusType.ERROR),
+                details=details,
+                error_message="; ".join(errors) if errors else "",
+                duration_ms=duration_ms,
+                correlation_id=self.correlation_id,
+            )
         )
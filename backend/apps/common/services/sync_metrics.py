@@ -0,0 +1,428 @@
+"""
+Предагрегированные метрики синхронизации клиентов.
+
+Счетчики и скетчи длительностей обновляются в момент записи CustomerSyncLog
+(см. apps.common.signals) и хранятся в Redis в hash-бакетах трех уровней:
+минута, час и сутки. Запрос метрик за период собирает период из
+ограниченного набора бакетов (крупные — в середине, минутные — по краям),
+поэтому /metrics, метрики операций, realtime-метрики и проверки алертов не
+сканируют таблицу логов. Бакеты читаются только за периоды, которые покрыла
+пересборка rebuild_sync_metrics (метка rebuilt_since), до нее — по БД.
+
+Квантили длительности считаются по логарифмической гистограмме (DDSketch):
+относительная ошибка p95/p99 не больше SKETCH_RELATIVE_ACCURACY, скетчи
+разных бакетов складываются без потери точности.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Any
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from apps.common.models import CustomerSyncLog
+
+logger = logging.getLogger(__name__)
+
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+MINUTE = timedelta(minutes=1)
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+# Сколько хранятся бакеты каждого уровня; старше — период округляется до более крупного бакета
+MINUTE_RETENTION = timedelta(hours=26)
+HOUR_RETENTION = timedelta(days=35)
+DAY_RETENTION = timedelta(days=400)
+
+ERROR_STATUSES = (CustomerSyncLog.StatusType.ERROR, CustomerSyncLog.StatusType.FAILED)
+
+# Атомарное обновление бакета: HINCRBY по парам полей, min/max длительности, TTL
+_UPDATE_BUCKET_LUA = """
+for i = 4, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+if ARGV[2] ~= '' then
+    local current = redis.call('HGET', KEYS[1], 'dur:min')
+    if not current or tonumber(ARGV[2]) < tonumber(current) then
+        redis.call('HSET', KEYS[1], 'dur:min', ARGV[2])
+    end
+end
+if ARGV[3] ~= '' then
+    local current = redis.call('HGET', KEYS[1], 'dur:max')
+    if not current or tonumber(ARGV[3]) > tonumber(current) then
+        redis.call('HSET', KEYS[1], 'dur:max', ARGV[3])
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class DurationSketch:
+    """
+    Логарифмическая гистограмма длительностей (DDSketch).
+
+    Значение v > 0 попадает в бакет ceil(log_gamma(v)); нулевые значения
+    считаются отдельно. Квантиль возвращается как середина бакета с
+    относительной ошибкой не больше SKETCH_RELATIVE_ACCURACY.
+    """
+
+    GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+    _LOG_GAMMA = math.log(GAMMA)
+
+    def __init__(self) -> None:
+        self.buckets: Counter[int] = Counter()
+        self.zero_count = 0
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.buckets.values())
+
+    @classmethod
+    def bucket_index(cls, value: float) -> int | None:
+        """Индекс бакета для значения (None — для нулевых значений)."""
+        if value <= 0:
+            return None
+        return math.ceil(math.log(value) / cls._LOG_GAMMA)
+
+    def add(self, value: float, count: int = 1) -> None:
+        index = self.bucket_index(value)
+        if index is None:
+            self.zero_count += count
+        else:
+            self.buckets[index] += count
+
+    def merge(self, other: DurationSketch) -> None:
+        self.buckets.update(other.buckets)
+        self.zero_count += other.zero_count
+
+    def quantile(self, q: float) -> float:
+        """Приближенный квантиль q (0..1); 0.0 для пустого скетча."""
+        total = self.count
+        if total == 0:
+            return 0.0
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return 2 * self.GAMMA**index / (self.GAMMA + 1)
+        return 2 * self.GAMMA ** max(self.buckets) / (self.GAMMA + 1)
+
+
+class _Bucket:
+    """Агрегат одного или нескольких бакетов Redis."""
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.by_status: Counter[str] = Counter()
+        self.by_operation: Counter[str] = Counter()
+        self.duration_count = 0
+        self.duration_sum = 0
+        self.duration_min: int | None = None
+        self.duration_max: int | None = None
+        self.sketch = DurationSketch()
+
+    @property
+    def error_count(self) -> int:
+        return sum(self.by_status[status] for status in ERROR_STATUSES)
+
+    @property
+    def success_count(self) -> int:
+        return self.by_status[CustomerSyncLog.StatusType.SUCCESS]
+
+    @property
+    def duration_avg(self) -> float:
+        return self.duration_sum / self.duration_count if self.duration_count else 0.0
+
+    def merge_fields(self, fields: dict[bytes, bytes]) -> None:
+        for raw_name, raw_value in fields.items():
+            name = raw_name.decode()
+            value = int(raw_value)
+            if name == "total":
+                self.total += value
+            elif name.startswith("status:"):
+                self.by_status[name[7:]] += value
+            elif name.startswith("op:"):
+                self.by_operation[name[3:]] += value
+            elif name == "dur:n":
+                self.duration_count += value
+            elif name == "dur:sum":
+                self.duration_sum += value
+            elif name == "dur:min":
+                self.duration_min = value if self.duration_min is None else min(self.duration_min, value)
+            elif name == "dur:max":
+                self.duration_max = value if self.duration_max is None else max(self.duration_max, value)
+            elif name == "dur:z":
+                self.sketch.zero_count += value
+            elif name.startswith("dur:b:"):
+                self.sketch.buckets[int(name[6:])] += value
+
+
+class SyncMetricsAggregator:
+    """Запись и чтение предагрегированных метрик CustomerSyncLog в Redis."""
+
+    def __init__(self, key_prefix: str | None = None, connection: Any = None) -> None:
+        self.key_prefix = key_prefix or self._settings().get("KEY_PREFIX", "sync_metrics")
+        self._connection = connection
+
+    @staticmethod
+    def _settings() -> dict[str, Any]:
+        return getattr(settings, "SYNC_METRICS", {})
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        """Включена ли предагрегация (в тестах выключена — метрики читаются из БД)."""
+        return bool(cls._settings().get("ENABLED", False))
+
+    @property
+    def redis(self) -> Any:
+        if self._connection is None:
+            self._connection = get_redis_connection("default")
+        return self._connection
+
+    # ------------------------------------------------------------------
+    # Запись
+    # ------------------------------------------------------------------
+
+    def record(self, logs: Iterable[CustomerSyncLog]) -> None:
+        """
+        Учесть записанные логи во всех бакетах (минута, час, сутки).
+
+        Логи группируются по бакетам в памяти, на каждый бакет уходит один
+        вызов Lua-скрипта; все вызовы отправляются одним pipeline.
+        """
+        increments: dict[tuple[str, int], Counter[str]] = defaultdict(Counter)
+        extremes: dict[tuple[str, int], list[int]] = {}
+
+        for log in logs:
+            created_at = log.created_at.astimezone(dt_timezone.utc)
+            for key, ttl in self._bucket_keys(created_at):
+                fields = increments[(key, ttl)]
+                fields["total"] += 1
+                fields[f"status:{log.status}"] += 1
+                fields[f"op:{log.operation_type}"] += 1
+                if log.duration_ms is not None:
+                    duration = int(log.duration_ms)
+                    fields["dur:n"] += 1
+                    fields["dur:sum"] += duration
+                    index = DurationSketch.bucket_index(duration)
+                    fields["dur:z" if index is None else f"dur:b:{index}"] += 1
+                    bounds = extremes.setdefault((key, ttl), [duration, duration])
+                    bounds[0] = min(bounds[0], duration)
+                    bounds[1] = max(bounds[1], duration)
+
+        if not increments:
+            return
+
+        script = self.redis.register_script(_UPDATE_BUCKET_LUA)
+        pipe = self.redis.pipeline(transaction=False)
+        for (key, ttl), fields in increments.items():
+            low, high = extremes.get((key, ttl), ("", ""))
+            args: list[Any] = [ttl, low, high]
+            for name, value in fields.items():
+                args.extend((name, value))
+            script(keys=[key], args=args, client=pipe)
+        pipe.execute()
+
+    def rebuild(self, since: datetime, batch_size: int = 2000) -> int:
+        """
+        Пересобрать бакеты начиная с суток, содержащих since, по таблице логов.
+
+        Нужен после включения агрегатора или потери данных Redis. Записи,
+        сделанные во время пересборки, могут быть учтены дважды.
+
+        Returns:
+            int: Количество учтенных логов.
+        """
+        start = since.astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        # Пока бакеты пересобираются, читатели считают по БД
+        covered_since = self.covered_since()
+        self.redis.delete(self._rebuilt_since_key)
+        for pattern in ("m", "h", "d"):
+            stale = [
+                key
+                for key in self.redis.scan_iter(match=f"{self.key_prefix}:{pattern}:*", count=1000)
+                if self._key_time(key) >= start
+            ]
+            if stale:
+                self.redis.delete(*stale)
+
+        processed = 0
+        batch: list[CustomerSyncLog] = []
+        logs = (
+            CustomerSyncLog.objects.filter(created_at__gte=start)
+            .only("created_at", "status", "operation_type", "duration_ms")
+            .order_by()
+            .iterator(chunk_size=batch_size)
+        )
+        for log in logs:
+            batch.append(log)
+            if len(batch) >= batch_size:
+                self.record(batch)
+                processed += len(batch)
+                batch = []
+        if batch:
+            self.record(batch)
+            processed += len(batch)
+
+        # Бакеты до start не трогались: покрытие — от более ранней из пересборок
+        covered = start if covered_since is None else min(start, covered_since)
+        self.redis.set(self._rebuilt_since_key, covered.strftime(self._KEY_FORMATS["d"]))
+        logger.info(f"Sync metrics rebuilt since {start.isoformat()}: {processed} logs")
+        return processed
+
+    def covered_since(self) -> datetime | None:
+        """Начало периода, за который бакеты полны (None — пересборки не было или Redis потерял данные)."""
+        raw = self.redis.get(self._rebuilt_since_key)
+        if raw is None:
+            return None
+        return self._key_time(f"{self.key_prefix}:d:{raw.decode() if isinstance(raw, bytes) else raw}")
+
+    def covers(self, start_date: datetime) -> bool:
+        """Бакеты полны начиная с start_date (иначе метрики считаются по БД)."""
+        covered_since = self.covered_since()
+        return covered_since is not None and start_date >= covered_since
+
+    # ------------------------------------------------------------------
+    # Чтение
+    # ------------------------------------------------------------------
+
+    def get_operation_metrics(self, start_date: datetime, end_date: datetime) -> dict[str, Any]:
+        """Метрики операций за период в формате CustomerSyncMonitor.get_operation_metrics."""
+        bucket = self._load(self._covering_keys(start_date, end_date))
+        total = bucket.total
+        return {
+            "total_operations": total,
+            "operations_by_type": dict(bucket.by_operation),
+            "success_count": bucket.success_count,
+            "error_count": bucket.error_count,
+            "warning_count": bucket.by_status[CustomerSyncLog.StatusType.WARNING],
+            "success_rate": round(bucket.success_count / total * 100, 2) if total > 0 else 0.0,
+            "error_rate": round(bucket.error_count / total * 100, 2) if total > 0 else 0.0,
+            "duration_avg_ms": round(bucket.duration_avg, 2),
+            "duration_min_ms": bucket.duration_min or 0,
+            "duration_max_ms": bucket.duration_max or 0,
+            "duration_p95_ms": round(bucket.sketch.quantile(0.95), 2),
+            "duration_p99_ms": round(bucket.sketch.quantile(0.99), 2),
+            "period_start": start_date.isoformat(),
+            "period_end": end_date.isoformat(),
+        }
+
+    def get_hourly_breakdown(self, start_date: datetime, end_date: datetime) -> list[dict[str, Any]]:
+        """Почасовая разбивка по часовым бакетам (только часы с операциями)."""
+        hour = self._floor(start_date.astimezone(dt_timezone.utc), HOUR)
+        hours: list[datetime] = []
+        while hour < end_date:
+            hours.append(hour)
+            hour += HOUR
+
+        pipe = self.redis.pipeline(transaction=False)
+        for hour in hours:
+            pipe.hgetall(self._key("h", hour))
+        rows = []
+        for hour, fields in zip(hours, pipe.execute(), strict=True):
+            bucket = _Bucket()
+            bucket.merge_fields(fields)
+            if not bucket.total:
+                continue
+            rows.append(
+                {
+                    "hour": hour.isoformat(),
+                    "total_operations": bucket.total,
+                    "successful_operations": bucket.success_count,
+                    "failed_operations": bucket.error_count,
+                    "avg_duration_ms": round(bucket.duration_avg, 2),
+                    "success_rate": round(bucket.success_count / bucket.total * 100, 2),
+                }
+            )
+        return rows
+
+    def _load(self, keys: list[str]) -> _Bucket:
+        bucket = _Bucket()
+        if not keys:
+            return bucket
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        for fields in pipe.execute():
+            bucket.merge_fields(fields)
+        return bucket
+
+    # ------------------------------------------------------------------
+    # Ключи бакетов
+    # ------------------------------------------------------------------
+
+    _KEY_FORMATS = {"m": "%Y%m%d%H%M", "h": "%Y%m%d%H", "d": "%Y%m%d"}
+
+    @property
+    def _rebuilt_since_key(self) -> str:
+        return f"{self.key_prefix}:rebuilt_since"
+
+    def _key(self, level: str, moment: datetime) -> str:
+        return f"{self.key_prefix}:{level}:{moment.strftime(self._KEY_FORMATS[level])}"
+
+    def _key_time(self, key: bytes | str) -> datetime:
+        raw = key.decode() if isinstance(key, bytes) else key
+        level, stamp = raw.rsplit(":", 2)[-2:]
+        return datetime.strptime(stamp, self._KEY_FORMATS[level]).replace(tzinfo=dt_timezone.utc)
+
+    def _bucket_keys(self, moment: datetime) -> list[tuple[str, int]]:
+        return [
+            (self._key("m", moment), int(MINUTE_RETENTION.total_seconds())),
+            (self._key("h", moment), int(HOUR_RETENTION.total_seconds())),
+            (self._key("d", moment), int(DAY_RETENTION.total_seconds())),
+        ]
+
+    @staticmethod
+    def _floor(moment: datetime, step: timedelta) -> datetime:
+        if step == DAY:
+            return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        if step == HOUR:
+            return moment.replace(minute=0, second=0, microsecond=0)
+        return moment.replace(second=0, microsecond=0)
+
+    def _covering_keys(self, start_date: datetime, end_date: datetime, now: datetime | None = None) -> list[str]:
+        """
+        Минимальный набор бакетов, покрывающий [start_date, end_date).
+
+        Границы округляются до минуты наружу. Внутри периода берутся сутки
+        и часы, по краям — минуты; для краев старше срока хранения минутных
+        (часовых) бакетов используется содержащий их час (сутки).
+        """
+        now = (now or datetime.now(dt_timezone.utc)).astimezone(dt_timezone.utc)
+        cursor = self._floor(start_date.astimezone(dt_timezone.utc), MINUTE)
+        end = end_date.astimezone(dt_timezone.utc)
+        stop = self._floor(end, MINUTE) + (MINUTE if end != self._floor(end, MINUTE) else timedelta(0))
+
+        keys: list[str] = []
+        while cursor < stop:
+            age = now - cursor
+            if cursor == self._floor(cursor, DAY) and cursor + DAY <= stop:
+                keys.append(self._key("d", cursor))
+                cursor += DAY
+            elif age > HOUR_RETENTION:
+                day = self._floor(cursor, DAY)
+                keys.append(self._key("d", day))
+                cursor = day + DAY
+            elif cursor == self._floor(cursor, HOUR) and cursor + HOUR <= stop:
+                keys.append(self._key("h", cursor))
+                cursor += HOUR
+            elif age > MINUTE_RETENTION:
+                hour = self._floor(cursor, HOUR)
+                keys.append(self._key("h", hour))
+                cursor = hour + HOUR
+            else:
+                keys.append(self._key("m", cursor))
+                cursor += MINUTE
+        return keys
@@ -0,0 +1,52 @@
+"""
+Сигналы приложения common.
+
+Обновление предагрегированных метрик синхронизации при записи CustomerSyncLog.
+"""
+
+import logging
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import Signal, receiver
+
+from .models import CustomerSyncLog
+
+logger = logging.getLogger(__name__)
+
+# Пакетная запись логов через bulk_create (post_save для неё не вызывается)
+# Provides: records (list[Model])
+log_records_bulk_created = Signal()
+
+
+def _record_sync_metrics(logs: list[CustomerSyncLog]) -> None:
+    from apps.common.services.sync_metrics import SyncMetricsAggregator
+
+    if not logs or not SyncMetricsAggregator.is_enabled():
+        return
+    # Бакеты обновляются после коммита: откаченные логи не учитываются
+    transaction.on_commit(partial(_write_sync_metrics, list(logs)))
+
+
+def _write_sync_metrics(logs: list[CustomerSyncLog]) -> None:
+    from apps.common.services.sync_metrics import SyncMetricsAggregator
+
+    try:
+        SyncMetricsAggregator().record(logs)
+    except Exception as e:
+        # Метрики не должны ломать запись логов; расхождение исправит rebuild_sync_metrics
+        logger.warning(f"Failed to update sync metrics for {len(logs)} logs: {e}")
+
+
+@receiver(post_save, sender=CustomerSyncLog)
+def update_sync_metrics(sender, instance, created, **kwargs):
+    """Учесть новый лог синхронизации в метриках."""
+    if created:
+        _record_sync_metrics([instance])
+
+
+@receiver(log_records_bulk_created, sender=CustomerSyncLog)
+def update_sync_metrics_bulk(sender, records, **kwargs):
+    """Учесть пакет логов синхронизации в метриках."""
+    _record_sync_metrics(records)
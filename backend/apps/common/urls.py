@@ -14,6 +14,7 @@ urlpatterns = [
     ),
     path("monitoring/metrics/business/", views.business_metrics, name="business-metrics"),
     path("monitoring/metrics/realtime/", views.realtime_metrics, name="realtime-metrics"),
+    path("monitoring/metrics/prometheus/", views.prometheus_metrics, name="prometheus-metrics"),
     path("monitoring/health/", views.system_health, name="system-health"),
     # Newsletter & News endpoints
     path("subscribe/", views.subscribe, name="subscribe"),
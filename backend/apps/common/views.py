@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+import hmac
 import logging
 from datetime import datetime, timedelta
 
 from django.conf import settings
 from django.db import DatabaseError, transaction
+from django.http import Http404, HttpRequest, HttpResponse
 from django.utils import timezone
+from django.views.decorators.http import require_GET
 from drf_spectacular.utils import OpenApiExample, OpenApiParameter, OpenApiResponse, extend_schema, inline_serializer
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework import generics, serializers, status
 from rest_framework.decorators import api_view, parser_classes, permission_classes, throttle_classes
 from rest_framework.exceptions import ValidationError as DRFValidationError
@@ -28,7 +32,7 @@ from apps.common.serializers import (
     UnsubscribeResponseSerializer,
     UnsubscribeSerializer,
 )
-from apps.common.services import CustomerSyncMonitor
+from apps.common.services import CustomerSyncMonitor, PrometheusMetrics
 from apps.common.throttling import SubscribeRateThrottle, UnsubscribeRateThrottle
 from apps.common.utils.consent_audit import (
     get_consent_ip_address,
@@ -308,6 +312,31 @@ def realtime_metrics(_request: Request) -> Response:
     return Response(metrics, status=status.HTTP_200_OK)
 
 
+def _has_metrics_token(request: HttpRequest) -> bool:
+    token = settings.PROMETHEUS_METRICS_TOKEN
+    if not token:
+        return False
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(credentials.strip(), token)
+
+
+@require_GET
+def prometheus_metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Метрики в текстовом формате Prometheus для scrape.
+
+    Обычное Django-представление: Prometheus передаёт статический
+    Bearer-токен (PROMETHEUS_METRICS_TOKEN), который JWT-аутентификация DRF
+    отклонила бы. Администраторам доступно и по сессии.
+    """
+    if not PrometheusMetrics.is_enabled():
+        raise Http404
+    if not (_has_metrics_token(request) or request.user.is_staff):
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+
+    return HttpResponse(PrometheusMetrics.export_metrics_text(), content_type=CONTENT_TYPE_LATEST)
+
+
 # ============================================================================
 # Newsletter & News Views
 # ============================================================================
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from django.contrib import admin
 from django.http import HttpRequest
+from django.urls import reverse
 from django.utils.html import format_html
 
 from .models import Session
@@ -40,9 +41,14 @@ class ImportSessionAdmin(admin.ModelAdmin):
         "finished_at",
         "report_details",
         "celery_task_id",
+        "profiling",
+        "events_log",
     )
     actions = []  # Удалены все admin actions - только просмотр
 
+    # Сколько последних строк журнала показывать на странице сессии
+    events_tail_size = 200
+
     class Media:
         """Добавляем JavaScript для автообновления страницы"""
 
@@ -52,7 +58,7 @@ class ImportSessionAdmin(admin.ModelAdmin):
         (
             "Основная информация",
             {
-                "fields": ("id", "import_type", "status", "celery_task_id"),
+                "fields": ("id", "import_type", "status", "celery_task_id", "profiling"),
             },
         ),
         (
@@ -61,6 +67,7 @@ class ImportSessionAdmin(admin.ModelAdmin):
                 "fields": (
                     "report_details",
                     "error_message",
+                    "events_log",
                 ),
             },
         ),
@@ -241,3 +248,31 @@ class ImportSessionAdmin(admin.ModelAdmin):
                     total,
                 )
         return "-"
+
+    @admin.display(description="Отчет")
+    def events_log(self, obj: Session) -> str:
+        """
+        Последние строки журнала событий сессии.
+
+        Страница показывает только «хвост» журнала; для активных сессий
+        JS дочитывает новые события через
+        /admin/integrations/session/<id>/events/?after=<id последнего события>.
+        """
+        events = list(obj.events.order_by("-id")[: self.events_tail_size])[::-1]
+        text = "".join(event.render() for event in events)
+        if not events:
+            # Сессии, созданные до журнала событий, хранят отчет текстом
+            text = obj.legacy_report
+        active = obj.status in {
+            Session.ImportStatus.PENDING,
+            Session.ImportStatus.STARTED,
+            Session.ImportStatus.IN_PROGRESS,
+        }
+        return format_html(
+            '<pre id="import-session-events" data-events-url="{}" data-last-id="{}" data-tail="{}" '
+            'style="max-height: 480px; overflow: auto; white-space: pre-wrap;">{}</pre>',
+            reverse("admin:integrations_session_events", args=[obj.pk]),
+            events[-1].pk if events else 0,
+            "1" if active else "0",
+            text or "-",
+        )
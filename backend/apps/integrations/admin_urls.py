@@ -2,13 +2,13 @@
 Регистрация custom URLs для Django Admin в приложении integrations.
 
 Этот модуль выполняет monkey-patching Django admin site для добавления
-custom URL страницы "Импорт из 1С".
+custom URL страницы "Импорт из 1С" и JSON-журнала событий сессии импорта.
 """
 
 from django.contrib import admin
 from django.urls import path
 
-from apps.integrations.views import import_from_1c_view
+from apps.integrations.views import import_from_1c_view, import_session_events_view
 
 # Сохраняем оригинальный метод get_urls
 _original_get_urls = admin.site.get_urls
@@ -16,7 +16,8 @@ _original_get_urls = admin.site.get_urls
 
 def _custom_get_urls() -> list:
     """
-    Добавляет custom URL для страницы импорта к стандартным admin URLs.
+    Добавляет custom URL для страницы импорта и журнала событий сессии
+    к стандартным admin URLs.
 
     Returns:
         List URL patterns включая custom URL для импорта из 1С
@@ -27,6 +28,11 @@ def _custom_get_urls() -> list:
             admin.site.admin_view(import_from_1c_view),
             name="integrations_import_from_1c",
         ),
+        path(
+            "integrations/session/<int:session_id>/events/",
+            admin.site.admin_view(import_session_events_view),
+            name="integrations_session_events",
+        ),
     ]
     return custom_urls + _original_get_urls()
 
@@ -0,0 +1,92 @@
+"""
+Management команда поиска журналов обмена с 1С в сжатом архиве
+"""
+
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.integrations.onec_exchange.exchange_archive import ExchangeArchive
+from apps.integrations.onec_exchange.file_service import get_exchange_log_dir
+
+
+class Command(BaseCommand):
+    """
+    Поиск orders.xml и ответов mode=query в архиве EXCHANGE_LOG_DIR/archive
+
+    Ищет по индексу архива (index.sqlite3), без распаковки журналов.
+
+    Использование:
+        python manage.py find_exchange_payload --order=FS-20260202-001
+        python manage.py find_exchange_payload --sessid=abc123 --mode=query --since=2026-02-01
+        python manage.py find_exchange_payload --order=FS-20260202-001 --extract=/tmp/payloads
+        python manage.py find_exchange_payload --rotate
+    """
+
+    help = "Поиск журналов обмена с 1С в сжатом архиве"
+
+    def add_arguments(self, parser):
+        """Добавление аргументов команды"""
+        parser.add_argument("--order", type=str, help="Номер заказа (<Номер> документа)")
+        parser.add_argument("--sessid", type=str, help="Сессия обмена")
+        parser.add_argument("--mode", choices=("file", "query"), help="Режим обмена")
+        parser.add_argument("--since", type=str, help="Не раньше даты/времени (ISO, например 2026-02-01)")
+        parser.add_argument("--limit", type=int, default=20, help="Максимум журналов (default: 20)")
+        parser.add_argument("--extract", type=str, help="Распаковать найденные журналы в каталог")
+        parser.add_argument("--rotate", action="store_true", help="Выполнить ротацию архива и выйти")
+
+    def handle(self, *args, **options):
+        """Основная логика команды"""
+        archive = ExchangeArchive(get_exchange_log_dir())
+
+        if options["rotate"]:
+            removed = archive.rotate()
+            self.stdout.write(self.style.SUCCESS(f"✅ Ротация завершена, удалено журналов: {removed}"))
+            return
+
+        since = None
+        if options["since"]:
+            try:
+                since = datetime.fromisoformat(options["since"])
+            except ValueError as e:
+                raise CommandError(f"Некорректная дата --since: {options['since']}") from e
+
+        payloads = archive.find(
+            order=options["order"],
+            sessid=options["sessid"],
+            mode=options["mode"],
+            since=since,
+            limit=options["limit"],
+        )
+        if not payloads:
+            self.stdout.write(self.style.WARNING("⚠️ Журналы не найдены"))
+            return
+
+        extract_dir = Path(options["extract"]) if options["extract"] else None
+        if extract_dir:
+            extract_dir.mkdir(parents=True, exist_ok=True)
+
+        self.stdout.write(f"🔎 Найдено журналов: {len(payloads)}")
+        for payload in payloads:
+            orders = ", ".join(payload.orders[:10])
+            if len(payload.orders) > 10:
+                orders += f" … (+{len(payload.orders) - 10})"
+            self.stdout.write(
+                f"   {payload.created_at:%Y-%m-%d %H:%M:%S} {payload.mode or '-':<6} "
+                f"sessid={payload.sessid or '-'} {payload.filename} "
+                f"{payload.size} → {payload.stored_size} байт"
+            )
+            if orders:
+                self.stdout.write(f"      заказы: {orders}")
+            self.stdout.write(f"      архив: {payload.path}")
+            if extract_dir:
+                target = extract_dir / payload.filename
+                try:
+                    with archive.open(payload) as src, open(target, "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+                except FileNotFoundError:
+                    self.stdout.write(self.style.WARNING(f"      ⚠️ Архив удален ротацией: {payload.path}"))
+                    continue
+                self.stdout.write(f"      📄 Распакован: {target}")
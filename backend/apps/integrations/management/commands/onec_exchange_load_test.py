@@ -0,0 +1,157 @@
+"""
+Management команда нагрузочного прогона протокола обмена с 1С
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.integrations.onec_exchange.load_harness import (
+    MB,
+    ExchangeLoadTest,
+    LoadTestConfig,
+    LocalExchangeServer,
+    seed_orders,
+)
+from apps.products.services.commerceml_generator import CommerceMLDatasetGenerator, DatasetSpec
+
+LOADTEST_EMAIL = "loadtest-1c@example.com"
+LOADTEST_PASSWORD = "loadtest-1c-password"
+SCENARIOS = ("catalog", "contention", "orders")
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный прогон mode=checkauth/init/file/import/complete/query/success
+
+    Работает только с настройками freesport.settings.loadtest (ONEC_LOAD_TEST_ENABLED):
+    создает пользователя обмена и тестовые заказы в локальной БД.
+
+    Использование:
+        python manage.py onec_exchange_load_test --settings=freesport.settings.loadtest
+        python manage.py onec_exchange_load_test --settings=freesport.settings.loadtest \\
+            --offers=500000 --sessions=4 --chunk-mb=100 --report=/tmp/exchange.json
+        python manage.py onec_exchange_load_test --settings=freesport.settings.loadtest \\
+            --dataset=/tmp/1c-100k --scenario=catalog --wait-import=1800
+    """
+
+    help = "Нагрузочный прогон протокола обмена с 1С"
+
+    def add_arguments(self, parser):
+        """Добавление аргументов команды"""
+        parser.add_argument("--url", type=str, help="Адрес сервера (по умолчанию — сервер в процессе)")
+        parser.add_argument("--scenario", choices=SCENARIOS, action="append", help="Сценарий (по умолчанию все)")
+        parser.add_argument("--dataset", type=str, help="Готовая выгрузка generate_1c_dataset")
+        parser.add_argument(
+            "--offers", type=int, default=100_000, help="Размер генерируемой выгрузки (default: 100000)"
+        )
+        parser.add_argument("--sessions", type=int, default=2, help="Параллельных сеансов каталога (default: 2)")
+        parser.add_argument(
+            "--flow",
+            choices=("import", "complete"),
+            default="import",
+            help=(
+                "Завершение загрузки каталога: mode=import по файлам и mode=complete "
+                "или только mode=complete (default: import)"
+            ),
+        )
+        parser.add_argument("--chunk-mb", type=int, default=32, help="Размер порции mode=file, МБ (default: 32)")
+        parser.add_argument("--contention-writers", type=int, default=4, help="Писателей одного файла (default: 4)")
+        parser.add_argument("--contention-mb", type=int, default=4, help="Размер файла конкуренции, МБ (default: 4)")
+        parser.add_argument(
+            "--contention-seconds",
+            type=float,
+            default=3.0,
+            help="Длительность одной загрузки при конкуренции, с (default: 3)",
+        )
+        parser.add_argument("--query-workers", type=int, default=4, help="Параллельных клиентов заказов (default: 4)")
+        parser.add_argument("--query-cycles", type=int, default=10, help="Циклов query/success на клиента")
+        parser.add_argument("--orders", type=int, default=200, help="Создать заказов для выгрузки (default: 200)")
+        parser.add_argument(
+            "--wait-import",
+            type=float,
+            default=0,
+            help="Ждать завершения импорта, с (0 — только постановки в очередь)",
+        )
+        parser.add_argument("--report", type=str, help="Сохранить отчет JSON в файл")
+
+    def handle(self, *args, **options):
+        """Основная логика команды"""
+        if not getattr(settings, "ONEC_LOAD_TEST_ENABLED", False):
+            raise CommandError("Прогон разрешен только с --settings=freesport.settings.loadtest")
+
+        scenarios = tuple(options["scenario"] or SCENARIOS)
+        user = self._exchange_user()
+        if "orders" in scenarios and options["orders"]:
+            seed_orders(options["orders"], user)
+            self.stdout.write(f"📦 Создано заказов: {options['orders']}")
+
+        with tempfile.TemporaryDirectory(prefix="onec-load-") as tmp:
+            dataset_dir = self._dataset(options, Path(tmp)) if "catalog" in scenarios else None
+            config = LoadTestConfig(
+                base_url=options["url"] or "",
+                username=LOADTEST_EMAIL,
+                password=LOADTEST_PASSWORD,
+                dataset_dir=dataset_dir,
+                sessions=options["sessions"],
+                flow=options["flow"],
+                chunk_size=options["chunk_mb"] * MB,
+                contention_writers=options["contention_writers"],
+                contention_file_size=options["contention_mb"] * MB,
+                contention_upload_seconds=options["contention_seconds"],
+                query_workers=options["query_workers"],
+                query_cycles=options["query_cycles"],
+                wait_import=options["wait_import"],
+            )
+            if options["url"]:
+                report = ExchangeLoadTest(config).run(scenarios)
+            else:
+                with LocalExchangeServer() as server:
+                    config.base_url = server.url
+                    report = ExchangeLoadTest(config).run(scenarios)
+
+        self._print_report(report)
+        if options["report"]:
+            Path(options["report"]).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+            self.stdout.write(f"📝 Отчет: {options['report']}")
+
+    def _exchange_user(self):
+        User = get_user_model()
+        user, _ = User.objects.get_or_create(email=LOADTEST_EMAIL, defaults={"is_staff": True})
+        user.is_staff = True
+        user.set_password(LOADTEST_PASSWORD)
+        user.save()
+        return user
+
+    def _dataset(self, options, tmp: Path) -> Path:
+        if options["dataset"]:
+            return Path(options["dataset"])
+        output = tmp / "dataset"
+        # Без сегментов: prices/offers при 100k+ предложений — файлы в сотни МБ
+        CommerceMLDatasetGenerator(DatasetSpec(offers=options["offers"], segment_size=0)).generate(output)
+        total = sum(path.stat().st_size for path in output.rglob("*.xml"))
+        self.stdout.write(f"🧪 Сгенерирована выгрузка: {options['offers']} предложений, {total / MB:.0f} МБ XML")
+        return output
+
+    def _print_report(self, report: dict) -> None:
+        self.stdout.write(self.style.SUCCESS(f"\n✅ Прогон завершен за {report['elapsed_s']}s"))
+        self.stdout.write(f"   {'mode':<16}{'req':>6}{'fail':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'MB/s':>9}")
+        for name, item in report["operations"].items():
+            self.stdout.write(
+                f"   {name:<16}{item['requests']:>6}{item['failures']:>6}{item['rps']:>9}"
+                f"{item['p50_ms']:>9}{item['p95_ms']:>9}{item['p99_ms']:>9}{item.get('mb_per_s', ''):>9}"
+            )
+        contention = report["lock_contention"]
+        self.stdout.write(
+            f"   FileLockError («File busy»): {contention['file_busy']}/{contention['uploads']} "
+            f"загрузок ({contention['rate']:.1%}), приняты {contention['accepted']}/{contention['writers']} писателей"
+        )
+        for record in report["imports"]:
+            finished = f", завершен через {record['finished_s']}s" if record["finished_s"] is not None else ""
+            self.stdout.write(
+                f"   Импорт {record['sessid']}: {record['status']}, в очереди через {record['queued_s']}s{finished}"
+            )
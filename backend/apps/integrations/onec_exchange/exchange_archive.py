@@ -0,0 +1,414 @@
+"""
+Exchange Archive for 1C payloads.
+
+Журнал обмена (orders.xml из 1С, ответы mode=query) хранится сжатым:
+- запрос только пишет сырой файл в EXCHANGE_LOG_DIR (ADR-005: журнал до
+  обработки) и передает его путь архиватору;
+- фоновый поток процесса сжимает файл в archive/YYYY/MM/DD/<имя>.gz, удаляет
+  сырую копию и записывает строку в индекс archive/index.sqlite3 (время,
+  sessid, mode, имя файла, размеры, номера документов);
+- ротация удаляет самые старые архивы сверх EXCHANGE_ARCHIVE["MAX_BYTES"] и
+  старше EXCHANGE_ARCHIVE["MAX_AGE_DAYS"].
+
+Сырые файлы, не успевшие попасть в архив (перезапуск процесса), архивируются
+при первом обращении к архиву в следующем процессе.
+
+Usage:
+    archive = exchange_archive(log_dir)
+    if archive is not None:
+        archive.submit(raw_path, mode="query", sessid=sessid)
+
+    for payload in archive.find(order="FS-20260202-001"):
+        with archive.open(payload) as f:
+            ...
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import closing
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from pathlib import Path
+from typing import IO, Any
+from xml.etree.ElementTree import ParseError as ETParseError
+
+import defusedxml.ElementTree as ET
+from defusedxml.common import DefusedXmlException
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUBDIR = "archive"
+INDEX_FILENAME = "index.sqlite3"
+DEFAULT_MAX_BYTES = 2 * 1024**3
+DEFAULT_MAX_AGE_DAYS = 30
+# Поток архиватора завершается после простоя и запускается заново при следующей передаче
+WORKER_IDLE_SECONDS = 30.0
+# Сырые файлы моложе этого возраста может еще писать другой процесс
+RECOVERY_MIN_AGE_SECONDS = 3600
+# Сырые журналы, которые архивируются (profile.json и прочие остаются как есть)
+ARCHIVED_LOG_SUFFIXES = ("_orders.xml", "_orders.zip")
+SQLITE_TIMEOUT_SECONDS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payloads (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    sessid TEXT NOT NULL DEFAULT '',
+    mode TEXT NOT NULL DEFAULT '',
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payload_orders (
+    payload_id INTEGER NOT NULL REFERENCES payloads(id) ON DELETE CASCADE,
+    order_number TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS payloads_created_at ON payloads(created_at);
+CREATE INDEX IF NOT EXISTS payloads_sessid ON payloads(sessid);
+CREATE INDEX IF NOT EXISTS payload_orders_number ON payload_orders(order_number);
+CREATE INDEX IF NOT EXISTS payload_orders_payload ON payload_orders(payload_id);
+"""
+
+
+def _archive_settings() -> dict[str, Any]:
+    return getattr(settings, "EXCHANGE_ARCHIVE", {})
+
+
+def _local_name(tag: Any) -> str:
+    return str(tag).rsplit("}", 1)[-1]
+
+
+def extract_order_numbers(path: Path) -> list[str]:
+    """Номера документов (<Документ>/<Номер>) из XML или XML-членов ZIP; без ошибок разбора."""
+    numbers: list[str] = []
+    try:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as zf:
+                for info in zf.infolist():
+                    if info.filename.lower().endswith(".xml"):
+                        with zf.open(info) as member:
+                            _collect_order_numbers(member, numbers)
+        else:
+            with open(path, "rb") as f:
+                _collect_order_numbers(f, numbers)
+    except (ETParseError, DefusedXmlException, zipfile.BadZipFile, OSError, ValueError) as e:
+        logger.debug(f"[EXCHANGE ARCHIVE] Order numbers of {path.name} are incomplete: {e}")
+    return list(dict.fromkeys(numbers))
+
+
+def _collect_order_numbers(source: IO[bytes], numbers: list[str]) -> None:
+    for _event, elem in ET.iterparse(source, events=("end",)):
+        if _local_name(elem.tag) != "Документ":
+            continue
+        for child in elem:
+            if _local_name(child.tag) == "Номер" and child.text and child.text.strip():
+                numbers.append(child.text.strip())
+                break
+        elem.clear()
+
+
+@dataclass(frozen=True)
+class ArchiveJob:
+    """Сырой файл журнала, переданный архиватору."""
+
+    path: Path
+    mode: str = ""
+    sessid: str = ""
+
+
+@dataclass(frozen=True)
+class ArchivedPayload:
+    """Строка индекса архива."""
+
+    id: int
+    created_at: datetime
+    sessid: str
+    mode: str
+    filename: str
+    size: int
+    stored_size: int
+    path: Path
+    orders: tuple[str, ...] = field(default_factory=tuple)
+
+
+class ExchangeArchive:
+    """Сжатый архив журналов обмена одного EXCHANGE_LOG_DIR с индексом и ротацией."""
+
+    def __init__(self, log_dir: Path | str, max_bytes: int | None = None, max_age_days: float | None = None):
+        self.log_dir = Path(log_dir)
+        self.root = self.log_dir / ARCHIVE_SUBDIR
+        self._max_bytes = max_bytes
+        self._max_age_days = max_age_days
+        self._queue: queue.Queue[ArchiveJob] = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return int(_archive_settings().get("MAX_BYTES", DEFAULT_MAX_BYTES))
+
+    @property
+    def max_age_days(self) -> float:
+        if self._max_age_days is not None:
+            return self._max_age_days
+        return float(_archive_settings().get("MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS))
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / INDEX_FILENAME
+
+    # ------------------------------------------------------------------
+    # Фоновая архивация
+    # ------------------------------------------------------------------
+
+    def submit(self, path: Path | str, mode: str = "", sessid: str = "") -> None:
+        """Передать сырой файл фоновому потоку; вызывающий поток не ждет сжатия."""
+        self._queue.put(ArchiveJob(Path(path), mode, sessid or ""))
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="exchange-archive", daemon=True)
+                self._worker.start()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Дождаться архивации переданных файлов; False, если не успели за timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def recover(self) -> int:
+        """Поставить в очередь сырые журналы, оставшиеся от прошлых процессов."""
+        if not self.log_dir.is_dir():
+            return 0
+        cutoff = time.time() - RECOVERY_MIN_AGE_SECONDS
+        recovered = 0
+        for path in sorted(self.log_dir.iterdir()):
+            if not path.is_file() or not path.name.endswith(ARCHIVED_LOG_SUFFIXES):
+                continue
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            self.submit(path)
+            recovered += 1
+        if recovered:
+            logger.info(f"[EXCHANGE ARCHIVE] Recovering {recovered} raw exchange logs in {self.log_dir}")
+        return recovered
+
+    def _run(self) -> None:
+        while True:
+            try:
+                job = self._queue.get(timeout=WORKER_IDLE_SECONDS)
+            except queue.Empty:
+                with self._lock:
+                    # submit() после истечения get() увидит живой поток — проверяем очередь под замком
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+            try:
+                self.archive_now(job)
+            except Exception:
+                logger.exception(f"[EXCHANGE ARCHIVE] Failed to archive {job.path}")
+            finally:
+                self._queue.task_done()
+
+    def archive_now(self, job: ArchiveJob) -> ArchivedPayload | None:
+        """Сжать файл, записать его в индекс, удалить сырую копию и выполнить ротацию."""
+        raw = job.path
+        try:
+            stat = raw.stat()
+        except FileNotFoundError:
+            logger.warning(f"[EXCHANGE ARCHIVE] Raw exchange log {raw} disappeared before archiving")
+            return None
+
+        created_at = datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+        orders = extract_order_numbers(raw)
+        relative = Path(created_at.strftime("%Y/%m/%d")) / f"{raw.stem}-{uuid.uuid4().hex[:8]}{raw.suffix}.gz"
+        target = self.root / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(f"{target.name}.part")
+        with open(raw, "rb") as src, gzip.open(partial, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        partial.replace(target)
+        stored_size = target.stat().st_size
+
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO payloads (created_at, sessid, mode, filename, size, stored_size, path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    created_at.isoformat(timespec="seconds"),
+                    job.sessid,
+                    job.mode,
+                    raw.name,
+                    stat.st_size,
+                    stored_size,
+                    relative.as_posix(),
+                ),
+            )
+            payload_id = int(cursor.lastrowid or 0)
+            conn.executemany(
+                "INSERT INTO payload_orders (payload_id, order_number) VALUES (?, ?)",
+                [(payload_id, number) for number in orders],
+            )
+        raw.unlink(missing_ok=True)
+        self.rotate()
+        return ArchivedPayload(
+            id=payload_id,
+            created_at=created_at,
+            sessid=job.sessid,
+            mode=job.mode,
+            filename=raw.name,
+            size=stat.st_size,
+            stored_size=stored_size,
+            path=target,
+            orders=tuple(orders),
+        )
+
+    # ------------------------------------------------------------------
+    # Ротация и поиск
+    # ------------------------------------------------------------------
+
+    def rotate(self) -> int:
+        """Удалить архивы старше MAX_AGE_DAYS и самые старые сверх MAX_BYTES; вернуть число удаленных."""
+        cutoff = (datetime.now(dt_timezone.utc) - timedelta(days=self.max_age_days)).isoformat(timespec="seconds")
+        with closing(self._connect()) as conn, conn:
+            expired = conn.execute(
+                "SELECT id, path FROM payloads WHERE created_at < ? ORDER BY created_at", (cutoff,)
+            ).fetchall()
+            total = conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM payloads WHERE created_at >= ?", (cutoff,))
+            excess = int(total.fetchone()[0]) - self.max_bytes
+            oversized: list[tuple[int, str]] = []
+            if excess > 0:
+                for payload_id, path, stored_size in conn.execute(
+                    "SELECT id, path, stored_size FROM payloads WHERE created_at >= ? ORDER BY created_at, id",
+                    (cutoff,),
+                ):
+                    if excess <= 0:
+                        break
+                    oversized.append((payload_id, path))
+                    excess -= stored_size
+
+            removed = expired + oversized
+            if not removed:
+                return 0
+            ids = [(payload_id,) for payload_id, _path in removed]
+            conn.executemany("DELETE FROM payload_orders WHERE payload_id = ?", ids)
+            conn.executemany("DELETE FROM payloads WHERE id = ?", ids)
+
+        for _payload_id, path in removed:
+            archived = self.root / path
+            archived.unlink(missing_ok=True)
+            try:
+                archived.parent.rmdir()
+            except OSError:
+                pass
+        logger.info(f"[EXCHANGE ARCHIVE] Rotated {len(removed)} archived exchange logs")
+        return len(removed)
+
+    def find(
+        self,
+        order: str | None = None,
+        sessid: str | None = None,
+        mode: str | None = None,
+        since: datetime | None = None,
+        limit: int = 50,
+    ) -> list[ArchivedPayload]:
+        """Найти архивы по номеру заказа, sessid, mode и времени (новые первыми)."""
+        if not self.index_path.exists():
+            return []
+        conditions: list[str] = []
+        params: list[Any] = []
+        if order:
+            conditions.append("id IN (SELECT payload_id FROM payload_orders WHERE order_number = ?)")
+            params.append(order)
+        if sessid:
+            conditions.append("sessid = ?")
+            params.append(sessid)
+        if mode:
+            conditions.append("mode = ?")
+            params.append(mode)
+        if since is not None:
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=dt_timezone.utc)
+            conditions.append("created_at >= ?")
+            params.append(since.astimezone(dt_timezone.utc).isoformat(timespec="seconds"))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, created_at, sessid, mode, filename, size, stored_size, path FROM payloads "
+                f"{where} ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+            payloads = []
+            for payload_id, created_at, row_sessid, row_mode, filename, size, stored_size, path in rows:
+                orders = conn.execute(
+                    "SELECT order_number FROM payload_orders WHERE payload_id = ? ORDER BY rowid", (payload_id,)
+                ).fetchall()
+                payloads.append(
+                    ArchivedPayload(
+                        id=payload_id,
+                        created_at=datetime.fromisoformat(created_at),
+                        sessid=row_sessid,
+                        mode=row_mode,
+                        filename=filename,
+                        size=size,
+                        stored_size=stored_size,
+                        path=self.root / path,
+                        orders=tuple(number for (number,) in orders),
+                    )
+                )
+        return payloads
+
+    def open(self, payload: ArchivedPayload) -> IO[bytes]:
+        """Открыть распакованное содержимое архива на чтение."""
+        return gzip.open(payload.path, "rb")
+
+    def _connect(self) -> sqlite3.Connection:
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.index_path, timeout=SQLITE_TIMEOUT_SECONDS)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+
+_archives: dict[Path, ExchangeArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def exchange_archive(log_dir: Path | str) -> ExchangeArchive | None:
+    """Общий для процесса архиватор каталога журналов; None, если EXCHANGE_ARCHIVE["ENABLED"] выключен."""
+    if not _archive_settings().get("ENABLED", True):
+        return None
+    key = Path(log_dir).resolve()
+    with _archives_lock:
+        archive = _archives.get(key)
+        if archive is not None:
+            return archive
+        archive = _archives[key] = ExchangeArchive(key)
+    try:
+        archive.recover()
+    except OSError as e:
+        logger.error(f"[EXCHANGE ARCHIVE] Failed to scan {key} for raw exchange logs: {e}")
+    return archive
@@ -6,6 +6,7 @@ from 1C Enterprise system using chunked transfer.
 
 Story 2.1: File Stream Upload
 """
+import hashlib
 import logging
 import os
 import time
@@ -15,15 +16,43 @@ from typing import IO, Any, Generator, Union
 
 from django.conf import settings
 
+from apps.common.services.prometheus import observe_file_lock_wait
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
 logger = logging.getLogger(__name__)
 
 # File permissions: owner read/write, group/others read-only
 DEFAULT_FILE_MODE = 0o644
 
-# Lock acquisition settings
+# Lock acquisition settings (O_EXCL fallback without fcntl)
 LOCK_TIMEOUT_SECONDS = 30
 LOCK_RETRY_INTERVAL = 0.1
 
+# Streaming read size for request bodies and file hashing
+STREAM_CHUNK_SIZE = 64 * 1024
+# Expected SHA-256 of the whole file (mode=file&file_checksum=...): .<filename>.sha256
+CHECKSUM_SUFFIX = ".sha256"
+
+# Exchange audit logs: BASE_DIR / "var" / EXCHANGE_LOG_SUBDIR unless EXCHANGE_LOG_DIR is set
+EXCHANGE_LOG_SUBDIR = "1c_exchange/logs"
+
+
+def get_exchange_log_dir() -> Path:
+    """Return the private directory for exchange audit logs.
+
+    Uses ``settings.EXCHANGE_LOG_DIR`` when configured, otherwise falls back
+    to ``BASE_DIR / "var" / EXCHANGE_LOG_SUBDIR`` which is NOT inside
+    MEDIA_ROOT (and therefore not publicly accessible).
+    """
+    custom = getattr(settings, "EXCHANGE_LOG_DIR", None)
+    if custom:
+        return Path(custom)
+    return Path(settings.BASE_DIR) / "var" / EXCHANGE_LOG_SUBDIR
+
 
 class FileLockError(Exception):
     """Raised when file lock cannot be acquired."""
@@ -31,12 +60,46 @@ class FileLockError(Exception):
     pass
 
 
+class UploadError(Exception):
+    """Raised when a resumable chunk is rejected; the file keeps `received` bytes."""
+
+    def __init__(self, message: str, received: int):
+        super().__init__(message)
+        self.received = received
+
+
+class UploadOffsetError(UploadError):
+    """Chunk starts after the end of the received bytes (a chunk is missing)."""
+
+
+class UploadChecksumError(UploadError):
+    """Chunk or file SHA-256 does not match the checksum sent by the client."""
+
+
+class UploadTooLargeError(UploadError):
+    """Chunk exceeds ONEC_EXCHANGE["FILE_LIMIT_BYTES"]."""
+
+
 class FileLock:
     """
-    Cross-platform file locking using lock files.
+    Exclusive lock on a lock file, released by the kernel if the holder dies.
+
+    On POSIX the lock is fcntl.flock on the lock file: an uncontended acquire
+    is one non-blocking flock call, a contended one blocks in the kernel
+    (LOCK_EX) and wakes up as soon as the holder releases — no sleep polling.
+    The kernel drops the lock when the holder's process exits, so a crashed
+    worker leaves no stale lock and the wait needs no timeout. The lock file
+    is removed on release; an acquired descriptor is checked against the
+    current file on disk so a waiter woken on an already unlinked file
+    retries on the new one.
 
-    Uses exclusive file creation (O_EXCL) to ensure atomic lock acquisition.
-    This works on both Windows and Linux without external dependencies.
+    Without fcntl (Windows) falls back to exclusive file creation (O_EXCL)
+    polled every LOCK_RETRY_INTERVAL; only there the timeout applies, since
+    a lock file left by a crashed holder never goes away by itself.
+
+    Wait time and contention are exported as the Prometheus histogram
+    freesport_onec_file_lock_wait_seconds{outcome=free|contended|timeout}
+    and kept on the instance (wait_seconds, contended).
 
     Usage:
         lock = FileLock(Path("/tmp/myfile.lock"))
@@ -49,28 +112,89 @@ class FileLock:
         self.lock_path = lock_path
         self.timeout = timeout
         self._acquired = False
+        self._fd: int | None = None
+        self.wait_seconds = 0.0
+        self.contended = False
 
     def acquire(self) -> bool:
         """
-        Acquire the file lock, waiting up to timeout seconds.
+        Acquire the file lock, waiting until the holder releases it.
 
         Returns:
             True if lock acquired
 
         Raises:
-            FileLockError: If lock cannot be acquired within timeout
+            FileLockError: If lock cannot be acquired within timeout (O_EXCL fallback only)
         """
-        start = time.time()
+        start = time.monotonic()
+        try:
+            if fcntl is None:
+                self._acquire_exclusive_create(start)
+            elif not self._try_flock():
+                self.contended = True
+                self._wait_flock()
+        except FileLockError:
+            self._observe("timeout", start)
+            raise
+
+        self._acquired = True
+        self._observe("contended" if self.contended else "free", start)
+        logger.debug(f"Lock acquired: {self.lock_path}")
+        return True
+
+    def _open_lock_file(self) -> int:
+        return os.open(str(self.lock_path), os.O_CREAT | os.O_RDWR, DEFAULT_FILE_MODE)
+
+    def _is_current(self, fd: int) -> bool:
+        """The locked descriptor still refers to the lock file on disk (not unlinked by the previous holder)."""
+        try:
+            disk = os.stat(str(self.lock_path))
+        except FileNotFoundError:
+            return False
+        held = os.fstat(fd)
+        return (held.st_dev, held.st_ino) == (disk.st_dev, disk.st_ino)
+
+    def _try_flock(self) -> bool:
+        """Non-blocking attempt: False if another process holds the lock."""
+        while True:
+            fd = self._open_lock_file()
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            except BaseException:
+                os.close(fd)
+                raise
+            if self._is_current(fd):
+                self._fd = fd
+                return True
+            os.close(fd)
 
-        while time.time() - start < self.timeout:
+    def _wait_flock(self) -> None:
+        """Block in flock(LOCK_EX) until the holder releases; retry if the locked file was unlinked meanwhile."""
+        while True:
+            fd = self._open_lock_file()
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                os.close(fd)
+                raise
+            if self._is_current(fd):
+                self._fd = fd
+                return
+            os.close(fd)
+
+    def _acquire_exclusive_create(self, start: float) -> None:
+        """Fallback without fcntl: O_CREAT | O_EXCL lock file, polled every LOCK_RETRY_INTERVAL."""
+        while time.monotonic() - start < self.timeout:
             try:
                 # O_CREAT | O_EXCL ensures atomic creation - fails if file exists
                 fd = os.open(str(self.lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
                 os.close(fd)
-                self._acquired = True
-                logger.debug(f"Lock acquired: {self.lock_path}")
-                return True
+                return
             except FileExistsError:
+                self.contended = True
                 time.sleep(LOCK_RETRY_INTERVAL)
             except OSError as e:
                 # Handle permission errors or other OS-level issues
@@ -79,10 +203,17 @@ class FileLock:
 
         raise FileLockError(f"Could not acquire lock within {self.timeout}s: {self.lock_path}")
 
+    def _observe(self, outcome: str, start: float) -> None:
+        self.wait_seconds = time.monotonic() - start
+        observe_file_lock_wait(outcome, self.wait_seconds)
+        if outcome != "free":
+            logger.info(f"Lock {outcome} on {self.lock_path.name}: waited {self.wait_seconds:.3f}s")
+
     def release(self) -> None:
-        """Release the file lock by removing the lock file."""
+        """Release the file lock and remove the lock file."""
         if self._acquired:
             try:
+                # Unlink while still holding the lock: waiters re-check the inode
                 os.unlink(str(self.lock_path))
                 logger.debug(f"Lock released: {self.lock_path}")
             except FileNotFoundError:
@@ -91,6 +222,9 @@ class FileLock:
             except OSError as e:
                 logger.warning(f"Error releasing lock: {e}")
             finally:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
                 self._acquired = False
 
     def __enter__(self) -> "FileLock":
@@ -236,7 +370,7 @@ class FileStreamService:
         """
         if not self.session_dir.exists():
             return []
-        return [f.name for f in self.session_dir.iterdir() if f.is_file()]
+        return [f.name for f in self.session_dir.iterdir() if f.is_file() and not f.name.endswith(CHECKSUM_SUFFIX)]
 
     def cleanup_session(self, force: bool = False) -> int:
         """
@@ -354,14 +488,16 @@ class FileStreamService:
             FileWriter instance with write() method and bytes_written counter
 
         Raises:
-            FileLockError: If file lock cannot be acquired within timeout
+            FileLockError: If file lock cannot be acquired within
+                ONEC_EXCHANGE["LOCK_TIMEOUT_SECONDS"] (O_EXCL fallback without fcntl)
         """
         self._ensure_session_dir()
         file_path = self.get_file_path(filename)
         lock_path = file_path.with_suffix(file_path.suffix + ".lock")
 
         writer = None
-        lock = FileLock(lock_path)
+        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
+        lock = FileLock(lock_path, timeout=exchange_cfg.get("LOCK_TIMEOUT_SECONDS", LOCK_TIMEOUT_SECONDS))
 
         try:
             # Acquire exclusive lock before opening file
@@ -393,3 +529,129 @@ class FileStreamService:
                 logger.info(
                     f"Wrote {writer.bytes_written} bytes to {file_path.name} " f"(session: {self.session_id[:8]}...)"
                 )
+
+    # ------------------------------------------------------------------
+    # Resumable uploads
+    # ------------------------------------------------------------------
+
+    def write_chunk_at(
+        self,
+        filename: str,
+        stream: IO[bytes],
+        offset: int | None,
+        checksum: str | None = None,
+        limit: int | None = None,
+    ) -> tuple[int, int]:
+        """
+        Write a chunk that starts at byte `offset` of the file (resumable upload).
+
+        The received size is the file size on disk, checked under the file lock:
+        - bytes of the chunk that are already received (offset < size, a re-sent
+          chunk after a dropped connection) are skipped, so re-sends are idempotent;
+        - a chunk starting after the end of the file is rejected;
+        - with `checksum` (SHA-256 hex of the chunk) the chunk is hashed while
+          streaming and the file is truncated back if it does not match.
+
+        Args:
+            filename: Name of the file
+            stream: Request body
+            offset: Position of the first byte of the chunk in the file (None — append)
+            checksum: Optional SHA-256 hex digest of the chunk
+            limit: Maximum chunk size in bytes
+
+        Returns:
+            Tuple of (received bytes after the chunk, bytes written)
+
+        Raises:
+            UploadOffsetError, UploadChecksumError, UploadTooLargeError:
+                the file is left with exactly the previously received bytes
+            FileLockError: If file lock cannot be acquired
+        """
+        self._ensure_session_dir()
+        file_path = self.get_file_path(filename)
+        lock_path = file_path.with_suffix(file_path.suffix + ".lock")
+        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
+
+        with FileLock(lock_path, timeout=exchange_cfg.get("LOCK_TIMEOUT_SECONDS", LOCK_TIMEOUT_SECONDS)):
+            received = file_path.stat().st_size if file_path.exists() else 0
+            if offset is None:
+                offset = received
+            elif offset > received:
+                logger.warning(f"Chunk {filename}@{offset} is past received bytes {received}")
+                raise UploadOffsetError("Offset mismatch", received)
+
+            fd = os.open(str(file_path), os.O_RDWR | os.O_CREAT, DEFAULT_FILE_MODE)
+            with os.fdopen(fd, "r+b") as f:
+                f.seek(received)
+                hasher = hashlib.sha256()
+                skip = received - offset
+                body_size = 0
+                written = 0
+                try:
+                    while True:
+                        chunk = stream.read(STREAM_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        body_size += len(chunk)
+                        if limit is not None and body_size > limit:
+                            raise UploadTooLargeError("File too large", received)
+                        hasher.update(chunk)
+                        if skip:
+                            duplicate = min(skip, len(chunk))
+                            skip -= duplicate
+                            chunk = chunk[duplicate:]
+                        if chunk:
+                            f.write(chunk)
+                            written += len(chunk)
+
+                    if checksum and hasher.hexdigest() != checksum.strip().lower():
+                        raise UploadChecksumError("Checksum mismatch", received)
+                except UploadError:
+                    f.truncate(received)
+                    raise
+
+        logger.info(
+            f"Chunk {filename}@{offset}: {body_size} bytes, {body_size - written} already received, "
+            f"{received + written} total (session: {self.session_id[:8]}...)"
+        )
+        return received + written, written
+
+    def set_expected_checksum(self, filename: str, checksum: str) -> None:
+        """Remember the SHA-256 the whole file must have before it is routed."""
+        self._ensure_session_dir()
+        self._checksum_path(filename).write_text(checksum.strip().lower(), encoding="ascii")
+
+    def verify_file(self, filename: str) -> bool:
+        """
+        Check the uploaded file against its expected SHA-256, if one was sent.
+
+        The file is hashed in STREAM_CHUNK_SIZE reads. A corrupted file and its
+        checksum are deleted so that 1C uploads it again.
+
+        Returns:
+            True if verified, False if no checksum was sent
+
+        Raises:
+            UploadChecksumError: If the file does not match
+        """
+        checksum_path = self._checksum_path(filename)
+        if not checksum_path.exists():
+            return False
+
+        expected = checksum_path.read_text(encoding="ascii").strip()
+        file_path = self.get_file_path(filename)
+        hasher = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+                hasher.update(block)
+
+        checksum_path.unlink(missing_ok=True)
+        if hasher.hexdigest() != expected:
+            size = file_path.stat().st_size
+            file_path.unlink(missing_ok=True)
+            logger.error(f"Checksum mismatch for {filename} ({size} bytes), file discarded")
+            raise UploadChecksumError(f"Checksum mismatch for {filename}", 0)
+        return True
+
+    def _checksum_path(self, filename: str) -> Path:
+        return self.session_dir / f".{Path(filename).name}{CHECKSUM_SUFFIX}"
@@ -9,7 +9,6 @@ Story 4.3 Review Follow-up: [AI-Review][MEDIUM] Fat View refactoring.
 
 import logging
 import shutil
-import zipfile
 from datetime import timedelta
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
@@ -19,7 +18,8 @@ from django.db import transaction
 from django.utils import timezone
 
 from .file_service import FileStreamService
-from .routing_service import XML_ROUTING_RULES, FileRoutingService
+from .routing_service import FileRoutingService
+from .zip_source import prepare_archives
 
 if TYPE_CHECKING:
     from apps.products.models import ImportSession
@@ -35,8 +35,10 @@ class ImportOrchestratorService:
     - Expire stale import sessions
     - Find or create an ImportSession
     - Transfer files from temp to import directory
-    - Unpack ZIP archives with Zip Slip protection and route contents
+    - Validate ZIP archives with Zip Slip protection and route contents
     - Execute synchronous import via management command
+    - Pipelined mode: stage each finished segment, apply on mode=complete
+    - Coalescing mode: one import per quiet window, late files as a follow-up
     - Mark exchange cycle as complete
     """
 
@@ -63,8 +65,15 @@ class ImportOrchestratorService:
             logger.info(
                 f"[IMPORT] Session {session.pk} is IN_PROGRESS, " "returning success without modifying import_dir"
             )
+            if self._quiet_window():
+                # The file stays in temp; the running import picks it up as a follow-up
+                session.log_event(f"{self.filename} будет импортирован следующим инкрементом")
             return True, "already_in_progress"
 
+        # Pipelined exchange: parse this segment now, apply everything on mode=complete
+        if self._pipelined():
+            return self._stage_uploaded_file(session)
+
         # Transfer files
         ok, msg = self._transfer_files(session)
         if not ok:
@@ -73,11 +82,62 @@ class ImportOrchestratorService:
         # Unpack ZIPs
         self._unpack_zips(session)
 
+        # Coalescing: one import after the quiet window instead of one per file
+        if self._quiet_window():
+            self._schedule_coalesced_dispatch(session)
+            return True, "success"
+
         # Run import — async via Celery to avoid Nginx timeouts on large files
         self._dispatch_import(session)
 
         return True, "success"
 
+    def dispatch_when_quiet(self, session_id: int) -> str:
+        """
+        Dispatch the coalesced import once no mode=import arrived for the quiet window.
+
+        Called by dispatch_coalesced_import_task scheduled on every mode=import
+        (session.updated_at is the time of the latest request). A task that
+        fires too early re-arms itself for the rest of the window; once one
+        task dispatches, the others find the session no longer PENDING.
+
+        Returns:
+            "dispatched", "rescheduled" or "skipped"
+        """
+        from apps.products.models import ImportSession
+
+        window = self._quiet_window()
+        with transaction.atomic():
+            session = ImportSession.objects.select_for_update().filter(pk=session_id).first()
+            if session is None or session.status != ImportSession.ImportStatus.PENDING:
+                return "skipped"
+            quiet_for = (timezone.now() - session.updated_at).total_seconds()
+            if quiet_for < window:
+                self._schedule_coalesced_dispatch(session, countdown=window - quiet_for)
+                return "rescheduled"
+            # Dispatch under the row lock: a concurrent mode=import either came
+            # first (and reset the window) or sees IN_PROGRESS and queues a follow-up
+            self._dispatch_import(session, coalesced=True)
+        return "dispatched"
+
+    def dispatch_followup(self) -> bool:
+        """
+        Import files that arrived while the coalesced import was running.
+
+        They were left in the temp directory; start a new session over them
+        (transfer, quiet window, import) so they are neither dropped nor
+        mixed into the finished run.
+
+        Returns:
+            True if a follow-up increment was queued
+        """
+        pending = [name for name in FileStreamService(self.sessid).list_files() if not name.startswith(".")]
+        if not pending:
+            return False
+        logger.info(f"[IMPORT] Follow-up increment for {self.sessid}: {pending}")
+        ok, _ = self.execute()
+        return ok
+
     # ------------------------------------------------------------------
     # Internal steps
     # ------------------------------------------------------------------
@@ -123,30 +183,28 @@ class ImportOrchestratorService:
             if active_session:
                 if active_session.status == ImportSession.ImportStatus.IN_PROGRESS:
                     logger.info(f"[IMPORT] Session {active_session.pk} is IN_PROGRESS, " "skipping duplicate")
-                    active_session.report += (
-                        f"[{timezone.now()}] mode=import для {self.filename} " "- сессия уже обрабатывается\n"
-                    )
-                    active_session.save(update_fields=["report", "updated_at"])
+                    active_session.save(update_fields=["updated_at"])
+                    active_session.log_event(f"mode=import для {self.filename} - сессия уже обрабатывается")
                     # Return a sentinel to indicate "already running" — caller treats as success
                     return active_session
 
                 session = active_session
                 logger.info(f"[IMPORT] Using existing PENDING session {session.pk}")
-                session.report += f"[{timezone.now()}] Получен mode=import для {self.filename}, " "запускаем импорт\n"
-                session.save(update_fields=["report", "updated_at"])
+                session.save(update_fields=["updated_at"])
+                session.log_event(f"Получен mode=import для {self.filename}, запускаем импорт")
             else:
                 session = ImportSession.objects.create(
                     session_key=self.sessid,
                     status=ImportSession.ImportStatus.PENDING,
                     import_type=ImportSession.ImportType.CATALOG,
-                    report=(f"[{timezone.now()}] Сессия создана по mode=import. " f"Файл: {self.filename}\n"),
                 )
+                session.log_event(f"Сессия создана по mode=import. Файл: {self.filename}")
                 logger.info(f"[IMPORT] Created NEW session id={session.pk}")
 
         return session
 
     def _transfer_files(self, session: "ImportSession", label: str = "IMPORT") -> tuple[bool, str]:
-        """Transfer files from temp to import directory.
+        """Transfer files from temp to import directory (a priority batch — to its own directory).
 
         Args:
             session: ImportSession instance for report logging.
@@ -159,9 +217,10 @@ class ImportOrchestratorService:
         """
         try:
             file_service = FileStreamService(self.sessid)
-            routing_service = FileRoutingService(self.sessid)
             files = file_service.list_files()
             logger.info(f"[{label}] Files in temp: {files}")
+            self._classify_uploads(session, files)
+            routing_service = FileRoutingService(self.sessid, import_dir=self._batch_dir(session))
 
             transferred_count = 0
             failed_files: list[str] = []
@@ -174,8 +233,7 @@ class ImportOrchestratorService:
                     failed_files.append(f)
 
             logger.info(f"[{label}] Transferred {transferred_count}/{len(files)} files")
-            session.report += f"[{timezone.now()}] Перенесено файлов: " f"{transferred_count}/{len(files)}\n"
-            session.save(update_fields=["report"])
+            session.log_event(f"Перенесено файлов: {transferred_count}/{len(files)}")
 
             if failed_files:
                 return (
@@ -186,105 +244,67 @@ class ImportOrchestratorService:
 
         except Exception as e:
             logger.error(f"[{label}] File transfer failed: {e}", exc_info=True)
-            session.report += f"[{timezone.now()}] ОШИБКА переноса: {e}\n"
-            session.save(update_fields=["report"])
+            session.log_event(f"ОШИБКА переноса: {e}", level="error")
             return False, "File transfer error"
 
-    def _unpack_zips(self, session: "ImportSession") -> None:
-        """Unpack ZIP files with Zip Slip protection and route contents."""
-        try:
-            zip_files = list(self.import_dir.glob("*.zip"))
-            if not zip_files:
-                return
+    def _pipelined(self) -> bool:
+        return bool(settings.ONEC_EXCHANGE.get("PIPELINED_IMPORT", False))
 
-            logger.info(f"[IMPORT] Found {len(zip_files)} ZIP files to unpack")
+    def _quiet_window(self) -> float:
+        return float(settings.ONEC_EXCHANGE.get("IMPORT_QUIET_WINDOW_SECONDS", 0) or 0)
 
-            for zf in zip_files:
-                try:
-                    with zipfile.ZipFile(zf, "r") as zip_ref:
-                        unpacked_files = zip_ref.namelist()
-                        # Zip Slip protection
-                        for member in unpacked_files:
-                            member_path = (self.import_dir / member).resolve()
-                            if not str(member_path).startswith(str(self.import_dir.resolve())):
-                                raise ValueError(f"Zip Slip detected: {member} resolves " "outside import dir")
-                        zip_ref.extractall(self.import_dir)
-
-                    logger.info(f"[IMPORT] Unpacked: {zf.name} " f"({len(unpacked_files)} files)")
-
-                    routed_count = self._route_unpacked_files(unpacked_files)
-
-                    session.report += (
-                        f"[{timezone.now()}] Архив {zf.name}: "
-                        f"{len(unpacked_files)} файлов, распределено: "
-                        f"{routed_count}\n"
-                    )
+    def _schedule_coalesced_dispatch(self, session: "ImportSession", countdown: float | None = None) -> None:
+        """Queue dispatch_coalesced_import_task after the quiet window."""
+        from apps.products.tasks import dispatch_coalesced_import_task
 
-                    try:
-                        zf.unlink()
-                    except OSError:
-                        pass
+        window = self._quiet_window()
+        dispatch_coalesced_import_task.apply_async(
+            args=(session.pk, self.sessid), countdown=window if countdown is None else countdown
+        )
+        if countdown is None:
+            session.log_event(f"Импорт {self.filename} объединяется: запуск после {window:g} с без новых файлов")
 
-                except Exception as unzip_err:
-                    logger.error(f"[IMPORT] Failed to unpack {zf.name}: {unzip_err}")
-                    session.report += f"[{timezone.now()}] Ошибка распаковки {zf.name}: " f"{unzip_err}\n"
-                    # Remove the corrupted zip file so it doesn't get retried endlessly
-                    try:
-                        zf.unlink()
-                        logger.info(f"[IMPORT] Deleted corrupted archive: {zf.name}")
-                    except OSError as del_err:
-                        logger.warning(f"[IMPORT] Failed to delete corrupted archive {zf.name}: {del_err}")
+    def _stage_uploaded_file(self, session: "ImportSession") -> tuple[bool, str]:
+        """Route the finished file and queue its parsing into staging.
 
-            session.save(update_fields=["report"])
+        Only this file is moved: other files may still be uploading. The
+        session stays PENDING until mode=complete dispatches the apply task.
+        """
+        from apps.products.tasks import stage_1c_import_file_task
 
+        routing_service = FileRoutingService(self.sessid)
+        try:
+            path = routing_service.move_to_import(self.filename)
+        except FileNotFoundError:
+            # Repeated mode=import for an already routed file
+            path = self.import_dir / routing_service.route_file(self.filename) / Path(self.filename).name
         except Exception as e:
-            logger.error(f"[IMPORT] ZIP processing failed: {e}", exc_info=True)
-            session.report += f"[{timezone.now()}] Ошибка обработки архивов: {e}\n"
-            session.save(update_fields=["report"])
-
-    def _route_unpacked_files(self, unpacked_files: list[str]) -> int:
-        """Route unpacked files to subdirectories based on naming rules."""
-        routed_count = 0
-        for unpacked_name in unpacked_files:
-            file_path = self.import_dir / unpacked_name
-            if not file_path.exists() or not file_path.is_file():
-                continue
-
-            name_lower = unpacked_name.lower()
-            suffix = file_path.suffix.lower()
-            target_subdir = None
-
-            if suffix == ".xml":
-                sorted_rules = sorted(
-                    XML_ROUTING_RULES.items(),
-                    key=lambda x: len(x[0]),
-                    reverse=True,
-                )
-                for prefix, subdir in sorted_rules:
-                    # Сравнение case-insensitive: 1С присылает 'priceLists_*.xml' (mixed case),
-                    # а name_lower уже lowercased — без .lower() на префиксе матчинг проваливается
-                    if name_lower.startswith(prefix.lower()):
-                        target_subdir = subdir.rstrip("/")
-                        break
-            elif suffix in {".jpg", ".jpeg", ".png", ".gif", ".webp"}:
-                if name_lower.startswith("import_files/"):
-                    target_subdir = "goods"
-                else:
-                    target_subdir = "goods/import_files"
+            logger.error(f"[IMPORT] Failed to move {self.filename}: {e}")
+            session.log_event(f"ОШИБКА переноса {self.filename}: {e}", level="error")
+            return False, "File transfer error"
 
-            if target_subdir:
-                dest_dir = self.import_dir / target_subdir
-                dest_path = dest_dir / unpacked_name
-                dest_path.parent.mkdir(parents=True, exist_ok=True)
-                try:
-                    shutil.move(str(file_path), str(dest_path))
-                    routed_count += 1
-                except Exception as move_err:
-                    logger.warning(f"[IMPORT] Failed to route {unpacked_name}: {move_err}")
+        if path.suffix.lower() == ".zip":
+            # Members are staged when the import is applied
+            self._unpack_zips(session)
+        elif path.suffix.lower() == ".xml" and path.exists():
+            stage_1c_import_file_task.delay(session.pk, str(path))
+            session.log_event(f"Сегмент {path.name} поставлен на подготовку")
+
+        return True, "success"
 
-        return routed_count
+    def _unpack_zips(self, session: "ImportSession") -> None:
+        """Validate ZIP files (Zip Slip protection) and route their contents.
+
+        Catalog XML and images are read straight from the archive by the
+        import command; only members needed by other commands are written out.
+        """
+        try:
+            prepare_archives(self._batch_dir(session), session.log_event)
+        except Exception as e:
+            logger.error(f"[IMPORT] ZIP processing failed: {e}", exc_info=True)
+            session.log_event(f"Ошибка обработки архивов: {e}", level="error")
 
-    def _dispatch_import(self, session: "ImportSession") -> None:
+    def _dispatch_import(self, session: "ImportSession", coalesced: bool = False) -> None:
         """Dispatch import via Celery to avoid blocking the HTTP response.
 
         For large files, synchronous import inside the request can exceed
@@ -298,16 +318,20 @@ class ImportOrchestratorService:
 
         if dry_run:
             logger.info("[IMPORT] DRY RUN mode - skipping import")
-            session.report += f"[{timezone.now()}] DRY RUN: импорт пропущен\n"
             session.status = session.ImportStatus.COMPLETED
             session.finished_at = timezone.now()
-            session.save(update_fields=["report", "status", "finished_at"])
+            session.save(update_fields=["status", "finished_at"])
+            session.log_event("DRY RUN: импорт пропущен")
             file_service = FileStreamService(self.sessid)
             file_service.mark_complete()
             return
 
         file_type = self._detect_file_type()
-        logger.info(f"[IMPORT] Dispatching Celery import task for " f"session_id={session.pk}, file_type={file_type}")
+        priority_types = self._priority_types(session)
+        logger.info(
+            f"[IMPORT] Dispatching Celery import task for "
+            f"session_id={session.pk}, file_type={file_type}, priority={priority_types}"
+        )
 
         # Race-fix (same as _dispatch_or_dryrun): перевести session в IN_PROGRESS ДО
         # dispatch. Иначе session остаётся PENDING в окне очереди Celery, и
@@ -318,16 +342,70 @@ class ImportOrchestratorService:
         from apps.products.models import ImportSession
 
         session.status = ImportSession.ImportStatus.IN_PROGRESS
-        session.report += f"[{timezone.now()}] Celery import task dispatched " f"(file_type={file_type})\n"
-        session.save(update_fields=["status", "report", "updated_at"])
+        session.save(update_fields=["status", "priority", "updated_at"])
+        session.log_event(f"Celery import task dispatched (file_type={file_type})")
 
-        task_result = process_1c_import_task.delay(session.pk, str(self.import_dir))
+        task_kwargs: dict[str, Any] = {}
+        if coalesced:
+            task_kwargs["coalesced"] = True
+        if priority_types:
+            task_kwargs["priority"] = True
+            task_kwargs["file_types"] = priority_types
+        task_result = process_1c_import_task.delay(session.pk, str(self._batch_dir(session)), **task_kwargs)
 
         logger.info(f"[IMPORT] Celery task dispatched: task_id={task_result.id}, " f"session_id={session.pk}")
 
-    def _detect_file_type(self) -> str:
-        """Determine import file type from filename."""
-        fn_lower = self.filename.lower() if self.filename else ""
+    def _classify_uploads(self, session: "ImportSession", files: list[str]) -> None:
+        """
+        Flag a prices/rests-only exchange for the priority Celery queue.
+
+        The batch is the session's own uploads, accumulated over its mode=import
+        requests in report_details["upload_types"] — not the shared import
+        directory, where a running catalog import keeps its goods/offers files.
+        """
+        from apps.products.services.import_lanes import is_priority_batch
+
+        details = session.report_details or {}
+        upload_types = set(details.get("upload_types", []))
+        upload_types.update(self._detect_file_type(name) for name in files if not name.startswith("."))
+        was_priority = session.priority
+        session.priority = not self._pipelined() and is_priority_batch(upload_types)
+        session.report_details = {**details, "upload_types": sorted(upload_types)}
+        session.save(update_fields=["priority", "report_details", "updated_at"])
+        if was_priority and not session.priority:
+            self._merge_priority_files()
+
+    def _priority_types(self, session: "ImportSession") -> list[str]:
+        """File types of a priority batch (the task imports only them), otherwise an empty list."""
+        if not session.priority:
+            return []
+        return list((session.report_details or {}).get("upload_types", []))
+
+    def _batch_dir(self, session: "ImportSession") -> Path:
+        """Data directory of the session's import: its own one for a priority batch, else the shared one."""
+        from apps.products.services.import_lanes import priority_data_dir
+
+        return priority_data_dir(self.sessid) if session.priority else self.import_dir
+
+    def _merge_priority_files(self) -> None:
+        """Catalog files joined a prices/rests batch: move the files routed so far into the shared directory."""
+        from apps.products.services.import_lanes import priority_data_dir
+
+        priority_dir = priority_data_dir(self.sessid)
+        if not priority_dir.is_dir():
+            return
+        for path in sorted(priority_dir.rglob("*")):
+            if path.is_file():
+                target = self.import_dir / path.relative_to(priority_dir)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(path), str(target))
+        shutil.rmtree(priority_dir, ignore_errors=True)
+        logger.info(f"[IMPORT] Session {self.sessid} is no longer prices/rests-only, files moved to {self.import_dir}")
+
+    def _detect_file_type(self, filename: str | None = None) -> str:
+        """Determine import file type from filename (the request's one by default)."""
+        filename = filename or self.filename
+        fn_lower = filename.lower() if filename else ""
         if fn_lower.startswith("goods") or fn_lower.startswith("import"):
             return "goods"
         elif fn_lower.startswith("offers"):
@@ -377,13 +455,19 @@ class ImportOrchestratorService:
         with transaction.atomic():
             session = self._resolve_complete_session(ImportSession)
 
+        if session.status != ImportSession.ImportStatus.PENDING:
+            # mode=import already dispatched the import of this exchange: complete only closes the cycle
+            session.log_event("Получен сигнал complete: импорт уже запущен по mode=import.")
+            logger.info(f"[COMPLETE] Session {session.pk} is {session.status}, marking cycle complete only")
+            FileStreamService(self.sessid).mark_complete()
+            return True, "success"
+
         # Step 2: IO operations OUTSIDE transaction (no DB lock held)
         # Transfer files from temp to import directory
         ok, msg = self._transfer_files(session, label="COMPLETE")
         if not ok:
             logger.error(f"[COMPLETE] File transfer failed: {msg}")
-            session.report += f"[{timezone.now()}] ОШИБКА: перенос файлов не удался, " f"импорт прерван: {msg}\n"
-            session.save(update_fields=["report"])
+            session.log_event(f"ОШИБКА: перенос файлов не удался, импорт прерван: {msg}", level="error")
             return False, f"File transfer failed: {msg}"
 
         # Check for file-flag .dry_run
@@ -397,25 +481,36 @@ class ImportOrchestratorService:
         return True, "success"
 
     def _resolve_complete_session(self, ImportSession: type["ImportSession"]) -> Any:
-        """Find or create ImportSession for mode=complete."""
+        """
+        Find or create ImportSession for mode=complete.
+
+        Any active session of the exchange is reused (unique_active_session_key):
+        after mode=import it is already STARTED/IN_PROGRESS.
+        """
         session = (
             ImportSession.objects.select_for_update()
-            .filter(session_key=self.sessid, status=ImportSession.ImportStatus.PENDING)
+            .filter(
+                session_key=self.sessid,
+                status__in=[
+                    ImportSession.ImportStatus.PENDING,
+                    ImportSession.ImportStatus.STARTED,
+                    ImportSession.ImportStatus.IN_PROGRESS,
+                ],
+            )
             .first()
         )
 
         if not session:
-            logger.warning(f"[COMPLETE] No PENDING session found for {self.sessid}. " "Creating NEW session.")
+            logger.warning(f"[COMPLETE] No active session found for {self.sessid}. " "Creating NEW session.")
             session = ImportSession.objects.create(
                 session_key=self.sessid,
                 status=ImportSession.ImportStatus.PENDING,
                 import_type=ImportSession.ImportType.CATALOG,
-                report=(f"[{timezone.now()}] Сессия создана по сигналу complete " "(Fix check skipped?).\n"),
             )
+            session.log_event("Сессия создана по сигналу complete (Fix check skipped?).")
             logger.info(f"[COMPLETE] Created NEW session id={session.pk} " f"for sessid={self.sessid}")
-        else:
-            session.report += f"[{timezone.now()}] Получен сигнал complete.\n"
-            session.save(update_fields=["report"])
+        elif session.status == ImportSession.ImportStatus.PENDING:
+            session.log_event("Получен сигнал complete.")
             logger.info(f"[COMPLETE] Found EXISTING session id={session.pk}, " f"status={session.status}")
 
         return session
@@ -434,9 +529,8 @@ class ImportOrchestratorService:
                 logger.info(f"[COMPLETE] DRY RUN mode, unpacking {len(zip_files)} ZIPs")
                 for zf in zip_files:
                     file_service.unpack_zip(zf, self.import_dir)
-                    session.report += f"[{timezone.now()}] DRY RUN: Архив {zf} распакован.\n"
-                session.report += f"[{timezone.now()}] DRY RUN: Импорт пропущен.\n"
-                session.save(update_fields=["report"])
+                    session.log_event(f"DRY RUN: Архив {zf} распакован.")
+                session.log_event("DRY RUN: Импорт пропущен.")
             else:
                 # Race-fix: перевести session в IN_PROGRESS ДО dispatch и ДО mark_complete().
                 # Это закрывает окно очереди Celery — handle_init guard видит active session
@@ -444,19 +538,26 @@ class ImportOrchestratorService:
                 # повторно установит IN_PROGRESS на старте — операция идемпотентна.
                 from apps.products.models import ImportSession
 
+                pipelined = self._pipelined()
+                priority_types = self._priority_types(session)
                 session.status = ImportSession.ImportStatus.IN_PROGRESS
-                session.report += (
-                    f"[{timezone.now()}] Celery task queued; session marked IN_PROGRESS " "before complete marker.\n"
-                )
-                session.save(update_fields=["status", "report", "updated_at"])
+                session.save(update_fields=["status", "priority", "updated_at"])
+                session.log_event("Celery task queued; session marked IN_PROGRESS before complete marker.")
 
                 logger.info(
-                    f"[COMPLETE] Dispatching Celery task for " f"session_id={session.pk}, import_dir={self.import_dir}"
+                    f"[COMPLETE] Dispatching Celery task for "
+                    f"session_id={session.pk}, import_dir={self.import_dir}, priority={priority_types}"
                 )
-                task_result = process_1c_import_task.delay(session.pk, str(self.import_dir))
+                if pipelined:
+                    task_result = process_1c_import_task.delay(session.pk, str(self.import_dir), staged=True)
+                elif priority_types:
+                    task_result = process_1c_import_task.delay(
+                        session.pk, str(self._batch_dir(session)), priority=True, file_types=priority_types
+                    )
+                else:
+                    task_result = process_1c_import_task.delay(session.pk, str(self.import_dir))
                 logger.info(f"[COMPLETE] Celery task dispatched: task_id={task_result.id}")
-                session.report += f"[{timezone.now()}] Celery task запущен: {task_result.id}\n"
-                session.save(update_fields=["report", "updated_at"])
+                session.log_event(f"Celery task запущен: {task_result.id}")
 
             # Mark exchange cycle complete for next init
             file_service.mark_complete()
@@ -464,5 +565,4 @@ class ImportOrchestratorService:
 
         except Exception as e:
             logger.error(f"[COMPLETE] Protocol error: {e}", exc_info=True)
-            session.report += f"[{timezone.now()}] ОШИБКА: {e}\n"
-            session.save(update_fields=["report"])
+            session.log_event(f"ОШИБКА: {e}", level="error")
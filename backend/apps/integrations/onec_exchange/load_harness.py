@@ -0,0 +1,443 @@
+"""
+Нагрузочный прогон протокола обмена с 1С (ICExchangeView).
+
+ExchangeLoadTest воспроизводит сеансы обмена так, как их ведет 1С,
+против тестового сервера (LocalExchangeServer в процессе или внешний --url):
+
+- catalog: параллельные сеансы checkauth -> init -> mode=file (каждый файл
+  выгрузки порциями chunk_size, как 1С режет файлы больше file_limit) ->
+  mode=import по каждому файлу и завершающий mode=complete (инкрементальный
+  обмен) или только mode=complete (полный обмен) -> опрос ImportSession до
+  постановки импорта в очередь (и до завершения при wait_import);
+- contention: несколько писателей одновременно загружают один и тот же файл
+  одного сеанса с ограниченной скоростью; на POSIX писатели ждут FileLock
+  (flock) в очереди -> задержка mode=file, без fcntl блокировка держится
+  дольше ONEC_EXCHANGE["LOCK_TIMEOUT_SECONDS"] -> доля ответов «File busy»
+  (FileLockError); получив «File busy», писатель повторяет загрузку, как 1С;
+- orders: параллельные циклы mode=query -> mode=success выгрузки заказов.
+
+По каждой операции протокола собираются число запросов, ошибки, пропускная
+способность (запросы/с, МБ/с) и перцентили задержки p50/p90/p95/p99.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+import requests
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import connections
+
+EXCHANGE_PATH = "/api/integration/1c/exchange/"
+MB = 1024 * 1024
+FILE_BUSY = "File busy"
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class LoadTestConfig:
+    """Параметры прогона; размеры в байтах, время в секундах."""
+
+    base_url: str
+    username: str
+    password: str
+    dataset_dir: Path | None = None
+    sessions: int = 2
+    flow: str = "import"
+    chunk_size: int = 32 * MB
+    contention_writers: int = 4
+    contention_file_size: int = 4 * MB
+    contention_upload_seconds: float = 3.0
+    query_workers: int = 4
+    query_cycles: int = 10
+    wait_import: float = 0.0
+    poll_interval: float = 0.5
+    request_timeout: float = 600.0
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Перцентиль по рангу (nearest-rank) для отсортированного списка."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[rank - 1]
+
+
+@dataclass
+class _Operation:
+    latencies: list[float] = field(default_factory=list)
+    failures: int = 0
+    bytes: int = 0
+    errors: Counter[str] = field(default_factory=Counter)
+
+
+class OperationStats:
+    """Потокобезопасный сбор задержек по операциям протокола (mode)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._operations: dict[str, _Operation] = defaultdict(_Operation)
+
+    def record(self, operation: str, seconds: float, ok: bool, nbytes: int = 0, error: str = "") -> None:
+        with self._lock:
+            stats = self._operations[operation]
+            stats.latencies.append(seconds)
+            stats.bytes += nbytes
+            if not ok:
+                stats.failures += 1
+                stats.errors[error or "unknown"] += 1
+
+    def count(self, operation: str, error: str | None = None) -> int:
+        with self._lock:
+            stats = self._operations.get(operation)
+            if stats is None:
+                return 0
+            return len(stats.latencies) if error is None else stats.errors[error]
+
+    def summary(self, elapsed: float) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for name, stats in sorted(self._operations.items()):
+                latencies = sorted(stats.latencies)
+                busy = sum(latencies)
+                item: dict[str, Any] = {
+                    "requests": len(latencies),
+                    "failures": stats.failures,
+                    "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+                    **{f"p{q}_ms": round(percentile(latencies, q) * 1000, 1) for q in PERCENTILES},
+                    "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+                }
+                if stats.bytes:
+                    item["mb"] = round(stats.bytes / MB, 2)
+                    item["mb_per_s"] = round(stats.bytes / MB / busy, 2) if busy else 0.0
+                if stats.errors:
+                    item["errors"] = dict(stats.errors.most_common(5))
+                result[name] = item
+            return result
+
+
+class _ThrottledBody:
+    """
+    Тело запроса известной длины, отдаваемое равномерно за seconds секунд (медленный канал 1С).
+
+    Не наследует io: requests вызвал бы tell() и перешел на chunked-передачу,
+    которую WSGI-сервер Django не принимает.
+    """
+
+    def __init__(self, size: int, seconds: float, block: int = 64 * 1024, fill: bytes = b"<"):
+        self.size = size
+        self._remaining = size
+        self._block = block
+        self._fill = fill
+        self._delay = seconds * block / size if size and seconds > 0 else 0.0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def read(self, n: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        size = min(self._block, self._remaining)
+        self._remaining -= size
+        if self._delay:
+            time.sleep(self._delay)
+        return self._fill * size
+
+
+class ExchangeClient:
+    """Один клиент 1С: сессионная cookie после checkauth и запись каждой операции в stats."""
+
+    def __init__(self, config: LoadTestConfig, stats: OperationStats, exchange_type: str = "catalog"):
+        self.config = config
+        self.stats = stats
+        self.exchange_type = exchange_type
+        self.http = requests.Session()
+        self.sessid: str | None = None
+
+    def _request(
+        self, operation: str, method: str, params: dict[str, str], data: Any = None, auth: bool = False
+    ) -> tuple[bool, bytes]:
+        params = {"type": self.exchange_type, **params}
+        if self.sessid:
+            params["sessid"] = self.sessid
+        started = time.perf_counter()
+        try:
+            response = self.http.request(
+                method,
+                self.config.base_url.rstrip("/") + EXCHANGE_PATH,
+                params=params,
+                data=data,
+                auth=(self.config.username, self.config.password) if auth else None,
+                timeout=self.config.request_timeout,
+            )
+            body = response.content
+        except requests.RequestException as e:
+            self.stats.record(operation, time.perf_counter() - started, ok=False, error=type(e).__name__)
+            return False, b""
+        elapsed = time.perf_counter() - started
+
+        ok = response.status_code == 200 and not body.startswith(b"failure")
+        error = ""
+        if not ok:
+            lines = body.decode("utf-8", errors="replace").splitlines()
+            error = lines[1] if len(lines) > 1 and lines[0] == "failure" else f"HTTP {response.status_code}"
+        # Объем: отправленный для mode=file, полученный для выгрузки заказов
+        nbytes = len(data) if data is not None else len(body) if operation == "query" else 0
+        self.stats.record(operation, elapsed, ok, nbytes=nbytes, error=error)
+        return ok, body
+
+    def checkauth(self) -> bool:
+        ok, _ = self._request("checkauth", "GET", {"mode": "checkauth"}, auth=True)
+        return ok
+
+    def init(self) -> bool:
+        ok, body = self._request("init", "GET", {"mode": "init"})
+        for line in body.decode("utf-8", errors="replace").splitlines():
+            if line.startswith("sessid="):
+                self.sessid = line.split("=", 1)[1]
+        return ok and bool(self.sessid)
+
+    def upload(self, path: Path, chunk_size: int) -> bool:
+        """Загрузить файл порциями (каждая порция — отдельный POST mode=file)."""
+        ok = True
+        with open(path, "rb") as stream:
+            while chunk := stream.read(chunk_size):
+                ok = self.upload_body(path.name, chunk) and ok
+        return ok
+
+    def upload_body(self, filename: str, data: Any) -> bool:
+        ok, _ = self._request("file", "POST", {"mode": "file", "filename": filename}, data=data)
+        return ok
+
+    def upload_until_accepted(self, filename: str, make_body: Callable[[], Any], deadline: float) -> bool:
+        """Повторять загрузку, пока файл занят другим запросом («File busy»), но не дольше deadline."""
+        while True:
+            ok, body = self._request("file", "POST", {"mode": "file", "filename": filename}, data=make_body())
+            if ok or FILE_BUSY.encode() not in body or time.perf_counter() > deadline:
+                return ok
+            time.sleep(self.config.poll_interval)
+
+    def import_file(self, filename: str) -> bool:
+        ok, _ = self._request("import", "GET", {"mode": "import", "filename": filename})
+        return ok
+
+    def complete(self) -> bool:
+        ok, _ = self._request("complete", "GET", {"mode": "complete"})
+        return ok
+
+    def query(self) -> bool:
+        ok, _ = self._request("query", "GET", {"mode": "query"})
+        return ok
+
+    def success(self) -> bool:
+        ok, _ = self._request("success", "GET", {"mode": "success"})
+        return ok
+
+
+class LocalExchangeServer:
+    """Многопоточный WSGI-сервер Django в процессе прогона (порт выбирается системой)."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadedWSGIServer((host, port), _QuietHandler, allow_reuse_address=False)
+        self.httpd.set_app(get_internal_wsgi_application())
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="exchange-load-server", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> LocalExchangeServer:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._thread.join()
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class ExchangeLoadTest:
+    """
+    Сценарии catalog, contention и orders с общим отчетом.
+
+    Usage:
+        with LocalExchangeServer() as server:
+            config = LoadTestConfig(server.url, "1c@example.com", "secret", dataset_dir=Path("/tmp/1c-100k"))
+            report = ExchangeLoadTest(config).run()
+    """
+
+    def __init__(self, config: LoadTestConfig):
+        self.config = config
+        self.stats = OperationStats()
+        self.imports: list[dict[str, Any]] = []
+        self._imports_lock = threading.Lock()
+        self.contention: dict[str, Any] = {"sessid": None, "writers": 0, "accepted": 0}
+
+    def run(self, scenarios: tuple[str, ...] = ("catalog", "contention", "orders")) -> dict[str, Any]:
+        started = time.perf_counter()
+        timings = {}
+        for name in scenarios:
+            scenario_started = time.perf_counter()
+            getattr(self, f"run_{name}")()
+            timings[name] = round(time.perf_counter() - scenario_started, 3)
+        elapsed = time.perf_counter() - started
+
+        busy = self.stats.count("file", FILE_BUSY)
+        uploads = self.stats.count("file")
+        config = {key: str(value) if isinstance(value, Path) else value for key, value in asdict(self.config).items()}
+        config.pop("password")
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "scenarios_s": timings,
+            "operations": self.stats.summary(elapsed),
+            "lock_contention": {
+                "uploads": uploads,
+                "file_busy": busy,
+                "rate": round(busy / uploads, 4) if uploads else 0.0,
+                **self.contention,
+            },
+            "imports": self.imports,
+            "config": config,
+        }
+
+    # ------------------------------------------------------------------
+    # Сценарии
+    # ------------------------------------------------------------------
+
+    def run_catalog(self) -> None:
+        if self.config.dataset_dir is None:
+            return
+        files = sorted(self.config.dataset_dir.rglob("*.xml"), key=lambda path: path.stat().st_size)
+        self._parallel(self.config.sessions, lambda index: self._catalog_exchange(files))
+
+    def run_contention(self) -> None:
+        if self.config.contention_writers < 2:
+            return
+        client = ExchangeClient(self.config, self.stats)
+        if not (client.checkauth() and client.init()):
+            return
+        size = self.config.contention_file_size
+        seconds = self.config.contention_upload_seconds
+        deadline = time.perf_counter() + self.config.request_timeout
+        accepted = []
+
+        def writer(index: int) -> None:
+            # Свой байт заполнения у каждого писателя: по файлу видно, что загрузки не перемешались
+            fill = bytes([ord("a") + index % 26])
+            if client.upload_until_accepted(
+                "contention.xml", lambda: _ThrottledBody(size, seconds, fill=fill), deadline
+            ):
+                accepted.append(index)
+
+        self._parallel(self.config.contention_writers, writer)
+        self.contention = {
+            "sessid": client.sessid,
+            "writers": self.config.contention_writers,
+            "accepted": len(accepted),
+        }
+
+    def run_orders(self) -> None:
+        def cycles(index: int) -> None:
+            client = ExchangeClient(self.config, self.stats, exchange_type="sale")
+            if not (client.checkauth() and client.init()):
+                return
+            for _ in range(self.config.query_cycles):
+                if client.query():
+                    client.success()
+
+        self._parallel(self.config.query_workers, cycles)
+
+    # ------------------------------------------------------------------
+    # Шаги
+    # ------------------------------------------------------------------
+
+    def _catalog_exchange(self, files: list[Path]) -> None:
+        client = ExchangeClient(self.config, self.stats)
+        if not (client.checkauth() and client.init()):
+            return
+        for path in files:
+            client.upload(path, self.config.chunk_size)
+        uploaded = time.perf_counter()
+        if self.config.flow != "complete":
+            for path in files:
+                client.import_file(path.name)
+        client.complete()
+        self._poll_import(client.sessid, uploaded)
+
+    def _poll_import(self, sessid: str | None, started: float) -> None:
+        """Ждать постановки импорта в очередь (и завершения при wait_import) по ImportSession."""
+        from apps.products.models import ImportSession
+
+        finished = (ImportSession.ImportStatus.COMPLETED, ImportSession.ImportStatus.FAILED)
+        queued = (ImportSession.ImportStatus.IN_PROGRESS, *finished)
+        deadline = started + (self.config.wait_import or self.config.request_timeout)
+        record: dict[str, Any] = {"sessid": sessid, "status": None, "queued_s": None, "finished_s": None}
+        try:
+            while True:
+                session = ImportSession.objects.filter(session_key=sessid).order_by("-pk").first()
+                record["status"] = session.status if session else None
+                elapsed = round(time.perf_counter() - started, 3)
+                if record["queued_s"] is None and record["status"] in queued:
+                    record["queued_s"] = elapsed
+                    self.stats.record("import_queued", elapsed, ok=True)
+                if record["status"] in finished:
+                    record["finished_s"] = elapsed
+                    ok = record["status"] == ImportSession.ImportStatus.COMPLETED
+                    self.stats.record("import_finished", elapsed, ok=ok, error=record["status"])
+                    break
+                if (record["queued_s"] is not None and not self.config.wait_import) or time.perf_counter() > deadline:
+                    break
+                time.sleep(self.config.poll_interval)
+        finally:
+            connections.close_all()
+        with self._imports_lock:
+            self.imports.append(record)
+
+    def _parallel(self, workers: int, target: Callable[[int], Any]) -> None:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="exchange-load") as pool:
+            for future in [pool.submit(target, index) for index in range(workers)]:
+                future.result()
+
+
+def seed_orders(count: int, user: Any) -> int:
+    """Создать count субзаказов (по мастеру на каждый) с одной позицией для mode=query."""
+    from apps.orders.models import Order, OrderItem
+    from apps.products.factories import ProductVariantFactory
+
+    variant = ProductVariantFactory(retail_price=Decimal("1000.00"))
+    fields = {
+        "user": user,
+        "total_amount": Decimal("1000.00"),
+        "delivery_address": "Нагрузочный тест",
+        "delivery_method": "courier",
+        "payment_method": "card",
+    }
+    for _ in range(count):
+        master = Order.objects.create(is_master=True, **fields)
+        order = Order.objects.create(is_master=False, parent_order=master, **fields)
+        OrderItem.objects.create(
+            order=order,
+            product=variant.product,
+            variant=variant,
+            quantity=1,
+            unit_price=Decimal("1000.00"),
+            total_price=Decimal("1000.00"),
+            product_name=variant.product.name,
+            product_sku=variant.sku,
+        )
+    return count
@@ -0,0 +1,225 @@
+"""
+Orders Inbox for 1C orders.xml.
+
+orders.xml из mode=file принимается без разбора в запросе
+(ONEC_EXCHANGE["ORDERS_XML_ASYNC"]):
+- тело запроса пишется на диск порциями, XML не в UTF-8 перекодируется
+  потоковым декодером (Utf8XmlTranscoder) по объявлению <?xml encoding=...?>;
+- файл пишется во временный *.part, после fsync переименовывается — 1С
+  получает success только для целиком сохраненного файла;
+- попутно считаются <Документ> (прогресс импорта) и сохраняется заголовок
+  (проверка ДатаФормирования).
+
+Статусы заказов применяет задача apps.orders.tasks.import_orders_xml_task,
+после нее файл уходит в архив журналов обмена (archive_processed).
+
+Usage:
+    inbox = OrdersInbox(log_dir / ORDERS_INBOX_SUBDIR, max_bytes=limit)
+    payload = inbox.spool(request)
+"""
+
+from __future__ import annotations
+
+import codecs
+import logging
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from django.utils import timezone
+
+from .exchange_archive import ArchiveJob, exchange_archive
+
+logger = logging.getLogger(__name__)
+
+ORDERS_INBOX_SUBDIR = "inbox"
+SPOOL_CHUNK_SIZE = 64 * 1024
+# Объявление <?xml ... encoding="..."?> ищется в начале документа
+XML_DECLARATION_SCAN_BYTES = 200
+# Сколько байт начала документа сохраняется для проверки ДатаФормирования
+HEADER_BYTES = 2048
+
+# Simple regex to count <Документ> tags without full XML parsing
+DOCUMENT_TAG_RE = re.compile(rb"<\xd0\x94\xd0\xbe\xd0\xba\xd1\x83\xd0\xbc\xd0\xb5\xd0\xbd\xd1\x82[\s>/]")
+# Хвост предыдущей порции: тег <Документ> может быть разрезан границей порций
+_DOCUMENT_TAG_TAIL = 32
+
+# Regex to detect encoding from XML declaration (AC10)
+XML_ENCODING_RE = re.compile(rb'<\?xml[^>]+encoding=["\']([^"\']+)["\']', re.IGNORECASE)
+_DECLARED_ENCODING_RE = re.compile(r'encoding=["\'][^"\']+["\']')
+
+
+class OrdersInboxError(Exception):
+    """orders.xml не принят: текст уходит в ответ 1С после failure."""
+
+
+class Utf8XmlTranscoder:
+    """
+    Потоковое перекодирование XML в UTF-8 по объявлению кодировки.
+
+    Порции декодируются инкрементальным декодером (многобайтные символы на
+    границе порций не теряются); UTF-8 и документы без объявления
+    передаются как есть.
+
+    Raises:
+        UnicodeDecodeError: байты не соответствуют объявленной кодировке.
+    """
+
+    def __init__(self) -> None:
+        self.declared = ""
+        self._head = bytearray()
+        self._started = False
+        self._decoder: codecs.IncrementalDecoder | None = None
+
+    def feed(self, chunk: bytes) -> bytes:
+        if not self._started:
+            self._head += chunk
+            if len(self._head) < XML_DECLARATION_SCAN_BYTES:
+                return b""
+            return self._start()
+        if self._decoder is None:
+            return chunk
+        return self._decoder.decode(chunk).encode("utf-8")
+
+    def finish(self) -> bytes:
+        data = self._start() if not self._started else b""
+        if self._decoder is not None:
+            data += self._decoder.decode(b"", final=True).encode("utf-8")
+        return data
+
+    def _start(self) -> bytes:
+        self._started = True
+        head = bytes(self._head)
+        self._head.clear()
+
+        match = XML_ENCODING_RE.search(head[:XML_DECLARATION_SCAN_BYTES])
+        declared = match.group(1).decode("ascii", errors="ignore").lower().strip() if match else ""
+        if declared in ("", "utf-8", "utf8"):
+            return head
+        try:
+            self._decoder = codecs.getincrementaldecoder(declared)()
+        except LookupError:
+            logger.warning(f"[ORDERS IMPORT] Unknown XML encoding {declared}, keeping bytes as is")
+            return head
+
+        self.declared = declared
+        logger.info(f"[ORDERS IMPORT] Re-encoding XML from {declared} to UTF-8")
+        text = _DECLARED_ENCODING_RE.sub('encoding="utf-8"', self._decoder.decode(head), count=1)
+        return text.encode("utf-8")
+
+
+@dataclass(frozen=True)
+class SpooledOrdersXml:
+    """orders.xml, сохраненный во входящей папке."""
+
+    path: Path
+    received: int  # Байт тела запроса
+    size: int  # Байт на диске (после перекодирования)
+    documents: int  # Найдено <Документ>
+    header: bytes  # Начало документа (UTF-8)
+    encoding: str = ""  # Исходная кодировка, если файл перекодирован
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class OrdersInbox:
+    """Входящая папка orders.xml для асинхронного импорта статусов"""
+
+    def __init__(self, directory: Path | str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def spool(self, stream: BinaryIO, chunk_size: int = SPOOL_CHUNK_SIZE) -> SpooledOrdersXml:
+        """
+        Сохранить тело запроса в UTF-8 и надежно записать на диск.
+
+        Raises:
+            OrdersInboxError: тело больше max_bytes или не в объявленной кодировке.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
+        path = self.directory / f"{timestamp}_{uuid.uuid4().hex[:8]}_orders.xml"
+        partial = path.with_name(f"{path.name}.part")
+
+        transcoder = Utf8XmlTranscoder()
+        writer = _CountingWriter()
+        received = 0
+        try:
+            with open(partial, "wb") as f:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    received += len(chunk)
+                    if received > self.max_bytes:
+                        raise OrdersInboxError("File too large")
+                    writer.write(f, transcoder.feed(chunk))
+                writer.write(f, transcoder.finish())
+                f.flush()
+                os.fsync(f.fileno())
+            partial.replace(path)
+            _fsync_directory(self.directory)
+        except UnicodeDecodeError as e:
+            partial.unlink(missing_ok=True)
+            logger.warning(f"[ORDERS IMPORT] Failed to re-encode from {transcoder.declared}: {e}")
+            raise OrdersInboxError("Malformed XML") from e
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+
+        return SpooledOrdersXml(
+            path=path,
+            received=received,
+            size=writer.size,
+            documents=writer.documents,
+            header=bytes(writer.header),
+            encoding=transcoder.declared,
+        )
+
+
+class _CountingWriter:
+    """Запись порций с подсчетом <Документ> и сохранением заголовка."""
+
+    def __init__(self) -> None:
+        self.size = 0
+        self.documents = 0
+        self.header = bytearray()
+        self._tail = b""
+
+    def write(self, f: BinaryIO, data: bytes) -> None:
+        if not data:
+            return
+        f.write(data)
+        self.size += len(data)
+        if len(self.header) < HEADER_BYTES:
+            self.header += data[: HEADER_BYTES - len(self.header)]
+        # Теги, закончившиеся в хвосте, посчитаны на предыдущей порции
+        window = self._tail + data
+        self.documents += sum(1 for match in DOCUMENT_TAG_RE.finditer(window) if match.end() > len(self._tail))
+        self._tail = window[-_DOCUMENT_TAG_TAIL:]
+
+
+def _fsync_directory(directory: Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def archive_processed(path: Path, log_dir: Path, sessid: str = "") -> None:
+    """Обработанный orders.xml — в архив журналов обмена (при выключенном архиве — в журнал как есть)."""
+    archive = exchange_archive(log_dir)
+    if archive is not None:
+        archive.archive_now(ArchiveJob(path, mode="file", sessid=sessid))
+    else:
+        path.replace(log_dir / path.name)
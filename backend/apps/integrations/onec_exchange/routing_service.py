@@ -15,6 +15,8 @@ from pathlib import Path
 
 from django.conf import settings
 
+from .file_service import FileStreamService
+
 logger = logging.getLogger(__name__)
 
 # Routing rules for XML files based on filename prefix
@@ -44,6 +46,29 @@ IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 ZIP_EXTENSIONS = {".zip"}
 
 
+def xml_subdir(filename: str) -> str | None:
+    """
+    Determine the import subdirectory for an XML file by its name prefix.
+
+    Args:
+        filename: File name (directories are ignored)
+
+    Returns:
+        Subdirectory name without trailing slash (e.g. 'goods'),
+        or None if no XML_ROUTING_RULES prefix matches.
+    """
+    name_lower = Path(filename).name.lower()
+    # Sort rules by length of prefix descending to match most specific first
+    # e.g. 'propertiesOffers' (len 16) before 'properties' (len 10)
+    sorted_rules = sorted(XML_ROUTING_RULES.items(), key=lambda x: len(x[0]), reverse=True)
+    for prefix, subdir in sorted_rules:
+        # Сравнение case-insensitive: 1С присылает 'priceLists_*.xml' (mixed case),
+        # а name_lower уже lowercased — без .lower() на префиксе матчинг проваливается
+        if name_lower.startswith(prefix.lower()):
+            return subdir.rstrip("/")
+    return None
+
+
 class FileRoutingService:
     """
     Service for routing uploaded files to appropriate import directories.
@@ -57,12 +82,14 @@ class FileRoutingService:
             target_path = router.move_to_import(filename)
     """
 
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, import_dir: Path | None = None):
         """
         Initialize service for a specific session.
 
         Args:
             session_id: Django session key for isolation
+            import_dir: Target directory instead of the shared IMPORT_DIR
+                (priority exchanges, see import_lanes.priority_data_dir)
 
         Raises:
             ValueError: If session_id is empty
@@ -79,7 +106,7 @@ class FileRoutingService:
         self.temp_dir = self.temp_base / session_id
         # FIXED: Import directory should be shared/root, not session-isolated
         # Parser expects files in data/import_1c/goods, not data/import_1c/<sessid>/goods
-        self.import_dir = self.import_base
+        self.import_dir = import_dir or self.import_base
 
     def _get_temp_file_path(self, filename: str) -> Path:
         """
@@ -124,20 +151,11 @@ class FileRoutingService:
         """
         safe_filename = Path(filename).name
         suffix = Path(safe_filename).suffix.lower()
-        name_lower = safe_filename.lower()
 
         # Check XML routing rules by prefix
         if suffix == ".xml":
-            # Sort rules by length of prefix descending to match most specific first
-            # e.g. 'propertiesOffers' (len 16) before 'properties' (len 10)
-            sorted_rules = sorted(XML_ROUTING_RULES.items(), key=lambda x: len(x[0]), reverse=True)
-            for prefix, subdir in sorted_rules:
-                # Сравнение case-insensitive: 1С присылает 'priceLists_*.xml' (mixed case),
-                # а name_lower уже lowercased — без .lower() на префиксе матчинг проваливается
-                if name_lower.startswith(prefix.lower()):
-                    return subdir.rstrip("/")
             # Unknown XML file -> root
-            return ""
+            return xml_subdir(safe_filename) or ""
 
         # Check image extensions
         # Parser expects images in 'goods/import_files/' or 'offers/import_files/'
@@ -175,6 +193,9 @@ class FileRoutingService:
         if not source_path.exists():
             raise FileNotFoundError(f"Source file not found: {source_path}")
 
+        # Resumable upload with file_checksum: streaming SHA-256 check before routing
+        FileStreamService(self.session_id).verify_file(filename)
+
         # Determine target subdirectory
         subdir = self.route_file(filename)
         target_dir = self._ensure_import_dir(subdir)
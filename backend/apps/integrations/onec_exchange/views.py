@@ -1,11 +1,11 @@
 import io
+import json
 import logging
 import re
-import shutil
 import time
 import zipfile
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
 from xml.etree.ElementTree import ParseError as ETParseError
 from xml.sax.saxutils import escape as xml_escape
 
@@ -14,18 +14,22 @@ from django.conf import settings
 from django.contrib.auth import get_backends, login
 from django.core.cache import cache
 from django.db import DatabaseError, OperationalError, transaction
-from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 from rest_framework.views import APIView
 
+from apps.common.services.profiling import ExchangeProfiler, profiling_settings
+from apps.common.services.query_budget import query_budget
 from apps.orders.models import Order
 from apps.orders.services.order_export import OrderExportService
 from apps.orders.services.order_status_import import OrderStatusImportService
 from apps.orders.signals import orders_bulk_updated
 
 from .authentication import Basic1CAuthentication, CsrfExemptSessionAuthentication
-from .file_service import FileLockError, FileStreamService
+from .exchange_archive import exchange_archive
+from .file_service import FileLockError, FileStreamService, UploadError, get_exchange_log_dir
 from .import_orchestrator import ImportOrchestratorService
+from .orders_inbox import DOCUMENT_TAG_RE, ORDERS_INBOX_SUBDIR, OrdersInbox, OrdersInboxError, Utf8XmlTranscoder
 from .permissions import Is1CExchangeUser
 from .renderers import PlainTextRenderer
 from .routing_service import FileRoutingService
@@ -33,19 +37,14 @@ from .throttling import OneCAuthThrottle, OneCExchangeThrottle
 
 logger = logging.getLogger(__name__)
 
-EXCHANGE_LOG_SUBDIR = "1c_exchange/logs"
 ORDERS_XML_FILENAME = "orders.xml"
 ORDERS_ZIP_FILENAME = "orders.zip"
 ORDERS_XML_MAX_SIZE = 5 * 1024 * 1024  # 5MB (ADR-004)
 MAX_DOCUMENTS_PER_FILE = 1000  # FM4.5: Guard against oversized XML
 ORDERS_IMPORT_MAX_RETRIES = 3  # FM5.1/FM5.2: DB retry attempts
 XML_TIMESTAMP_SCAN_BYTES = 2048  # Review follow-up: avoid missing timestamp
-
-# Simple regex to count <Документ> tags without full XML parsing
-_DOCUMENT_TAG_RE = re.compile(rb"<\xd0\x94\xd0\xbe\xd0\xba\xd1\x83\xd0\xbc\xd0\xb5\xd0\xbd\xd1\x82[\s>/]")
-
-# Regex to detect encoding from XML declaration (AC10)
-_XML_ENCODING_RE = re.compile(rb'<\?xml[^>]+encoding=["\']([^"\']+)["\']', re.IGNORECASE)
+EXPORT_STREAM_BUFFER_SIZE = 64 * 1024  # Размер порции, отдаваемой в ответ mode=query
+EXPORTED_IDS_CACHE_TIMEOUT = 3600
 
 
 def _validate_xml_timestamp(xml_data: bytes, max_age_hours: int = 24) -> bool:
@@ -86,51 +85,34 @@ def _validate_xml_timestamp(xml_data: bytes, max_age_hours: int = 24) -> bool:
 def _reencode_xml_if_needed(xml_data: bytes) -> bytes:
     """Detect non-UTF-8 encoding from XML declaration and re-encode to UTF-8.
 
-    Supports windows-1251 and other encodings declared in ``<?xml encoding="..."?>``.
-    Returns original bytes if already UTF-8 or no encoding declared.
+    Supports windows-1251 and other encodings declared in ``<?xml encoding="..."?>``
+    (same streaming codec as the orders inbox). Returns original bytes if already
+    UTF-8, no encoding declared, or the bytes do not match the declaration.
     """
-    header = xml_data[:200]
-    match = _XML_ENCODING_RE.search(header)
-    if not match:
-        return xml_data
-
-    declared = match.group(1).decode("ascii", errors="ignore").lower().strip()
-    if declared in ("utf-8", "utf8"):
-        return xml_data
-
+    transcoder = Utf8XmlTranscoder()
     try:
-        text = xml_data.decode(declared)
-        # Replace encoding declaration with utf-8
-        text = re.sub(
-            r'encoding=["\'][^"\']+["\']',
-            'encoding="utf-8"',
-            text,
-            count=1,
-        )
-        logger.info(f"[ORDERS IMPORT] Re-encoded XML from {declared} to UTF-8")
-        return text.encode("utf-8")
-    except (UnicodeDecodeError, LookupError) as exc:
-        logger.warning(f"[ORDERS IMPORT] Failed to re-encode from {declared}: {exc}")
+        return transcoder.feed(xml_data) + transcoder.finish()
+    except UnicodeDecodeError as exc:
+        logger.warning(f"[ORDERS IMPORT] Failed to re-encode from {transcoder.declared}: {exc}")
         return xml_data
 
 
-def _get_exchange_log_dir() -> Path:
-    """Return the private directory for exchange audit logs.
+def _save_exchange_log(
+    filename: str,
+    content: bytes | str,
+    is_binary: bool = False,
+    *,
+    archive: bool = False,
+    mode: str = "",
+    sessid: str = "",
+) -> None:
+    """Save a copy of exchange output to a private log directory for audit.
 
-    Uses ``settings.EXCHANGE_LOG_DIR`` when configured, otherwise falls back
-    to ``BASE_DIR / "var" / EXCHANGE_LOG_SUBDIR`` which is NOT inside
-    MEDIA_ROOT (and therefore not publicly accessible).
+    With ``archive`` the raw copy is only a spool: it is written synchronously
+    (ADR-005) and handed over to the background exchange archive.
     """
-    custom = getattr(settings, "EXCHANGE_LOG_DIR", None)
-    if custom:
-        return Path(custom)
-    return Path(settings.BASE_DIR) / "var" / EXCHANGE_LOG_SUBDIR
-
-
-def _save_exchange_log(filename: str, content: bytes | str, is_binary: bool = False) -> None:
-    """Save a copy of exchange output to a private log directory for audit."""
     try:
-        log_dir = _get_exchange_log_dir()
+        log_dir = get_exchange_log_dir()
         log_dir.mkdir(parents=True, exist_ok=True)
         timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
         filepath = log_dir / f"{timestamp}_{filename}"
@@ -142,26 +124,143 @@ def _save_exchange_log(filename: str, content: bytes | str, is_binary: bool = Fa
             if isinstance(content, bytes):
                 content = content.decode("utf-8")
             filepath.write_text(content, encoding="utf-8")
+        if archive:
+            _archive_exchange_log(filepath, mode=mode, sessid=sessid)
     except Exception as e:
         logger.error(f"[EXCHANGE LOG] Failed to save audit log {filename}: {e}")
 
 
-def _copy_file_to_log(source_path: Path, filename: str) -> None:
-    """Copy a file to the exchange log directory without loading it into RAM.
-
-    This avoids OOM issues when logging large XML/ZIP files by using
-    filesystem-level copy instead of reading content into memory.
-    """
+def _open_exchange_log(filename: str) -> BinaryIO | None:
+    """Open a new audit log file for incremental writes; None if the log dir is unavailable."""
     try:
-        log_dir = _get_exchange_log_dir()
+        log_dir = get_exchange_log_dir()
         log_dir.mkdir(parents=True, exist_ok=True)
         timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
-        dest_path = log_dir / f"{timestamp}_{filename}"
-        shutil.copy2(source_path, dest_path)
+        return open(log_dir / f"{timestamp}_{filename}", "wb")
+    except Exception as e:
+        logger.error(f"[EXCHANGE LOG] Failed to open audit log {filename}: {e}")
+        return None
+
+
+def _archive_exchange_log(path: Path, mode: str, sessid: str) -> None:
+    """Hand a written audit log over to the exchange archive (compression, index, rotation)."""
+    try:
+        archiver = exchange_archive(path.parent)
+        if archiver is not None:
+            archiver.submit(path, mode=mode, sessid=sessid)
     except Exception as e:
-        logger.error(f"[EXCHANGE LOG] Failed to copy audit log {filename}: {e}")
+        logger.error(f"[EXCHANGE LOG] Failed to hand {path.name} over to the exchange archive: {e}")
+
+
+def _exchange_profiler(label: str) -> ExchangeProfiler | None:
+    """Профайлер обмена заказами, если включён EXCHANGE_PROFILING["MODE"]."""
+    return ExchangeProfiler.from_mode(profiling_settings().get("MODE"), label)
+
+
+def _finish_exchange_profile(profiler: ExchangeProfiler) -> None:
+    """Сохранить сводку профайлера (и сэмплы стека) рядом с журналами обмена."""
+    report = profiler.finish(get_exchange_log_dir())
+    _save_exchange_log(f"{profiler.label}.profile.json", json.dumps(report, ensure_ascii=False, indent=2))
+    phases = ", ".join(f"{name}={phase['wall_s']}s/{phase['queries']}q" for name, phase in report["phases"].items())
+    logger.info(f"[EXCHANGE PROFILE] {profiler.label}: wall={report['wall_s']}s cpu={report['cpu_s']}s {phases}")
 
 
+def _profile_stream(chunks: Iterable[str], profiler: ExchangeProfiler) -> Iterator[str]:
+    """Профилировать генерацию выгрузки в потоке, который читает ответ, до закрытия потока."""
+    profiler.start()
+    try:
+        yield from chunks
+    finally:
+        _finish_exchange_profile(profiler)
+
+
+class _ZipStreamSink(io.RawIOBase):
+    """Unseekable in-memory sink for ``zipfile``: compressed bytes are drained as they appear.
+
+    Without ``seek`` zipfile writes local headers with data descriptors, so the
+    archive can be produced strictly front-to-back straight into the response.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _encode_xml_fragments(fragments: Iterable[str]) -> Iterator[bytes]:
+    """Encode XML fragments to UTF-8 and batch them into response-sized chunks."""
+    buffer = bytearray()
+    for fragment in fragments:
+        buffer += fragment.encode("utf-8")
+        if len(buffer) >= EXPORT_STREAM_BUFFER_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _deflate_xml_fragments(fragments: Iterable[str], member_name: str) -> Iterator[bytes]:
+    """Deflate XML fragments into a single-member ZIP archive, yielding compressed chunks."""
+    sink = _ZipStreamSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        with zf.open(member_name, "w") as member:
+            for chunk in _encode_xml_fragments(fragments):
+                member.write(chunk)
+                if sink.pending >= EXPORT_STREAM_BUFFER_SIZE:
+                    yield sink.drain()
+    if sink.pending:
+        yield sink.drain()
+
+
+def _stream_export(
+    chunks: Iterable[bytes],
+    log_filename: str,
+    on_complete: Callable[[], None],
+    sessid: str = "",
+) -> Iterator[bytes]:
+    """Pass response chunks through, tee-ing the same bytes to the audit log in one pass.
+
+    ``on_complete`` runs only after the last chunk has been handed to the server,
+    so export bookkeeping (exported/skipped ids) never reflects a truncated stream.
+    The closed log (complete or truncated) is handed over to the exchange archive.
+    """
+    log_file = _open_exchange_log(log_filename)
+    try:
+        for chunk in chunks:
+            if log_file is not None:
+                log_file.write(chunk)
+            yield chunk
+        on_complete()
+    except Exception as e:
+        logger.exception(f"[EXPORT] Streaming export failed: {e}")
+        raise
+    finally:
+        if log_file is not None:
+            log_file.close()
+            _archive_exchange_log(Path(log_file.name), mode="query", sessid=sessid)
+
+
+@query_budget(25)
 class ICExchangeView(APIView):
     def _get_exchange_identity(self, request):
         """
@@ -566,9 +665,9 @@ class ICExchangeView(APIView):
         Protocol: GET /?mode=query[&zip=yes]
         Returns XML (or ZIP) with pending orders for 1C.
 
-        Memory optimization: Uses streaming for XML responses to avoid
-        materializing large exports in RAM. For ZIP, uses tempfile to
-        avoid doubling memory pressure.
+        Memory optimization: XML (or ZIP) responses are generated while they
+        are streamed (OrderExportReader pages sub-orders by pk), so neither RAM
+        nor temp files hold the whole export.
         """
         # 1С УТ 11 sends repeated query instead of mode=success.
         # Treat a repeated query as implicit confirmation of previous batch.
@@ -577,16 +676,12 @@ class ICExchangeView(APIView):
         query_time = timezone.now()
 
         # Экспортируем только субзаказы (is_master=False). Мастер-заказы — агрегирующие, в 1С не попадают.
-        orders = (
-            Order.objects.filter(
-                sent_to_1c=False,
-                export_skipped=False,
-                created_at__lte=query_time,
-                is_master=False,
-                parent_order__isnull=False,
-            )
-            .select_related("user", "parent_order")
-            .prefetch_related("items__variant", "items__product")
+        orders = Order.objects.filter(
+            sent_to_1c=False,
+            export_skipped=False,
+            created_at__lte=query_time,
+            is_master=False,
+            parent_order__isnull=False,
         )
 
         exchange_type = request.query_params.get("type", "")
@@ -596,95 +691,55 @@ class ICExchangeView(APIView):
             exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
             schema_ver = str(exchange_cfg.get("COMMERCEML_VERSION", "3.1"))
 
-        service = OrderExportService(schema_version=schema_ver)
+        profiler = _exchange_profiler("orders_export")
+        service = OrderExportService(schema_version=schema_ver, profiler=profiler)
         use_zip = request.query_params.get("zip", "").lower() == "yes"
 
-        import tempfile
-
         exported_ids: list[int] = []
         skipped_ids: list[int] = []
 
-        if use_zip:
-            # ZIP mode: Stream XML to temp file, then compress and stream response
-            # Using NamedTemporaryFile to allow FileResponse streaming
-            xml_tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".xml")
-            try:
-                for chunk in service.generate_xml_streaming(orders, exported_ids, skipped_ids):
-                    xml_tmp.write(chunk.encode("utf-8"))
-                xml_tmp.close()
-
-                # Mark skipped orders to prevent poison queue
-                if skipped_ids:
-                    Order.objects.filter(pk__in=skipped_ids).update(export_skipped=True)
-                    logger.info(f"Marked {len(skipped_ids)} orders as export_skipped")
-
-                # Store session/cache state after successful generation
-                request.session["last_1c_query_time"] = query_time.isoformat()
-                cache_key = f"1c_exported_ids_{request.session.session_key}"
-                cache.set(cache_key, exported_ids, timeout=3600)
-
-                # Create ZIP in a named temp file for streaming
-                zip_tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".zip")
-                try:
-                    with zipfile.ZipFile(zip_tmp, "w", zipfile.ZIP_DEFLATED) as zf:
-                        zf.write(xml_tmp.name, ORDERS_XML_FILENAME)
-                    zip_tmp.close()
-
-                    # Save audit log via file copy (avoids loading into RAM)
-                    _copy_file_to_log(Path(zip_tmp.name), ORDERS_ZIP_FILENAME)
-
-                    # Stream ZIP file as response
-                    response = FileResponse(
-                        open(zip_tmp.name, "rb"),
-                        content_type="application/zip",
-                        as_attachment=True,
-                        filename=ORDERS_ZIP_FILENAME,
-                    )
-                    # Mark temp file for cleanup after response is sent
-                    zip_path = Path(zip_tmp.name)
-                    response._resource_closers.append(lambda p=zip_path: p.unlink(missing_ok=True))  # type: ignore
-                    return response
-                finally:
-                    # Cleanup XML temp file
-                    Path(xml_tmp.name).unlink(missing_ok=True)
-            except Exception:
-                # Cleanup on error
-                Path(xml_tmp.name).unlink(missing_ok=True)
-                raise
-
-        # Non-ZIP: Stream XML directly via FileResponse
-        xml_file = tempfile.NamedTemporaryFile(delete=False, suffix=".xml", mode="w", encoding="utf-8")
-        try:
-            for chunk in service.generate_xml_streaming(orders, exported_ids, skipped_ids):
-                xml_file.write(chunk)
-            xml_file.close()
+        # XML (or its deflated ZIP) is written straight into the response while it is
+        # generated, and the same bytes are tee-ed into the audit log — no temp files.
+        # Until generation completes, the cache holds an empty id list: if the stream
+        # breaks, a subsequent mode=success has nothing to confirm (and the
+        # time-window fallback is not triggered for a partially delivered export).
+        request.session["last_1c_query_time"] = query_time.isoformat()
+        cache_key = f"1c_exported_ids_{request.session.session_key}"
+        cache.set(cache_key, [], timeout=EXPORTED_IDS_CACHE_TIMEOUT)
 
+        def _on_export_complete() -> None:
             # Mark skipped orders to prevent poison queue
             if skipped_ids:
                 Order.objects.filter(pk__in=skipped_ids).update(export_skipped=True)
                 logger.info(f"Marked {len(skipped_ids)} orders as export_skipped")
+            cache.set(cache_key, exported_ids, timeout=EXPORTED_IDS_CACHE_TIMEOUT)
 
-            # Store session/cache state after successful generation
-            request.session["last_1c_query_time"] = query_time.isoformat()
-            cache_key = f"1c_exported_ids_{request.session.session_key}"
-            cache.set(cache_key, exported_ids, timeout=3600)
-
-            # Save audit log via file copy (avoids loading into RAM)
-            _copy_file_to_log(Path(xml_file.name), ORDERS_XML_FILENAME)
+        fragments = service.generate_xml_streaming(orders, exported_ids, skipped_ids)
+        if profiler:
+            fragments = _profile_stream(fragments, profiler)
 
-            # Stream XML file as response
-            response = FileResponse(
-                open(xml_file.name, "rb"),
-                content_type="application/xml",
+        if use_zip:
+            response = StreamingHttpResponse(
+                _stream_export(
+                    _deflate_xml_fragments(fragments, ORDERS_XML_FILENAME),
+                    ORDERS_ZIP_FILENAME,
+                    _on_export_complete,
+                    sessid=request.session.session_key or "",
+                ),
+                content_type="application/zip",
             )
-            # Mark temp file for cleanup after response is sent
-            xml_path = Path(xml_file.name)
-            response._resource_closers.append(lambda p=xml_path: p.unlink(missing_ok=True))  # type: ignore
+            response["Content-Disposition"] = f'attachment; filename="{ORDERS_ZIP_FILENAME}"'
             return response
-        except Exception:
-            # Cleanup on error
-            Path(xml_file.name).unlink(missing_ok=True)
-            raise
+
+        return StreamingHttpResponse(
+            _stream_export(
+                _encode_xml_fragments(fragments),
+                ORDERS_XML_FILENAME,
+                _on_export_complete,
+                sessid=request.session.session_key or "",
+            ),
+            content_type="application/xml",
+        )
 
     def handle_success(self, request):
         """
@@ -847,7 +902,14 @@ class ICExchangeView(APIView):
         1. It's typically small (<1MB)
         2. 1C expects immediate status response
         3. No need for mode=import follow-up
+
+        With ONEC_EXCHANGE["ORDERS_XML_ASYNC"] the file is queued instead
+        (see _queue_orders_xml).
         """
+        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
+        if exchange_cfg.get("ORDERS_XML_ASYNC"):
+            return self._queue_orders_xml(request, exchange_cfg)
+
         try:
             # ADR-004: Check file size BEFORE reading
             content_length = int(request.META.get("CONTENT_LENGTH", 0))
@@ -888,10 +950,17 @@ class ICExchangeView(APIView):
                 )
 
             # ADR-005: Audit log BEFORE processing (for recovery)
-            _save_exchange_log(ORDERS_XML_FILENAME, xml_data, is_binary=True)
+            _save_exchange_log(
+                ORDERS_XML_FILENAME,
+                xml_data,
+                is_binary=True,
+                archive=True,
+                mode="file",
+                sessid=request.session.session_key or "",
+            )
 
             # FM4.5: Guard against oversized XML
-            doc_count = len(_DOCUMENT_TAG_RE.findall(xml_data))
+            doc_count = len(DOCUMENT_TAG_RE.findall(xml_data))
             if doc_count > MAX_DOCUMENTS_PER_FILE:
                 logger.warning(f"[ORDERS IMPORT] Too many documents: {doc_count} " f"(max {MAX_DOCUMENTS_PER_FILE})")
                 return HttpResponse(
@@ -900,22 +969,15 @@ class ICExchangeView(APIView):
                 )
 
             # FM5.1/FM5.2: Retry on transient DB errors
-            service = OrderStatusImportService()
-            last_db_error = None
-            result = None
-            for attempt in range(ORDERS_IMPORT_MAX_RETRIES):
-                try:
-                    result = service.process(xml_data)
-                    break
-                except OperationalError as e:
-                    last_db_error = e
-                    if attempt == ORDERS_IMPORT_MAX_RETRIES - 1:
-                        raise
-                    logger.warning(f"[ORDERS IMPORT] DB error, retry {attempt + 1}: {e}")
-                    time.sleep(0.5 * (attempt + 1))
-
-            if result is None:
-                raise RuntimeError(f"Service returned no result: {last_db_error}")
+            profiler = _exchange_profiler("orders_import")
+            service = OrderStatusImportService(profiler=profiler)
+            if profiler:
+                profiler.start()
+            try:
+                result = service.process_with_retries(xml_data, attempts=ORDERS_IMPORT_MAX_RETRIES)
+            finally:
+                if profiler:
+                    _finish_exchange_profile(profiler)
 
             parse_error = next(
                 (err for err in result.errors if "xml parse error" in err.lower()),
@@ -984,9 +1046,83 @@ class ICExchangeView(APIView):
                 content_type="text/plain; charset=utf-8",
             )
 
+    def _queue_orders_xml(self, request: Any, exchange_cfg: dict[str, Any]) -> HttpResponse:
+        """Spool orders.xml to disk and import it in a Celery task.
+
+        The body is streamed into the orders inbox (re-encoded to UTF-8 on the
+        fly) and fsync-ed; 1C gets "success" once the file is on disk and an
+        ImportSession (import_type=orders) is queued. Progress and the result
+        are reported by the session (admin "Сессии импорта").
+        """
+        from apps.orders.tasks import import_orders_xml_task
+        from apps.products.models import ImportSession
+
+        max_bytes = int(exchange_cfg.get("ORDERS_XML_ASYNC_MAX_BYTES") or exchange_cfg.get("FILE_LIMIT_BYTES", 0))
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        if content_length > max_bytes:
+            logger.warning(f"[ORDERS IMPORT] Rejected: file too large ({content_length} bytes)")
+            return HttpResponse("failure\nFile too large", content_type="text/plain; charset=utf-8")
+
+        sessid = request.session.session_key or ""
+        try:
+            payload = OrdersInbox(get_exchange_log_dir() / ORDERS_INBOX_SUBDIR, max_bytes).spool(request._request)
+        except OrdersInboxError as e:
+            logger.warning(f"[ORDERS IMPORT] Rejected: {e}")
+            return HttpResponse(f"failure\n{e}", content_type="text/plain; charset=utf-8")
+        except Exception as e:
+            logger.exception(f"[ORDERS IMPORT] Failed to spool orders.xml: {e}")
+            return HttpResponse("failure\nInternal error", content_type="text/plain; charset=utf-8")
+
+        # FM1.1: Body integrity check
+        if content_length > 0 and payload.received != content_length:
+            logger.warning(f"[ORDERS IMPORT] Truncated body: expected {content_length}, got {payload.received}")
+            payload.discard()
+            return HttpResponse("failure\nIncomplete request body", content_type="text/plain; charset=utf-8")
+
+        # AC13: Reject stale XML (anti-replay)
+        if not _validate_xml_timestamp(payload.header):
+            logger.warning("[SECURITY] Stale XML rejected")
+            payload.discard()
+            return HttpResponse("failure\nXML timestamp too old", content_type="text/plain; charset=utf-8")
+
+        session = ImportSession.objects.create(
+            import_type=ImportSession.ImportType.ORDERS,
+            status=ImportSession.ImportStatus.PENDING,
+            report_details={
+                "file": str(payload.path),
+                "sessid": sessid,
+                "size": payload.received,
+                "encoding": payload.encoding,
+                "total_items": payload.documents,
+                "processed_items": 0,
+            },
+        )
+        session.log_event(f"orders.xml принят: {payload.received} байт, документов: {payload.documents}")
+        try:
+            import_orders_xml_task.delay(session.pk)
+        except Exception as e:
+            # Без задачи файл никто не обработает — 1С повторит выгрузку
+            logger.exception(f"[ORDERS IMPORT] Failed to queue orders.xml import: {e}")
+            session.status = ImportSession.ImportStatus.FAILED
+            session.error_message = f"Не удалось поставить задачу в очередь: {e}"
+            session.finished_at = timezone.now()
+            session.save(update_fields=["status", "error_message", "finished_at", "updated_at"])
+            payload.discard()
+            return HttpResponse("failure\nImport queue unavailable", content_type="text/plain; charset=utf-8")
+
+        logger.info(f"[ORDERS IMPORT] Queued session {session.pk}: {payload.documents} documents")
+        return HttpResponse("success", content_type="text/plain; charset=utf-8")
+
     def handle_file_upload(self, request):
         """
         Handle chunked file uploads from 1C.
+
+        Optional resumable-upload parameters (plain 1C sends none of them):
+        - offset: position of the chunk in the file; bytes already received
+          are skipped, a gap is rejected with the received size;
+        - checksum: SHA-256 hex of the chunk, verified while streaming;
+        - file_checksum: SHA-256 hex of the whole file, verified before routing.
+        The response then carries the received size: "success\nreceived=<bytes>".
         """
         sessid = self._get_exchange_identity(request)
         filename = request.query_params.get("filename")
@@ -1004,11 +1140,19 @@ class ICExchangeView(APIView):
 
         exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
         file_limit = exchange_cfg.get("FILE_LIMIT_BYTES", 100 * 1024 * 1024)
+        offset = request.query_params.get("offset")
+        checksum = request.query_params.get("checksum")
+        file_checksum = request.query_params.get("file_checksum")
 
         try:
             file_service = FileStreamService(sessid)
             wsgi_request = request._request
 
+            if file_checksum:
+                file_service.set_expected_checksum(filename, file_checksum)
+            if offset is not None or checksum:
+                return self._handle_resumable_chunk(file_service, filename, wsgi_request, offset, checksum, file_limit)
+
             with file_service.open_for_write(filename) as writer:
                 chunk_size = 64 * 1024
                 while True:
@@ -1032,3 +1176,36 @@ class ICExchangeView(APIView):
         except Exception as e:
             logger.exception(f"Upload error: {e}")
             return HttpResponse("failure\nInternal error", content_type="text/plain; charset=utf-8")
+
+    def _handle_resumable_chunk(
+        self,
+        file_service: FileStreamService,
+        filename: str,
+        wsgi_request: Any,
+        offset: str | None,
+        checksum: str | None,
+        file_limit: int,
+    ) -> HttpResponse:
+        """Chunk with offset/checksum: idempotent re-send, response reports received bytes.
+
+        An empty body at offset=<received> is a status probe before resuming.
+        """
+        # Only a checksum: the chunk continues the file
+        start = None
+        if offset is not None:
+            try:
+                start = int(offset)
+            except ValueError:
+                start = -1
+            if start < 0:
+                return HttpResponse("failure\nInvalid offset", content_type="text/plain; charset=utf-8")
+
+        try:
+            received, _ = file_service.write_chunk_at(filename, wsgi_request, start, checksum, file_limit)
+        except UploadError as e:
+            logger.warning(f"Chunk {filename}@{start} rejected: {e}")
+            return HttpResponse(
+                f"failure\n{e}\nreceived={e.received}",
+                content_type="text/plain; charset=utf-8",
+            )
+        return HttpResponse(f"success\nreceived={received}", content_type="text/plain; charset=utf-8")
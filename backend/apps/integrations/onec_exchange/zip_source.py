@@ -0,0 +1,245 @@
+"""
+Zip Import Source for 1C Exchange.
+
+Архивы 1С читаются импортом без распаковки на диск:
+- XML-члены маршрутизируются по префиксам XML_ROUTING_RULES и отдаются
+  парсеру потоком (ZipFile.open);
+- изображения копируются импортом прямо из архива в MEDIA_ROOT;
+- на диск (в ту же подпапку, что и при маршрутизации) пишутся только члены,
+  которые читают другие команды (contragents, propertiesOffers, ...).
+
+Usage:
+    with ZipImportSource(import_dir).open() as source:
+        for member in source.xml_members("goods", "goods"):
+            parser.parse_goods_xml(member)
+"""
+
+from __future__ import annotations
+
+import logging
+import shutil
+import zipfile
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import IO, Any, Callable, Collection
+
+from .routing_service import IMAGE_EXTENSIONS, xml_subdir
+
+logger = logging.getLogger(__name__)
+
+# Подпапки, которые import_products_from_1c читает потоком из архива
+STREAMED_SUBDIRS = frozenset({"goods", "groups", "offers", "prices", "rests", "priceLists", "propertiesGoods"})
+
+IMAGES_PREFIX = "import_files/"
+
+
+@dataclass(frozen=True)
+class ZipMember:
+    """XML-файл или изображение внутри архива 1С."""
+
+    archive: zipfile.ZipFile
+    info: zipfile.ZipInfo
+
+    @property
+    def name(self) -> str:
+        """Имя файла без каталогов (как Path.name)."""
+        return PurePosixPath(self.info.filename).name
+
+    @property
+    def size(self) -> int:
+        """Размер после распаковки."""
+        return self.info.file_size
+
+    def open(self) -> IO[bytes]:
+        return self.archive.open(self.info)
+
+    def __str__(self) -> str:
+        return f"{Path(str(self.archive.filename)).name}:{self.info.filename}"
+
+
+class ZipImportSource:
+    """
+    Index of the ZIP archives in the import directory.
+
+    Members are routed once, when an archive is added; nothing is extracted
+    except members outside STREAMED_SUBDIRS (see extract_unstreamed).
+    """
+
+    def __init__(self, import_dir: Path | str):
+        self.import_dir = Path(import_dir)
+        self.archives: list[zipfile.ZipFile] = []
+        self._xml: dict[str, list[ZipMember]] = defaultdict(list)
+        self._images: dict[str, ZipMember] = {}
+        self._unstreamed: list[tuple[str, ZipMember]] = []
+        # Архив -> (подпапки его потоковых XML, есть ли изображения)
+        self._contents: dict[Path, tuple[frozenset[str], bool]] = {}
+
+    def __enter__(self) -> ZipImportSource:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def open(self) -> ZipImportSource:
+        """Add every *.zip from the root of the import directory."""
+        if self.import_dir.exists():
+            for path in sorted(self.import_dir.glob("*.zip")):
+                self.add(path)
+        return self
+
+    def close(self) -> None:
+        for archive in self.archives:
+            archive.close()
+        self.archives.clear()
+
+    @property
+    def paths(self) -> list[Path]:
+        return [Path(str(archive.filename)) for archive in self.archives]
+
+    def add(self, path: Path) -> int:
+        """
+        Open an archive and route its members.
+
+        Raises:
+            zipfile.BadZipFile: If the archive is corrupted
+            ValueError: If a member resolves outside the import dir (Zip Slip)
+
+        Returns:
+            Number of routed members
+        """
+        archive = zipfile.ZipFile(path, "r")
+        try:
+            infos = [info for info in archive.infolist() if not info.is_dir()]
+            # Zip Slip protection
+            import_root = str(self.import_dir.resolve())
+            for info in infos:
+                member_path = (self.import_dir / info.filename).resolve()
+                if not str(member_path).startswith(import_root):
+                    raise ValueError(f"Zip Slip detected: {info.filename} resolves outside import dir")
+        except Exception:
+            archive.close()
+            raise
+
+        self.archives.append(archive)
+        routed = 0
+        streamed: set[str] = set()
+        has_images = False
+        for info in infos:
+            member = ZipMember(archive, info)
+            suffix = PurePosixPath(info.filename).suffix.lower()
+            if suffix == ".xml":
+                subdir = xml_subdir(info.filename)
+                if subdir is None:
+                    continue
+                if subdir in STREAMED_SUBDIRS:
+                    self._xml[subdir].append(member)
+                    streamed.add(subdir)
+                else:
+                    self._unstreamed.append((subdir, member))
+                routed += 1
+            elif suffix in IMAGE_EXTENSIONS:
+                key = info.filename[len(IMAGES_PREFIX) :] if info.filename.startswith(IMAGES_PREFIX) else info.filename
+                self._images[key] = member
+                has_images = True
+                routed += 1
+
+        self._contents[path] = (frozenset(streamed), has_images)
+        logger.info(f"Indexed archive {path.name}: {len(infos)} members, routed {routed}")
+        return routed
+
+    def consumed_paths(self, subdirs: Collection[str], images: bool) -> list[Path]:
+        """
+        Archives fully read by an import of the given subdirectories.
+
+        An archive is consumed when all its streamed XML members belong to
+        subdirs and it has no images, or images were read as well.
+        """
+        return [
+            path
+            for path, (streamed, has_images) in self._contents.items()
+            if streamed <= set(subdirs) and (images or not has_images)
+        ]
+
+    def has_xml(self, subdir: str) -> bool:
+        return bool(self._xml.get(subdir))
+
+    def xml_members(self, subdir: str, prefix: str) -> list[ZipMember]:
+        """
+        XML members routed to subdir, in the same order as files on disk.
+
+        Сначала точное имя (<prefix>.xml), затем сегменты <prefix>_*.xml по имени;
+        регистр не учитывается.
+        """
+        prefix = prefix.lower()
+        exact = [m for m in self._xml.get(subdir, []) if m.name.lower() == f"{prefix}.xml"]
+        segments = sorted(
+            (m for m in self._xml.get(subdir, []) if m.name.lower().startswith(f"{prefix}_")),
+            key=lambda m: m.name,
+        )
+        return exact + segments
+
+    def image(self, relative_path: str) -> ZipMember | None:
+        """Image by its path relative to import_files/ (as in goods.xml/offers.xml)."""
+        return self._images.get(relative_path)
+
+    def extract_unstreamed(self) -> int:
+        """
+        Write members read by other commands into their routed subdirectory.
+
+        Каждый член пишется один раз прямо в конечный путь; уже записанный
+        файл того же размера пропускается (повторный вызов из Celery-задачи).
+
+        Returns:
+            Number of written files
+        """
+        written = 0
+        import_root = str(self.import_dir.resolve())
+        for subdir, member in self._unstreamed:
+            target = self.import_dir / subdir / member.name
+            if not str(target.resolve()).startswith(import_root):
+                raise ValueError(f"Zip Slip detected: {member} resolves outside import dir")
+            if target.exists() and target.stat().st_size == member.size:
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with member.open() as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            written += 1
+        return written
+
+
+def prepare_archives(import_dir: Path, log_event: Callable[..., Any]) -> None:
+    """
+    Validate archives in the import directory and extract unstreamed members.
+
+    Replaces the former extractall + move step: streamed members stay in the
+    archive until import_products_from_1c reads them. Corrupted archives and
+    archives failing the Zip Slip check are logged and deleted so they don't
+    get retried endlessly.
+
+    Args:
+        import_dir: Shared import directory
+        log_event: ImportSession.log_event (message, level="info")
+    """
+    zip_files = sorted(import_dir.glob("*.zip")) if import_dir.exists() else []
+    if not zip_files:
+        return
+
+    logger.info(f"[IMPORT] Found {len(zip_files)} ZIP files")
+    for zf in zip_files:
+        source = ZipImportSource(import_dir)
+        try:
+            routed = source.add(zf)
+            extracted = source.extract_unstreamed()
+            log_event(f"Архив {zf.name}: распределено {routed}, распаковано на диск {extracted}")
+        except Exception as err:
+            logger.error(f"[IMPORT] Failed to read archive {zf.name}: {err}")
+            log_event(f"Ошибка распаковки {zf.name}: {err}", level="error")
+            source.close()  # закрыть до удаления
+            try:
+                zf.unlink()
+                logger.info(f"[IMPORT] Deleted corrupted archive: {zf.name}")
+            except OSError as del_err:
+                logger.warning(f"[IMPORT] Failed to delete corrupted archive {zf.name}: {del_err}")
+        finally:
+            source.close()
@@ -104,11 +104,73 @@
     }
   }
 
+  /**
+   * Дочитывает новые строки журнала на странице сессии импорта.
+   *
+   * Вместо перезагрузки страницы запрашивает только события с id больше
+   * последнего показанного и дописывает их в конец отчета.
+   */
+  function initEventsTail() {
+    const log = document.getElementById("import-session-events");
+    if (!log || log.dataset.tail !== "1") {
+      return;
+    }
+
+    let lastId = parseInt(log.dataset.lastId || "0", 10);
+
+    function poll() {
+      fetch(`${log.dataset.eventsUrl}?after=${lastId}`, {
+        credentials: "same-origin",
+      })
+        .then(function (response) {
+          return response.json();
+        })
+        .then(function (data) {
+          if (data.events && data.events.length) {
+            if (lastId === 0) {
+              log.textContent = "";
+            }
+            const atBottom =
+              log.scrollTop + log.clientHeight >= log.scrollHeight - 5;
+            log.textContent += data.events
+              .map(function (event) {
+                return event.line;
+              })
+              .join("");
+            if (atBottom) {
+              log.scrollTop = log.scrollHeight;
+            }
+          }
+          lastId = data.last_id;
+
+          const active = ["pending", "started", "in_progress"].includes(
+            data.status,
+          );
+          if (data.has_more) {
+            poll();
+          } else if (active) {
+            setTimeout(poll, 5000);
+          }
+        })
+        .catch(function (error) {
+          console.log("[ImportSession] Ошибка чтения журнала:", error);
+          setTimeout(poll, 15000);
+        });
+    }
+
+    setTimeout(poll, 5000);
+  }
+
+  function init() {
+    initAutoRefresh();
+    initEventsTail();
+  }
+
   // Запускаем проверку после полной загрузки DOM
   if (document.readyState === "loading") {
-    document.addEventListener("DOMContentLoaded", initAutoRefresh);
+    document.addEventListener("DOMContentLoaded", init);
   } else {
     // DOM уже загружен
-    initAutoRefresh();
+    init();
   }
 })();
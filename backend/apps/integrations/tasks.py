@@ -31,6 +31,7 @@ def run_selective_import_task(
         | None
         # Этот аргумент больше не используется, но оставлен для обратной совместимости
     ) = None,
+    profiling: str = ImportSession.ProfilingMode.OFF,
 ) -> dict[str, Any]:
     """
     Асинхронная задача для выборочного импорта данных из 1С.
@@ -38,6 +39,7 @@ def run_selective_import_task(
     Args:
         selected_types: Список типов импорта (catalog, stocks, prices, customers)
         data_dir: Директория с данными 1С (если None, берется из settings)
+        profiling: Режим профилирования для import_products_from_1c (--profile)
 
     Returns:
         Dict с результатами импорта
@@ -75,7 +77,7 @@ def run_selective_import_task(
             logger.info(f"[Task {task_id}] Начало импорта: {import_type}")
 
             try:
-                result = _execute_import_type(import_type, task_id)
+                result = _execute_import_type(import_type, task_id, profiling)
                 results.append(result)
                 logger.info(f"[Task {task_id}] Импорт {import_type} завершен: " f"{result['message']}")
             except Exception as e:
@@ -103,7 +105,9 @@ def run_selective_import_task(
         raise self.retry(exc=e)
 
 
-def _execute_import_type(import_type: str, task_id: str) -> dict[str, str]:
+def _execute_import_type(
+    import_type: str, task_id: str, profiling: str = ImportSession.ProfilingMode.OFF
+) -> dict[str, str]:
     """
     Выполнение импорта конкретного типа данных.
 
@@ -112,6 +116,7 @@ def _execute_import_type(import_type: str, task_id: str) -> dict[str, str]:
             "Тип импорта (catalog, attributes, stocks, prices, customers, images)"
         )
         task_id: ID задачи Celery для логирования и связи с сессией
+        profiling: Режим профилирования импорта товаров (ImportSession.ProfilingMode)
 
     Returns:
         Dict с результатом импорта
@@ -120,6 +125,8 @@ def _execute_import_type(import_type: str, task_id: str) -> dict[str, str]:
         FileNotFoundError: Если файл не найден
         Exception: При ошибках выполнения команды
     """
+    profile_args = ["--profile", profiling] if profiling != ImportSession.ProfilingMode.OFF else []
+
     if import_type == "catalog":
         logger.info(f"[Task {task_id}] Запуск import_products_from_1c --file-type=all")
         call_command(
@@ -128,6 +135,7 @@ def _execute_import_type(import_type: str, task_id: str) -> dict[str, str]:
             "all",
             "--celery-task-id",
             task_id,
+            *profile_args,
         )
         return {"type": "catalog", "message": "Каталог импортирован"}
 
@@ -147,6 +155,7 @@ def _execute_import_type(import_type: str, task_id: str) -> dict[str, str]:
             "rests",
             "--celery-task-id",
             task_id,
+            *profile_args,
         )
         return {"type": "stocks", "message": "Остатки обновлены"}
 
@@ -158,6 +167,7 @@ def _execute_import_type(import_type: str, task_id: str) -> dict[str, str]:
             "prices",
             "--celery-task-id",
             task_id,
+            *profile_args,
         )
         return {"type": "prices", "message": "Цены обновлены"}
 
@@ -182,6 +192,7 @@ def _execute_import_type(import_type: str, task_id: str) -> dict[str, str]:
             "--variants-only",
             "--celery-task-id",
             task_id,
+            *profile_args,
         )
         return {"type": "variants", "message": "Варианты товаров импортированы"}
 
@@ -14,17 +14,21 @@ from pathlib import Path
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import HttpRequest, HttpResponse
-from django.shortcuts import redirect
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, redirect
 from django.template.response import TemplateResponse
 from django_redis import get_redis_connection
 
-from apps.products.models import ImportSession, Product
+from apps.products.models import ImportSession, ImportSessionEvent, Product
+from apps.products.services.import_lanes import PRIORITY_IMPORT_TYPES
 
 from .tasks import run_selective_import_task
 
 logger = logging.getLogger(__name__)
 
+EVENTS_PAGE_DEFAULT_LIMIT = 200
+EVENTS_PAGE_MAX_LIMIT = 1000
+
 
 @staff_member_required
 def import_from_1c_view(request: HttpRequest) -> HttpResponse:
@@ -117,10 +121,52 @@ def import_from_1c_view(request: HttpRequest) -> HttpResponse:
                 "requires_catalog": False,
             },
         ],
+        "profiling_modes": ImportSession.ProfilingMode.choices,
     }
     return TemplateResponse(request, "admin/integrations/import_1c.html", context)
 
 
+@staff_member_required
+def import_session_events_view(request: HttpRequest, session_id: int) -> JsonResponse:
+    """
+    Страница журнала событий сессии импорта (JSON) для админки.
+
+    Курсорная пагинация по id: клиент передает ?after=<id последнего
+    полученного события>&limit=<N> и получает следующие события по
+    возрастанию. Повторные запросы с последним id «дочитывают хвост»
+    активного импорта, не перечитывая весь отчет.
+    """
+    session = get_object_or_404(ImportSession.objects.only("id", "status"), pk=session_id)
+    try:
+        after_id = max(int(request.GET.get("after", 0)), 0)
+        limit = min(max(int(request.GET.get("limit", EVENTS_PAGE_DEFAULT_LIMIT)), 1), EVENTS_PAGE_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({"error": "after и limit должны быть целыми числами"}, status=400)
+
+    events = ImportSessionEvent.objects.page(session.pk, after_id=after_id, limit=limit + 1)
+    has_more = len(events) > limit
+    events = events[:limit]
+
+    return JsonResponse(
+        {
+            "session_id": session.pk,
+            "status": session.status,
+            "events": [
+                {
+                    "id": event.pk,
+                    "created_at": event.created_at.isoformat(),
+                    "level": event.level,
+                    "message": event.message,
+                    "line": event.render(),
+                }
+                for event in events
+            ],
+            "last_id": events[-1].pk if events else after_id,
+            "has_more": has_more,
+        }
+    )
+
+
 def _handle_import_request(request: HttpRequest) -> HttpResponse:
     """
     Обработка POST запроса на запуск импорта.
@@ -132,6 +178,9 @@ def _handle_import_request(request: HttpRequest) -> HttpResponse:
         HttpResponse редирект на страницу сессий или обратно на форму
     """
     import_type = request.POST.get("import_type")
+    profiling = request.POST.get("profiling", ImportSession.ProfilingMode.OFF)
+    if profiling not in ImportSession.ProfilingMode.values:
+        profiling = ImportSession.ProfilingMode.OFF
 
     if not import_type:
         messages.warning(request, "⚠️ Не выбран тип импорта.")
@@ -158,7 +207,7 @@ def _handle_import_request(request: HttpRequest) -> HttpResponse:
 
     try:
         # Запуск импорта
-        session = _create_and_run_import(import_type)
+        session = _create_and_run_import(import_type, profiling=profiling)
 
         messages.success(
             request,
@@ -209,12 +258,13 @@ def _validate_dependencies(selected_types: list[str]) -> tuple[bool, str]:
     return True, ""
 
 
-def _create_and_run_import(import_type: str) -> ImportSession:
+def _create_and_run_import(import_type: str, profiling: str = ImportSession.ProfilingMode.OFF) -> ImportSession:
     """
     Создание сессии импорта и запуск Celery задачи.
 
     Args:
         import_type: Тип импорта (catalog, images, stocks, prices, customers)
+        profiling: Режим профилирования импорта (ImportSession.ProfilingMode)
 
     Returns:
         ImportSession: Созданная сессия импорта
@@ -293,7 +343,9 @@ def _create_and_run_import(import_type: str) -> ImportSession:
     session_import_type = session_type_map.get(import_type, ImportSession.ImportType.CATALOG)
 
     # Запускаем Celery задачу
-    task = run_selective_import_task.delay([import_type])
+    # Режим профилирования передается задаче только если включен
+    task_kwargs = {"profiling": profiling} if profiling != ImportSession.ProfilingMode.OFF else {}
+    task = run_selective_import_task.delay([import_type], **task_kwargs)
 
     # Создаем сессию импорта для отслеживания
     # Команда import_customers_from_1c создаст свою внутреннюю сессию
@@ -302,6 +354,8 @@ def _create_and_run_import(import_type: str) -> ImportSession:
         import_type=session_import_type,
         status=ImportSession.ImportStatus.STARTED,
         celery_task_id=task.id,
+        profiling=profiling,
+        priority=import_type in PRIORITY_IMPORT_TYPES,
     )
 
     logger.info(f"[Request {request_id}] Импорт запущен. " f"Session ID: {session.pk}, Task ID: {task.id}")
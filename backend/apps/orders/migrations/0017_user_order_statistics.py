@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:01
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0016_customercodesequence"),
+        ("users", "0016_user_country"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserOrderStatistics",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="order_statistics",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+                ("orders_count", models.PositiveIntegerField(default=0, verbose_name="Количество заказов")),
+                (
+                    "total_amount",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=14, verbose_name="Сумма заказов"
+                    ),
+                ),
+                (
+                    "status_counts",
+                    models.JSONField(blank=True, default=dict, verbose_name="Количество заказов по статусам"),
+                ),
+                ("last_order_at", models.DateTimeField(blank=True, null=True, verbose_name="Дата последнего заказа")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Дата обновления")),
+            ],
+            options={
+                "verbose_name": "Статистика заказов пользователя",
+                "verbose_name_plural": "Статистика заказов пользователей",
+                "db_table": "user_order_statistics",
+            },
+        ),
+    ]
@@ -415,6 +415,66 @@ class CustomerCodeSequence(models.Model):
         return f"CustomerCodeSequence: {self.last_value}"
 
 
+class UserOrderStatistics(models.Model):
+    """Материализованная сводка заказов пользователя для личного кабинета.
+
+    Учитываются только мастер-заказы: субзаказы — технические документы для 1С
+    и в кабинете не показываются. Поддерживается инкрементально
+    (`OrderStatisticsService`), расхождения исправляет ночная сверка.
+    """
+
+    objects = models.Manager()
+
+    if TYPE_CHECKING:
+        user: UserType
+        user_id: int
+        orders_count: int
+        total_amount: Decimal
+        status_counts: dict[str, int]
+        last_order_at: datetime | None
+        updated_at: datetime
+
+    user = cast(
+        "UserType",
+        models.OneToOneField(
+            User,
+            on_delete=models.CASCADE,
+            primary_key=True,
+            related_name="order_statistics",
+            verbose_name="Пользователь",
+        ),
+    )
+    orders_count = cast(int, models.PositiveIntegerField("Количество заказов", default=0))
+    total_amount = cast(
+        Decimal,
+        models.DecimalField("Сумма заказов", max_digits=14, decimal_places=2, default=Decimal("0")),
+    )
+    status_counts = cast(
+        "dict[str, int]",
+        models.JSONField("Количество заказов по статусам", default=dict, blank=True),
+    )
+    last_order_at = cast(
+        "datetime | None",
+        models.DateTimeField("Дата последнего заказа", null=True, blank=True),
+    )
+    updated_at = cast(datetime, models.DateTimeField("Дата обновления", auto_now=True))
+
+    class Meta:
+        verbose_name = "Статистика заказов пользователя"
+        verbose_name_plural = "Статистика заказов пользователей"
+        db_table = "user_order_statistics"
+
+    def __str__(self) -> str:
+        return f"UserOrderStatistics: user={self.user_id}, orders={self.orders_count}"
+
+    @property
+    def avg_amount(self) -> Decimal | None:
+        """Средняя сумма заказа"""
+        if not self.orders_count:
+            return None
+        return self.total_amount / self.orders_count
+
+
 class OrderItem(models.Model):
     """Элемент заказа с информацией о товаре и зафиксированной цене."""
 
@@ -1,10 +1,15 @@
 from apps.orders.constants import STATUS_MAPPING
 
 from .order_export import OrderExportService
+from .order_export_reader import ExportLookups, OrderExportReader
+from .order_statistics import OrderStatisticsService
 from .order_status_import import ImportResult, OrderStatusImportService, OrderUpdateData
 
 __all__ = [
     "OrderExportService",
+    "OrderExportReader",
+    "ExportLookups",
+    "OrderStatisticsService",
     "OrderStatusImportService",
     "ImportResult",
     "OrderUpdateData",
@@ -9,7 +9,7 @@ from typing import Any, cast
 
 from django.conf import settings
 from django.db import transaction
-from django.db.models import F
+from django.db.models import Case, F, IntegerField, Model, When
 from django.db.models.manager import BaseManager
 from rest_framework import serializers
 
@@ -39,7 +39,18 @@ class OrderCreateService:
         # увидит пустую корзину (cart.clear() уже вызван) и получит ValidationError.
         cart_manager = cast(BaseManager[Cart], getattr(Cart, "objects"))
         cart = cart_manager.select_for_update().filter(pk=self.cart.pk).first()
-        if not cart or not cart.items.exists():
+        # Атрибуты нужны ответу (OrderItemSerializer, depth=1): загружаются здесь же,
+        # чтобы сериализация созданного заказа не читала их по каждой позиции
+        cart_items = (
+            list(
+                cart.items.select_related("variant__product").prefetch_related(
+                    "variant__attributes", "variant__product__attributes"
+                )
+            )
+            if cart
+            else []
+        )
+        if not cart or not cart_items:
             raise serializers.ValidationError(
                 "Корзина пуста или уже используется для создания заказа. " "Обновите корзину и попробуйте снова."
             )
@@ -57,7 +68,7 @@ class OrderCreateService:
         groups: dict[tuple[Decimal | None, str | None], list] = defaultdict(list)
         total_items_sum = Decimal("0")
 
-        for ci in cart.items.select_related("variant__product"):
+        for ci in cart_items:
             variant = ci.variant
             product = variant.product if variant else None
             if not variant or not product:
@@ -99,47 +110,51 @@ class OrderCreateService:
         )
         master.save()
 
-        # 3. Создать субзаказы + OrderItem для каждой VAT-группы
-        variant_updates: list[tuple[int, int]] = []
-        order_item_manager = cast(BaseManager[OrderItem], getattr(OrderItem, "objects"))
+        # 3. Создать все субзаказы одним INSERT (PostgreSQL возвращает pk через RETURNING),
+        # затем все OrderItem — вторым INSERT. Число запросов не зависит от количества
+        # VAT/складских групп и позиций корзины.
+        sub_orders: list[Order] = []
+        sub_items_by_order: list[list[OrderItem]] = []
+        variant_quantities: dict[int, int] = defaultdict(int)
+        variant_skus: dict[int, str] = {}
 
         for suborder_sequence, ((vat_key, _warehouse_key), items) in enumerate(ordered_groups, start=1):
             group_total = Decimal(sum(ci.total_price for ci in items))
             sub_number = OrderNumberingService.build_suborder_number(master, suborder_sequence)
-            sub = Order(
-                order_number=sub_number.order_number,
-                user=user,
-                is_master=False,
-                parent_order=master,
-                vat_group=vat_key,
-                customer_code_snapshot=sub_number.customer_code_snapshot,
-                order_year=sub_number.order_year,
-                customer_year_sequence=sub_number.customer_year_sequence,
-                suborder_sequence=sub_number.suborder_sequence,
-                delivery_cost=Decimal("0"),
-                total_amount=group_total,
-                status="pending",
-                payment_status="pending",
-                customer_name=master.customer_name,
-                customer_email=master.customer_email,
-                customer_phone=master.customer_phone,
-                delivery_address=master.delivery_address,
-                delivery_method=master.delivery_method,
-                delivery_date=master.delivery_date,
-                payment_method=master.payment_method,
-                notes=master.notes,
+            sub_orders.append(
+                Order(
+                    order_number=sub_number.order_number,
+                    user=user,
+                    is_master=False,
+                    parent_order=master,
+                    vat_group=vat_key,
+                    customer_code_snapshot=sub_number.customer_code_snapshot,
+                    order_year=sub_number.order_year,
+                    customer_year_sequence=sub_number.customer_year_sequence,
+                    suborder_sequence=sub_number.suborder_sequence,
+                    delivery_cost=Decimal("0"),
+                    total_amount=group_total,
+                    status="pending",
+                    payment_status="pending",
+                    customer_name=master.customer_name,
+                    customer_email=master.customer_email,
+                    customer_phone=master.customer_phone,
+                    delivery_address=master.delivery_address,
+                    delivery_method=master.delivery_method,
+                    delivery_date=master.delivery_date,
+                    payment_method=master.payment_method,
+                    notes=master.notes,
+                )
             )
-            sub.save()
 
-            sub_items = []
+            group_items = []
             for ci in items:
                 variant = ci.variant
                 product = variant.product
                 unit_price = ci.price_snapshot
                 snapshot = OrderItem.build_snapshot(product, variant)
-                sub_items.append(
+                group_items.append(
                     OrderItem(
-                        order=sub,
                         product=product,
                         variant=variant,
                         quantity=ci.quantity,
@@ -148,31 +163,84 @@ class OrderCreateService:
                         **snapshot,
                     )
                 )
-                variant_updates.append((variant.pk, ci.quantity))
+                variant_quantities[variant.pk] += ci.quantity
+                variant_skus[variant.pk] = variant.sku
+            sub_items_by_order.append(group_items)
+
+        order_manager = cast(BaseManager[Order], getattr(Order, "objects"))
+        order_manager.bulk_create(sub_orders)
+
+        # order_id проставляется после bulk_create субзаказов: до INSERT pk ещё нет.
+        all_items: list[OrderItem] = []
+        for sub, group_items in zip(sub_orders, sub_items_by_order):
+            for item in group_items:
+                item.order = sub
+            all_items.extend(group_items)
+
+        order_item_manager = cast(BaseManager[OrderItem], getattr(OrderItem, "objects"))
+        order_item_manager.bulk_create(all_items)
+
+        # 4. Списать остатки. Строки вариантов блокируются одним SELECT ... FOR UPDATE
+        # (в порядке pk — защита от взаимных блокировок между параллельными checkout'ами),
+        # остаток проверяется в памяти, списание выполняется одним UPDATE с CASE.
+        # Если stock уже забрал другой покупатель — ValidationError, транзакция откатывается.
+        self._decrement_stock(variant_quantities, variant_skus)
 
-            order_item_manager.bulk_create(sub_items)
+        # Ответ собирается из объектов в памяти: prefetch cache мастера и субзаказов
+        # заполняется вручную, повторного чтения заказа из БД не требуется.
+        for sub, group_items in zip(sub_orders, sub_items_by_order):
+            self._attach_prefetched(sub, "items", group_items)
+        self._attach_prefetched(master, "sub_orders", sub_orders)
+        self._attach_prefetched(master, "items", [])
+
+        # 5. Очистить корзину: резерв снимается по уже посчитанным количествам
+        cart.clear(reserved=variant_quantities)
+
+        return master
+
+    @staticmethod
+    def _decrement_stock(variant_quantities: dict[int, int], variant_skus: dict[int, str]) -> None:
+        """Списывает остатки по всем вариантам заказа за фиксированное число запросов."""
+        if not variant_quantities:
+            return
 
-        # 4. Списать остатки через conditional update — защита от race condition
-        # между параллельными checkout'ами: если stock уже забрали, update вернёт 0,
-        # бросаем ValidationError, транзакция откатывается целиком.
         variant_manager = cast(BaseManager[ProductVariant], getattr(ProductVariant, "objects"))
-        for variant_pk, qty in variant_updates:
-            updated = variant_manager.filter(pk=variant_pk, stock_quantity__gte=qty).update(
-                stock_quantity=F("stock_quantity") - qty
-            )
-            if updated == 0:
-                variant: ProductVariant | None = variant_manager.filter(pk=variant_pk).only("id", "sku").first()
-                sku = getattr(variant, "sku", variant_pk) if variant else variant_pk
+        locked_stock = dict(
+            variant_manager.select_for_update()
+            .filter(pk__in=variant_quantities.keys())
+            .order_by("pk")
+            .values_list("pk", "stock_quantity")
+        )
+        for variant_pk, qty in variant_quantities.items():
+            if locked_stock.get(variant_pk, 0) < qty:
+                sku = variant_skus.get(variant_pk, variant_pk)
                 raise serializers.ValidationError(
                     f"Недостаточно товара '{sku}' на складе. "
                     f"Запрошенное количество больше не доступно — возможно, другой покупатель "
                     f"оформил заказ раньше. Обновите корзину и попробуйте снова."
                 )
 
-        # 5. Очистить корзину
-        cart.clear()
+        variant_manager.filter(pk__in=variant_quantities.keys()).update(
+            stock_quantity=Case(
+                *[
+                    When(pk=variant_pk, then=F("stock_quantity") - qty)
+                    for variant_pk, qty in variant_quantities.items()
+                ],
+                output_field=IntegerField(),
+            )
+        )
 
-        return master
+    @staticmethod
+    def _attach_prefetched(instance: Model, related_name: str, objects: list[Any]) -> None:
+        """Заполняет prefetch cache связи, как это делает prefetch_related_objects()."""
+        queryset = getattr(instance, related_name).all()
+        queryset._result_cache = list(objects)
+        queryset._prefetch_done = True
+        cache = getattr(instance, "_prefetched_objects_cache", None)
+        if cache is None:
+            cache = {}
+            setattr(instance, "_prefetched_objects_cache", cache)
+        cache[related_name] = queryset
 
     def _resolve_item_vat_rate(self, variant: ProductVariant, product: Any) -> Decimal | None:
         """
@@ -17,7 +17,9 @@ from django.conf import settings
 from django.db.models import QuerySet
 from django.utils import timezone
 
+from apps.common.services.profiling import ExchangeProfiler, profile_phase
 from apps.orders.models import Order, OrderItem
+from apps.orders.services.order_export_reader import EXPORT_CHUNK_SIZE, ExportLookups, OrderExportReader
 from apps.products.models import ProductVariant
 from apps.users.models import User
 
@@ -34,12 +36,14 @@ class OrderExportService:
 
     DEFAULT_SCHEMA_VERSION = "3.1"
 
-    def __init__(self, schema_version: str | None = None):
+    def __init__(self, schema_version: str | None = None, profiler: ExchangeProfiler | None = None):
+        self.profiler = profiler
         if schema_version:
             self._schema_version = schema_version
         else:
             exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
             self._schema_version = str(exchange_cfg.get("COMMERCEML_VERSION", self.DEFAULT_SCHEMA_VERSION))
+        self._active_lookups: ExportLookups | None = None
 
     @property
     def SCHEMA_VERSION(self) -> str:
@@ -55,8 +59,25 @@ class OrderExportService:
     DEFAULT_UNIT_NAME_INTL = "PCE"
     DEFAULT_UNIT_NAME_SHORT = "шт"
 
+    @property
+    def _lookups(self) -> ExportLookups:
+        """Справочники текущего экспорта; вне generate_xml_streaming — свежий снимок настроек."""
+        if self._active_lookups is not None:
+            return self._active_lookups
+        return self._build_lookups()
+
+    def _build_lookups(self) -> ExportLookups:
+        return ExportLookups.from_settings(
+            unit_defaults=self._read_unit_defaults(),
+            order_defaults=self._read_order_defaults(),
+        )
+
     @property
     def _unit_defaults(self) -> dict:
+        """Default unit of measurement (configurable via settings.ONEC_EXCHANGE.DEFAULT_UNIT)."""
+        return self._lookups.unit_defaults
+
+    def _read_unit_defaults(self) -> dict:
         """Read default unit of measurement from settings, falling back to hardcoded defaults."""
         exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
         unit_cfg = exchange_cfg.get("DEFAULT_UNIT", {})
@@ -91,6 +112,7 @@ class OrderExportService:
         orders: "QuerySet[Order]",
         exported_ids: list[int] | None = None,
         skipped_ids: list[int] | None = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
     ) -> Iterator[str]:
         """
         Generate CommerceML 3.1 XML using streaming/generator approach.
@@ -98,6 +120,15 @@ class OrderExportService:
         Suitable for large datasets where memory efficiency is critical.
         Yields XML fragments that should be concatenated by the caller.
 
+        Orders are read by OrderExportReader in pk-ordered chunks with items,
+        variants, products and users prefetched per chunk, so the query count
+        is bounded per chunk regardless of prefetches on the passed queryset.
+        Settings-derived lookups are computed once per export.
+
+        With a profiler, reading orders (``read``) and building documents
+        (``build``) are measured as separate phases; time spent by the caller
+        between yields is not attributed to either.
+
         Args:
             orders: QuerySet of **sub-orders** (is_master=False, parent_order__isnull=False)
                     with prefetch_related('items__variant', 'items__product', 'user').
@@ -107,6 +138,7 @@ class OrderExportService:
                          Allows callers to know exactly which orders were included.
             skipped_ids: Optional list to append skipped order PKs to.
                         Orders that failed validation (e.g., no items) are added here.
+            chunk_size: Number of sub-orders loaded per database round trip.
 
         Yields:
             XML string fragments (declaration, root open, documents, root close).
@@ -120,31 +152,45 @@ class OrderExportService:
         yield f'ДатаФормирования="{formation_date}">\n'
 
         # Stream each order as a Container with Document inside
-        for _order in orders.iterator(chunk_size=100):
-            order: Any = _order
-            if order.is_master:
-                logger.warning(
-                    f"Order {order.order_number}: is_master=True, export skipped — "
-                    f"OrderExportService expects sub-orders only"
-                )
-                if skipped_ids is not None:
-                    skipped_ids.append(order.pk)
-                continue
-            if not self._validate_order(order):
-                if skipped_ids is not None:
-                    skipped_ids.append(order.pk)
-                continue
-            container = ET.Element("Контейнер")
-            document = self._create_document_element(order)
-            container.append(document)
-            yield ET.tostring(container, encoding="unicode", method="xml")
-            yield "\n"
-            if exported_ids is not None:
-                exported_ids.append(order.pk)
+        self._active_lookups = self._build_lookups()
+        try:
+            reader = iter(OrderExportReader(orders, chunk_size=chunk_size))
+            while True:
+                with profile_phase(self.profiler, "read"):
+                    order: Any = next(reader, None)
+                if order is None:
+                    break
+                with profile_phase(self.profiler, "build") as phase:
+                    fragment = self._build_order_fragment(order)
+                    phase.rows["exported" if fragment else "skipped"] += 1
+                if fragment is None:
+                    if skipped_ids is not None:
+                        skipped_ids.append(order.pk)
+                    continue
+                yield fragment
+                yield "\n"
+                if exported_ids is not None:
+                    exported_ids.append(order.pk)
+        finally:
+            self._active_lookups = None
 
         # Root element close tag
         yield "</КоммерческаяИнформация>"
 
+    def _build_order_fragment(self, order: "Order") -> str | None:
+        """XML контейнера с документом заказа; None, если заказ не выгружается."""
+        if order.is_master:
+            logger.warning(
+                f"Order {order.order_number}: is_master=True, export skipped — "
+                f"OrderExportService expects sub-orders only"
+            )
+            return None
+        if not self._validate_order(order):
+            return None
+        container = ET.Element("Контейнер")
+        container.append(self._create_document_element(order))
+        return ET.tostring(container, encoding="unicode", method="xml")
+
     def _validate_order(self, order: "Order") -> bool:
         """Валидация заказа перед генерацией XML."""
         # Use cached items from prefetch_related to avoid N+1 queries
@@ -180,11 +226,9 @@ class OrderExportService:
         else:
             # AC8: vat_group=None → DEFAULT_* без warehouse_name routing
             logger.warning(f"Sub-order {order.order_number}: vat_group is None, using defaults")
-            _exc_cfg = getattr(settings, "ONEC_EXCHANGE", {})
-            org_name = _exc_cfg.get("DEFAULT_ORGANIZATION", "ИП Семерюк Д.В.")
-            warehouse_name = _exc_cfg.get("DEFAULT_WAREHOUSE", "1 СДВ склад")
-        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
-        agreement_name = exchange_cfg.get("DEFAULT_AGREEMENT", "Стандартное")
+            org_name = self._lookups.default_organization
+            warehouse_name = self._lookups.default_warehouse
+        agreement_name = self._lookups.agreement_name
 
         self._add_text_element(document, "Организация", org_name)
         self._add_text_element(document, "Склад", warehouse_name)
@@ -326,8 +370,7 @@ class OrderExportService:
         """Создание блока Товары."""
         products = ET.Element("Товары")
 
-        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
-        action = exchange_cfg.get("DEFAULT_ITEM_ACTION", "Резервировать")
+        action = self._lookups.item_action
         price_type_name = self._get_price_type(order)
         price_type_id = self._get_price_type_id(price_type_name)
         order_vat_rate = self._get_order_vat_rate(order)
@@ -436,8 +479,7 @@ class OrderExportService:
         if order.vat_group is not None:
             return Decimal(str(order.vat_group))
 
-        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
-        default_rate = Decimal(str(exchange_cfg.get("DEFAULT_VAT_RATE", 22)))
+        default_rate = self._lookups.default_vat_rate
         for item in order.items.all():
             # Приоритет snapshot (Story 34-1)
             if item.vat_rate is not None:
@@ -486,9 +528,7 @@ class OrderExportService:
             return None
 
         warehouse_name = next(iter(warehouse_names))
-        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
-        warehouse_rules = exchange_cfg.get("WAREHOUSE_RULES", {})
-        if warehouse_name not in warehouse_rules:
+        if warehouse_name not in self._lookups.warehouse_organization:
             return None
 
         warehouse_vat_rate = self._get_vat_rate_by_warehouse_name(warehouse_name)
@@ -503,38 +543,22 @@ class OrderExportService:
         Возвращает (название организации, название склада).
         Приоритет: warehouse_name -> vat_rate -> DEFAULT_*.
         """
-        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
-        warehouse_rules = exchange_cfg.get("WAREHOUSE_RULES", {})
+        lookups = self._lookups
         if warehouse_name:
-            warehouse_info = warehouse_rules.get(warehouse_name)
-            if warehouse_info:
-                return warehouse_info["organization"], warehouse_name
+            organization = lookups.warehouse_organization.get(warehouse_name)
+            if organization:
+                return organization, warehouse_name
 
-        mapping = exchange_cfg.get("ORGANIZATION_BY_VAT", {})
-        info = mapping.get(int(vat_rate))
+        info = lookups.organization_by_vat.get(int(vat_rate))
         if info:
-            return info["name"], info["warehouse"]
-        return (
-            exchange_cfg.get("DEFAULT_ORGANIZATION", "ИП Семерюк Д.В."),
-            exchange_cfg.get("DEFAULT_WAREHOUSE", "1 СДВ склад"),
-        )
+            return info
+        return lookups.default_organization, lookups.default_warehouse
 
     def _get_vat_rate_by_warehouse_name(self, warehouse_name: str | None) -> Decimal | None:
         """Возвращает ставку НДС по имени склада."""
         if not warehouse_name:
             return None
-
-        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
-        warehouse_rules = exchange_cfg.get("WAREHOUSE_RULES", {})
-        info = warehouse_rules.get(warehouse_name)
-        if not info:
-            return None
-
-        vat_rate = info.get("vat_rate")
-        if vat_rate is None:
-            return None
-
-        return Decimal(str(vat_rate))
+        return self._lookups.warehouse_vat_rate.get(warehouse_name)
 
     def _get_variant_vat_rate(self, variant: "ProductVariant", default_rate: Decimal) -> Decimal:
         """Возвращает НДС варианта: собственный vat_rate, затем ставка по складу, затем default."""
@@ -552,20 +576,15 @@ class OrderExportService:
         Возвращает вид цены в 1С по роли пользователя.
         Маппинг настраивается через ONEC_EXCHANGE['PRICE_TYPE_BY_ROLE'].
         """
-        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
-        role_map = exchange_cfg.get("PRICE_TYPE_BY_ROLE", {})
-        default_pt = str(exchange_cfg.get("DEFAULT_PRICE_TYPE", "РРЦ"))
+        lookups = self._lookups
         user = order.user
         if user:
-            return str(role_map.get(user.role, default_pt))
-        return default_pt
+            return lookups.price_type_by_role.get(user.role, lookups.default_price_type)
+        return lookups.default_price_type
 
     def _get_price_type_id(self, price_type_name: str) -> str | None:
         """Возвращает GUID типа цены 1С по имени без SQL-запросов."""
-        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
-        mapping = exchange_cfg.get("PRICE_TYPE_ID_BY_NAME", {})
-        price_type_id = str(mapping.get(price_type_name, "")).strip()
-        return price_type_id or None
+        return self._lookups.price_type_id_by_name.get(price_type_name) or None
 
     def _calc_vat_amount(self, total_price: Decimal, vat_rate: Decimal) -> Decimal:
         """
@@ -576,6 +595,10 @@ class OrderExportService:
         return (total_price * vat_rate / (Decimal("100") + vat_rate)).quantize(Decimal("0.01"))
 
     def _get_order_defaults(self) -> dict:
+        """Order default requisites (settings.ONEC_EXCHANGE.ORDER_DEFAULTS)."""
+        return self._lookups.order_defaults
+
+    def _read_order_defaults(self) -> dict:
         """Read order default requisites from settings.ONEC_EXCHANGE.ORDER_DEFAULTS."""
         exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
         defaults = exchange_cfg.get("ORDER_DEFAULTS", {})
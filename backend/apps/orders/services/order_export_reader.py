@@ -0,0 +1,127 @@
+"""
+Постраничное чтение субзаказов для экспорта в 1С (mode=query).
+
+`QuerySet.iterator(chunk_size=...)` в зависимости от версии Django и настроек
+либо игнорирует prefetch_related, либо выполняет его заново, а вспомогательные
+методы экспорта перечитывают ONEC_EXCHANGE на каждый заказ. Ридер выбирает
+субзаказы keyset-пагинацией по pk фиксированными порциями и подгружает позиции,
+варианты, товары и пользователей одной порцией запросов на чанк, а справочники
+организаций/складов/НДС/видов цен вычисляются один раз на весь экспорт.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Iterator
+
+from django.conf import settings
+from django.db.models import Prefetch, QuerySet
+
+from apps.orders.models import Order, OrderItem
+
+EXPORT_CHUNK_SIZE = 100
+
+DEFAULT_ORGANIZATION = "ИП Семерюк Д.В."
+DEFAULT_WAREHOUSE = "1 СДВ склад"
+
+
+@dataclass(frozen=True)
+class ExportLookups:
+    """Снимок настроек ONEC_EXCHANGE, нужных для генерации документов заказа."""
+
+    warehouse_organization: dict[str, str | None] = field(default_factory=dict)
+    warehouse_vat_rate: dict[str, Decimal | None] = field(default_factory=dict)
+    organization_by_vat: dict[Any, tuple[str, str]] = field(default_factory=dict)
+    default_organization: str = DEFAULT_ORGANIZATION
+    default_warehouse: str = DEFAULT_WAREHOUSE
+    default_vat_rate: Decimal = Decimal("22")
+    agreement_name: str = "Стандартное"
+    item_action: str = "Резервировать"
+    price_type_by_role: dict[str, str] = field(default_factory=dict)
+    default_price_type: str = "РРЦ"
+    price_type_id_by_name: dict[str, str] = field(default_factory=dict)
+    unit_defaults: dict[str, str] = field(default_factory=dict)
+    order_defaults: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_settings(cls, unit_defaults: dict[str, str], order_defaults: dict[str, str]) -> "ExportLookups":
+        """Строит справочники из settings.ONEC_EXCHANGE."""
+        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
+        warehouse_rules = exchange_cfg.get("WAREHOUSE_RULES", {})
+
+        warehouse_vat_rate: dict[str, Decimal | None] = {}
+        for name, info in warehouse_rules.items():
+            vat_rate = info.get("vat_rate")
+            warehouse_vat_rate[name] = Decimal(str(vat_rate)) if vat_rate is not None else None
+
+        price_type_ids = {
+            str(name): str(value).strip()
+            for name, value in exchange_cfg.get("PRICE_TYPE_ID_BY_NAME", {}).items()
+            if str(value).strip()
+        }
+
+        return cls(
+            warehouse_organization={name: info.get("organization") for name, info in warehouse_rules.items()},
+            warehouse_vat_rate=warehouse_vat_rate,
+            organization_by_vat={
+                rate: (info["name"], info["warehouse"])
+                for rate, info in exchange_cfg.get("ORGANIZATION_BY_VAT", {}).items()
+            },
+            default_organization=exchange_cfg.get("DEFAULT_ORGANIZATION", DEFAULT_ORGANIZATION),
+            default_warehouse=exchange_cfg.get("DEFAULT_WAREHOUSE", DEFAULT_WAREHOUSE),
+            default_vat_rate=Decimal(str(exchange_cfg.get("DEFAULT_VAT_RATE", 22))),
+            agreement_name=exchange_cfg.get("DEFAULT_AGREEMENT", "Стандартное"),
+            item_action=exchange_cfg.get("DEFAULT_ITEM_ACTION", "Резервировать"),
+            price_type_by_role={
+                str(role): str(name) for role, name in exchange_cfg.get("PRICE_TYPE_BY_ROLE", {}).items()
+            },
+            default_price_type=str(exchange_cfg.get("DEFAULT_PRICE_TYPE", "РРЦ")),
+            price_type_id_by_name=price_type_ids,
+            unit_defaults=unit_defaults,
+            order_defaults=order_defaults,
+        )
+
+
+class OrderExportReader:
+    """
+    Итератор субзаказов для экспорта с ограниченным числом запросов на чанк.
+
+    Каждый чанк — два запроса: субзаказы (JOIN user, parent_order) и их позиции
+    (JOIN variant, product). Пагинация по pk (WHERE pk > last_pk LIMIT N) не
+    зависит от OFFSET и устойчива к параллельным изменениям sent_to_1c.
+    """
+
+    def __init__(self, orders: "QuerySet[Order]", chunk_size: int = EXPORT_CHUNK_SIZE):
+        if chunk_size < 1:
+            raise ValueError("chunk_size должен быть больше либо равен 1.")
+        self.chunk_size = chunk_size
+        self._base = (
+            orders.prefetch_related(None)
+            .select_related("user", "parent_order")
+            .prefetch_related(
+                Prefetch(
+                    "items",
+                    queryset=OrderItem.objects.select_related("variant", "product").order_by("pk"),
+                )
+            )
+            .order_by("pk")
+        )
+        self.chunks_read = 0
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self.iter_chunks():
+            yield from chunk
+
+    def iter_chunks(self) -> Iterator[list[Any]]:
+        """Отдаёт субзаказы списками по chunk_size с заполненным prefetch cache."""
+        last_pk = 0
+        while True:
+            chunk = list(self._base.filter(pk__gt=last_pk)[: self.chunk_size])
+            if not chunk:
+                return
+            self.chunks_read += 1
+            yield chunk
+            if len(chunk) < self.chunk_size:
+                return
+            last_pk = chunk[-1].pk
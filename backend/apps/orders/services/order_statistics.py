@@ -0,0 +1,208 @@
+"""
+Материализованная статистика заказов пользователя для личного кабинета.
+
+Дашборд читает `UserOrderStatistics` одним запросом по первичному ключу вместо
+aggregate() по всем заказам пользователя. Сводка поддерживается
+инкрементально: создание мастер-заказа (post_save), отмена заказа клиентом и
+импорт статусов из 1С передают сюда изменения статусов. Ночная задача
+`reconcile_user_order_statistics` пересчитывает сводки и исправляет
+накопившиеся расхождения (правки в админке, удаление заказов и т.п.).
+
+Учитываются только мастер-заказы: субзаказы — технические документы для 1С,
+их суммы уже входят в сумму мастера.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from decimal import Decimal
+from typing import Any
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from apps.orders.models import Order, UserOrderStatistics
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_BATCH_SIZE = 500
+
+StatusChange = tuple[int | None, str, str]  # (user_id, старый статус, новый статус)
+
+
+class OrderStatisticsService:
+    """Чтение и инкрементальное обновление `UserOrderStatistics`."""
+
+    @classmethod
+    def get_for_user(cls, user: Any) -> UserOrderStatistics:
+        """
+        Вернуть сводку пользователя одним запросом по pk.
+
+        Если сводки ещё нет (пользователь без заказов или заказы созданы до
+        появления таблицы) — значения считаются по заказам без сохранения:
+        GET-запрос дашборда ничего не пишет, сводку создадут запись заказа
+        или `reconcile_user_order_statistics`.
+        """
+        try:
+            return UserOrderStatistics.objects.get(pk=user.pk)
+        except UserOrderStatistics.DoesNotExist:
+            return cls._compute([user.pk])[user.pk]
+
+    @classmethod
+    def record_created(cls, order: Order) -> None:
+        """Учесть новый мастер-заказ в сводке его пользователя."""
+        if not order.is_master or order.user_id is None:
+            return
+
+        with transaction.atomic():
+            stats = UserOrderStatistics.objects.select_for_update().filter(pk=order.user_id).first()
+            if stats is None:
+                # Заказ уже записан в текущей транзакции — пересчёт его учтёт
+                cls.rebuild([order.user_id])
+                return
+
+            stats.orders_count += 1
+            # До повторного чтения из БД сумма может быть float/int (fixtures, admin)
+            stats.total_amount += Decimal(str(order.total_amount or 0))
+            stats.status_counts[order.status] = stats.status_counts.get(order.status, 0) + 1
+            if order.created_at and (stats.last_order_at is None or order.created_at > stats.last_order_at):
+                stats.last_order_at = order.created_at
+            stats.save(update_fields=["orders_count", "total_amount", "status_counts", "last_order_at", "updated_at"])
+
+    @classmethod
+    def record_status_changes(cls, changes: Iterable[StatusChange]) -> None:
+        """
+        Перенести мастер-заказы между статусами в сводках пользователей.
+
+        Вызывается после записи новых статусов в текущей транзакции. Строки
+        сводок блокируются одним запросом в порядке pk и пишутся одним
+        bulk_update; отсутствующие сводки строятся заново по заказам.
+        """
+        deltas: dict[int, Counter[str]] = defaultdict(Counter)
+        for user_id, old_status, new_status in changes:
+            if user_id is None or old_status == new_status:
+                continue
+            deltas[user_id][old_status] -= 1
+            deltas[user_id][new_status] += 1
+        if not deltas:
+            return
+
+        with transaction.atomic():
+            rows = list(
+                UserOrderStatistics.objects.select_for_update()
+                .filter(pk__in=deltas.keys())
+                .order_by("pk")
+                .only("pk", "status_counts", "updated_at")
+            )
+            now = timezone.now()
+            for stats in rows:
+                counts = dict(stats.status_counts)
+                for status, delta in deltas[stats.pk].items():
+                    value = counts.get(status, 0) + delta
+                    if value > 0:
+                        counts[status] = value
+                    else:
+                        counts.pop(status, None)
+                stats.status_counts = counts
+                # bulk_update не применяет auto_now — проставляем updated_at явно
+                stats.updated_at = now
+            if rows:
+                UserOrderStatistics.objects.bulk_update(rows, ["status_counts", "updated_at"])
+
+            missing = set(deltas) - {stats.pk for stats in rows}
+            if missing:
+                cls.rebuild(missing)
+
+    @classmethod
+    def rebuild(cls, user_ids: Iterable[int]) -> int:
+        """Пересчитать и сохранить сводки пользователей по их заказам."""
+        computed = cls._compute(user_ids)
+        cls._upsert(list(computed.values()))
+        return len(computed)
+
+    @classmethod
+    def reconcile(cls, batch_size: int = RECONCILE_BATCH_SIZE) -> int:
+        """
+        Сверить все сводки с заказами и исправить расхождения.
+
+        Проверяются пользователи с мастер-заказами и пользователи с уже
+        существующими сводками (заказы могли быть удалены). Перезаписываются
+        только разошедшиеся строки.
+
+        Returns:
+            int: Количество исправленных сводок.
+        """
+        user_ids = set(
+            Order.objects.filter(is_master=True, user_id__isnull=False)
+            .order_by()
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+        user_ids.update(UserOrderStatistics.objects.values_list("pk", flat=True))
+
+        ordered_ids = sorted(user_ids)
+        corrected = 0
+        for start in range(0, len(ordered_ids), batch_size):
+            chunk = ordered_ids[start : start + batch_size]
+            computed = cls._compute(chunk)
+            existing = UserOrderStatistics.objects.in_bulk(chunk)
+            drifted = [
+                stats
+                for user_id, stats in computed.items()
+                if user_id not in existing or not cls._same_values(existing[user_id], stats)
+            ]
+            cls._upsert(drifted)
+            corrected += len(drifted)
+
+        if corrected:
+            logger.warning(f"Order statistics reconcile: corrected {corrected} of {len(ordered_ids)} summaries")
+        else:
+            logger.info(f"Order statistics reconcile: {len(ordered_ids)} summaries are consistent")
+        return corrected
+
+    @staticmethod
+    def _compute(user_ids: Iterable[int]) -> dict[int, UserOrderStatistics]:
+        """Построить сводки по заказам одним GROUP BY-запросом (user, status)."""
+        ids = set(user_ids)
+        computed = {user_id: UserOrderStatistics(user_id=user_id) for user_id in ids}
+        if not ids:
+            return computed
+
+        rows = (
+            Order.objects.filter(user_id__in=ids, is_master=True)
+            .order_by()
+            .values_list("user_id", "status")
+            .annotate(count=Count("id"), total=Sum("total_amount"), last_order_at=Max("created_at"))
+        )
+        for user_id, status, count, total, last_order_at in rows:
+            stats = computed[user_id]
+            stats.orders_count += count
+            stats.total_amount += total or Decimal("0")
+            stats.status_counts[status] = count
+            if last_order_at and (stats.last_order_at is None or last_order_at > stats.last_order_at):
+                stats.last_order_at = last_order_at
+        return computed
+
+    @staticmethod
+    def _upsert(rows: list[UserOrderStatistics]) -> None:
+        """Записать сводки одним INSERT ... ON CONFLICT DO UPDATE."""
+        if not rows:
+            return
+        UserOrderStatistics.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=["orders_count", "total_amount", "status_counts", "last_order_at", "updated_at"],
+        )
+
+    @staticmethod
+    def _same_values(current: UserOrderStatistics, expected: UserOrderStatistics) -> bool:
+        return (
+            current.orders_count == expected.orders_count
+            and current.total_amount == expected.total_amount
+            and current.status_counts == expected.status_counts
+            and current.last_order_at == expected.last_order_at
+        )
@@ -4,24 +4,33 @@
 Реализует Service Layer паттерн с разделением Parser/Processor:
 - _parse_orders_xml() — чистый парсинг XML, возврат dataclass
 - _process_order_update() — бизнес-логика обновления Order
+
+Фаза применения работает пакетами: изменения заказов пакета копятся в памяти
+(PendingOrderWrites) и пишутся одним bulk_update, а мастера пересчитываются
+по одному GROUP BY-запросу на все parent_order_id пакета.
 """
 
 from __future__ import annotations
 
 import logging
 import re
+import time
+from collections.abc import Callable, Collection, Iterator
 from dataclasses import dataclass, field
 from datetime import datetime
+from pathlib import Path
 from xml.etree.ElementTree import Element
 from zoneinfo import ZoneInfo
 
 import defusedxml.ElementTree as ET
 from defusedxml.common import DefusedXmlException
 from django.conf import settings
-from django.db import OperationalError, transaction
+from django.db import DatabaseError, OperationalError, transaction
+from django.db.models import Max
 from django.utils import timezone
 from django.utils.dateparse import parse_date, parse_datetime
 
+from apps.common.services.profiling import ExchangeProfiler, profile_phase
 from apps.orders.constants import (
     ACTIVE_STATUSES,
     ALLOWED_REQUISITES,
@@ -35,9 +44,13 @@ from apps.orders.constants import (
     ProcessingStatus,
 )
 from apps.orders.models import Order
+from apps.orders.services.order_statistics import OrderStatisticsService, StatusChange
 
 logger = logging.getLogger(__name__)
 
+# Попыток process_with_retries при временных ошибках БД
+PROCESS_MAX_ATTEMPTS = 3
+
 # [AI-Review][Low] Regex вынесен на уровень модуля для оптимизации
 REQUISITE_NAME_WHITESPACE_RE = re.compile(r"\s+")
 
@@ -101,6 +114,33 @@ class ImportResult:
         )
 
 
+@dataclass
+class PendingOrderWrites:
+    """Изменения заказов пакета, накопленные в памяти до bulk_update."""
+
+    orders: dict[int, Order] = field(default_factory=dict)  # pk → изменённый заказ
+    fields: set[str] = field(default_factory=set)  # Объединение update_fields пакета
+    status_changes: list[StatusChange] = field(default_factory=list)  # Переходы статусов мастеров
+
+    def add(self, order: Order, update_fields: list[str], status_change: StatusChange | None = None) -> None:
+        self.orders[order.pk] = order
+        self.fields.update(update_fields)
+        if status_change is not None:
+            self.status_changes.append(status_change)
+
+    def __bool__(self) -> bool:
+        return bool(self.orders)
+
+
+@dataclass
+class SubOrderSummary:
+    """Сводка по субзаказам одного мастера для агрегации (Story 34-4)."""
+
+    statuses: set[str] = field(default_factory=set)
+    payment_statuses: set[str] = field(default_factory=set)
+    last_sent_to_1c_at: datetime | None = None
+
+
 class DocumentParseError(Exception):
     """Ошибка парсинга одного документа orders.xml."""
 
@@ -132,14 +172,43 @@ class OrderStatusImportService:
             f"Skipped unknown status: {result.skipped_unknown_status}, "
             f"Skipped invalid: {result.skipped_invalid}"
         )
+
+    С профайлером (OrderStatusImportService(profiler=...)) замеряются фазы
+    parse (разбор XML) и apply (пакетное обновление заказов). Обработчик
+    progress(обработано, всего) вызывается после каждого пакета.
     """
 
-    def process(self, xml_data: str | bytes) -> ImportResult:
+    def __init__(
+        self,
+        profiler: ExchangeProfiler | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ):
+        self.profiler = profiler
+        self.progress = progress
+
+    def process_with_retries(self, xml_data: str | bytes | Path, attempts: int = PROCESS_MAX_ATTEMPTS) -> ImportResult:
+        """
+        process() с повтором при временных ошибках БД (FM5.1/FM5.2).
+
+        Raises:
+            OperationalError: БД недоступна все attempts попыток.
+        """
+        for attempt in range(attempts):
+            try:
+                return self.process(xml_data)
+            except OperationalError as e:
+                if attempt == attempts - 1:
+                    raise
+                logger.warning(f"[ORDERS IMPORT] DB error, retry {attempt + 1}: {e}")
+                time.sleep(0.5 * (attempt + 1))
+        raise ValueError("attempts must be positive")
+
+    def process(self, xml_data: str | bytes | Path) -> ImportResult:
         """
         Основная точка входа: парсить XML и обновить статусы заказов.
 
         Args:
-            xml_data: XML-строка или bytes в формате CommerceML 3.1.
+            xml_data: XML-строка, bytes или путь к файлу в формате CommerceML 3.1.
 
         Returns:
             ImportResult с подробной статистикой обработки.
@@ -148,7 +217,9 @@ class OrderStatusImportService:
 
         # PARSE: извлечь данные из XML
         try:
-            order_updates, total_documents, parse_errors = self._parse_orders_xml(xml_data)
+            with profile_phase(self.profiler, "parse") as phase:
+                order_updates, total_documents, parse_errors = self._parse_orders_xml(xml_data)
+                phase.rows["documents"] += total_documents
         except DefusedXmlException as e:
             logger.error(f"XML security error: {e}")
             result.errors.append(f"XML security error: {e}")
@@ -191,47 +262,60 @@ class OrderStatusImportService:
         # [AI-Review][High] Защита от race condition — блокировки в bulk fetch
         for start in range(0, len(order_updates), batch_size):
             batch = order_updates[start : start + batch_size]
+            # Счетчики и id пакета попадают в result только после коммита пакета
+            batch_result = ImportResult()
+            batch_sub_ids: list[int] = []
+            batch_master_ids: set[int] = set()
             try:
-                with transaction.atomic():
+                with profile_phase(self.profiler, "apply") as phase, transaction.atomic():
+                    phase.rows["documents"] += len(batch)
                     # BULK FETCH: загрузить заказы для пакета (оптимизация N+1)
                     orders_cache = self._bulk_fetch_orders(batch)
+                    masters_with_subs = self._fetch_masters_with_sub_orders(orders_cache)
                     # [Story 34-4] Собираем master_ids для агрегации после batch
                     master_ids_in_batch: set[int] = set()
+                    # Изменения пакета пишутся одним bulk_update после цикла
+                    pending = PendingOrderWrites()
 
                     for order_data in batch:
                         try:
-                            status, update_error = self._process_order_update(order_data, orders_cache)
+                            status, update_error = self._process_order_update(
+                                order_data,
+                                orders_cache,
+                                pending=pending,
+                                masters_with_subs=masters_with_subs,
+                            )
                             # [AI-Review][Medium] Используем Enum вместо magic strings
                             if status == ProcessingStatus.UPDATED:
-                                result.updated += 1
+                                batch_result.updated += 1
                                 consecutive_errors = 0  # Сброс счётчика при успехе
                                 # [Story 34-4] Собираем parent_order_id для агрегации
                                 sub = self._find_in_cache(order_data, orders_cache)
                                 if sub is not None:
-                                    updated_sub_ids.append(sub.pk)
+                                    batch_sub_ids.append(sub.pk)
                                     if sub.parent_order_id is not None:
                                         master_ids_in_batch.add(sub.parent_order_id)
                             elif status == ProcessingStatus.SKIPPED_UP_TO_DATE:
-                                result.skipped_up_to_date += 1
+                                batch_result.skipped_up_to_date += 1
                                 # [Story 34-4] SKIPPED_UP_TO_DATE тоже затрагивает sub
                                 sub = self._find_in_cache(order_data, orders_cache)
                                 if sub is not None and sub.parent_order_id is not None:
                                     master_ids_in_batch.add(sub.parent_order_id)
                             elif status == ProcessingStatus.SKIPPED_UNKNOWN_STATUS:
-                                result.skipped_unknown_status += 1
+                                batch_result.skipped_unknown_status += 1
                             elif status == ProcessingStatus.SKIPPED_DATA_CONFLICT:
-                                result.skipped_data_conflict += 1
+                                batch_result.skipped_data_conflict += 1
                             elif status == ProcessingStatus.SKIPPED_STATUS_REGRESSION:
-                                result.skipped_status_regression += 1
+                                batch_result.skipped_status_regression += 1
                             elif status == ProcessingStatus.SKIPPED_MASTER_UNEXPECTED:
-                                result.skipped_master_unexpected += 1
+                                batch_result.skipped_master_unexpected += 1
                             elif status == ProcessingStatus.NOT_FOUND:
-                                result.not_found += 1
+                                batch_result.not_found += 1
                                 consecutive_errors += 1
 
                             # Сбор ошибок из _process_order_update
-                            if update_error and len(result.errors) < MAX_ERRORS:
-                                result.errors.append(update_error)
+                            if update_error:
+                                batch_result.errors.append(update_error)
 
                         except Exception as e:
                             consecutive_errors += 1
@@ -248,15 +332,17 @@ class OrderStatusImportService:
                                 )
                                 log_suppressed = True
 
-                            if len(result.errors) < MAX_ERRORS:
-                                result.errors.append(update_error)
+                            batch_result.errors.append(update_error)
+
+                    self._bulk_save_orders(pending)
 
                     # [Story 34-4] Применить агрегацию мастеров для batch
                     if master_ids_in_batch:
-                        self._apply_master_aggregation(master_ids_in_batch, result, aggregated_master_ids)
-            except OperationalError as e:
+                        self._apply_master_aggregation(master_ids_in_batch, batch_result, batch_master_ids)
+            except DatabaseError as e:
+                # Пакет откатан целиком: его счетчики и id отбрасываются
                 consecutive_errors += 1
-                update_error = f"Database error during bulk fetch: {e}"
+                update_error = f"Database error during bulk fetch/update: {e}"
                 if consecutive_errors <= MAX_CONSECUTIVE_ERRORS:
                     logger.exception(update_error)
                 elif not log_suppressed:
@@ -267,6 +353,13 @@ class OrderStatusImportService:
                 if len(result.errors) < MAX_ERRORS:
                     result.errors.append(update_error)
                 continue
+            else:
+                self._merge_batch_result(result, batch_result, batch_master_ids - aggregated_master_ids)
+                updated_sub_ids.extend(batch_sub_ids)
+                aggregated_master_ids.update(batch_master_ids)
+            finally:
+                if self.progress is not None:
+                    self.progress(min(start + batch_size, len(order_updates)), len(order_updates))
 
         # Итоговое сообщение, если логи были подавлены
         if log_suppressed:
@@ -298,7 +391,7 @@ class OrderStatusImportService:
     # Parser Methods
     # =========================================================================
 
-    def _parse_orders_xml(self, xml_data: str | bytes) -> tuple[list[OrderUpdateData], int, list[str]]:
+    def _parse_orders_xml(self, xml_data: str | bytes | Path) -> tuple[list[OrderUpdateData], int, list[str]]:
         """
         Парсинг XML orders.xml в формате CommerceML 3.1.
 
@@ -321,7 +414,8 @@ class OrderStatusImportService:
             </КоммерческаяИнформация>
 
         Args:
-            xml_data: XML-строка или bytes.
+            xml_data: XML-строка, bytes или путь к файлу (разбирается
+                потоково, без чтения файла в память целиком).
 
         Returns:
             tuple: (список OrderUpdateData, общее число найденных <Документ>,
@@ -331,18 +425,20 @@ class OrderStatusImportService:
             ET.ParseError: при невалидном XML.
         """
         # defusedxml.ElementTree handles encoding automatically
+        documents: Iterator[Element]
+        if isinstance(xml_data, Path):
+            documents = _iter_documents(xml_data)
+        else:
+            # [AI-Review][High] Гибкий поиск <Документ>:
+            # 1. Сначала ищем .//Документ везде в дереве (наиболее гибко)
+            # 2. Это покрывает: <Контейнер><Документ>, <Документ> напрямую, вложенные структуры
+            documents = iter(ET.fromstring(xml_data).findall(".//Документ"))
 
-        root = ET.fromstring(xml_data)
         order_updates: list[OrderUpdateData] = []
         parse_errors: list[str] = []
-
-        # [AI-Review][High] Гибкий поиск <Документ>:
-        # 1. Сначала ищем .//Документ везде в дереве (наиболее гибко)
-        # 2. Это покрывает: <Контейнер><Документ>, <Документ> напрямую, вложенные структуры
-        documents = root.findall(".//Документ")
-
-        total_documents = len(documents)
+        total_documents = 0
         for document in documents:
+            total_documents += 1
             try:
                 order_data = self._parse_document(document)
             except DocumentParseError as exc:
@@ -631,6 +727,7 @@ class OrderStatusImportService:
                 "updated_at",
                 "is_master",
                 "parent_order_id",
+                "user_id",
             )
         )
 
@@ -645,6 +742,51 @@ class OrderStatusImportService:
         logger.debug(f"Bulk fetched {len(cache)} orders for {len(order_updates)} updates")
         return cache
 
+    def _fetch_masters_with_sub_orders(self, orders_cache: dict[str, Order]) -> set[int]:
+        """
+        Найти среди заказов пакета мастера, у которых есть субзаказы.
+
+        Один запрос на пакет вместо sub_orders.exists() на каждый документ
+        (master-guard, Story 34-4).
+        """
+        master_pks = {order.pk for order in orders_cache.values() if order.is_master}
+        if not master_pks:
+            return set()
+        return set(
+            Order.objects.filter(parent_order_id__in=master_pks)
+            .order_by()
+            .values_list("parent_order_id", flat=True)
+            .distinct()
+        )
+
+    def _merge_batch_result(self, result: ImportResult, batch_result: ImportResult, new_master_ids: set[int]) -> None:
+        """Перенести итоги закоммиченного пакета в result (мастер считается один раз за импорт)."""
+        result.updated += batch_result.updated
+        result.skipped_up_to_date += batch_result.skipped_up_to_date
+        result.skipped_unknown_status += batch_result.skipped_unknown_status
+        result.skipped_data_conflict += batch_result.skipped_data_conflict
+        result.skipped_status_regression += batch_result.skipped_status_regression
+        result.skipped_master_unexpected += batch_result.skipped_master_unexpected
+        result.skipped_master_regression += batch_result.skipped_master_regression
+        result.not_found += batch_result.not_found
+        result.aggregated_master_count += len(new_master_ids)
+        result.errors.extend(batch_result.errors[: max(MAX_ERRORS - len(result.errors), 0)])
+
+    def _bulk_save_orders(self, pending: PendingOrderWrites) -> None:
+        """
+        Записать накопленные изменения пакета одним bulk_update.
+
+        Строки уже заблокированы select_for_update() в текущей транзакции,
+        поэтому запись объединения update_fields для всех заказов пакета
+        безопасна: неизменённые поля пишутся теми же значениями. Переходы
+        статусов мастер-заказов переносятся в статистику пользователей.
+        """
+        if not pending:
+            return
+        Order.objects.bulk_update(list(pending.orders.values()), sorted(pending.fields))
+        if pending.status_changes:
+            OrderStatisticsService.record_status_changes(pending.status_changes)
+
     # =========================================================================
     # Processor Methods
     # =========================================================================
@@ -653,6 +795,8 @@ class OrderStatusImportService:
         self,
         order_data: OrderUpdateData,
         orders_cache: dict[str, Order] | None = None,
+        pending: PendingOrderWrites | None = None,
+        masters_with_subs: set[int] | None = None,
     ) -> tuple[ProcessingStatus, str | None]:
         """
         Обработка обновления одного заказа.
@@ -664,6 +808,10 @@ class OrderStatusImportService:
         Args:
             order_data: Данные для обновления.
             orders_cache: Кэш заказов из bulk fetch (опционально).
+            pending: Накопитель изменений пакета. Если передан — заказ не
+                сохраняется сразу, а записывается позже через bulk_update.
+            masters_with_subs: pk мастеров с субзаказами из
+                _fetch_masters_with_sub_orders (иначе — exists() по заказу).
 
         Returns:
             tuple: (ProcessingStatus, ошибка или None).
@@ -678,7 +826,11 @@ class OrderStatusImportService:
             return ProcessingStatus.NOT_FOUND, error_msg
 
         # [Story 34-4] Master-guard: XML должен адресовать субзаказ, не мастер
-        if order.is_master and order.sub_orders.exists():
+        if masters_with_subs is not None:
+            has_sub_orders = order.pk in masters_with_subs
+        else:
+            has_sub_orders = order.is_master and order.sub_orders.exists()
+        if order.is_master and has_sub_orders:
             error_msg = (
                 f"Order {order.order_number}: is_master=True with sub_orders, "
                 f"status imports must target sub-orders (check 1C export config)"
@@ -743,13 +895,17 @@ class OrderStatusImportService:
         if not status_changed and not dates_changed and not sent_to_1c_changed and not payment_status_needs_update:
             logger.debug(f"Order {order.order_number}: up-to-date, updating sync timestamp")
             order.sent_to_1c_at = sync_time
-            order.save(update_fields=["sent_to_1c_at", "updated_at"])
+            self._save_order(order, ["sent_to_1c_at", "updated_at"], pending)
             return ProcessingStatus.SKIPPED_UP_TO_DATE, None
 
         # Обновление заказа
         update_fields = ["updated_at"]
+        status_change: StatusChange | None = None
 
         if status_changed:
+            # Legacy-мастер без субзаказов: статус учитывается в статистике кабинета
+            if order.is_master and order.status != new_status:
+                status_change = (order.user_id, order.status, new_status)
             order.status = new_status
             # [AI-Review][Low] Truncate status_1c to 255 chars to prevent DB errors
             order.status_1c = order_data.status_1c[:255]  # AC4
@@ -780,34 +936,60 @@ class OrderStatusImportService:
         if "sent_to_1c_at" not in update_fields:
             update_fields.append("sent_to_1c_at")
 
-        order.save(update_fields=update_fields)
+        self._save_order(order, update_fields, pending, status_change)
 
         logger.debug(f"Order {order.order_number}: status updated to " f"'{new_status}' (1C: '{order_data.status_1c}')")
         return ProcessingStatus.UPDATED, None
 
+    def _save_order(
+        self,
+        order: Order,
+        update_fields: list[str],
+        pending: PendingOrderWrites | None,
+        status_change: StatusChange | None = None,
+    ) -> None:
+        """Сохранить заказ сразу или отложить запись до bulk_update пакета."""
+        if pending is None:
+            order.save(update_fields=update_fields)
+            if status_change is not None:
+                OrderStatisticsService.record_status_changes([status_change])
+            return
+        # bulk_update не применяет auto_now — проставляем updated_at явно
+        order.updated_at = timezone.now()
+        pending.add(order, update_fields, status_change)
+
     # =========================================================================
     # Master Aggregation Methods (Story 34-4)
     # =========================================================================
 
-    def _aggregate_master_status(self, master: Order) -> tuple[str | None, bool]:
+    def _aggregate_master_status(
+        self, master: Order, statuses: Collection[str] | None = None
+    ) -> tuple[str | None, bool]:
         """Пересчёт master.status на основе sub_orders (Story 34-4, AC4, AC5).
 
+        Args:
+            master: Мастер-заказ.
+            statuses: Статусы субзаказов из _fetch_sub_order_summaries; если не
+                переданы — читаются из master.sub_orders.
+
         Returns:
             tuple[new_status | None, regression_blocked].
             - (new_status, False) — статус нужно обновить
             - (None, False) — статус не изменился
             - (None, True) — регрессия финального статуса заблокирована
         """
-        statuses = list(master.sub_orders.values_list("status", flat=True))
+        if statuses is None:
+            statuses = list(master.sub_orders.values_list("status", flat=True))
         if not statuses:
             return None, False  # legacy master без subs
 
-        if all(s == statuses[0] for s in statuses):
-            new_status = statuses[0]
-        elif "pending" in statuses:
+        distinct_statuses = set(statuses)
+        if len(distinct_statuses) == 1:
+            new_status = next(iter(distinct_statuses))
+        elif "pending" in distinct_statuses:
             new_status = "pending"
         else:
-            non_terminal = [s for s in statuses if STATUS_PRIORITY.get(s, 0) > 0]
+            non_terminal = [s for s in distinct_statuses if STATUS_PRIORITY.get(s, 0) > 0]
             if non_terminal:
                 new_status = min(non_terminal, key=lambda s: STATUS_PRIORITY[s])
             else:
@@ -825,9 +1007,10 @@ class OrderStatusImportService:
 
         return new_status, False
 
-    def _aggregate_master_payment_status(self, master: Order) -> str | None:
+    def _aggregate_master_payment_status(self, master: Order, payments: Collection[str] | None = None) -> str | None:
         """Пересчёт master.payment_status (Story 34-4, AC6)."""
-        payments = list(master.sub_orders.values_list("payment_status", flat=True))
+        if payments is None:
+            payments = list(master.sub_orders.values_list("payment_status", flat=True))
         if not payments:
             return None
         if "refunded" in payments:
@@ -838,55 +1021,101 @@ class OrderStatusImportService:
             new_ps = "pending"
         return new_ps if new_ps != master.payment_status else None
 
-    def _aggregate_master_sent_to_1c_at(self, master: Order) -> datetime | None:
+    def _aggregate_master_sent_to_1c_at(
+        self, master: Order, timestamps: Collection[datetime | None] | None = None
+    ) -> datetime | None:
         """max(sub.sent_to_1c_at) игнорируя None (Story 34-4, AC7)."""
-        timestamps = [ts for ts in master.sub_orders.values_list("sent_to_1c_at", flat=True) if ts is not None]
-        if not timestamps:
+        if timestamps is None:
+            timestamps = list(master.sub_orders.values_list("sent_to_1c_at", flat=True))
+        non_empty = [ts for ts in timestamps if ts is not None]
+        if not non_empty:
             return None
-        new_ts = max(timestamps)
+        new_ts = max(non_empty)
         return new_ts if new_ts != master.sent_to_1c_at else None
 
+    def _fetch_sub_order_summaries(self, master_ids: set[int]) -> dict[int, SubOrderSummary]:
+        """
+        Сводка по субзаказам всех мастеров одним GROUP BY-запросом.
+
+        Группировка по (parent_order_id, status, payment_status) даёт не больше
+        нескольких строк на мастер — этого достаточно для правил агрегации,
+        которым важен набор различных значений, а не число субзаказов.
+        """
+        rows = (
+            Order.objects.filter(parent_order_id__in=master_ids)
+            .order_by()
+            .values_list("parent_order_id", "status", "payment_status")
+            .annotate(last_sent_to_1c_at=Max("sent_to_1c_at"))
+        )
+        summaries: dict[int, SubOrderSummary] = {}
+        for parent_id, status, payment_status, last_sent_to_1c_at in rows:
+            summary = summaries.setdefault(parent_id, SubOrderSummary())
+            summary.statuses.add(status)
+            summary.payment_statuses.add(payment_status)
+            if last_sent_to_1c_at is not None and (
+                summary.last_sent_to_1c_at is None or last_sent_to_1c_at > summary.last_sent_to_1c_at
+            ):
+                summary.last_sent_to_1c_at = last_sent_to_1c_at
+        return summaries
+
     def _apply_master_aggregation(
         self,
         master_ids: set[int],
         result: ImportResult,
         aggregated_master_ids: set[int],
     ) -> None:
-        """Применить агрегацию на всех затронутых мастерах (Story 34-4, AC3, AC10)."""
-        for master_id in master_ids:
-            try:
-                master = Order.objects.select_for_update().get(pk=master_id)
-            except Order.DoesNotExist:
-                logger.warning(f"Master order {master_id} not found during aggregation")
-                continue
+        """Применить агрегацию на всех затронутых мастерах (Story 34-4, AC3, AC10).
+
+        Мастера блокируются одним запросом в порядке pk, субзаказы читаются
+        одним GROUP BY-запросом, изменения пишутся одним bulk_update.
+        """
+        masters = list(
+            Order.objects.select_for_update()
+            .filter(pk__in=master_ids)
+            .order_by("pk")
+            .only("pk", "order_number", "user_id", "status", "payment_status", "sent_to_1c_at", "updated_at")
+        )
+        for missing_id in sorted(master_ids - {master.pk for master in masters}):
+            logger.warning(f"Master order {missing_id} not found during aggregation")
+        if not masters:
+            return
 
+        summaries = self._fetch_sub_order_summaries({master.pk for master in masters})
+        pending = PendingOrderWrites()
+
+        for master in masters:
+            summary = summaries.get(master.pk, SubOrderSummary())
             update_fields: list[str] = []
+            status_change: StatusChange | None = None
 
-            new_status, regression_blocked = self._aggregate_master_status(master)
+            new_status, regression_blocked = self._aggregate_master_status(master, summary.statuses)
             if regression_blocked:
                 result.skipped_master_regression += 1
             elif new_status is not None:
+                status_change = (master.user_id, master.status, new_status)
                 master.status = new_status
                 update_fields.append("status")
 
-            new_ps = self._aggregate_master_payment_status(master)
+            new_ps = self._aggregate_master_payment_status(master, summary.payment_statuses)
             if new_ps is not None:
                 master.payment_status = new_ps
                 update_fields.append("payment_status")
 
-            new_ts = self._aggregate_master_sent_to_1c_at(master)
+            new_ts = self._aggregate_master_sent_to_1c_at(master, [summary.last_sent_to_1c_at])
             if new_ts is not None:
                 master.sent_to_1c_at = new_ts
                 update_fields.append("sent_to_1c_at")
 
             if update_fields:
                 update_fields.append("updated_at")
-                master.save(update_fields=update_fields)
+                self._save_order(master, update_fields, pending, status_change)
                 # AC11: только мастера с изменённым status/payment_status
                 if "status" in update_fields or "payment_status" in update_fields:
-                    if master_id not in aggregated_master_ids:
+                    if master.pk not in aggregated_master_ids:
                         result.aggregated_master_count += 1
-                    aggregated_master_ids.add(master_id)
+                    aggregated_master_ids.add(master.pk)
+
+        self._bulk_save_orders(pending)
 
     def _find_in_cache(self, order_data: OrderUpdateData, orders_cache: dict[str, Order] | None) -> Order | None:
         """Искать заказ только в кэше (не DB)."""
@@ -1010,3 +1239,30 @@ class OrderStatusImportService:
                 return db_order_by_id, None
 
         return None, None
+
+
+def _iter_documents(path: Path) -> Iterator[Element]:
+    """
+    Потоковый обход <Документ> (на любой глубине, как .//Документ) в файле.
+
+    Разобранный документ верхнего уровня удаляется из дерева, поэтому память
+    не растет с размером файла.
+
+    Raises:
+        ET.ParseError: при невалидном XML.
+    """
+    stack: list[Element] = []
+    depth = 0
+    for event, element in ET.iterparse(str(path), events=("start", "end")):
+        if event == "start":
+            stack.append(element)
+            if element.tag == "Документ":
+                depth += 1
+            continue
+        stack.pop()
+        if element.tag != "Документ":
+            continue
+        yield element
+        depth -= 1
+        if depth == 0 and stack:
+            stack[-1].remove(element)
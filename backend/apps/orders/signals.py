@@ -54,3 +54,22 @@ def send_order_confirmation_email(sender, instance, created, **kwargs):
         logger.info(f"Задача уведомления администраторов о заказе {instance.order_number} " "добавлена в очередь")
     except Exception as e:
         logger.error(f"Ошибка добавления задачи уведомления для заказа {instance.order_number}: {e}")
+
+
+@receiver(post_save, sender=Order)
+def update_user_order_statistics(sender, instance, created, **kwargs):
+    """
+    Учёт нового мастер-заказа в материализованной статистике пользователя.
+
+    Ошибка обновления сводки не должна мешать оформлению заказа: изменения
+    сводки откатываются до savepoint, расхождение исправит ночная сверка.
+    """
+    if not created or not instance.is_master or instance.user_id is None:
+        return
+
+    try:
+        from apps.orders.services.order_statistics import OrderStatisticsService
+
+        OrderStatisticsService.record_created(instance)
+    except Exception as e:
+        logger.error(f"Ошибка обновления статистики заказов для заказа {instance.order_number}: {e}")
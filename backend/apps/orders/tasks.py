@@ -2,23 +2,38 @@
 Celery tasks для отправки email-уведомлений о заказах.
 
 Реализует асинхронную отправку уведомлений при создании/отмене заказов
-получателям, настроенным через NotificationRecipient в Django Admin.
+получателям, настроенным через NotificationRecipient в Django Admin,
+и асинхронный импорт статусов заказов из orders.xml обмена с 1С.
 """
 
 import logging
+from datetime import timedelta
+from pathlib import Path
 from smtplib import SMTPException
 from typing import Any
 
 from celery import shared_task
 from django.conf import settings
 from django.core.mail import send_mail
+from django.db import InterfaceError, OperationalError
 from django.template.loader import render_to_string
+from django.utils import timezone
 
 from apps.common.models import NotificationRecipient
+from apps.common.services.profiling import ExchangeProfiler, profiling_settings
 from apps.orders.models import Order, OrderItem
+from apps.orders.services.order_statistics import OrderStatisticsService
+from apps.orders.services.order_status_import import ImportResult, OrderStatusImportService
 
 logger = logging.getLogger(__name__)
 
+# Повтор задачи импорта orders.xml при недоступной БД
+ORDERS_XML_DB_ERRORS = (OperationalError, InterfaceError)
+# Сессии младше порога не трогаются: задача могла еще не дойти до воркера
+ORDERS_XML_REQUEUE_AFTER = timedelta(minutes=10)
+# Сколько раз сессия ставится в очередь повторно, прежде чем остаться FAILED
+ORDERS_XML_REQUEUE_MAX = 5
+
 
 def _get_order_display_items(order: Order):
     """Возвращает позиции для отображения в email/admin.
@@ -338,3 +353,170 @@ def send_order_cancelled_notification_email(self: Any, order_id: int) -> bool:
             },
         )
         raise self.retry(exc=exc)
+
+
+@shared_task(name="apps.orders.tasks.reconcile_user_order_statistics")
+def reconcile_user_order_statistics() -> int:
+    """
+    Ночная сверка материализованной статистики заказов с таблицей заказов.
+
+    Исправляет расхождения, которые не проходят через инкрементальные
+    обновления (правки статусов в админке, удаление заказов).
+
+    Returns:
+        Количество исправленных сводок
+    """
+    corrected = OrderStatisticsService.reconcile()
+    logger.info(
+        "User order statistics reconciled",
+        extra={"corrected_count": corrected},
+    )
+    return corrected
+
+
+@shared_task(
+    name="apps.orders.tasks.import_orders_xml_task",
+    bind=True,
+    acks_late=True,
+    max_retries=3,
+    autoretry_for=ORDERS_XML_DB_ERRORS,
+    retry_backoff=True,
+    retry_backoff_max=600,
+)
+def import_orders_xml_task(self: Any, session_id: int) -> str:
+    """
+    Импорт статусов заказов из orders.xml, принятого обменом с 1С (ONEC_EXCHANGE["ORDERS_XML_ASYNC"]).
+
+    Прогресс (processed_items/total_items) и итог пишутся в сессию
+    ImportSession (import_type=orders); обработанный файл уходит в архив
+    журналов обмена. При ошибке БД задача повторяется, после исчерпания
+    повторов файл остается во входящей папке и сессию снова ставит в
+    очередь requeue_orders_xml_sessions.
+
+    Args:
+        session_id: ID сессии ImportSession
+
+    Returns:
+        Результат выполнения ('success' или 'failure')
+    """
+    from apps.integrations.onec_exchange.file_service import get_exchange_log_dir
+    from apps.integrations.onec_exchange.orders_inbox import archive_processed
+    from apps.products.models import ImportSession
+
+    session = ImportSession.objects.get(pk=session_id)
+    path = Path(session.report_details["file"])
+    if session.status == ImportSession.ImportStatus.COMPLETED or not path.exists():
+        # Повторная доставка (acks_late) или повторная постановка уже обработанной сессии
+        logger.info(f"[ORDERS IMPORT] Session {session_id} already processed, skipping")
+        return "skipped"
+    session.status = ImportSession.ImportStatus.IN_PROGRESS
+    session.celery_task_id = self.request.id
+    session.save(update_fields=["status", "celery_task_id", "updated_at"])
+    session.log_event("Задача Celery запущена. Применяем статусы заказов...")
+
+    def report_progress(processed: int, total: int) -> None:
+        session.report_details = {**session.report_details, "processed_items": processed, "total_items": total}
+        session.save(update_fields=["report_details", "updated_at"])
+
+    profiler = ExchangeProfiler.from_mode(profiling_settings().get("MODE"), "orders_import")
+    if profiler:
+        profiler.start()
+    try:
+        service = OrderStatusImportService(profiler=profiler, progress=report_progress)
+        result = service.process_with_retries(path)
+    except ORDERS_XML_DB_ERRORS as e:
+        if self.request.retries < self.max_retries:
+            session.log_event(f"Ошибка БД, задача будет повторена: {e}", level="warning")
+            raise
+        logger.exception(f"[ORDERS IMPORT] Session {session_id} failed: {e}")
+        _finish_orders_session(session, ImportSession.ImportStatus.FAILED, error_message=str(e))
+        return "failure"
+    except Exception as e:
+        logger.exception(f"[ORDERS IMPORT] Session {session_id} failed: {e}")
+        _finish_orders_session(session, ImportSession.ImportStatus.FAILED, error_message=str(e))
+        return "failure"
+    finally:
+        if profiler:
+            session.store_profile(profiler.finish(get_exchange_log_dir()))
+
+    # ADR-003: Partial Success = Success
+    fatal = any("xml parse error" in err.lower() or "xml security error" in err.lower() for err in result.errors)
+    failed = fatal or (result.updated == 0 and bool(result.errors))
+    session.report_details = {**session.report_details, **_orders_import_stats(result)}
+    for error in result.errors[:5]:
+        session.log_event(error, level="warning")
+    session.log_event(
+        f"processed={result.processed}, updated={result.updated}, skipped={result.skipped}, "
+        f"aggregated_masters={result.aggregated_master_count}, not_found={result.not_found}, "
+        f"errors={len(result.errors)}"
+    )
+    if failed:
+        _finish_orders_session(session, ImportSession.ImportStatus.FAILED, error_message=result.errors[0])
+    else:
+        _finish_orders_session(session, ImportSession.ImportStatus.COMPLETED)
+
+    try:
+        archive_processed(path, get_exchange_log_dir(), session.report_details.get("sessid", ""))
+    except Exception as e:
+        logger.error(f"[ORDERS IMPORT] Failed to archive {path.name}: {e}")
+    return "failure" if failed else "success"
+
+
+@shared_task(name="apps.orders.tasks.requeue_orders_xml_sessions")
+def requeue_orders_xml_sessions() -> int:
+    """
+    Повторная постановка в очередь импорта orders.xml, файл которого остался во входящей папке.
+
+    Подхватывает сессии PENDING (задача потеряна брокером) и FAILED (БД
+    была недоступна дольше повторов задачи), не обновлявшиеся
+    ORDERS_XML_REQUEUE_AFTER. Обработанные файлы уходят в архив, поэтому
+    сессии с некорректным XML повторно не ставятся.
+
+    Returns:
+        Количество сессий, поставленных в очередь
+    """
+    from apps.products.models import ImportSession
+
+    sessions = ImportSession.objects.filter(
+        import_type=ImportSession.ImportType.ORDERS,
+        status__in=[ImportSession.ImportStatus.PENDING, ImportSession.ImportStatus.FAILED],
+        updated_at__lt=timezone.now() - ORDERS_XML_REQUEUE_AFTER,
+    )
+    requeued = 0
+    for session in sessions:
+        file_path = session.report_details.get("file")
+        attempts = session.report_details.get("requeued", 0)
+        if not file_path or not Path(file_path).exists() or attempts >= ORDERS_XML_REQUEUE_MAX:
+            continue
+        session.status = ImportSession.ImportStatus.PENDING
+        session.error_message = ""
+        session.report_details = {**session.report_details, "requeued": attempts + 1}
+        session.save(update_fields=["status", "error_message", "report_details", "updated_at"])
+        session.log_event(f"Файл остался во входящей папке, задача поставлена в очередь повторно ({attempts + 1}).")
+        import_orders_xml_task.delay(session.pk)
+        requeued += 1
+
+    if requeued:
+        logger.info("Orders XML import sessions requeued", extra={"requeued_count": requeued})
+    return requeued
+
+
+def _orders_import_stats(result: ImportResult) -> dict[str, Any]:
+    """Статистика ImportResult для report_details сессии."""
+    return {
+        "processed": result.processed,
+        "updated": result.updated,
+        "skipped": result.skipped,
+        "skipped_up_to_date": result.skipped_up_to_date,
+        "skipped_invalid": result.skipped_invalid,
+        "not_found": result.not_found,
+        "aggregated_masters": result.aggregated_master_count,
+        "errors": result.errors,
+    }
+
+
+def _finish_orders_session(session: Any, status: str, error_message: str = "") -> None:
+    session.status = status
+    session.error_message = error_message
+    session.finished_at = timezone.now()
+    session.save(update_fields=["status", "error_message", "finished_at", "report_details", "updated_at"])
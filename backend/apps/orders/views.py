@@ -4,17 +4,20 @@ API Views для заказов FREESPORT
 """
 
 from django.db import transaction
-from django.db.models import prefetch_related_objects
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import OpenApiExample, OpenApiResponse, extend_schema
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from apps.common.services.query_budget import query_budget
+
 from .models import Order
 from .serializers import OrderCreateSerializer, OrderDetailSerializer, OrderListSerializer
+from .services.order_statistics import OrderStatisticsService
 
 
+@query_budget(15)
 class OrderViewSet(viewsets.ModelViewSet):
     """ViewSet для управления заказами.
 
@@ -117,20 +120,16 @@ class OrderViewSet(viewsets.ModelViewSet):
         },
         tags=["Orders"],
     )
+    @query_budget(80)
     def create(self, request, *args, **kwargs):
         """Создать новый заказ из корзины"""
         serializer = self.get_serializer(data=request.data, context={"request": request})
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
 
-        # Наполняем prefetch cache на уже созданном объекте без лишнего root SELECT
-        # по Order.pk. Для freshly-created master direct items всегда пусты,
-        # поэтому достаточно префетчить sub_orders/items path.
-        prefetch_related_objects(
-            [order],
-            "sub_orders__items__product",
-            "sub_orders__items__variant",
-        )
+        # OrderCreateService заполняет prefetch cache мастера (sub_orders → items)
+        # объектами, созданными в памяти, поэтому ответ собирается без повторного
+        # чтения заказа и его позиций из БД.
         detail_serializer = OrderDetailSerializer(order, context={"request": request})
         return Response(detail_serializer.data, status=status.HTTP_201_CREATED)
 
@@ -160,6 +159,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         tags=["Orders"],
     )
     @action(detail=True, methods=["post"])
+    @query_budget(40)
     def cancel(self, request, pk=None):
         """Отменить мастер-заказ (субзаказы отменяются каскадно).
 
@@ -189,9 +189,11 @@ class OrderViewSet(viewsets.ModelViewSet):
             )
 
         with transaction.atomic():
+            previous_status = order.status
             order.status = "cancelled"
             order.save()
             order.sub_orders.update(status="cancelled")
+            OrderStatisticsService.record_status_changes([(order.user_id, previous_status, order.status)])
 
         serializer = self.get_serializer(order)
         return Response(serializer.data)
@@ -12,6 +12,8 @@ from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
 from django.db import connection
 from django.db.models import Q, QuerySet
 
+from apps.common.services.prometheus import record_cache_lookup
+
 from .models import Attribute, Brand, Category, Product
 
 if TYPE_CHECKING:
@@ -46,6 +48,7 @@ class ProductFilter(django_filters.FilterSet):
 
         cache_key = "active_attributes_for_filters"
         active_attributes = cache.get(cache_key)
+        record_cache_lookup("active_attributes", active_attributes is not None)
 
         if active_attributes is None:
             # Загружаем только активные атрибуты для создания фильтров
@@ -219,6 +222,7 @@ class ProductFilter(django_filters.FilterSet):
 
         cache_key = f"category_descendants_{category_id}"
         category_ids = cache.get(cache_key)
+        record_cache_lookup("category_descendants", category_ids is not None)
 
         if category_ids is None:
             # Проверяем существование категории
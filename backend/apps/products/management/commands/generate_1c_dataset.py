@@ -0,0 +1,80 @@
+"""
+Management команда для генерации синтетической выгрузки 1С (CommerceML 3.1)
+"""
+
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.services.commerceml_generator import SCALES, CommerceMLDatasetGenerator, DatasetSpec
+
+
+class Command(BaseCommand):
+    """
+    Генерация выгрузки goods/offers/prices/rests/groups/propertiesGoods/priceLists
+    для нагрузочных замеров импорта
+
+    Использование:
+        python manage.py generate_1c_dataset --output=/tmp/1c-100k --scale=100k
+        python manage.py generate_1c_dataset --output=/tmp/1c --offers=25000 --segment-size=5000 --images
+        python manage.py import_products_from_1c --data-dir=/tmp/1c-100k --skip-backup --profile=phases
+    """
+
+    help = "Генерация синтетической выгрузки 1С для бенчмарка импорта"
+
+    def add_arguments(self, parser):
+        """Добавление аргументов команды"""
+        parser.add_argument("--output", type=str, required=True, help="Каталог для выгрузки")
+        parser.add_argument(
+            "--scale",
+            choices=sorted(SCALES),
+            default="10k",
+            help="Пресет числа предложений (default: 10k)",
+        )
+        parser.add_argument("--offers", type=int, help="Число предложений (перекрывает --scale)")
+        parser.add_argument(
+            "--variants-per-product",
+            type=int,
+            default=DatasetSpec.variants_per_product,
+            help=f"Предложений на товар (default: {DatasetSpec.variants_per_product})",
+        )
+        parser.add_argument(
+            "--segment-size",
+            type=int,
+            default=DatasetSpec.segment_size,
+            help=f"Элементов в одном файле, 0 — без сегментов (default: {DatasetSpec.segment_size})",
+        )
+        parser.add_argument(
+            "--warehouses",
+            type=int,
+            default=DatasetSpec.warehouses,
+            help=f"Число складов в остатках (default: {DatasetSpec.warehouses})",
+        )
+        parser.add_argument("--images", action="store_true", help="Создать изображения товаров в goods/import_files")
+        parser.add_argument("--seed", type=int, default=DatasetSpec.seed, help="Seed идентификаторов (default: 1)")
+
+    def handle(self, *args, **options):
+        """Основная логика команды"""
+        output = Path(options["output"])
+        if output.exists() and any(output.iterdir()):
+            raise CommandError(f"Каталог не пуст: {output}")
+
+        spec = DatasetSpec(
+            offers=options["offers"] or SCALES[options["scale"]],
+            variants_per_product=options["variants_per_product"],
+            segment_size=options["segment_size"],
+            warehouses=options["warehouses"],
+            images=options["images"],
+            seed=options["seed"],
+        )
+        if spec.offers < 1 or spec.variants_per_product < 1 or spec.segment_size < 0:
+            raise CommandError("--offers и --variants-per-product должны быть >= 1, --segment-size >= 0")
+
+        started = time.perf_counter()
+        stats = CommerceMLDatasetGenerator(spec).generate(output)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Выгрузка создана в {output} за {elapsed:.1f}s"))
+        for key, value in stats.items():
+            self.stdout.write(f"   {key}: {value}")
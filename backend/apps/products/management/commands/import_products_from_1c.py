@@ -20,23 +20,47 @@ within its own transaction (via VariantImportProcessor).
 Trade-offs:
 - Pros: Significantly lower memory usage, resilient to timeouts, partial progress is saved.
 - Cons: Failure mid-import requires a re-run or manual cleanup (ImportSession tracks state).
-- Recovery: ImportSession.report logs progress, allowing analysis of where failure occurred.
+- Recovery: ImportSessionEvent journal logs progress, allowing analysis of where failure occurred.
 """
 
 from __future__ import annotations
 
 import os
+import zipfile
 from pathlib import Path
-from typing import Any, cast
+from typing import Any, Callable, cast
 
 from django.core.management import call_command
 from django.core.management.base import BaseCommand, CommandError
 from tqdm import tqdm
 
+from apps.common.services.profiling import ExchangeProfiler, ProfilingMode
+from apps.integrations.onec_exchange.zip_source import ZipImportSource
 from apps.products.models import Brand, Category, ImportSession, Product, ProductVariant
-from apps.products.services.parser import XMLDataParser
+from apps.products.services.import_lanes import PriorityImportGate
+from apps.products.services.import_staging import ImportStagingService, StagedSource
+from apps.products.services.parser import XMLDataParser, XMLSource
+from apps.products.services.set_based_apply import SetBasedApplyService, set_based_apply_supported
 from apps.products.services.variant_import import VariantImportProcessor
 
+# Файлы, по заголовкам которых выгрузка определяется как пакет изменений
+PACKAGE_SOURCES = (
+    ("groups", "groups.xml"),
+    ("goods", "goods.xml"),
+    ("offers", "offers.xml"),
+    ("prices", "prices.xml"),
+    ("rests", "rests.xml"),
+)
+
+# Подпапки архива, которые читает импорт каждого типа (архив, прочитанный
+# целиком, удаляется после импорта)
+ARCHIVE_SUBDIRS_BY_FILE_TYPE = {
+    "goods": frozenset({"goods", "groups", "propertiesGoods"}),
+    "offers": frozenset({"offers", "prices", "rests"}),
+    "prices": frozenset({"prices", "priceLists"}),
+    "rests": frozenset({"rests"}),
+}
+
 
 class Command(BaseCommand):
     """
@@ -50,9 +74,21 @@ class Command(BaseCommand):
         python manage.py import_products_from_1c --data-dir /path --file-type=goods
         python manage.py import_products_from_1c --data-dir /path --clear-existing
         python manage.py import_products_from_1c --data-dir /path --variants-only
+        python manage.py import_products_from_1c --data-dir /path --profile=sampling
+        python manage.py import_products_from_1c --data-dir /path --set-based-apply
     """
 
     help = "Импорт каталога товаров из файлов 1С (CommerceML 3.1) " "с поддержкой ProductVariant"
+    # Профайлер, начатый вызывающим кодом (process_1c_import_task), — только через call_command
+    stealth_options = ("profiler",)
+    # Архивы *.zip в корне data_dir: XML и изображения читаются из них без распаковки
+    archive: ZipImportSource | None = None
+    # Строки, подготовленные во время загрузки (--staged), вместо разбора файлов
+    staging: ImportStagingService | None = None
+    # Цены и остатки через COPY и UPDATE ... FROM (--set-based-apply)
+    apply_engine: SetBasedApplyService | None = None
+    # Уступка приоритетным импортам цен/остатков между фазами (импорт каталога)
+    priority_gate: PriorityImportGate | None = None
 
     def add_arguments(self, parser):
         """Добавление аргументов команды"""
@@ -135,9 +171,48 @@ class Command(BaseCommand):
             default=None,
             help="ID существующей сессии ImportSession для консолидации логов.",
         )
+        parser.add_argument(
+            "--profile",
+            choices=ProfilingMode.values,
+            default=None,
+            help=(
+                "Профилирование импорта: phases — время, CPU, SQL и строки по фазам "
+                "(report_details['profile']), sampling — плюс сэмплирующий профиль "
+                "в каталоге журналов обмена. По умолчанию — режим сессии."
+            ),
+        )
+        parser.add_argument(
+            "--staged",
+            action="store_true",
+            help=(
+                "Применить строки, подготовленные при загрузке сегментов (конвейерный обмен, "
+                "ONEC_EXCHANGE['PIPELINED_IMPORT']); требует --import-session-id."
+            ),
+        )
+        parser.add_argument(
+            "--set-based-apply",
+            action="store_true",
+            help=(
+                "Применять цены и остатки множественными SQL-операциями (COPY во временные таблицы "
+                "и UPDATE ... FROM, одна транзакция на фазу; только PostgreSQL). "
+                "По умолчанию — ONEC_EXCHANGE['SET_BASED_APPLY']."
+            ),
+        )
 
     def handle(self, *args, **options):
         """Основная логика команды"""
+        try:
+            return self._handle_import(options)
+        finally:
+            self.staging = None
+            self.apply_engine = None
+            self.priority_gate = None
+            if self.archive:
+                self.archive.close()
+                self.archive = None
+
+    def _handle_import(self, options: dict[str, Any]) -> None:
+        """Валидация, подготовка сессии и шаги импорта"""
         from django.conf import settings
 
         data_dir = options["data_dir"]
@@ -155,11 +230,16 @@ class Command(BaseCommand):
         variants_only = options.get("variants_only", False)
         celery_task_id = options.get("celery_task_id", None)
         import_session_id = options.get("import_session_id", None)
+        staged = options.get("staged", False)
+        set_based_apply = options.get("set_based_apply") or settings.ONEC_EXCHANGE.get("SET_BASED_APPLY", False)
 
         # --variants-only переопределяет file_type
         if variants_only:
             file_type = "offers"  # Импортировать только offers + prices + rests
 
+        if staged and (dry_run or not import_session_id):
+            raise CommandError("--staged требует --import-session-id и несовместим с --dry-run")
+
         # Валидация директории
         if not os.path.exists(data_dir):
             raise CommandError(f"Директория не найдена: {data_dir}")
@@ -167,38 +247,31 @@ class Command(BaseCommand):
         if not os.path.isdir(data_dir):
             raise CommandError(f"Путь не является директорией: {data_dir}")
 
-        # Валидация структуры директории
-        if file_type == "all":
+        try:
+            self.archive = ZipImportSource(data_dir).open()
+        except (zipfile.BadZipFile, ValueError) as e:
+            raise CommandError(f"Некорректный архив в {data_dir}: {e}")
+
+        # Валидация структуры директории (поддиректория может быть и внутри архива;
+        # с --staged файлы уже разобраны при загрузке)
+        if file_type == "all" and not staged:
             required_subdirs = ["goods", "offers", "prices", "rests", "priceLists"]
             for subdir in required_subdirs:
                 subdir_path = os.path.join(data_dir, subdir)
-                if not os.path.exists(subdir_path):
+                if not os.path.exists(subdir_path) and not self.archive.has_xml(subdir):
                     raise CommandError(f"Отсутствует обязательная поддиректория: {subdir}")
-        elif file_type == "offers" or variants_only:
+        elif (file_type == "offers" or variants_only) and not staged:
             # Для --variants-only нужны только offers, prices, rests
             required_subdirs = ["offers", "prices", "rests"]
             for subdir in required_subdirs:
                 subdir_path = os.path.join(data_dir, subdir)
-                if not os.path.exists(subdir_path):
+                if not os.path.exists(subdir_path) and not self.archive.has_xml(subdir):
                     raise CommandError(f"Отсутствует обязательная поддиректория для " f"импорта вариантов: {subdir}")
 
         if dry_run:
             self.stdout.write(self.style.WARNING("🔍 DRY RUN MODE: Изменения не будут сохранены в БД"))
             return self._dry_run_import(data_dir)
 
-        # Автоматический backup перед полным импортом
-        if not dry_run and file_type == "all" and not skip_backup:
-            self.stdout.write(self.style.WARNING("\n💾 Создание backup перед импортом..."))
-            try:
-                call_command("backup_db")
-                self.stdout.write(self.style.SUCCESS("✅ Backup создан успешно"))
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f"⚠️ Не удалось создать backup: {e}. Продолжаем импорт..."))
-
-        # Очистка существующих данных
-        if clear_existing:
-            self._clear_existing_data()
-
         # Вывод параметров импорта
         self.stdout.write("\n" + "=" * 60)
         if variants_only:
@@ -255,7 +328,41 @@ class Command(BaseCommand):
 
         session_id = session.pk
 
+        profile_mode = options.get("profile")
+        if profile_mode and profile_mode != session.profiling:
+            session.profiling = profile_mode
+            session.save(update_fields=["profiling", "updated_at"])
+
+        # Профайлер вызывающего кода завершает он сам, собственный — команда
+        profiler = options.get("profiler")
+        owns_profiler = profiler is None
+        if owns_profiler:
+            profiler = ExchangeProfiler.from_mode(session.profiling, label=f"import_session_{session_id}")
+            if profiler:
+                profiler.start()
+
         try:
+            # Пакет изменений 1С (СодержитТолькоИзменения="true"): без backup и проходов по всему каталогу.
+            # Подготовленные строки конвейерного обмена — всегда полная выгрузка.
+            # Чтение заголовков — внутри обработки ошибок: битый файл завершает сессию FAILED
+            changes_only = (
+                file_type in ["all", "goods", "offers"] and not staged and self._is_changes_only_package(data_dir)
+            )
+            self.stdout.write(f"   Changes only: {changes_only}")
+
+            # Автоматический backup перед полным импортом
+            if file_type == "all" and not skip_backup and not changes_only:
+                self.stdout.write(self.style.WARNING("\n💾 Создание backup перед импортом..."))
+                try:
+                    call_command("backup_db")
+                    self.stdout.write(self.style.SUCCESS("✅ Backup создан успешно"))
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f"⚠️ Не удалось создать backup: {e}. Продолжаем импорт..."))
+
+            # Очистка существующих данных
+            if clear_existing:
+                self._clear_existing_data()
+
             # Инициализация парсера и процессора
             parser = XMLDataParser()
 
@@ -267,50 +374,92 @@ class Command(BaseCommand):
                 session_id=session_id,
                 batch_size=batch_size,
                 skip_validation=skip_validation,
+                profiler=profiler,
+                image_source=self.archive,
             )
+            if changes_only:
+                variant_processor.changes_only = True
+                variant_processor.log_progress(
+                    "Пакет изменений: default variants только для товаров пакета, без деактивации категорий"
+                )
+
+            if set_based_apply:
+                if set_based_apply_supported():
+                    self.apply_engine = SetBasedApplyService(variant_processor)
+                else:
+                    self.stdout.write(self.style.WARNING("⚠️ --set-based-apply требует PostgreSQL, построчный режим"))
+
+            # Импорт каталога уступает приоритетным импортам цен/остатков между фазами
+            if file_type in ["all", "goods", "offers"]:
+                self.priority_gate = PriorityImportGate(session)
+
+            # Конвейерный обмен: дополнить staging файлами, не разобранными при загрузке
+            if staged:
+                self.staging = ImportStagingService(session_id)
+                with variant_processor.phase("staging"):
+                    pending = self.staging.stage_pending(data_dir, self.archive)
+                self.stdout.write(f"\n📥 Подготовлено при применении (не успели при загрузке): {pending} файлов")
 
             # ШАГ 0.5: Загрузка категорий из groups.xml
             if file_type in ["all", "goods"]:
+                self._yield_to_priority_imports("categories", variant_processor)
                 variant_processor.log_progress("Начало импорта категорий...")
-                self._import_categories(data_dir, parser, variant_processor)
+                with variant_processor.phase("categories"):
+                    self._import_categories(data_dir, parser, variant_processor)
 
             # ШАГ 0.6: Загрузка брендов из propertiesGoods.xml
             if file_type in ["all", "goods"]:
+                self._yield_to_priority_imports("brands", variant_processor)
                 variant_processor.log_progress("Начало импорта брендов...")
-                self._import_brands(data_dir, parser, variant_processor)
+                with variant_processor.phase("brands"):
+                    self._import_brands(data_dir, parser, variant_processor)
 
             # ШАГ 1: Загрузка типов цен из priceLists*.xml
             if file_type in ["all", "prices"]:
+                self._yield_to_priority_imports("price_types", variant_processor)
                 variant_processor.log_progress("Начало импорта типов цен...")
-                self._import_price_types(data_dir, parser, variant_processor)
+                with variant_processor.phase("price_types"):
+                    self._import_price_types(data_dir, parser, variant_processor)
 
             # ШАГ 2: Парсинг goods.xml → Product (базовая информация)
             if file_type in ["all", "goods"]:
+                self._yield_to_priority_imports("goods", variant_processor)
                 variant_processor.log_progress("Начало импорта товаров (goods.xml)...")
-                self._import_products_from_goods(data_dir, parser, variant_processor, skip_images)
+                with variant_processor.phase("goods"):
+                    self._import_products_from_goods(data_dir, parser, variant_processor, skip_images)
 
             # ШАГ 3: Парсинг offers.xml → ProductVariant
             if file_type in ["all", "offers"]:
+                self._yield_to_priority_imports("offers", variant_processor)
                 variant_processor.log_progress("Начало импорта вариантов (offers.xml)...")
-                self._import_variants_from_offers(data_dir, parser, variant_processor, skip_images)
+                with variant_processor.phase("offers"):
+                    self._import_variants_from_offers(data_dir, parser, variant_processor, skip_images)
 
             # ШАГ 3.5: Создание default variants для товаров без вариантов
             if file_type in ["all", "offers"] and not skip_default_variants:
+                self._yield_to_priority_imports("default_variants", variant_processor)
                 variant_processor.log_progress("Создание дефолтных вариантов...")
-                self._create_default_variants(variant_processor)
+                with variant_processor.phase("default_variants"):
+                    self._create_default_variants(variant_processor)
 
             # ШАГ 4: Парсинг prices.xml → ProductVariant (цены)
             if file_type in ["all", "prices", "offers"]:
+                self._yield_to_priority_imports("prices", variant_processor)
                 variant_processor.log_progress("Обновление цен из prices.xml...")
-                self._import_variant_prices(data_dir, parser, variant_processor)
+                with variant_processor.phase("prices"):
+                    self._import_variant_prices(data_dir, parser, variant_processor)
 
             # ШАГ 5: Парсинг rests.xml → ProductVariant (остатки)
             if file_type in ["all", "rests", "offers"]:
+                self._yield_to_priority_imports("rests", variant_processor)
                 variant_processor.log_progress("Обновление остатков из rests.xml...")
-                self._import_variant_stocks(data_dir, parser, variant_processor)
+                with variant_processor.phase("rests"):
+                    self._import_variant_stocks(data_dir, parser, variant_processor)
 
             # Финализация сессии
             variant_processor.finalize_session(status=ImportSession.ImportStatus.COMPLETED)
+            if self.staging:
+                self.staging.clear()
 
             # Очистка файлов после успешного импорта
             if not dry_run and not options.get("keep_files", False):
@@ -325,6 +474,16 @@ class Command(BaseCommand):
             session.error_message = str(e)
             session.save()
             raise CommandError(f"Импорт завершился с ошибкой: {e}")
+        finally:
+            if profiler and owns_profiler:
+                from apps.integrations.onec_exchange.file_service import get_exchange_log_dir
+
+                session.store_profile(profiler.finish(get_exchange_log_dir()))
+
+    def _yield_to_priority_imports(self, phase: str, processor: VariantImportProcessor) -> None:
+        """Граница фаз: пропустить вперед активные приоритетные импорты цен/остатков"""
+        if self.priority_gate and self.priority_gate.wait(phase, processor.log_progress):
+            processor.stats["priority_wait_seconds"] = round(self.priority_gate.waited, 3)
 
     def _import_categories(self, data_dir: str, parser: XMLDataParser, processor: VariantImportProcessor) -> None:
         """Импорт категорий из groups.xml"""
@@ -334,10 +493,10 @@ class Command(BaseCommand):
         if groups_files:
             total_categories = 0
             for file_path in groups_files:
-                categories_data = parser.parse_groups_xml(file_path)
+                categories_data = self._parse(parser.parse_groups_xml, file_path)
                 result = processor.process_categories(categories_data)
                 total_categories += result["created"] + result["updated"]
-                self.stdout.write(f"   • {Path(file_path).name}: категорий {len(categories_data)}")
+                self.stdout.write(f"   • {self._file_label(file_path)}: категорий {len(categories_data)}")
 
                 if result["cycles_detected"] > 0:
                     self.stdout.write(
@@ -357,11 +516,11 @@ class Command(BaseCommand):
             total_brands = 0
             total_mappings = 0
             for file_path in properties_files:
-                brands_data = parser.parse_properties_goods_xml(file_path)
+                brands_data = self._parse(parser.parse_properties_goods_xml, file_path)
                 result = processor.process_brands(brands_data)
                 total_brands += result["brands_created"]
                 total_mappings += result["mappings_created"]
-                self.stdout.write(f"   • {Path(file_path).name}: брендов {len(brands_data)}")
+                self.stdout.write(f"   • {self._file_label(file_path)}: брендов {len(brands_data)}")
 
             self.stdout.write(self.style.SUCCESS(f"   ✅ Создано брендов: {total_brands}, маппингов: {total_mappings}"))
         else:
@@ -375,11 +534,11 @@ class Command(BaseCommand):
         if price_list_files:
             total_price_types = 0
             for file_path in price_list_files:
-                price_types_data = parser.parse_price_lists_xml(file_path)
+                price_types_data = self._parse(parser.parse_price_lists_xml, file_path)
                 for price_type in price_types_data:
                     processor.process_price_types([price_type])
                 total_price_types += len(price_types_data)
-                self.stdout.write(f"   • {Path(file_path).name}: типов цен {len(price_types_data)}")
+                self.stdout.write(f"   • {self._file_label(file_path)}: типов цен {len(price_types_data)}")
 
             self.stdout.write(self.style.SUCCESS(f"   ✅ Загружено типов цен (всего): {total_price_types}"))
         else:
@@ -401,10 +560,10 @@ class Command(BaseCommand):
             return
 
         for file_path in goods_files:
-            goods_data = parser.parse_goods_xml(file_path)
+            goods_data = self._parse(parser.parse_goods_xml, file_path)
             base_dir = os.path.join(data_dir, "goods", "import_files")
 
-            for i, goods_item in enumerate(tqdm(goods_data, desc=f"   Обработка {Path(file_path).name}")):
+            for i, goods_item in enumerate(tqdm(goods_data, desc=f"   Обработка {self._file_label(file_path)}")):
                 processor.process_product_from_goods(
                     cast("dict[str, Any]", goods_item),
                     base_dir=base_dir,
@@ -412,10 +571,10 @@ class Command(BaseCommand):
                 )
                 if (i + 1) % 20 == 0:
                     processor.log_progress(
-                        f"Обработка товаров ({Path(file_path).name}): " f"{i + 1} из {len(goods_data)}"
+                        f"Обработка товаров ({self._file_label(file_path)}): " f"{i + 1} из {len(goods_data)}"
                     )
 
-            self.stdout.write(f"   • {Path(file_path).name}: товаров {len(goods_data)}")
+            self.stdout.write(f"   • {self._file_label(file_path)}: товаров {len(goods_data)}")
 
         stats = processor.get_stats()
         self.stdout.write(
@@ -438,7 +597,7 @@ class Command(BaseCommand):
             return
 
         for file_path in offers_files:
-            offers_data = parser.parse_offers_xml(file_path)
+            offers_data = self._parse(parser.parse_offers_xml, file_path)
             base_dir = os.path.join(data_dir, "offers", "import_files")
             # Fallback: Если папка offers/import_files не существует, пробуем goods/import_files
             # (так как FileRoutingService по умолчанию кладет все картинки в goods/import_files)
@@ -448,7 +607,7 @@ class Command(BaseCommand):
                     base_dir = alt_dir
                     self.stdout.write(f"   ℹ️ Изображения будут загружаться из: {Path(base_dir).relative_to(data_dir)}")
 
-            for i, offer_item in enumerate(tqdm(offers_data, desc=f"   Обработка {Path(file_path).name}")):
+            for i, offer_item in enumerate(tqdm(offers_data, desc=f"   Обработка {self._file_label(file_path)}")):
                 processor.process_variant_from_offer(
                     cast("dict[str, Any]", offer_item),
                     base_dir=base_dir,
@@ -456,10 +615,10 @@ class Command(BaseCommand):
                 )
                 if (i + 1) % 20 == 0:
                     processor.log_progress(
-                        f"Обработка вариантов ({Path(file_path).name}): " f"{i + 1} из {len(offers_data)}"
+                        f"Обработка вариантов ({self._file_label(file_path)}): " f"{i + 1} из {len(offers_data)}"
                     )
 
-            self.stdout.write(f"   • {Path(file_path).name}: предложений {len(offers_data)}")
+            self.stdout.write(f"   • {self._file_label(file_path)}: предложений {len(offers_data)}")
 
         stats = processor.get_stats()
         self.stdout.write(
@@ -473,7 +632,8 @@ class Command(BaseCommand):
     def _create_default_variants(self, processor: VariantImportProcessor) -> None:
         """Создание default variants для товаров без вариантов (AC5)"""
         self.stdout.write("\n🔄 Шаг 3.5: Создание default variants...")
-        count = processor.create_default_variants()
+        product_ids = processor.touched_product_ids if processor.changes_only else None
+        count = processor.create_default_variants(product_ids)
         self.stdout.write(self.style.SUCCESS(f"   ✅ Создано default variants: {count}"))
 
     def _import_variant_prices(
@@ -490,17 +650,27 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("   ⚠️ Файлы prices.xml не найдены"))
             return
 
+        if self.apply_engine:
+            self.apply_engine.begin("prices")
+            for file_path in prices_files:
+                prices_data = self._parse(parser.parse_prices_xml, file_path)
+                self.apply_engine.add_prices(cast("list[dict[str, Any]]", prices_data))
+                self.stdout.write(f"   • {self._file_label(file_path)}: записей цен {len(prices_data)}")
+            counts = self.apply_engine.apply_prices()
+            self.stdout.write(self.style.SUCCESS(f"   ✅ Обновлено вариантов одной транзакцией: {counts['updated']}"))
+            return
+
         for file_path in prices_files:
-            prices_data = parser.parse_prices_xml(file_path)
+            prices_data = self._parse(parser.parse_prices_xml, file_path)
 
-            for i, price_item in enumerate(tqdm(prices_data, desc=f"   Обработка {Path(file_path).name}")):
+            for i, price_item in enumerate(tqdm(prices_data, desc=f"   Обработка {self._file_label(file_path)}")):
                 processor.update_variant_prices(cast("dict[str, Any]", price_item))
                 if (i + 1) % 20 == 0:
                     processor.log_progress(
-                        f"Обновление цен ({Path(file_path).name}): " f"{i + 1} из {len(prices_data)}"
+                        f"Обновление цен ({self._file_label(file_path)}): " f"{i + 1} из {len(prices_data)}"
                     )
 
-            self.stdout.write(f"   • {Path(file_path).name}: записей цен {len(prices_data)}")
+            self.stdout.write(f"   • {self._file_label(file_path)}: записей цен {len(prices_data)}")
 
         stats = processor.get_stats()
         self.stdout.write(self.style.SUCCESS(f"   ✅ Обновлено цен: {stats['prices_updated']}"))
@@ -519,17 +689,27 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("   ⚠️ Файлы rests.xml не найдены"))
             return
 
+        if self.apply_engine:
+            self.apply_engine.begin("rests")
+            for file_path in rests_files:
+                rests_data = self._parse(parser.parse_rests_xml, file_path)
+                self.apply_engine.add_rests(cast("list[dict[str, Any]]", rests_data))
+                self.stdout.write(f"   • {self._file_label(file_path)}: записей остатков {len(rests_data)}")
+            counts = self.apply_engine.apply_rests()
+            self.stdout.write(self.style.SUCCESS(f"   ✅ Обновлено вариантов одной транзакцией: {counts['updated']}"))
+            return
+
         for file_path in rests_files:
-            rests_data = parser.parse_rests_xml(file_path)
+            rests_data = self._parse(parser.parse_rests_xml, file_path)
 
-            for i, rest_item in enumerate(tqdm(rests_data, desc=f"   Обработка {Path(file_path).name}")):
+            for i, rest_item in enumerate(tqdm(rests_data, desc=f"   Обработка {self._file_label(file_path)}")):
                 processor.update_variant_stock(cast("dict[str, Any]", rest_item))
                 if (i + 1) % 20 == 0:
                     processor.log_progress(
-                        f"Обновление остатков ({Path(file_path).name}): " f"{i + 1} из {len(rests_data)}"
+                        f"Обновление остатков ({self._file_label(file_path)}): " f"{i + 1} из {len(rests_data)}"
                     )
 
-            self.stdout.write(f"   • {Path(file_path).name}: записей остатков {len(rests_data)}")
+            self.stdout.write(f"   • {self._file_label(file_path)}: записей остатков {len(rests_data)}")
 
         stats = processor.get_stats()
         self.stdout.write(self.style.SUCCESS(f"   ✅ Обновлено остатков: {stats['stocks_updated']}"))
@@ -579,6 +759,26 @@ class Command(BaseCommand):
 
         self.stdout.write(f"   ✅ Удалено XML файлов: {deleted_xml_count}")
 
+        # Архив удаляется, когда прочитаны все его XML: иначе следующий импорт
+        # снова прочитает из него уже примененные данные
+        if self.archive:
+            if file_type == "all":
+                archive_paths = self.archive.paths
+            else:
+                archive_paths = self.archive.consumed_paths(
+                    ARCHIVE_SUBDIRS_BY_FILE_TYPE.get(file_type, ()), images=file_type in ("goods", "offers")
+                )
+            # Члены для других команд (contragents, ...) остаются на диске
+            self.archive.extract_unstreamed()
+            self.archive.close()
+            for archive_path in archive_paths:
+                try:
+                    archive_path.unlink()
+                except OSError as e:
+                    self.stdout.write(self.style.ERROR(f"   ❌ Ошибка удаления {archive_path.name}: {e}"))
+            if archive_paths:
+                self.stdout.write(f"   ✅ Удалено архивов: {len(archive_paths)}")
+
         # 2. Очистка папок с изображениями (goods/import_files, offers/import_files)
         # Удаляем сами папки import_files, так как изображения уже скопированы в media/products
         img_dirs = []
@@ -651,13 +851,35 @@ class Command(BaseCommand):
         self.stdout.write(f"   Ошибок:                  {stats.get('images_errors', 0)}")
         self.stdout.write("=" * 60)
 
-    def _collect_xml_files(self, base_dir: str, subdir: str, filename: str) -> list[str]:
+    def _file_label(self, file_path: XMLSource | StagedSource) -> str:
+        """Имя файла для вывода (для члена архива — «архив:путь»)"""
+        return Path(file_path).name if isinstance(file_path, str) else str(file_path)
+
+    def _parse(self, parse: Callable[[XMLSource], list[Any]], file_path: XMLSource | StagedSource) -> list[Any]:
+        """Разбор файла или строки, подготовленные при загрузке (--staged)"""
+        return file_path.rows() if isinstance(file_path, StagedSource) else parse(file_path)
+
+    def _is_changes_only_package(self, data_dir: str) -> bool:
+        """Хотя бы один файл выгрузки помечен СодержитТолькоИзменения="true"."""
+        parser = XMLDataParser()
+        for subdir, filename in PACKAGE_SOURCES:
+            for source in self._collect_xml_files(data_dir, subdir, filename):
+                if not isinstance(source, StagedSource) and parser.is_changes_only(source):
+                    return True
+        return False
+
+    def _collect_xml_files(self, base_dir: str, subdir: str, filename: str) -> list[XMLSource | StagedSource]:
         """
         Сбор XML файлов из директории с поддержкой альтернативных имен и папок.
 
         1C часто присылает 'import.xml' вместо 'goods.xml', и файлы могут
         находиться в разных подпапках в зависимости от модуля выгрузки.
+        После файлов на диске идут XML-члены архивов, маршрутизированные
+        в те же подпапки.
         """
+        if self.staging:
+            return list(self.staging.sources(subdir))
+
         base_path = Path(base_dir) / subdir
         collected: list[Path] = []
 
@@ -700,7 +922,13 @@ class Command(BaseCommand):
                 if legacy_file.exists() and legacy_file not in collected:
                     collected.append(legacy_file)
 
-        return [str(path) for path in collected]
+        sources: list[XMLSource | StagedSource] = [str(path) for path in collected]
+        if self.archive:
+            search_subdirs = [subdir, "goods"] if subdir == "groups" else [subdir]
+            for archive_subdir in search_subdirs:
+                for fname in search_filenames:
+                    sources.extend(self.archive.xml_members(archive_subdir, fname.replace(".xml", "")))
+        return sources
 
     def _dry_run_import(self, data_dir: str) -> None:
         """Тестовый запуск импорта без записи в БД"""
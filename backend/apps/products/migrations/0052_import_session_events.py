@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0051_alter_productvariant_vat_rate"),
+    ]
+
+    operations = [
+        # Столбец report остается архивом старых отчетов (db_column), меняется только имя поля модели
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name="importsession",
+                    old_name="report",
+                    new_name="legacy_report",
+                ),
+                migrations.AlterField(
+                    model_name="importsession",
+                    name="legacy_report",
+                    field=models.TextField(
+                        blank=True,
+                        db_column="report",
+                        help_text="Текстовый лог сессий, созданных до журнала ImportSessionEvent",
+                        verbose_name="Отчет (архив)",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ImportSessionEvent",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now, verbose_name="Время")),
+                (
+                    "level",
+                    models.CharField(
+                        choices=[("info", "Информация"), ("warning", "Предупреждение"), ("error", "Ошибка")],
+                        default="info",
+                        max_length=10,
+                        verbose_name="Уровень",
+                    ),
+                ),
+                ("message", models.TextField(verbose_name="Сообщение")),
+                (
+                    "session",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="products.importsession",
+                        verbose_name="Сессия импорта",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Событие сессии импорта",
+                "verbose_name_plural": "События сессий импорта",
+                "db_table": "import_session_events",
+                "ordering": ["id"],
+                "indexes": [models.Index(fields=["session", "id"], name="import_event_session_id_idx")],
+            },
+        ),
+    ]
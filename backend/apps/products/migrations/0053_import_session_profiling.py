@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0052_import_session_events"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importsession",
+            name="profiling",
+            field=models.CharField(
+                choices=[
+                    ("off", "Выключено"),
+                    ("phases", "Фазы: время, CPU, SQL, строки"),
+                    ("sampling", "Фазы + сэмплирующий профиль"),
+                ],
+                default="off",
+                help_text="Замер фаз импорта (report_details['profile']) и сэмплирующий профиль в журналах обмена",
+                max_length=10,
+                verbose_name="Профилирование",
+            ),
+        ),
+    ]
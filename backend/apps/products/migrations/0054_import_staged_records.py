@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:43
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0053_import_session_profiling"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportStagedRecord",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(max_length=20, verbose_name="Фаза")),
+                ("source_file", models.CharField(max_length=255, verbose_name="Файл")),
+                ("position", models.PositiveIntegerField(verbose_name="Позиция в файле")),
+                (
+                    "payload",
+                    models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name="Данные"),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="staged_records",
+                        to="products.importsession",
+                        verbose_name="Сессия импорта",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Подготовленная строка импорта",
+                "verbose_name_plural": "Подготовленные строки импорта",
+                "db_table": "import_staged_records",
+                "indexes": [
+                    models.Index(fields=["session", "kind", "source_file", "position"], name="import_staged_order_idx")
+                ],
+            },
+        ),
+    ]
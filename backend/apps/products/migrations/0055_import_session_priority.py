@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0054_import_staged_records"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importsession",
+            name="priority",
+            field=models.BooleanField(
+                default=False,
+                help_text="Только цены и остатки: приоритетная очередь Celery, импорт каталога уступает между фазами",
+                verbose_name="Приоритетный импорт",
+            ),
+        ),
+    ]
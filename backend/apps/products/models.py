@@ -12,11 +12,14 @@ from decimal import Decimal
 from typing import TYPE_CHECKING, Any, cast
 
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 from transliterate import translit
 
+from apps.common.services.profiling import ProfilingMode
 from apps.products.utils.attributes import normalize_attribute_name
 from apps.products.utils.brands import normalize_brand_name
 
@@ -569,6 +572,7 @@ class ImportType(models.TextChoices):
     STOCKS = "stocks", "Остатки товаров"
     PRICES = "prices", "Цены товаров"
     CUSTOMERS = "customers", "Клиенты"
+    ORDERS = "orders", "Статусы заказов"
 
 
 class ImportStatus(models.TextChoices):
@@ -586,6 +590,7 @@ class ImportSession(models.Model):
 
     ImportType = ImportType
     ImportStatus = ImportStatus
+    ProfilingMode = ProfilingMode
 
     import_type = cast(
         str,
@@ -623,12 +628,13 @@ class ImportSession(models.Model):
         datetime | None,
         models.DateTimeField("Окончание импорта", null=True, blank=True),
     )
-    report = cast(
+    legacy_report = cast(
         str,
         models.TextField(
-            "Отчет",
+            "Отчет (архив)",
+            db_column="report",
             blank=True,
-            help_text="Текстовый лог/отчет о выполнении",
+            help_text="Текстовый лог сессий, созданных до журнала ImportSessionEvent",
         ),
     )
     report_details = cast(
@@ -652,6 +658,24 @@ class ImportSession(models.Model):
             help_text="UUID задачи Celery для отслеживания прогресса",
         ),
     )
+    profiling = cast(
+        str,
+        models.CharField(
+            "Профилирование",
+            max_length=10,
+            choices=ProfilingMode.choices,
+            default=ProfilingMode.OFF,
+            help_text="Замер фаз импорта (report_details['profile']) и сэмплирующий профиль в журналах обмена",
+        ),
+    )
+    priority = cast(
+        bool,
+        models.BooleanField(
+            "Приоритетный импорт",
+            default=False,
+            help_text="Только цены и остатки: приоритетная очередь Celery, импорт каталога уступает между фазами",
+        ),
+    )
 
     class Meta:
         verbose_name = "Сессия импорта"
@@ -689,6 +713,134 @@ class ImportSession(models.Model):
     def __str__(self) -> str:
         return f"{self.get_import_type_display()} - " f"{self.get_status_display()} ({self.created_at})"
 
+    @property
+    def report(self) -> str:
+        """
+        Текстовый отчет о выполнении, собранный из журнала событий.
+
+        Строится при каждом обращении; для постраничного чтения и «хвоста»
+        используйте ImportSessionEvent.objects.page().
+        """
+        if self.pk is None:
+            return self.legacy_report
+        events = self.events.order_by("id").only("created_at", "message")
+        return self.legacy_report + "".join(event.render() for event in events)
+
+    def log_event(self, message: str, level: str = "info") -> ImportSessionEvent:
+        """Дописать строку в отчет сессии (одна вставка в import_session_events)."""
+        return ImportSessionEvent.append(self.pk, message, level)
+
+    def store_profile(self, profile: dict[str, Any]) -> None:
+        """Сохранить сводку профайлера в report_details["profile"], не затирая статистику импорта."""
+        self.refresh_from_db(fields=["report_details"])
+        self.report_details = {**(self.report_details or {}), "profile": profile}
+        self.save(update_fields=["report_details", "updated_at"])
+
+
+class ImportSessionEventQuerySet(models.QuerySet["ImportSessionEvent"]):
+    """QuerySet журнала событий сессии импорта."""
+
+    def page(self, session_id: int, after_id: int = 0, limit: int = 200) -> list[ImportSessionEvent]:
+        """События сессии с id > after_id по возрастанию (курсорная пагинация)."""
+        return list(self.filter(session_id=session_id, id__gt=after_id).order_by("id")[:limit])
+
+
+class ImportSessionEvent(models.Model):
+    """
+    Строка журнала сессии импорта.
+
+    Журнал только дописывается: каждое сообщение о ходе импорта — одна
+    вставка вместо перезаписи растущего текстового поля ImportSession.
+    """
+
+    class Level(models.TextChoices):
+        INFO = "info", "Информация"
+        WARNING = "warning", "Предупреждение"
+        ERROR = "error", "Ошибка"
+
+    session = cast(
+        ImportSession,
+        models.ForeignKey(
+            ImportSession,
+            on_delete=models.CASCADE,
+            related_name="events",
+            verbose_name="Сессия импорта",
+            # Покрывается составным индексом (session, id)
+            db_index=False,
+        ),
+    )
+    created_at = cast(datetime, models.DateTimeField("Время", default=timezone.now))
+    level = cast(
+        str,
+        models.CharField(
+            "Уровень",
+            max_length=10,
+            choices=Level.choices,
+            default=Level.INFO,
+        ),
+    )
+    message = cast(str, models.TextField("Сообщение"))
+
+    objects = ImportSessionEventQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Событие сессии импорта"
+        verbose_name_plural = "События сессий импорта"
+        db_table = "import_session_events"
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["session", "id"], name="import_event_session_id_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return self.render().rstrip()
+
+    @classmethod
+    def append(cls, session_id: int, message: str, level: str = Level.INFO) -> ImportSessionEvent:
+        """Добавить событие в журнал сессии."""
+        return cls.objects.create(session_id=session_id, message=message, level=level)
+
+    def render(self) -> str:
+        """Строка отчета в формате «[YYYY-MM-DD HH:MM:SS] сообщение»."""
+        return f"[{self.created_at:%Y-%m-%d %H:%M:%S}] {self.message}\n"
+
+
+class ImportStagedRecord(models.Model):
+    """
+    Разобранная строка XML-сегмента 1С, ожидающая применения (конвейерный обмен).
+
+    Сегменты разбираются по мере загрузки (mode=import по файлу), а
+    import_products_from_1c --staged применяет строки по фазам в порядке
+    файлов и позиций.
+    """
+
+    session = cast(
+        ImportSession,
+        models.ForeignKey(
+            ImportSession,
+            on_delete=models.CASCADE,
+            related_name="staged_records",
+            verbose_name="Сессия импорта",
+            # Покрывается составным индексом (session, kind, source_file, position)
+            db_index=False,
+        ),
+    )
+    kind = cast(str, models.CharField("Фаза", max_length=20))
+    source_file = cast(str, models.CharField("Файл", max_length=255))
+    position = cast(int, models.PositiveIntegerField("Позиция в файле"))
+    payload = cast(dict, models.JSONField("Данные", encoder=DjangoJSONEncoder))
+
+    class Meta:
+        verbose_name = "Подготовленная строка импорта"
+        verbose_name_plural = "Подготовленные строки импорта"
+        db_table = "import_staged_records"
+        indexes = [
+            models.Index(fields=["session", "kind", "source_file", "position"], name="import_staged_order_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind}: {self.source_file}#{self.position}"
+
 
 class PriceType(models.Model):
     """
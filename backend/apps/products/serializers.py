@@ -8,7 +8,7 @@ from decimal import Decimal
 from typing import TYPE_CHECKING, Any, cast
 
 from django.core.exceptions import ValidationError
-from django.db.models import Count, Q, Sum
+from django.db.models import Count, Exists, Min, OuterRef, Prefetch, Q, QuerySet, Sum
 from drf_spectacular.utils import extend_schema_field, inline_serializer
 from rest_framework import serializers
 
@@ -530,6 +530,50 @@ class ProductListSerializer(serializers.ModelSerializer):
             "discount_percent",
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset: QuerySet[Product]) -> QuerySet[Product]:
+        """
+        Prefetch и аннотации, которые читают методы сериализатора.
+
+        Без них цены, остатки и атрибуты догружаются отдельными запросами на
+        каждый товар (N+1).
+        """
+        return (
+            queryset.select_related("brand", "category")
+            .prefetch_related(
+                "category__parent",
+                # Story 14.5: Prefetch атрибутов для избежания N+1 queries
+                Prefetch(
+                    "attributes",
+                    queryset=AttributeValue.objects.select_related("attribute"),
+                    to_attr="prefetched_attributes",
+                ),
+                # Prefetch первого варианта для получения цен (для списка)
+                Prefetch(
+                    "variants",
+                    queryset=ProductVariant.objects.filter(
+                        Q(retail_price__gt=0)
+                        | Q(opt1_price__gt=0)
+                        | Q(opt2_price__gt=0)
+                        | Q(opt3_price__gt=0)
+                        | Q(trainer_price__gt=0)
+                        | Q(federation_price__gt=0)
+                    ).order_by("retail_price"),
+                    to_attr="first_variant_list",
+                ),
+            )
+            .annotate(
+                # Аннотации для использования в ProductListSerializer и сортировки
+                total_stock=Sum("variants__stock_quantity"),
+                # Min retail_price для сортировки по цене (после Epic 13)
+                min_retail_price=Min(
+                    "variants__retail_price",
+                    filter=Q(variants__retail_price__gt=0),
+                ),
+                has_stock=Exists(ProductVariant.objects.filter(product=OuterRef("pk"), stock_quantity__gt=0)),
+            )
+        )
+
     def _get_first_variant(self, obj: Product) -> "ProductVariant | None":
         """Получить первый вариант товара с ценой > 0 (кэшированный или из БД)"""
         # Используем prefetched данные
@@ -790,19 +834,17 @@ class ProductDetailSerializer(ProductListSerializer):
     def get_related_products(self, obj):
         """Получить связанные товары из той же категории или бренда"""
         # Сначала товары из той же категории
-        related_by_category = (
-            Product.objects.filter(category=obj.category, is_active=True)
-            .exclude(id=obj.id)
-            .select_related("brand", "category")[:5]
-        )
+        related_by_category = self.setup_eager_loading(
+            Product.objects.filter(category=obj.category, is_active=True).exclude(id=obj.id)
+        )[:5]
 
         # Если меньше 5, добавляем товары того же бренда
         if len(related_by_category) < 5:
-            related_by_brand = (
-                Product.objects.filter(brand=obj.brand, is_active=True)
-                .exclude(id__in=[obj.id] + [p.id for p in related_by_category])
-                .select_related("brand", "category")[: 5 - len(related_by_category)]
-            )
+            related_by_brand = self.setup_eager_loading(
+                Product.objects.filter(brand=obj.brand, is_active=True).exclude(
+                    id__in=[obj.id] + [p.id for p in related_by_category]
+                )
+            )[: 5 - len(related_by_category)]
 
             related_products = list(related_by_category) + list(related_by_brand)
         else:
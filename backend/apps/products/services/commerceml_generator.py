@@ -0,0 +1,388 @@
+"""
+Генератор синтетической выгрузки 1С (CommerceML 3.1) для нагрузочных замеров импорта
+
+Создает структуру каталога, которую ожидает import_products_from_1c:
+
+    groups/groups.xml                   дерево категорий под корнем ROOT_CATEGORY_NAME (до 4 уровней)
+    propertiesGoods/propertiesGoods.xml свойство «Бренд» со справочником брендов
+    propertiesOffers/propertiesOffers.xml характеристики «Размер» и «Цвет» (для import_attributes)
+    priceLists/priceLists.xml           типы цен (розница, опт 1-3, тренер, РРЦ)
+    goods/goods.xml                     товары (Product) с группой, брендом, НДС и картинками
+    offers/offers.xml                   предложения (ProductVariant: размер, цвет)
+    prices/prices.xml                   цены предложений по всем типам цен
+    rests/rests.xml                     остатки предложений по складам
+    goods/import_files/**.jpg           изображения (опционально)
+
+Большие файлы режутся на сегменты по segment_size элементов с именами как у
+пакетной выгрузки 1С (goods_1_2_<uuid>.xml). Идентификаторы детерминированы
+(uuid5 от seed), поэтому повторная генерация с тем же seed дает те же данные,
+а файлы пишутся потоково — память не зависит от масштаба.
+"""
+
+from __future__ import annotations
+
+import io
+import random
+import uuid
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TextIO
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+# Пресеты масштаба: число предложений (ProductVariant)
+SCALES = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "500k": 500_000,
+}
+
+CATALOG_ID = "b1a7c0de-0000-4000-8000-000000000001"
+
+PRICE_TYPES = (
+    ("Розничная", 1.0),
+    ("Опт 1 (300-600 тыс.руб в квартал)", 0.7),
+    ("Опт 2 (150-300 тыс.руб в квартал)", 0.75),
+    ("Опт 3 (50-150 тыс.руб в квартал)", 0.8),
+    ("Тренерская", 0.85),
+    ("РРЦ рекомендованная", 1.05),
+)
+
+SIZES = ("XS", "S", "M", "L", "XL", "2XL", "3XL", "40", "42", "44", "46", "48")
+COLORS = ("черный", "белый", "синий", "красный", "зеленый", "желтый", "серый", "оранжевый")
+PRODUCT_KINDS = (
+    "Кимоно",
+    "Мяч футбольный",
+    "Гантель неопреновая",
+    "Кроссовки беговые",
+    "Перчатки боксерские",
+    "Коврик для йоги",
+    "Скакалка",
+    "Шлем защитный",
+    "Костюм спортивный",
+    "Ракетка теннисная",
+)
+ROOT_CATEGORY = "СПОРТ"
+SECTIONS = ("ТУРИЗМ", "ЕДИНОБОРСТВА", "ФИТНЕС", "ИГРОВЫЕ ВИДЫ", "ЗИМНИЕ ВИДЫ", "ВОДНЫЕ ВИДЫ", "ОДЕЖДА")
+VAT_RATES = ("22", "22", "22", "10")
+IMAGE_SIZE = 128
+
+XML_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<КоммерческаяИнформация xmlns="urn:1C.ru:commerceml_3" '
+    'xmlns:xs="http://www.w3.org/2001/XMLSchema" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+    'ВерсияСхемы="3.1" ДатаФормирования="{date}" Ид="Обмен с сайтом">\n'
+)
+XML_FOOTER = "</КоммерческаяИнформация>\n"
+
+CLASSIFIER_OPEN = (
+    '<Классификатор СодержитТолькоИзменения="false">\n'
+    f"<Ид>{CATALOG_ID}</Ид>\n<Наименование>Товары 1С</Наименование>\n"
+)
+CATALOG_OPEN = (
+    '<Каталог СодержитТолькоИзменения="false">\n'
+    f"<Ид>{CATALOG_ID}</Ид>\n<ИдКлассификатора>{CATALOG_ID}</ИдКлассификатора>\n"
+    "<Наименование>Товары 1С</Наименование>\n<Товары>\n"
+)
+OFFERS_PACKAGE_OPEN = (
+    '<ПакетПредложений СодержитТолькоИзменения="false">\n'
+    f"<Ид>#{CATALOG_ID}</Ид>\n<Наименование>Пакет предложений (Товары 1С)</Наименование>\n"
+    f"<ИдКаталога>{CATALOG_ID}</ИдКаталога>\n<ИдКлассификатора>{CATALOG_ID}</ИдКлассификатора>\n"
+    "<Предложения>\n"
+)
+
+
+@dataclass
+class DatasetSpec:
+    """Параметры синтетической выгрузки."""
+
+    offers: int = SCALES["10k"]
+    variants_per_product: int = 4
+    segment_size: int = 20_000
+    warehouses: int = 2
+    images: bool = False
+    seed: int = 1
+
+    @property
+    def products(self) -> int:
+        return max(1, -(-self.offers // self.variants_per_product))
+
+    @property
+    def categories(self) -> int:
+        return max(10, self.products // 50)
+
+    @property
+    def brands(self) -> int:
+        return max(5, self.products // 100)
+
+
+class CommerceMLDatasetGenerator:
+    """
+    Потоковый генератор выгрузки CommerceML по DatasetSpec.
+
+    Usage:
+        stats = CommerceMLDatasetGenerator(DatasetSpec(offers=100_000)).generate(Path("/tmp/1c"))
+    """
+
+    def __init__(self, spec: DatasetSpec):
+        self.spec = spec
+        self._namespace = uuid.uuid5(uuid.NAMESPACE_URL, f"freesport-commerceml-{spec.seed}")
+        self._date = timezone.now().strftime("%Y-%m-%dT%H:%M:%S")
+        self._leaf_categories: list[str] = []
+        self._image_bytes = b""
+        self.stats: dict[str, int] = {
+            "categories": 0,
+            "brands": 0,
+            "price_types": len(PRICE_TYPES),
+            "products": 0,
+            "offers": 0,
+            "images": 0,
+            "files": 0,
+        }
+
+    def generate(self, output_dir: Path) -> dict[str, int]:
+        """Записать выгрузку в output_dir и вернуть число сгенерированных объектов."""
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for subdir in (
+            "goods",
+            "offers",
+            "prices",
+            "rests",
+            "priceLists",
+            "groups",
+            "propertiesGoods",
+            "propertiesOffers",
+        ):
+            (output_dir / subdir).mkdir(exist_ok=True)
+
+        self._write_groups(output_dir / "groups")
+        self._write_file(
+            output_dir / "propertiesGoods" / "propertiesGoods.xml",
+            CLASSIFIER_OPEN + "<Свойства>\n",
+            self._brand_property(),
+            "</Свойства>\n</Классификатор>\n",
+        )
+        self._write_file(
+            output_dir / "propertiesOffers" / "propertiesOffers.xml",
+            CLASSIFIER_OPEN + "<Свойства>\n",
+            [self._reference_property("Размер", SIZES), self._reference_property("Цвет", COLORS)],
+            "</Свойства>\n</Классификатор>\n",
+        )
+        self._write_file(
+            output_dir / "priceLists" / "priceLists.xml",
+            CLASSIFIER_OPEN + "<ТипыЦен>\n",
+            (self._price_type(index, name) for index, (name, _) in enumerate(PRICE_TYPES)),
+            "</ТипыЦен>\n</Классификатор>\n",
+        )
+        self._write_segments(
+            output_dir / "goods", "goods", self.spec.products, self._product, CATALOG_OPEN, "</Товары>\n</Каталог>\n"
+        )
+        offers_close = "</Предложения>\n</ПакетПредложений>\n"
+        for subdir, build in (("offers", self._offer), ("prices", self._offer_prices), ("rests", self._offer_rests)):
+            self._write_segments(
+                output_dir / subdir, subdir, self.spec.offers, build, OFFERS_PACKAGE_OPEN, offers_close
+            )
+        self.stats["offers"] = self.spec.offers
+        self.stats["products"] = self.spec.products
+
+        if self.spec.images:
+            self._write_images(output_dir / "goods" / "import_files")
+        return self.stats
+
+    # ------------------------------------------------------------------
+    # Идентификаторы
+    # ------------------------------------------------------------------
+
+    def _id(self, kind: str, index: int | str) -> str:
+        return str(uuid.uuid5(self._namespace, f"{kind}:{index}"))
+
+    def _product_index(self, offer_index: int) -> int:
+        return offer_index // self.spec.variants_per_product
+
+    def _offer_id(self, offer_index: int) -> str:
+        product_id = self._id("product", self._product_index(offer_index))
+        return f"{product_id}#{self._id('characteristic', offer_index)}"
+
+    def _image_path(self, product_index: int, image_index: int) -> str:
+        product_id = self._id("product", product_index)
+        return f"import_files/{product_id[:2]}/{product_id}_{self._id('image', product_index * 10 + image_index)}.jpg"
+
+    # ------------------------------------------------------------------
+    # Запись файлов
+    # ------------------------------------------------------------------
+
+    def _write_file(self, path: Path, opening: str, elements: Iterable[str], closing: str) -> None:
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write(XML_HEADER.format(date=self._date))
+            stream.write(opening)
+            for element in elements:
+                stream.write(element)
+            stream.write(closing)
+            stream.write(XML_FOOTER)
+        self.stats["files"] += 1
+
+    def _write_segments(self, directory: Path, prefix: str, total: int, build, opening: str, closing: str) -> None:
+        """Один файл prefix.xml или сегменты prefix_1_N_<uuid>.xml по segment_size элементов."""
+        segment_size = self.spec.segment_size or total
+        if total <= segment_size:
+            self._write_file(directory / f"{prefix}.xml", opening, map(build, range(total)), closing)
+            return
+        for number, start in enumerate(range(0, total, segment_size), start=1):
+            name = f"{prefix}_1_{number}_{self._id(f'segment-{prefix}', number)}.xml"
+            indexes = range(start, min(start + segment_size, total))
+            self._write_file(directory / name, opening, map(build, indexes), closing)
+
+    def _write_groups(self, directory: Path) -> None:
+        # Корень — якорная категория ROOT_CATEGORY_NAME, под ним разделы и до двух уровней подгрупп
+        rng = random.Random(self.spec.seed)
+        children: dict[int, list[int]] = {0: []}
+        depth = {0: 1}
+        for index in range(1, self.spec.categories):
+            if index <= len(SECTIONS):
+                parent = 0
+            else:
+                parent = rng.choice([candidate for candidate in range(1, index) if depth[candidate] < 4][-50:])
+            children.setdefault(parent, []).append(index)
+            depth[index] = depth[parent] + 1
+        self._leaf_categories = [self._id("group", index) for index in depth if index not in children]
+        self.stats["categories"] = self.spec.categories
+
+        def render(index: int, stream: TextIO) -> None:
+            if index == 0:
+                name = ROOT_CATEGORY
+            elif index <= len(SECTIONS):
+                name = SECTIONS[index - 1]
+            else:
+                name = f"Группа {index}"
+            stream.write(f"<Группа>\n<Ид>{self._id('group', index)}</Ид>\n")
+            stream.write("<ПометкаУдаления>false</ПометкаУдаления>\n")
+            stream.write(f"<Наименование>{escape(name)}</Наименование>\n")
+            if index in children:
+                stream.write("<Группы>\n")
+                for child in children[index]:
+                    render(child, stream)
+                stream.write("</Группы>\n")
+            stream.write("</Группа>\n")
+
+        buffer = io.StringIO()
+        render(0, buffer)
+        self._write_file(
+            directory / "groups.xml",
+            CLASSIFIER_OPEN + "<Группы>\n",
+            [buffer.getvalue()],
+            "</Группы>\n</Классификатор>\n",
+        )
+
+    def _write_images(self, directory: Path) -> None:
+        for product_index in range(self.spec.products):
+            path = directory / self._image_path(product_index, 0).removeprefix("import_files/")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(self._jpeg())
+            self.stats["images"] += 1
+
+    def _jpeg(self) -> bytes:
+        # Шум почти не сжимается: ~13 КБ, больше FALLBACK_MIN_IMAGE_SIZE_BYTES импортера
+        if not self._image_bytes:
+            from PIL import Image
+
+            pixels = random.Random(self.spec.seed).randbytes(IMAGE_SIZE * IMAGE_SIZE * 3)
+            buffer = io.BytesIO()
+            Image.frombytes("RGB", (IMAGE_SIZE, IMAGE_SIZE), pixels).save(buffer, "JPEG", quality=85)
+            self._image_bytes = buffer.getvalue()
+        return self._image_bytes
+
+    # ------------------------------------------------------------------
+    # Элементы
+    # ------------------------------------------------------------------
+
+    def _brand_property(self) -> Iterator[str]:
+        self.stats["brands"] = self.spec.brands
+        yield "<Свойство>\n<Ид>Бренд</Ид>\n<Наименование>Бренд</Наименование>\n"
+        yield "<ТипЗначений>Справочник</ТипЗначений>\n<ВариантыЗначений>\n"
+        for index in range(self.spec.brands):
+            yield (
+                f"<Справочник><ИдЗначения>{self._id('brand', index)}</ИдЗначения>"
+                f"<Значение>Brand {index:05d}</Значение></Справочник>\n"
+            )
+        yield "</ВариантыЗначений>\n</Свойство>\n"
+
+    def _reference_property(self, name: str, values: Iterable[str]) -> str:
+        options = "".join(
+            f"<Справочник><ИдЗначения>{self._id(f'{name}-value', index)}</ИдЗначения>"
+            f"<Значение>{escape(value)}</Значение></Справочник>\n"
+            for index, value in enumerate(values)
+        )
+        return (
+            f"<Свойство>\n<Ид>{self._id('property', name)}</Ид>\n"
+            f"<Наименование>{escape(name)}</Наименование>\n<ТипЗначений>Справочник</ТипЗначений>\n"
+            f"<ВариантыЗначений>\n{options}</ВариантыЗначений>\n</Свойство>\n"
+        )
+
+    def _price_type(self, index: int, name: str) -> str:
+        return (
+            f"<ТипЦены>\n<Ид>{self._id('price-type', index)}</Ид>\n"
+            f"<Наименование>{escape(name)}</Наименование>\n<Валюта>RUB</Валюта>\n"
+            "<Налог><Наименование>НДС</Наименование><УчтеноВСумме>true</УчтеноВСумме></Налог>\n"
+            "</ТипЦены>\n"
+        )
+
+    def _product(self, index: int) -> str:
+        kind = PRODUCT_KINDS[index % len(PRODUCT_KINDS)]
+        brand = index % self.spec.brands
+        category = self._leaf_categories[index % len(self._leaf_categories)]
+        images = f"<Картинка>{self._image_path(index, 0)}</Картинка>\n" if self.spec.images else ""
+        return (
+            f"<Товар>\n<Ид>{self._id('product', index)}</Ид>\n"
+            "<ПометкаУдаления>false</ПометкаУдаления>\n"
+            f"<Артикул>FS-{index:07d}</Артикул>\n"
+            f"<Наименование>{kind} Brand {brand:05d} FS-{index:07d}</Наименование>\n"
+            "<БазоваяЕдиница>796</БазоваяЕдиница>\n"
+            f"<Группы><Ид>{category}</Ид></Группы>\n"
+            f"<Описание>{escape(kind)} для тренировок и соревнований. Модель FS-{index:07d}.</Описание>\n"
+            f"{images}"
+            "<ЗначенияСвойств>\n"
+            f"<ЗначенияСвойства><Ид>Бренд</Ид><Значение>{self._id('brand', brand)}</Значение></ЗначенияСвойства>\n"
+            "</ЗначенияСвойств>\n"
+            "<СтавкиНалогов><СтавкаНалога><Наименование>НДС</Наименование>"
+            f"<Ставка>{VAT_RATES[index % len(VAT_RATES)]}</Ставка></СтавкаНалога></СтавкиНалогов>\n"
+            "</Товар>\n"
+        )
+
+    def _offer(self, index: int) -> str:
+        product_index = self._product_index(index)
+        size = SIZES[index % len(SIZES)]
+        color = COLORS[product_index % len(COLORS)]
+        kind = PRODUCT_KINDS[product_index % len(PRODUCT_KINDS)]
+        return (
+            f"<Предложение>\n<Ид>{self._offer_id(index)}</Ид>\n"
+            "<ПометкаУдаления>false</ПометкаУдаления>\n"
+            f"<Артикул>FS-{product_index:07d}-{index % self.spec.variants_per_product}</Артикул>\n"
+            f"<Наименование>{kind} FS-{product_index:07d}, {color} ({size})</Наименование>\n"
+            "<ХарактеристикиТовара>\n"
+            f"<ХарактеристикаТовара><Наименование>Размер</Наименование><Значение>{size}</Значение>"
+            "</ХарактеристикаТовара>\n"
+            f"<ХарактеристикаТовара><Наименование>Цвет</Наименование><Значение>{color}</Значение>"
+            "</ХарактеристикаТовара>\n"
+            "</ХарактеристикиТовара>\n"
+            "</Предложение>\n"
+        )
+
+    def _offer_prices(self, index: int) -> str:
+        base = 500 + (index * 37) % 20_000
+        prices = "".join(
+            f"<Цена><ИдТипаЦены>{self._id('price-type', type_index)}</ИдТипаЦены>"
+            f"<ЦенаЗаЕдиницу>{round(base * ratio)}</ЦенаЗаЕдиницу><Валюта>RUB</Валюта></Цена>\n"
+            for type_index, (_, ratio) in enumerate(PRICE_TYPES)
+        )
+        return f"<Предложение>\n<Ид>{self._offer_id(index)}</Ид>\n<Цены>\n{prices}</Цены>\n</Предложение>\n"
+
+    def _offer_rests(self, index: int) -> str:
+        rests = "".join(
+            f"<Остаток><Склад><Ид>{self._id('warehouse', warehouse)}</Ид>"
+            f"<Количество>{(index + warehouse * 7) % 25}</Количество></Склад></Остаток>\n"
+            for warehouse in range(self.spec.warehouses)
+        )
+        return f"<Предложение>\n<Ид>{self._offer_id(index)}</Ид>\n<Остатки>\n{rests}</Остатки>\n</Предложение>\n"
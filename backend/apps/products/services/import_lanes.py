@@ -0,0 +1,134 @@
+"""
+Очереди импорта 1С: цены и остатки отдельно от каталога
+
+Обмен только ценами/остатками (prices, rests, priceLists) идет в приоритетную
+очередь ONEC_EXCHANGE["PRIORITY_IMPORT_QUEUE"] со своим пулом воркеров, а не
+ждет за 40-минутным импортом каталога в общей очереди. Сессии такого обмена
+помечаются ImportSession.priority. Обмен классифицируется по файлам своей
+сессии, а не по общему каталогу импорта (там лежат файлы идущего импорта
+каталога); его файлы переносятся в отдельный каталог priority_data_dir,
+чтобы не читать и не удалять файлы импорта каталога.
+
+Импорт каталога вытесняемый: между фазами import_products_from_1c
+(PriorityImportGate) он ждет, пока завершатся активные приоритетные сессии, —
+срочное обновление остатков проходит между фазами, а не после всего каталога.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+
+from apps.products.models import ImportSession
+
+logger = logging.getLogger("import_products")
+
+# Типы файлов (ImportOrchestratorService._detect_file_type) приоритетной очереди
+PRIORITY_FILE_TYPES = frozenset({"prices", "rests"})
+# Типы выборочного импорта из админки (run_selective_import_task)
+PRIORITY_IMPORT_TYPES = frozenset({"stocks", "prices"})
+
+PROCESS_IMPORT_TASK = "apps.products.tasks.process_1c_import_task"
+SELECTIVE_IMPORT_TASK = "apps.integrations.tasks.run_selective_import_task"
+
+ACTIVE_STATUSES = (
+    ImportSession.ImportStatus.PENDING,
+    ImportSession.ImportStatus.STARTED,
+    ImportSession.ImportStatus.IN_PROGRESS,
+)
+
+
+def priority_queue() -> str:
+    """Имя приоритетной очереди; пустая строка — все импорты в общей очереди."""
+    return str(settings.ONEC_EXCHANGE.get("PRIORITY_IMPORT_QUEUE") or "")
+
+
+def is_priority_batch(file_types: Iterable[str]) -> bool:
+    """Пакет обмена состоит только из цен и остатков."""
+    types = set(file_types)
+    return bool(types) and types <= PRIORITY_FILE_TYPES
+
+
+def priority_data_dir(session_key: str) -> Path:
+    """Каталог файлов приоритетного обмена: ONEC_EXCHANGE["PRIORITY_IMPORT_DIR"]/<sessid>."""
+    return Path(str(settings.ONEC_EXCHANGE["PRIORITY_IMPORT_DIR"])) / Path(session_key).name
+
+
+def route_import_task(
+    name: str, args: tuple[Any, ...], kwargs: dict[str, Any], options: dict[str, Any], task: Any = None, **kw: Any
+) -> dict[str, str] | None:
+    """
+    Маршрутизатор Celery (CELERY_TASK_ROUTES): приоритетные импорты — в свою очередь.
+
+    Остальные задачи маршрутизируются по умолчанию (None).
+    """
+    queue = priority_queue()
+    if not queue:
+        return None
+    if name == PROCESS_IMPORT_TASK and kwargs.get("priority"):
+        return {"queue": queue}
+    if name == SELECTIVE_IMPORT_TASK:
+        selected_types = args[0] if args else kwargs.get("selected_types") or []
+        if selected_types and set(selected_types) <= PRIORITY_IMPORT_TYPES:
+            return {"queue": queue}
+    return None
+
+
+def active_priority_sessions(exclude_pk: int | None = None) -> list[int]:
+    """ID приоритетных сессий, которые ждут воркера или выполняются."""
+    queryset = ImportSession.objects.filter(priority=True, status__in=ACTIVE_STATUSES)
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    return list(queryset.values_list("pk", flat=True))
+
+
+class PriorityImportGate:
+    """Точки вытеснения импорта каталога на границах фаз"""
+
+    POLL_SECONDS = 5.0
+
+    def __init__(self, session: ImportSession, max_wait: float | None = None):
+        self.session = session
+        if max_wait is None:
+            max_wait = float(settings.ONEC_EXCHANGE.get("PRIORITY_PREEMPTION_MAX_WAIT_SECONDS", 0))
+        # Бюджет ожидания на весь импорт: зависшая приоритетная сессия
+        # (до cleanup_stale_import_sessions) не останавливает каталог надолго
+        self.remaining = max_wait
+        self.waited = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return not self.session.priority and self.remaining > 0
+
+    def wait(self, phase: str, log: Callable[[str], None]) -> float:
+        """
+        Перед фазой phase дождаться завершения активных приоритетных сессий.
+
+        Returns:
+            Секунды ожидания перед этой фазой
+        """
+        if not self.enabled:
+            return 0.0
+        blocking = active_priority_sessions(exclude_pk=self.session.pk)
+        if not blocking:
+            return 0.0
+
+        log(f"Фаза {phase} отложена: выполняются приоритетные импорты цен/остатков {blocking}")
+        started = time.monotonic()
+        while blocking and time.monotonic() - started < self.remaining:
+            time.sleep(min(self.POLL_SECONDS, self.remaining))
+            blocking = active_priority_sessions(exclude_pk=self.session.pk)
+
+        waited = time.monotonic() - started
+        self.remaining = max(self.remaining - waited, 0.0)
+        self.waited += waited
+        if blocking:
+            log(f"Бюджет ожидания приоритетных импортов исчерпан, фаза {phase} продолжена ({waited:.1f} с)")
+        else:
+            log(f"Приоритетные импорты завершены, фаза {phase} продолжена ({waited:.1f} с)")
+        return waited
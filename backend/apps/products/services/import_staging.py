@@ -0,0 +1,204 @@
+"""
+Подготовка XML-сегментов 1С к импорту (конвейерный обмен)
+
+При ONEC_EXCHANGE["PIPELINED_IMPORT"] каждый сегмент разбирается сразу после
+mode=import по этому файлу, пока 1С продолжает загружать остальные, а строки
+сохраняются в ImportStagedRecord. На mode=complete
+import_products_from_1c --staged дополняет подготовку файлами, которые не
+успели разобрать (на диске и в архивах), и применяет строки по фазам —
+время обмена ≈ max(загрузка, импорт) вместо их суммы.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Any
+
+from django.db import transaction
+
+from apps.integrations.onec_exchange.routing_service import xml_subdir
+from apps.products.models import ImportSession, ImportStagedRecord
+from apps.products.services.parser import XMLDataParser, XMLSource
+
+if TYPE_CHECKING:
+    from apps.integrations.onec_exchange.zip_source import ZipImportSource
+
+logger = logging.getLogger("import_products")
+
+# Фаза (подпапка в Command._collect_xml_files) -> (метод парсера, источники: (подпапка, префикс имени))
+STAGED_KINDS: dict[str, tuple[str, tuple[tuple[str, str], ...]]] = {
+    "groups": (
+        "parse_groups_xml",
+        (("groups", "groups"), ("groups", "import"), ("goods", "groups"), ("goods", "import")),
+    ),
+    "propertiesGoods": ("parse_properties_goods_xml", (("propertiesGoods", "propertiesGoods"),)),
+    "priceLists": ("parse_price_lists_xml", (("priceLists", "priceLists"),)),
+    "goods": ("parse_goods_xml", (("goods", "goods"), ("goods", "import"))),
+    "offers": ("parse_offers_xml", (("offers", "offers"),)),
+    "prices": ("parse_prices_xml", (("prices", "prices"),)),
+    "rests": ("parse_rests_xml", (("rests", "rests"),)),
+}
+
+STAGED_SUBDIRS = sorted({subdir for _, sources in STAGED_KINDS.values() for subdir, _ in sources})
+
+
+def staged_kinds(subdir: str, filename: str) -> list[str]:
+    """Фазы, которые читают файл filename из подпапки subdir (import.xml — и groups, и goods)."""
+    name = filename.lower()
+    return [
+        kind
+        for kind, (_, sources) in STAGED_KINDS.items()
+        if any(
+            subdir == source_subdir and (name == f"{prefix.lower()}.xml" or name.startswith(f"{prefix.lower()}_"))
+            for source_subdir, prefix in sources
+        )
+    ]
+
+
+def staged_source_key(subdir: str, filename: str) -> str:
+    """
+    Ключ строк файла в staging: путь относительно каталога импорта.
+
+    Сегменты с одинаковым именем в разных подпапках (goods/import.xml и
+    groups/import.xml) не перезаписывают строки друг друга.
+    """
+    return PurePosixPath(subdir, filename).as_posix()
+
+
+def _restore(kind: str, payload: dict[str, Any]) -> dict[str, Any]:
+    """Вернуть Decimal, сериализованные DjangoJSONEncoder строкой."""
+    if kind == "goods" and payload.get("vat_rate") is not None:
+        payload["vat_rate"] = Decimal(payload["vat_rate"])
+    elif kind == "prices":
+        for price in payload.get("prices", []):
+            price["value"] = Decimal(price["value"])
+    return payload
+
+
+@dataclass(frozen=True)
+class StagedSource:
+    """Подготовленный файл: строки одной фазы в порядке файла."""
+
+    session_id: int
+    kind: str
+    source_file: str
+
+    @property
+    def name(self) -> str:
+        return self.source_file
+
+    def rows(self) -> list[dict[str, Any]]:
+        payloads = (
+            ImportStagedRecord.objects.filter(session_id=self.session_id, kind=self.kind, source_file=self.source_file)
+            .order_by("position")
+            .values_list("payload", flat=True)
+        )
+        return [_restore(self.kind, payload) for payload in payloads.iterator(chunk_size=2000)]
+
+    def __str__(self) -> str:
+        return f"{self.source_file} (staging)"
+
+
+class ImportStagingService:
+    """Разбор сегментов в ImportStagedRecord и чтение их по фазам"""
+
+    BATCH_SIZE = 2000
+
+    def __init__(self, session_id: int):
+        self.session_id = session_id
+        self.parser = XMLDataParser()
+
+    def stage(self, source: XMLSource, subdir: str) -> dict[str, int]:
+        """
+        Разобрать файл (или XML-член архива) и заменить его строки в staging.
+
+        Повторная подготовка того же файла идемпотентна: строки файла
+        удаляются и вставляются в одной транзакции под блокировкой сессии.
+
+        Returns:
+            Число строк по фазам
+        """
+        name = Path(source).name if isinstance(source, str) else source.name
+        parsed = {kind: getattr(self.parser, STAGED_KINDS[kind][0])(source) for kind in staged_kinds(subdir, name)}
+        if not parsed:
+            return {}
+        source_file = staged_source_key(subdir, name)
+
+        with transaction.atomic():
+            # Сериализует задачи подготовки одной сессии (delete + insert одного файла)
+            ImportSession.objects.select_for_update().filter(pk=self.session_id).first()
+            ImportStagedRecord.objects.filter(session_id=self.session_id, source_file=source_file).delete()
+            for kind, items in parsed.items():
+                ImportStagedRecord.objects.bulk_create(
+                    [
+                        ImportStagedRecord(
+                            session_id=self.session_id,
+                            kind=kind,
+                            source_file=source_file,
+                            position=position,
+                            payload=item,
+                        )
+                        for position, item in enumerate(items)
+                    ],
+                    batch_size=self.BATCH_SIZE,
+                )
+
+        counts = {kind: len(items) for kind, items in parsed.items()}
+        logger.info(f"Staged {source_file} for session {self.session_id}: {counts}")
+        return counts
+
+    def stage_file(self, path: Path) -> dict[str, int]:
+        """Подготовить маршрутизированный файл и удалить его: данные уже в staging."""
+        try:
+            counts = self.stage(str(path), path.parent.name)
+        except FileNotFoundError:
+            # Уже подготовлен и удален параллельной задачей
+            return {}
+        if counts:
+            path.unlink(missing_ok=True)
+        return counts
+
+    def stage_pending(self, data_dir: str | Path, archive: ZipImportSource | None = None) -> int:
+        """
+        Подготовить файлы, которые не успели разобрать во время загрузки.
+
+        Returns:
+            Число подготовленных файлов
+        """
+        staged = 0
+        for subdir in STAGED_SUBDIRS:
+            directory = Path(data_dir) / subdir
+            if not directory.is_dir():
+                continue
+            for path in sorted(directory.iterdir()):
+                if path.is_file() and path.suffix.lower() == ".xml" and self.stage_file(path):
+                    staged += 1
+
+        if archive:
+            members = {
+                member
+                for _, sources in STAGED_KINDS.values()
+                for subdir, prefix in sources
+                for member in archive.xml_members(subdir, prefix)
+            }
+            for member in sorted(members, key=str):
+                if self.stage(member, xml_subdir(member.name) or ""):
+                    staged += 1
+        return staged
+
+    def sources(self, kind: str) -> list[StagedSource]:
+        """Подготовленные файлы фазы в порядке имен (goods.xml раньше goods_1_*.xml)."""
+        names = (
+            ImportStagedRecord.objects.filter(session_id=self.session_id, kind=kind)
+            .values_list("source_file", flat=True)
+            .distinct()
+            .order_by("source_file")
+        )
+        return [StagedSource(self.session_id, kind, name) for name in names]
+
+    def clear(self) -> int:
+        deleted, _ = ImportStagedRecord.objects.filter(session_id=self.session_id).delete()
+        return deleted
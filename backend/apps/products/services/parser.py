@@ -4,12 +4,24 @@ XMLDataParser - парсер для XML файлов из 1С (CommerceML 3.1)
 
 import os
 from decimal import Decimal
-from typing import Any, Iterator, TypedDict, cast
+from typing import TYPE_CHECKING, Any, Iterator, TypedDict, Union, cast
 from xml.etree.ElementTree import Element, ElementTree
 
 import defusedxml.ElementTree as ET
 from django.conf import settings
 
+if TYPE_CHECKING:
+    from apps.integrations.onec_exchange.zip_source import ZipMember
+
+# Путь к XML-файлу или XML-член архива 1С (читается потоком без распаковки)
+XMLSource = Union[str, "ZipMember"]
+
+# Пакеты CommerceML, помечаемые атрибутом СодержитТолькоИзменения
+PACKAGE_TAGS = frozenset({"Классификатор", "Каталог", "ПакетПредложений", "ИзмененияПакетаПредложений"})
+CHANGES_ONLY_ATTR = "СодержитТолькоИзменения"
+# Первые элементы данных: атрибуты пакетов уже прочитаны
+PACKAGE_DATA_TAGS = frozenset({"Товар", "Предложение"})
+
 
 class PropertyValueData(TypedDict):
     """Данные значения свойства из goods.xml"""
@@ -93,6 +105,7 @@ class XMLDataParser:
     - parse_prices_xml() - парсинг prices.xml (цены)
     - parse_rests_xml() - парсинг rests.xml (остатки)
     - parse_price_lists_xml() - парсинг priceLists.xml (типы цен)
+    - is_changes_only() - пакет изменений или полная выгрузка
     """
 
     MAX_FILE_SIZE = getattr(settings, "IMPORT_MAX_FILE_SIZE", 100) * 1024 * 1024  # MB to bytes
@@ -100,21 +113,28 @@ class XMLDataParser:
     def __init__(self):
         pass
 
-    def _validate_file(self, file_path: str) -> None:
+    def _validate_file(self, file_path: XMLSource) -> None:
         """Валидация файла перед парсингом"""
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
-
-        file_size = os.path.getsize(file_path)
+        if isinstance(file_path, str):
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"File not found: {file_path}")
+            file_size = os.path.getsize(file_path)
+        else:
+            # Размер члена архива после распаковки — из заголовка ZIP
+            file_size = file_path.size
         if file_size > self.MAX_FILE_SIZE:
             raise ValueError(f"File size {file_size} bytes exceeds limit {self.MAX_FILE_SIZE} bytes")
 
-    def _safe_parse_xml(self, file_path: str) -> ElementTree:
+    def _safe_parse_xml(self, file_path: XMLSource) -> ElementTree:
         """Безопасный парсинг XML с защитой от XXE и XML Bomb"""
         self._validate_file(file_path)
 
         try:
-            tree: ElementTree = cast(ElementTree, ET.parse(file_path))
+            if isinstance(file_path, str):
+                tree: ElementTree = cast(ElementTree, ET.parse(file_path))
+            else:
+                with file_path.open() as stream:
+                    tree = cast(ElementTree, ET.parse(stream))
             root = cast(Element, tree.getroot())
             self._strip_namespace(root)
             return tree
@@ -129,6 +149,30 @@ class XMLDataParser:
             if local_tag:
                 elem.tag = local_tag
 
+    def is_changes_only(self, file_path: XMLSource) -> bool:
+        """
+        Файл — пакет изменений (СодержитТолькоИзменения="true"), а не полная выгрузка.
+
+        Читает заголовок потоком до первого <Товар>/<Предложение>, не разбирая
+        данные. Если хотя бы один пакет файла (Классификатор, Каталог,
+        ПакетПредложений) содержит только изменения, файл считается пакетом
+        изменений: полные проходы по каталогу для него недопустимы.
+        """
+        self._validate_file(file_path)
+        stream = open(file_path, "rb") if isinstance(file_path, str) else file_path.open()
+        try:
+            for _, elem in ET.iterparse(stream, events=("start",)):
+                tag = self._get_local_tag(elem.tag)
+                if tag in PACKAGE_DATA_TAGS:
+                    break
+                if tag in PACKAGE_TAGS and elem.get(CHANGES_ONLY_ATTR, "").strip().lower() == "true":
+                    return True
+        except ET.ParseError as e:
+            raise ValueError(f"Invalid XML structure in {file_path}: {e}")
+        finally:
+            stream.close()
+        return False
+
     def _get_local_tag(self, tag: Any) -> str:
         """Возвращает имя тега без namespace."""
 
@@ -239,7 +283,7 @@ class XMLDataParser:
 
         return normalized
 
-    def parse_goods_xml(self, file_path: str) -> list[GoodsData]:
+    def parse_goods_xml(self, file_path: XMLSource) -> list[GoodsData]:
         """
         Парсинг goods.xml - базовые товары.
 
@@ -247,7 +291,7 @@ class XMLDataParser:
         включая валидацию и нормализацию путей к изображениям.
 
         Args:
-            file_path: Путь к goods.xml файлу
+            file_path: Путь к goods.xml файлу или XML-член архива (ZipMember)
 
         Returns:
             Список словарей GoodsData с данными товаров
@@ -332,7 +376,7 @@ class XMLDataParser:
 
         return goods_list
 
-    def parse_offers_xml(self, file_path: str) -> list[OfferData]:
+    def parse_offers_xml(self, file_path: XMLSource) -> list[OfferData]:
         """Парсинг offers.xml - торговые предложения (SKU)"""
         tree = self._safe_parse_xml(file_path)
         root = cast(Element, tree.getroot())
@@ -379,7 +423,7 @@ class XMLDataParser:
 
         return offers_list
 
-    def parse_prices_xml(self, file_path: str) -> list[PriceData]:
+    def parse_prices_xml(self, file_path: XMLSource) -> list[PriceData]:
         """Парсинг prices.xml - цены"""
         tree = self._safe_parse_xml(file_path)
         root = cast(Element, tree.getroot())
@@ -417,7 +461,7 @@ class XMLDataParser:
 
         return prices_list
 
-    def parse_rests_xml(self, file_path: str) -> list[RestData]:
+    def parse_rests_xml(self, file_path: XMLSource) -> list[RestData]:
         """Парсинг rests.xml - остатки"""
         tree = self._safe_parse_xml(file_path)
         root = cast(Element, tree.getroot())
@@ -461,7 +505,7 @@ class XMLDataParser:
 
         return rests_list
 
-    def parse_price_lists_xml(self, file_path: str) -> list[PriceTypeData]:
+    def parse_price_lists_xml(self, file_path: XMLSource) -> list[PriceTypeData]:
         """Парсинг priceLists.xml - типы цен"""
         tree = self._safe_parse_xml(file_path)
         root = cast(Element, tree.getroot())
@@ -486,7 +530,7 @@ class XMLDataParser:
 
         return price_types
 
-    def parse_groups_xml(self, file_path: str) -> list[CategoryData]:
+    def parse_groups_xml(self, file_path: XMLSource) -> list[CategoryData]:
         """
         Парсинг groups.xml - иерархия категорий (Story 3.1.2)
 
@@ -558,7 +602,7 @@ class XMLDataParser:
             # По умолчанию - розничная цена
             return "retail_price"
 
-    def parse_properties_goods_xml(self, file_path: str) -> list[BrandData]:
+    def parse_properties_goods_xml(self, file_path: XMLSource) -> list[BrandData]:
         """
         Парсинг propertiesGoods.xml - свойства товаров (бренды)
 
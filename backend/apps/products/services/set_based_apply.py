@@ -0,0 +1,335 @@
+"""
+Применение цен и остатков 1С множественными SQL-операциями (PostgreSQL)
+
+Вместо save() по строке (update_variant_prices / update_variant_stock)
+разобранные строки фазы загружаются через COPY во временные таблицы
+(нежурналируемые, видны только соединению импорта), варианты
+сопоставляются по onec_id двумя UPDATE ... FROM, а затем все варианты фазы
+обновляются одним UPDATE ... FROM в короткой транзакции: витрина видит цены
+(остатки) либо до импорта, либо после, без наполовину обновленного каталога.
+
+Семантика совпадает с построчным режимом: последняя цена типа побеждает,
+РРЦ заполняет retail_price, остатки суммируются по ключу onec_id, основной
+склад — с наибольшим остатком (текущий при равенстве, иначе первый в файле).
+Число строк по фазам пишется в stats["apply"] → report_details сессии.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+from typing import TYPE_CHECKING, Any, Iterable
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+if TYPE_CHECKING:
+    from apps.products.services.variant_import import VariantImportProcessor
+
+logger = logging.getLogger("import_products")
+
+PRICE_FIELDS = (
+    "retail_price",
+    "opt1_price",
+    "opt2_price",
+    "opt3_price",
+    "trainer_price",
+    "federation_price",
+    "rrp",
+    "msrp",
+)
+
+# Сколько строк буферизуется перед одним COPY
+COPY_BATCH_SIZE = 50_000
+
+
+def set_based_apply_supported() -> bool:
+    """COPY и UPDATE ... FROM — только PostgreSQL; на других СУБД — построчный режим."""
+    return connection.vendor == "postgresql"
+
+
+def _copy_value(value: Any) -> str:
+    """Значение в текстовом формате COPY"""
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class SetBasedApplyService:
+    """Фазы prices и rests: COPY во временную таблицу и слияние одним UPDATE"""
+
+    def __init__(self, processor: VariantImportProcessor):
+        self.processor = processor
+        self._table: str | None = None
+        self._columns: tuple[str, ...] = ()
+        self._buffer: list[tuple[Any, ...]] = []
+        self._seq = 0
+
+    # ------------------------------------------------------------------
+    # Загрузка строк
+    # ------------------------------------------------------------------
+
+    def begin(self, kind: str) -> None:
+        """Создать временную таблицу фазы (prices или rests)"""
+        if kind == "prices":
+            ddl = "seq bigint, onec_id text, field text, value numeric, variant_id bigint"
+            self._columns = ("seq", "onec_id", "field", "value")
+        elif kind == "rests":
+            ddl = "seq bigint, onec_id text, warehouse_id text, quantity bigint, variant_id bigint"
+            self._columns = ("seq", "onec_id", "warehouse_id", "quantity")
+        else:
+            raise ValueError(f"Unsupported set-based phase: {kind}")
+
+        self._table = f"import_apply_{kind}"
+        self._buffer = []
+        self._seq = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{self._table}")
+            cursor.execute(f"CREATE TEMPORARY TABLE {self._table} ({ddl})")
+
+    def add_prices(self, items: Iterable[dict[str, Any]]) -> None:
+        """Строки prices.xml → (onec_id, поле варианта, цена) по маппингу PriceType"""
+        price_fields = self._price_type_fields()
+        for item in items:
+            self._seq += 1
+            onec_id = item.get("id")
+            if not onec_id:
+                self.processor._log_error("Missing id in price_data", item)
+                continue
+
+            updates: dict[str, Any] = {}
+            for price in item.get("prices", []):
+                field_name = price_fields.get(price.get("price_type_id") or "")
+                if field_name and price.get("value") is not None:
+                    updates[field_name] = price["value"]
+            # РРЦ из 1С является базовой розничной ценой для сайта
+            if "rrp" in updates and "retail_price" not in updates:
+                updates["retail_price"] = updates["rrp"]
+
+            # Строка без цен тоже загружается: отсутствующий вариант — предупреждение, как построчно
+            for field_name, value in updates.items() or [(None, None)]:
+                self._append((self._seq, onec_id, field_name, value))
+
+    def add_rests(self, items: Iterable[dict[str, Any]]) -> None:
+        """Строки rests.xml → (onec_id, склад, количество)"""
+        for item in items:
+            self._seq += 1
+            onec_id = item.get("id")
+            if not onec_id:
+                self.processor._log_error("Missing id in rest_data", item)
+                continue
+            warehouse_id = str(item.get("warehouse_id") or "").strip()
+            self._append((self._seq, onec_id, warehouse_id, int(item.get("quantity", 0))))
+
+    def _append(self, row: tuple[Any, ...]) -> None:
+        self._buffer.append(row)
+        if len(self._buffer) >= COPY_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        data = io.StringIO()
+        for row in self._buffer:
+            data.write("\t".join(_copy_value(value) for value in row))
+            data.write("\n")
+        data.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {self._table} ({', '.join(self._columns)}) FROM STDIN", data)
+        self._buffer = []
+
+    def _price_type_fields(self) -> dict[str, str]:
+        """onec_id типа цены → поле ProductVariant (как PriceType.objects...first())"""
+        from apps.products.models import PriceType
+
+        fields: dict[str, str] = {}
+        for onec_id, product_field in PriceType.objects.filter(is_active=True).values_list("onec_id", "product_field"):
+            if product_field in PRICE_FIELDS:
+                fields.setdefault(onec_id, product_field)
+        return fields
+
+    # ------------------------------------------------------------------
+    # Сопоставление и слияние
+    # ------------------------------------------------------------------
+
+    def _resolve_variants(self, cursor: Any) -> dict[str, int]:
+        """Проставить variant_id по onec_id (fallback — onec_id родителя до «#»)"""
+        cursor.execute(
+            f"""
+            UPDATE {self._table} s SET variant_id = v.id
+            FROM product_variants v
+            WHERE v.onec_id = s.onec_id
+            """
+        )
+        cursor.execute(
+            f"""
+            UPDATE {self._table} s SET variant_id = v.id
+            FROM product_variants v
+            WHERE s.variant_id IS NULL
+              AND strpos(s.onec_id, '#') > 0
+              AND v.onec_id = split_part(s.onec_id, '#', 1)
+            """
+        )
+        cursor.execute(
+            f"""
+            SELECT count(DISTINCT seq),
+                   count(DISTINCT seq) FILTER (WHERE variant_id IS NULL),
+                   count(DISTINCT variant_id)
+            FROM {self._table}
+            """
+        )
+        staged, missing, variants = cursor.fetchone()
+
+        if missing:
+            cursor.execute(
+                f"SELECT DISTINCT onec_id FROM {self._table} WHERE variant_id IS NULL ORDER BY onec_id LIMIT 10"
+            )
+            missing_ids = [row[0] for row in cursor.fetchall()]
+            logger.warning(f"ProductVariant not found for {missing} {self._table} rows, e.g. {missing_ids}")
+            self.processor.stats["warnings"] += missing
+        return {"staged": staged, "missing": missing, "variants": variants}
+
+    def apply_prices(self) -> dict[str, int]:
+        """Слить цены фазы в product_variants одним UPDATE"""
+        self._flush()
+        assignments = ",\n".join(f"{field} = COALESCE(p.{field}, v.{field})" for field in PRICE_FIELDS)
+        pivot = ",\n".join(f"max(value) FILTER (WHERE field = '{field}') AS {field}" for field in PRICE_FIELDS)
+
+        with connection.cursor() as cursor:
+            counts = self._resolve_variants(cursor)
+            cursor.execute(
+                f"SELECT count(DISTINCT seq) FROM {self._table} WHERE variant_id IS NOT NULL AND field IS NOT NULL"
+            )
+            (rows_with_prices,) = cursor.fetchone()
+
+            with transaction.atomic():
+                cursor.execute(
+                    f"""
+                    WITH latest AS (
+                        SELECT DISTINCT ON (variant_id, field) variant_id, field, value
+                        FROM {self._table}
+                        WHERE variant_id IS NOT NULL AND field IS NOT NULL
+                        ORDER BY variant_id, field, seq DESC
+                    ), p AS (
+                        SELECT variant_id, {pivot}
+                        FROM latest
+                        GROUP BY variant_id
+                    )
+                    UPDATE product_variants v SET
+                        {assignments},
+                        last_sync_at = %s
+                    FROM p
+                    WHERE v.id = p.variant_id
+                    RETURNING v.onec_id
+                    """,
+                    [timezone.now()],
+                )
+                updated = [row[0] for row in cursor.fetchall()]
+            cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{self._table}")
+
+        self.processor.stats["prices_updated"] += rows_with_prices
+        self.processor.updated_variants.extend(updated)
+        return self._report("prices", {**counts, "updated": len(updated)})
+
+    def apply_rests(self) -> dict[str, int]:
+        """Слить остатки фазы в product_variants одним UPDATE (и отметить товары синхронизированными)"""
+        self._flush()
+        with connection.cursor() as cursor:
+            counts = self._resolve_variants(cursor)
+            self._load_warehouses(cursor)
+            now = timezone.now()
+
+            with transaction.atomic():
+                cursor.execute(
+                    f"""
+                    WITH per_key AS (
+                        -- построчный режим копит остатки по onec_id строки
+                        SELECT variant_id, onec_id, sum(quantity) AS total, max(seq) AS last_seq
+                        FROM {self._table}
+                        WHERE variant_id IS NOT NULL
+                        GROUP BY variant_id, onec_id
+                    ), totals AS (
+                        SELECT DISTINCT ON (variant_id) variant_id, onec_id, total
+                        FROM per_key
+                        ORDER BY variant_id, last_seq DESC
+                    ), warehouses AS (
+                        SELECT r.variant_id, r.warehouse_id, sum(r.quantity) AS qty, min(r.seq) AS first_seq
+                        FROM {self._table} r
+                        JOIN totals t ON t.variant_id = r.variant_id AND t.onec_id = r.onec_id
+                        WHERE r.warehouse_id <> ''
+                        GROUP BY r.variant_id, r.warehouse_id
+                    ), primary_warehouse AS (
+                        SELECT DISTINCT ON (w.variant_id) w.variant_id, w.warehouse_id
+                        FROM warehouses w
+                        JOIN product_variants cur ON cur.id = w.variant_id
+                        ORDER BY w.variant_id, w.qty DESC,
+                                 (w.warehouse_id IS NOT DISTINCT FROM cur.warehouse_id) DESC, w.first_seq
+                    ), merged AS (
+                        SELECT t.variant_id, GREATEST(t.total, 0) AS total, p.warehouse_id
+                        FROM totals t
+                        LEFT JOIN primary_warehouse p ON p.variant_id = t.variant_id
+                    )
+                    UPDATE product_variants v SET
+                        stock_quantity = merged.total,
+                        warehouse_id = COALESCE(merged.warehouse_id, v.warehouse_id),
+                        warehouse_name = COALESCE(
+                            (SELECT m.warehouse_name FROM import_apply_warehouses m
+                             WHERE m.warehouse_id = COALESCE(merged.warehouse_id, v.warehouse_id)),
+                            v.warehouse_name
+                        ),
+                        vat_rate = COALESCE(
+                            (SELECT m.vat_rate FROM import_apply_warehouses m
+                             WHERE m.warehouse_id = COALESCE(merged.warehouse_id, v.warehouse_id)),
+                            v.vat_rate
+                        ),
+                        last_sync_at = %s
+                    FROM merged
+                    WHERE v.id = merged.variant_id
+                    RETURNING v.onec_id
+                    """,
+                    [now],
+                )
+                updated = [row[0] for row in cursor.fetchall()]
+                cursor.execute(
+                    f"""
+                    UPDATE products p SET sync_status = 'completed', last_sync_at = %s
+                    WHERE p.sync_status <> 'completed'
+                      AND p.id IN (
+                          SELECT v.product_id FROM product_variants v
+                          JOIN {self._table} r ON r.variant_id = v.id
+                      )
+                    """,
+                    [now],
+                )
+            cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{self._table}")
+            cursor.execute("DROP TABLE IF EXISTS pg_temp.import_apply_warehouses")
+
+        self.processor.stats["stocks_updated"] += counts["staged"] - counts["missing"]
+        self.processor.updated_variants.extend(updated)
+        return self._report("rests", {**counts, "updated": len(updated)})
+
+    def _load_warehouses(self, cursor: Any) -> None:
+        """Склады из настроек: GUID → имя и ставка НДС (как _resolve_warehouse_name)"""
+        exchange_cfg = getattr(settings, "ONEC_EXCHANGE", {})
+        warehouse_ids = {
+            *exchange_cfg.get("WAREHOUSE_NAME_BY_ID", {}),
+            *exchange_cfg.get("WAREHOUSE_RULES", {}),
+        }
+        data = io.StringIO()
+        for warehouse_id in sorted(warehouse_ids):
+            name = self.processor._resolve_warehouse_name(warehouse_id)
+            vat_rate = self.processor._get_vat_rate_by_warehouse_name(name)
+            data.write("\t".join(_copy_value(value) for value in (warehouse_id, name, vat_rate)) + "\n")
+        data.seek(0)
+
+        cursor.execute("DROP TABLE IF EXISTS pg_temp.import_apply_warehouses")
+        cursor.execute(
+            "CREATE TEMPORARY TABLE import_apply_warehouses (warehouse_id text, warehouse_name text, vat_rate numeric)"
+        )
+        cursor.copy_expert("COPY import_apply_warehouses FROM STDIN", data)
+
+    def _report(self, kind: str, counts: dict[str, int]) -> dict[str, int]:
+        self.processor.stats.setdefault("apply", {})[kind] = counts
+        logger.info(f"Set-based apply {kind}: {counts}")
+        return counts
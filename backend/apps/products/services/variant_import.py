@@ -13,7 +13,10 @@ from __future__ import annotations
 import logging
 import os
 import re
+import time
 import uuid
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from decimal import Decimal
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Sequence, TypedDict
@@ -25,9 +28,12 @@ from django.db import models, transaction
 from django.utils import timezone
 from django.utils.text import slugify
 
+from apps.common.services.profiling import ExchangeProfiler, profile_phase
+from apps.common.services.prometheus import observe_import_phase
 from apps.products.category_utils import REPAIR_ANCHOR_ONEC_ID
 
 if TYPE_CHECKING:
+    from apps.integrations.onec_exchange.zip_source import ZipImportSource, ZipMember
     from apps.products.models import Product, ProductVariant
 
 logger = logging.getLogger("import_products")
@@ -254,6 +260,8 @@ class VariantImportProcessor:
         session_id: int,
         batch_size: int = 500,
         skip_validation: bool = False,
+        profiler: ExchangeProfiler | None = None,
+        image_source: ZipImportSource | None = None,
     ):
         """
         Инициализация процессора
@@ -262,10 +270,15 @@ class VariantImportProcessor:
             session_id: ID сессии импорта
             batch_size: Размер batch для bulk операций (default 500)
             skip_validation: Пропустить валидацию данных
+            profiler: Профайлер фаз импорта (если профилирование включено)
+            image_source: Архивы 1С, из которых копируются изображения,
+                отсутствующие в base_dir
         """
         self.session_id = session_id
         self.batch_size = batch_size
         self.skip_validation = skip_validation
+        self.profiler = profiler
+        self.image_source = image_source
 
         self.stats: dict[str, Any] = {
             "products_created": 0,
@@ -287,6 +300,8 @@ class VariantImportProcessor:
             "brand_fallbacks": 0,
             "category_fallbacks": 0,
             "attributes_missing_mapping": 0,
+            # Длительность фаз импорта в секундах (см. phase())
+            "phase_durations": {},
         }
 
         # Story 13.2+ Debugging: Track specific updated items
@@ -309,6 +324,12 @@ class VariantImportProcessor:
         # Коллекция всех валидных категорий для деактивации устаревших
         self._valid_category_onec_ids: set[str] = set()
 
+        # Пакет изменений 1С (СодержитТолькоИзменения="true"): проходы по всему
+        # каталогу пропускаются, затрагиваются только товары из пакета
+        self.changes_only: bool = False
+        # Product.pk товаров из goods.xml и offers.xml этого импорта
+        self.touched_product_ids: set[int] = set()
+
     # ========================================================================
     # Helper methods
     # ========================================================================
@@ -330,12 +351,21 @@ class VariantImportProcessor:
             normalized_path = normalize_image_path(image_path)
             source_path = Path(base_dir) / normalized_path
             try:
-                if source_path.exists() and source_path.stat().st_size >= self.MIN_IMAGE_SIZE_BYTES:
+                if source_path.exists():
+                    size = source_path.stat().st_size
+                else:
+                    member = self._archive_image(normalized_path)
+                    size = member.size if member else 0
+                if size >= self.MIN_IMAGE_SIZE_BYTES:
                     return self.MIN_IMAGE_SIZE_BYTES
             except OSError:
                 continue
         return self.FALLBACK_MIN_IMAGE_SIZE_BYTES
 
+    def _archive_image(self, image_path: str) -> ZipMember | None:
+        """Изображение из архива 1С (если файла нет в base_dir)"""
+        return self.image_source.image(image_path) if self.image_source else None
+
     def _save_image_if_not_exists(
         self,
         source_path: Path,
@@ -359,13 +389,15 @@ class VariantImportProcessor:
         from django.core.files.base import ContentFile
         from django.core.files.storage import default_storage
 
-        if not source_path.exists():
+        # Файла нет на диске — копируем прямо из архива, без распаковки
+        member = None if source_path.exists() else self._archive_image(image_path)
+        if member is None and not source_path.exists():
             logger.warning(f"Image not found: {source_path}")
             self.stats["images_errors"] += 1
             return None
 
         effective_min = min_size_bytes if min_size_bytes is not None else self.MIN_IMAGE_SIZE_BYTES
-        file_size = source_path.stat().st_size
+        file_size = member.size if member else source_path.stat().st_size
         if file_size < effective_min:
             size_kb = file_size / 1024
             logger.debug(f"Image too small, skipping: {source_path} " f"({size_kb:.1f}KB < {effective_min // 1024}KB)")
@@ -393,7 +425,7 @@ class VariantImportProcessor:
 
         # Копирование файла
         try:
-            with open(source_path, "rb") as f:
+            with member.open() if member else open(source_path, "rb") as f:
                 saved_path = default_storage.save(destination_path, ContentFile(f.read()))
             self.stats["images_copied"] += 1
             return saved_path
@@ -454,10 +486,14 @@ class VariantImportProcessor:
 
             if existing:
                 # Обновление существующего Product
-                return self._update_existing_product(existing, goods_data, base_dir, skip_images)
+                product = self._update_existing_product(existing, goods_data, base_dir, skip_images)
+            else:
+                # Создание нового Product
+                product = self._create_new_product(goods_data, base_dir, skip_images)
 
-            # Создание нового Product
-            return self._create_new_product(goods_data, base_dir, skip_images)
+            if product is not None:
+                self.touched_product_ids.add(product.pk)
+            return product
 
         except Exception as e:
             self._log_error(f"Error processing product from goods: {e}", goods_data)
@@ -712,6 +748,7 @@ class VariantImportProcessor:
                     self._missing_products_logged.add(parent_id)
                 self.stats["skipped"] += 1
                 return None
+            self.touched_product_ids.add(product.pk)
 
             # Ставка НДС из маппинга goods.xml → variants
             vat_rate = self._product_vat_rates.get(parent_id)
@@ -957,12 +994,16 @@ class VariantImportProcessor:
     # Task 3: Обработка товаров без вариантов (AC: 5)
     # ========================================================================
 
-    def create_default_variants(self) -> int:
+    def create_default_variants(self, product_ids: Iterable[int] | None = None) -> int:
         """
         Создание дефолтных ProductVariant для товаров без вариантов (AC5)
 
         Выполняется ПОСЛЕ parse_offers_xml() и ДО parse_prices_xml()
 
+        Args:
+            product_ids: Проверять только эти товары (пакет изменений);
+                None — весь каталог
+
         Returns:
             Количество созданных default variants
         """
@@ -972,6 +1013,8 @@ class VariantImportProcessor:
         products_without_variants = Product.objects.filter(
             variants__isnull=True,
         )
+        if product_ids is not None:
+            products_without_variants = products_without_variants.filter(pk__in=list(product_ids))
 
         count = products_without_variants.count()
         logger.info(f"Found {count} products without variants")
@@ -2019,24 +2062,51 @@ class VariantImportProcessor:
 
         return result
 
-    def log_progress(self, message: str) -> None:
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Замер фазы импорта (категории, товары, варианты, цены, остатки...).
+
+        Длительность пишется в stats["phase_durations"] (попадает в
+        report_details сессии) и в гистограмму Prometheus
+        freesport_import_phase_duration_seconds. Фаза, завершившаяся
+        исключением, тоже учитывается.
+
+        При включённом профилировании фаза замеряется и профайлером, а
+        строками фазы считаются приращения счётчиков stats.
         """
-        Логирование прогресса в консоль и в поле report модели ImportSession.
+        counters_before = self._counters() if self.profiler else {}
+        started = time.perf_counter()
+        with profile_phase(self.profiler, name) as record:
+            try:
+                yield
+            finally:
+                duration = time.perf_counter() - started
+                self.stats["phase_durations"][name] = round(duration, 3)
+                observe_import_phase(name, duration)
+                if self.profiler:
+                    for key, value in self._counters().items():
+                        delta = value - counters_before.get(key, 0)
+                        if delta:
+                            record.rows[key] += delta
+
+    def _counters(self) -> dict[str, int]:
+        return {key: value for key, value in self.stats.items() if isinstance(value, int)}
+
+    def log_progress(self, message: str) -> None:
         """
-        from django.db.models import F, Value
-        from django.db.models.functions import Concat
+        Логирование прогресса в консоль и в журнал событий сессии импорта.
 
-        from apps.products.models import ImportSession
+        Одна вставка в ImportSessionEvent и обновление updated_at (heartbeat
+        для cleanup_stale_import_sessions) — без перезаписи отчета.
+        """
+        from apps.products.models import ImportSession, ImportSessionEvent
 
-        timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
-        full_message = f"[{timestamp}] {message}"
-        logger.info(full_message)
+        logger.info(message)
 
         try:
-            ImportSession.objects.filter(pk=self.session_id).update(
-                report=Concat(F("report"), Value(full_message + "\n")),
-                updated_at=timezone.now(),
-            )
+            ImportSessionEvent.append(self.session_id, message)
+            ImportSession.objects.filter(pk=self.session_id).update(updated_at=timezone.now())
         except Exception as e:
             logger.error(f"Error updating session report: {e}")
 
@@ -2044,8 +2114,11 @@ class VariantImportProcessor:
         """Завершение сессии импорта"""
         from apps.products.models import ImportSession
 
-        # Перед финальным сохранением статуса применяем деактивацию
-        if status == ImportSession.ImportStatus.COMPLETED or status == "completed":
+        # Перед финальным сохранением статуса применяем деактивацию.
+        # Пакет изменений перечисляет только измененные группы — остальные не устарели
+        if self.changes_only:
+            logger.info("Changes-only package: skipping obsolete categories deactivation")
+        elif status == ImportSession.ImportStatus.COMPLETED or status == "completed":
             try:
                 self.deactivate_obsolete_categories()
             except Exception as e:
@@ -2069,17 +2142,18 @@ class VariantImportProcessor:
             if len(self.updated_variants) > 100:
                 self.stats["updated_variants_ids"].append(f"...and {len(self.updated_variants) - 100} more")
 
+            if self.profiler:
+                self.stats["profile"] = self.profiler.report()
             session.report_details = self.stats
 
-            timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
             status_display = dict(ImportSession.ImportStatus.choices).get(status, status)
-            completion_message = f"[{timestamp}] Импорт завершен со статусом: {status_display}\n"
             if error_message:
-                completion_message += f"[{timestamp}] Ошибка: {error_message}\n"
                 session.error_message = error_message
 
-            session.report = (session.report or "") + completion_message
-            session.save()
+            session.save(update_fields=["status", "finished_at", "report_details", "error_message", "updated_at"])
+            session.log_event(f"Импорт завершен со статусом: {status_display}")
+            if error_message:
+                session.log_event(f"Ошибка: {error_message}", level="error")
 
             logger.info(f"Import session {self.session_id} finalized with status: {status}")
             logger.info(f"Import stats: {self.stats}")
@@ -1,4 +1,5 @@
 import logging
+import shutil
 from datetime import timedelta
 from pathlib import Path
 from typing import Any
@@ -9,8 +10,10 @@ from django.conf import settings
 from django.core.management import CommandError, call_command
 from django.utils import timezone
 
-from apps.integrations.onec_exchange.file_service import FileStreamService
-from apps.products.models import ImportSession
+from apps.common.services.profiling import ExchangeProfiler, profile_phase, profiling_settings
+from apps.integrations.onec_exchange.file_service import FileStreamService, get_exchange_log_dir
+from apps.integrations.onec_exchange.zip_source import prepare_archives
+from apps.products.models import ImportSession, ImportSessionEvent
 
 logger = logging.getLogger("import_tasks")
 
@@ -21,6 +24,10 @@ def process_1c_import_task(
     session_id: int,
     data_dir: str | None = None,
     zip_filename: str | None = None,
+    staged: bool = False,
+    coalesced: bool = False,
+    priority: bool = False,
+    file_types: list[str] | None = None,
 ) -> str:
     """
     Задача для асинхронного запуска импорта из 1С.
@@ -29,136 +36,34 @@ def process_1c_import_task(
         session_id: ID сессии ImportSession
         data_dir: Путь к директории с файлами (опционально)
         zip_filename: Имя ZIP-архива для асинхронной распаковки
+        staged: Применить строки, подготовленные stage_1c_import_file_task (конвейерный обмен)
+        coalesced: Импорт объединенных mode=import; файлы, пришедшие во время
+            импорта, запускаются следующим инкрементом
+        priority: Обмен только ценами/остатками (приоритетная очередь,
+            маршрутизация — import_lanes.route_import_task)
+        file_types: Типы файлов приоритетного обмена (prices, rests): импорт
+            выполняется только по ним, без фаз каталога и полной очистки
 
     Returns:
         Результат выполнения ('success' или 'failure')
     """
+    profiler: ExchangeProfiler | None = None
     try:
         session = ImportSession.objects.get(pk=session_id)
         session.status = ImportSession.ImportStatus.IN_PROGRESS
         session.celery_task_id = self.request.id
 
-        # Обновляем отчет о начале
-        timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
-        session.report += f"[{timestamp}] Задача Celery запущена. Начинаем импорт...\n"
-        session.save(update_fields=["status", "celery_task_id", "report", "updated_at"])
+        session.save(update_fields=["status", "celery_task_id", "updated_at"])
+        session.log_event("Задача Celery запущена. Начинаем импорт...")
 
-        # Story 3.1: Асинхронная распаковка архива (если передан)
-        if zip_filename and zip_filename.lower().endswith(".zip") and data_dir:
-            try:
-                # Extract sessid from data_dir path (data_dir = .../1c_import/<sessid>)
-                sessid = Path(data_dir).name
-                file_service = FileStreamService(sessid)
-                import_dir_path = Path(data_dir)
-
-                file_service.unpack_zip(zip_filename, import_dir_path)
+        profiler = ExchangeProfiler.from_mode(_session_profiling_mode(session), label=f"import_session_{session_id}")
+        if profiler:
+            profiler.start()
 
-                timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
-                session.report += f"[{timestamp}] Архив {zip_filename} успешно распакован.\n"
-                session.save(update_fields=["report"])
-            except Exception as e:
-                timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
-                session.status = ImportSession.ImportStatus.FAILED
-                session.error_message = f"Ошибка распаковки архива: {e}"
-                session.report += f"[{timestamp}] ОШИБКА РАСПАКОВКИ: {e}\n"
-                session.save(update_fields=["status", "error_message", "report"])
-                logger.error(f"Unpack failed for session {session_id}: {e}")
-                return "failure"
-
-        # Story 3.2: Defered Unpacking
-        # Files (including ZIPs) are already moved to import_dir by the view (handle_complete).
-        # We need to find them there and unpack.
-        target_import_dir = Path(data_dir) if data_dir else Path(str(settings.ONEC_EXCHANGE["IMPORT_DIR"]))
-
-        if target_import_dir.exists():
-            zip_files = list(target_import_dir.glob("*.zip"))
-            if zip_files:
-                logger.info(f"Found {len(zip_files)} ZIP files in import dir. Unpacking...")
-                import zipfile
-
-                from apps.integrations.onec_exchange.routing_service import XML_ROUTING_RULES
-
-                for zf in zip_files:
-                    try:
-                        # Direct unpacking to target directory
-                        with zipfile.ZipFile(zf, "r") as zip_ref:
-                            zip_ref.extractall(target_import_dir)
-                            unpacked_files = zip_ref.namelist()
-
-                        logger.info(f"Unpacked: {zf.name} to {target_import_dir}")
-
-                        # Route unpacked files to subdirectories
-                        routed_count = 0
-                        for filename in unpacked_files:
-                            file_path = target_import_dir / filename
-                            if not file_path.exists() or not file_path.is_file():
-                                continue
-
-                            # Logic similar to FileRoutingService.route_file
-                            name_lower = filename.lower()
-                            suffix = file_path.suffix.lower()
-                            target_subdir = None
-
-                            if suffix == ".xml":
-                                # Sort rules by length of prefix descending to match most specific first
-                                # e.g. 'propertiesOffers' (len 16) before 'properties' (len 10)
-                                sorted_rules = sorted(
-                                    XML_ROUTING_RULES.items(),
-                                    key=lambda x: len(x[0]),
-                                    reverse=True,
-                                )
-                                for prefix, subdir in sorted_rules:
-                                    if name_lower.startswith(prefix):
-                                        target_subdir = subdir.rstrip("/")
-                                        break
-                            elif suffix in {".jpg", ".jpeg", ".png", ".gif", ".webp"}:
-                                # Story 13.2: Handle images inside import_files folder or at root
-                                if name_lower.startswith("import_files/"):
-                                    # If file is already in import_files/ folder in ZIP,
-                                    # target should be just 'goods' so it lands in goods/import_files/file.jpg
-                                    target_subdir = "goods"
-                                else:
-                                    # If file is at root, put it into import_files
-                                    target_subdir = "goods/import_files"
-
-                            if target_subdir:
-                                dest_dir = target_import_dir / target_subdir
-                                dest_dir.mkdir(parents=True, exist_ok=True)
-                                dest_path = dest_dir / filename
-
-                                try:
-                                    # Move file
-                                    import shutil
-
-                                    shutil.move(str(file_path), str(dest_path))
-                                    routed_count += 1
-                                except Exception as move_err:
-                                    logger.warning(f"Failed to route {filename}: {move_err}")
-
-                        timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
-                        session.report += (
-                            f"[{timestamp}] Архив {zf.name} распакован ({len(unpacked_files)} файлов). "
-                            f"Распределено по папкам: {routed_count}.\n"
-                        )
-
-                        # Delete the ZIP file after unpacking
-                        try:
-                            zf.unlink()
-                            logger.info(f"Deleted archive: {zf.name}")
-                        except OSError as e:
-                            logger.warning(f"Failed to delete archive {zf.name}: {e}")
-
-                    except Exception as e:
-                        logger.error(f"Failed to unpack {zf.name}: {e}")
-                        session.report += f"[{timezone.now()}] Ошибка распаковки {zf.name}: {e}\n"
-                        # Remove the corrupted zip file so it doesn't get retried endlessly
-                        try:
-                            zf.unlink()
-                            logger.info(f"Deleted corrupted archive: {zf.name}")
-                        except OSError as del_err:
-                            logger.warning(f"Failed to delete corrupted archive {zf.name}: {del_err}")
-
-                session.save(update_fields=["report"])
+        with profile_phase(profiler, "unpack"):
+            target_import_dir = _prepare_import_files(session, data_dir, zip_filename)
+        if target_import_dir is None:
+            return "failure"
 
         # Story 3.2: Defensive directory creation
         # Ensure import directory and all required subdirectories exist
@@ -212,32 +117,40 @@ def process_1c_import_task(
                 f"Starting 1C customers import for session {session_id} "
                 f"(key={session.session_key}, data_dir={effective_data_dir})"
             )
-            call_command("import_customers_from_1c", data_dir=effective_data_dir)
+            with profile_phase(profiler, "customers"):
+                call_command("import_customers_from_1c", data_dir=effective_data_dir)
         else:
             # Запуск management команды импорта товарного каталога
             args: list[Any] = []
             options = {
                 "celery_task_id": self.request.id,
-                "file_type": detected_file_type,
                 "import_session_id": session_id,
             }
             if data_dir:
                 options["data_dir"] = data_dir
-
-            logger.info(
-                f"Starting 1C import for session {session_id} "
-                f"(key={session.session_key}, file_type={detected_file_type}, file={zip_filename})"
-            )
-            call_command("import_products_from_1c", *args, **options)
+            if profiler:
+                options["profiler"] = profiler
+            if staged:
+                options["staged"] = True
+            if priority:
+                # Срочное обновление цен/остатков: без backup_db перед импортом
+                options["skip_backup"] = True
+
+            for file_type in file_types or [detected_file_type]:
+                options["file_type"] = file_type
+                logger.info(
+                    f"Starting 1C import for session {session_id} "
+                    f"(key={session.session_key}, file_type={file_type}, file={zip_filename})"
+                )
+                call_command("import_products_from_1c", *args, **options)
 
         # Финализация сессии (если команда сама не завершила её)
         session.refresh_from_db()
         if session.status != ImportSession.ImportStatus.COMPLETED:
-            timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
             session.status = ImportSession.ImportStatus.COMPLETED
             session.finished_at = timezone.now()
-            session.report += f"[{timestamp}] Импорт успешно завершен.\n"
-            session.save(update_fields=["status", "finished_at", "report", "updated_at"])
+            session.save(update_fields=["status", "finished_at", "updated_at"])
+            session.log_event("Импорт успешно завершен.")
 
         # Clean up shared import directory only if no other sessions are active.
         # Multiple sessions share the same import_dir; cleaning up while another
@@ -251,7 +164,10 @@ def process_1c_import_task(
                 .exists()
             )
 
-            if other_active:
+            if file_types:
+                # Приоритетный обмен импортирован из своего каталога — общий каталог не трогаем
+                _cleanup_priority_data_dir(session, data_dir)
+            elif other_active:
                 logger.info("Skipping import directory cleanup — other sessions are still IN_PROGRESS.")
             elif session.session_key:
                 from apps.integrations.onec_exchange.routing_service import FileRoutingService
@@ -264,6 +180,15 @@ def process_1c_import_task(
         except Exception as cleanup_err:
             logger.warning(f"Failed post-import cleanup: {cleanup_err}")
 
+        if coalesced and session.session_key:
+            from apps.integrations.onec_exchange.import_orchestrator import ImportOrchestratorService
+
+            try:
+                if ImportOrchestratorService(str(session.session_key), "follow-up").dispatch_followup():
+                    session.log_event("Файлы, загруженные во время импорта, поставлены следующим инкрементом")
+            except Exception as followup_err:
+                logger.error(f"Failed to queue follow-up import for session {session_id}: {followup_err}")
+
         return "success"
 
     except ImportSession.DoesNotExist:
@@ -273,7 +198,6 @@ def process_1c_import_task(
         logger.error(f"Error in process_1c_import_task: {e}")
         try:
             session = ImportSession.objects.get(pk=session_id)
-            timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
 
             if isinstance(e, CommandError):
                 error_prefix = "ОШИБКА КОМАНДЫ"
@@ -293,12 +217,134 @@ def process_1c_import_task(
                 session.status = status
                 session.error_message = msg
 
-            session.report += f"[{timestamp}] {error_prefix}: {msg}\n"
-            session.save(update_fields=["status", "error_message", "report", "updated_at"])
+            session.save(update_fields=["status", "error_message", "updated_at"])
+            session.log_event(f"{error_prefix}: {msg}", level="error")
         except Exception as db_err:
             logger.critical(f"Failed to update session status after error: {db_err}")
 
         return "failure"
+    finally:
+        if profiler:
+            _store_session_profile(session_id, profiler)
+
+
+def _cleanup_priority_data_dir(session: ImportSession, data_dir: str | None) -> None:
+    """Удалить каталог файлов приоритетного обмена (import_lanes.priority_data_dir) после импорта."""
+    from apps.products.services.import_lanes import priority_data_dir
+
+    if not data_dir or not session.session_key:
+        return
+    session_dir = priority_data_dir(str(session.session_key))
+    if Path(data_dir).resolve() != session_dir.resolve():
+        logger.info(f"Skipping cleanup of {data_dir}: not the priority directory of the session.")
+        return
+    shutil.rmtree(session_dir, ignore_errors=True)
+    logger.info(f"Removed priority import directory {session_dir}.")
+
+
+def _prepare_import_files(session: ImportSession, data_dir: str | None, zip_filename: str | None) -> Path | None:
+    """
+    Фаза unpack: распаковка архива, переданного 1С, и подготовка архивов каталога импорта.
+
+    Returns:
+        Каталог импорта или None, если архив не распакован (сессия помечена FAILED)
+    """
+    # Story 3.1: Асинхронная распаковка архива (если передан)
+    if zip_filename and zip_filename.lower().endswith(".zip") and data_dir:
+        try:
+            # Extract sessid from data_dir path (data_dir = .../1c_import/<sessid>)
+            sessid = Path(data_dir).name
+            file_service = FileStreamService(sessid)
+            import_dir_path = Path(data_dir)
+
+            file_service.unpack_zip(zip_filename, import_dir_path)
+
+            session.log_event(f"Архив {zip_filename} успешно распакован.")
+        except Exception as e:
+            session.status = ImportSession.ImportStatus.FAILED
+            session.error_message = f"Ошибка распаковки архива: {e}"
+            session.save(update_fields=["status", "error_message"])
+            session.log_event(f"ОШИБКА РАСПАКОВКИ: {e}", level="error")
+            logger.error(f"Unpack failed for session {session.pk}: {e}")
+            return None
+
+    # Story 3.2: Defered Unpacking
+    # Files (including ZIPs) are already moved to import_dir by the view (handle_complete).
+    # We need to find them there and route their contents.
+    target_import_dir = Path(data_dir) if data_dir else Path(str(settings.ONEC_EXCHANGE["IMPORT_DIR"]))
+
+    # Архивы не распаковываются: import_products_from_1c читает их потоком
+    prepare_archives(target_import_dir, session.log_event)
+    return target_import_dir
+
+
+def _session_profiling_mode(session: ImportSession) -> str:
+    """Режим профилирования сессии; для сессий обмена с 1С — EXCHANGE_PROFILING["MODE"]."""
+    if session.profiling != ImportSession.ProfilingMode.OFF:
+        return session.profiling
+    return profiling_settings().get("MODE", ImportSession.ProfilingMode.OFF)
+
+
+def _store_session_profile(session_id: int, profiler: ExchangeProfiler) -> None:
+    """Завершить профайлер и записать сводку в сессию (сэмплы — в журналы обмена)."""
+    try:
+        ImportSession.objects.get(pk=session_id).store_profile(profiler.finish(get_exchange_log_dir()))
+    except Exception as e:
+        logger.warning(f"Failed to store import profile for session {session_id}: {e}")
+
+
+@shared_task(name="apps.products.tasks.stage_1c_import_file_task")
+def stage_1c_import_file_task(session_id: int, file_path: str) -> dict[str, int]:
+    """
+    Разбор загруженного сегмента в staging (конвейерный обмен).
+
+    Ставится на mode=import по файлу при ONEC_EXCHANGE["PIPELINED_IMPORT"], пока
+    1С загружает остальные сегменты; строки применяет process_1c_import_task(staged=True)
+    на mode=complete. Ошибка не прерывает обмен: неразобранный файл остается
+    на диске и будет подготовлен при применении.
+
+    Args:
+        session_id: ID сессии ImportSession
+        file_path: Путь к маршрутизированному файлу в каталоге импорта
+
+    Returns:
+        Число подготовленных строк по фазам
+    """
+    from apps.products.services.import_staging import ImportStagingService
+
+    try:
+        counts = ImportStagingService(session_id).stage_file(Path(file_path))
+    except Exception as e:
+        logger.error(f"Staging {file_path} failed for session {session_id}: {e}")
+        ImportSessionEvent.append(session_id, f"Ошибка подготовки {Path(file_path).name}: {e}", level="warning")
+        return {}
+
+    if counts:
+        rows = ", ".join(f"{kind}: {count}" for kind, count in counts.items())
+        ImportSessionEvent.append(session_id, f"Сегмент {Path(file_path).name} подготовлен ({rows})")
+    return counts
+
+
+@shared_task(name="apps.products.tasks.dispatch_coalesced_import_task")
+def dispatch_coalesced_import_task(session_id: int, sessid: str) -> str:
+    """
+    Запуск объединенного импорта после тихого окна (ONEC_EXCHANGE["IMPORT_QUIET_WINDOW_SECONDS"]).
+
+    Ставится на каждый mode=import; импорт запускает только задача, после
+    которой в течение окна не было новых mode=import.
+
+    Args:
+        session_id: ID сессии ImportSession
+        sessid: Идентификатор сеанса обмена 1С
+
+    Returns:
+        "dispatched", "rescheduled" или "skipped"
+    """
+    from apps.integrations.onec_exchange.import_orchestrator import ImportOrchestratorService
+
+    result = ImportOrchestratorService(sessid).dispatch_when_quiet(session_id)
+    logger.info(f"Coalesced import for session {session_id}: {result}")
+    return result
 
 
 @shared_task(name="apps.products.tasks.cleanup_stale_import_sessions")
@@ -319,8 +365,7 @@ def cleanup_stale_import_sessions() -> int:
         for session in stale_sessions:
             session.status = ImportSession.ImportStatus.FAILED
             session.error_message = "Зависла/Таймаут (не обновлялась более 2 часов)"
-            timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
-            session.report += f"[{timestamp}] Сессия помечена как зависшая инструментом очистки.\n"
-            session.save(update_fields=["status", "error_message", "report", "updated_at"])
+            session.save(update_fields=["status", "error_message", "updated_at"])
+            session.log_event("Сессия помечена как зависшая инструментом очистки.", level="warning")
 
     return count
@@ -158,7 +158,7 @@ class TestImportOrchestration:
         session = ImportSession.objects.create(
             import_type=ImportSession.ImportType.CATALOG,
             status=ImportSession.ImportStatus.PENDING,
-            report="Initial report\n",
+            legacy_report="Initial report\n",
         )
 
         # Create a mock for 'self'
@@ -178,6 +178,7 @@ class TestImportOrchestration:
         assert session.celery_task_id == "fake-task-id"
         assert "Задача Celery запущена" in session.report
         assert "Импорт успешно завершен" in session.report
+        assert session.report.startswith("Initial report\n")
         assert session.finished_at is not None
 
         # Check call_command
@@ -0,0 +1,117 @@
+"""
+Тесты журнала событий сессии импорта (ImportSessionEvent).
+"""
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from apps.products.models import ImportSession, ImportSessionEvent
+from apps.products.services.variant_import import VariantImportProcessor
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestImportSessionEvents:
+    def test_log_event_appends_without_touching_session_row(self, django_assert_num_queries):
+        session = ImportSession.objects.create()
+
+        with django_assert_num_queries(1):
+            session.log_event("Первая строка")
+
+        session.log_event("Ошибка разбора", level=ImportSessionEvent.Level.ERROR)
+
+        events = list(session.events.all())
+        assert [e.message for e in events] == ["Первая строка", "Ошибка разбора"]
+        assert events[1].level == "error"
+        assert session.legacy_report == ""
+
+    def test_report_renders_legacy_text_then_events(self):
+        session = ImportSession.objects.create(legacy_report="[2025-01-01 10:00:00] Старый отчет\n")
+        event = session.log_event("Новая строка")
+
+        assert session.report == (
+            "[2025-01-01 10:00:00] Старый отчет\n" f"[{event.created_at:%Y-%m-%d %H:%M:%S}] Новая строка\n"
+        )
+
+    def test_page_returns_events_after_cursor(self):
+        session = ImportSession.objects.create()
+        other = ImportSession.objects.create()
+        events = [session.log_event(f"Строка {i}") for i in range(5)]
+        other.log_event("Чужая строка")
+
+        page = ImportSessionEvent.objects.page(session.pk, after_id=events[1].pk, limit=2)
+
+        assert [e.message for e in page] == ["Строка 2", "Строка 3"]
+
+    def test_log_progress_writes_event_and_heartbeat(self):
+        session = ImportSession.objects.create(status=ImportSession.ImportStatus.IN_PROGRESS)
+        ImportSession.objects.filter(pk=session.pk).update(updated_at="2025-01-01T00:00:00Z")
+        processor = VariantImportProcessor(session_id=session.pk)
+
+        processor.log_progress("Обработка категорий: 100...")
+
+        session.refresh_from_db()
+        assert session.updated_at.year > 2025
+        assert "Обработка категорий: 100..." in session.report
+
+
+@pytest.mark.django_db
+class TestImportSessionEventsAdminView:
+    @pytest.fixture
+    def admin_client(self, client):
+        user = User.objects.create_superuser(email="admin@example.com", password="password")
+        client.force_login(user)
+        return client
+
+    def test_events_are_paged_by_cursor(self, admin_client):
+        session = ImportSession.objects.create(status=ImportSession.ImportStatus.IN_PROGRESS)
+        events = [session.log_event(f"Строка {i}") for i in range(3)]
+        url = reverse("admin:integrations_session_events", args=[session.pk])
+
+        first = admin_client.get(url, {"limit": 2}).json()
+        second = admin_client.get(url, {"after": first["last_id"], "limit": 2}).json()
+
+        assert [e["message"] for e in first["events"]] == ["Строка 0", "Строка 1"]
+        assert first["has_more"] is True
+        assert [e["id"] for e in second["events"]] == [events[2].pk]
+        assert second["has_more"] is False
+        assert second["status"] == "in_progress"
+
+    def test_tail_without_new_events_keeps_cursor(self, admin_client):
+        session = ImportSession.objects.create()
+        event = session.log_event("Строка")
+        url = reverse("admin:integrations_session_events", args=[session.pk])
+
+        data = admin_client.get(url, {"after": event.pk}).json()
+
+        assert data["events"] == []
+        assert data["last_id"] == event.pk
+
+    def test_invalid_cursor_is_rejected(self, admin_client):
+        session = ImportSession.objects.create()
+        url = reverse("admin:integrations_session_events", args=[session.pk])
+
+        assert admin_client.get(url, {"after": "abc"}).status_code == 400
+
+    def test_requires_staff(self, client):
+        session = ImportSession.objects.create()
+        url = reverse("admin:integrations_session_events", args=[session.pk])
+
+        response = client.get(url)
+
+        assert response.status_code == 302
+
+    def test_session_page_shows_events_tail(self, admin_client):
+        session = ImportSession.objects.create(status=ImportSession.ImportStatus.IN_PROGRESS)
+        session.log_event("Архив goods.zip распакован <5 файлов>")
+        url = reverse("admin:integrations_session_change", args=[session.pk])
+
+        response = admin_client.get(url)
+
+        assert response.status_code == 200
+        content = response.content.decode()
+        assert 'id="import-session-events"' in content
+        assert 'data-tail="1"' in content
+        assert "Архив goods.zip распакован &lt;5 файлов&gt;" in content
@@ -39,9 +39,10 @@ class TestImportSessionStructure(TestCase):
         assert session.status == "pending"
 
     def test_report_field_is_text(self):
-        """Verify report is a text field for progress logs"""
-        session = ImportSession.objects.create(
-            import_type=ImportSession.ImportType.CATALOG,
-            report="Starting import...\nProcessing goods...",
-        )
+        """Verify report renders progress logs as text"""
+        session = ImportSession.objects.create(import_type=ImportSession.ImportType.CATALOG)
+        session.log_event("Starting import...")
+        session.log_event("Processing goods...")
+
         assert "Starting import" in session.report
+        assert "Processing goods" in session.report
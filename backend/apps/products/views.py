@@ -19,6 +19,9 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from apps.common.services.prometheus import record_cache_lookup
+from apps.common.services.query_budget import query_budget
+
 from .category_utils import FULL_PLACEHOLDER_CATEGORY_RE_PATTERN
 from .constants import FEATURED_BRANDS_CACHE_KEY, FEATURED_BRANDS_CACHE_TIMEOUT, FEATURED_BRANDS_MAX_ITEMS
 from .filters import CategoryFilter, ProductFilter
@@ -66,42 +69,22 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         """Оптимизированный QuerySet с предзагрузкой связанных объектов"""
-        return (
-            Product.objects.filter(is_active=True)
-            .select_related("brand", "category")
-            .prefetch_related(
-                "category__parent",
-                # Story 14.5: Prefetch атрибутов для избежания N+1 queries
-                Prefetch(
-                    "attributes",
-                    queryset=AttributeValue.objects.select_related("attribute"),
-                    to_attr="prefetched_attributes",
-                ),
-                # Prefetch первого варианта для получения цен (для списка)
+        queryset = ProductListSerializer.setup_eager_loading(Product.objects.filter(is_active=True))
+        if self.action == "retrieve":
+            # Варианты карточки товара вместе с их атрибутами (get_attributes без запроса на вариант)
+            queryset = queryset.prefetch_related(
                 Prefetch(
                     "variants",
-                    queryset=ProductVariant.objects.filter(
-                        Q(retail_price__gt=0)
-                        | Q(opt1_price__gt=0)
-                        | Q(opt2_price__gt=0)
-                        | Q(opt3_price__gt=0)
-                        | Q(trainer_price__gt=0)
-                        | Q(federation_price__gt=0)
-                    ).order_by("retail_price"),
-                    to_attr="first_variant_list",
-                ),
-            )
-            .annotate(
-                # Аннотации для использования в ProductListSerializer и сортировки
-                total_stock=Sum("variants__stock_quantity"),
-                # Min retail_price для сортировки по цене (после Epic 13)
-                min_retail_price=Min(
-                    "variants__retail_price",
-                    filter=Q(variants__retail_price__gt=0),
-                ),
-                has_stock=Exists(ProductVariant.objects.filter(product=OuterRef("pk"), stock_quantity__gt=0)),
+                    queryset=ProductVariant.objects.prefetch_related(
+                        Prefetch(
+                            "attributes",
+                            queryset=AttributeValue.objects.select_related("attribute"),
+                            to_attr="prefetched_attributes",
+                        )
+                    ),
+                )
             )
-        )
+        return queryset
 
     def get_serializer_class(self):
         """Выбор serializer в зависимости от действия"""
@@ -156,6 +139,7 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         ],
         tags=["Products"],
     )
+    @query_budget(20)
     def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         """
         Список товаров (оптимизированная версия, без facets по умолчанию)
@@ -176,6 +160,7 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         description="Получение детальной информации о товаре",
         tags=["Products"],
     )
+    @query_budget(25)
     def retrieve(self, request, *args, **kwargs):
         """Retrieve с prefetch variants и attributes для оптимизации"""
         # Prefetch уже настроен в get_queryset() (Story 14.5)
@@ -198,6 +183,7 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         tags=["Products"],
     )
     @action(detail=False, methods=["get"], url_path="visible-categories")
+    @query_budget(8)
     def visible_categories(self, request: Request) -> Response:
         """
         Возвращает список category_id категорий (включая предков), содержащих
@@ -248,6 +234,7 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         tags=["Products"],
     )
     @action(detail=False, methods=["get"], url_path="visible-brands")
+    @query_budget(10)
     def visible_brands(self, request: Request) -> Response:
         """
         Возвращает список brand_id брендов, содержащих товары при текущих
@@ -266,6 +253,7 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({"brand_ids": brand_ids})
 
 
+@query_budget(10)
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet для категорий с поддержкой иерархии
@@ -313,6 +301,7 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
         return super().retrieve(request, *args, **kwargs)
 
 
+@query_budget(10)
 class CategoryTreeViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet для публичного дерева категорий.
@@ -373,6 +362,7 @@ class CategoryTreeViewSet(viewsets.ReadOnlyModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
+@query_budget(8)
 class BrandViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet для брендов
@@ -455,6 +445,7 @@ class BrandViewSet(viewsets.ReadOnlyModelViewSet):
         stale/wrong cached results. Search is available on the list endpoint.
         """
         cached = cache.get(FEATURED_BRANDS_CACHE_KEY)
+        record_cache_lookup("featured_brands", cached is not None)
         if cached is not None:
             return Response(cached)
 
@@ -471,6 +462,7 @@ class BrandViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(payload)
 
 
+@query_budget(8)
 class AttributeFilterViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet для фильтров каталога на основе активных атрибутов.
@@ -16,7 +16,7 @@ from apps.common.models import CustomerSyncLog
 from apps.products.models import ImportSession
 from apps.users.models import User
 from apps.users.services.parser import CustomerDataParser
-from apps.users.services.processor import CustomerDataProcessor
+from apps.users.services.processor import DEFAULT_CHUNK_SIZE, CustomerDataProcessor
 
 logger = logging.getLogger(__name__)
 
@@ -45,8 +45,11 @@ class Command(BaseCommand):
         parser.add_argument(
             "--chunk-size",
             type=int,
-            default=100,
-            help="Размер пакета для обработки (по умолчанию: 100).",
+            default=DEFAULT_CHUNK_SIZE,
+            help=(
+                "Размер пакета клиентов: кандидаты ищутся одним запросом, запись — "
+                f"bulk_create/bulk_update на пакет (по умолчанию: {DEFAULT_CHUNK_SIZE})."
+            ),
         )
         parser.add_argument(
             "--dry-run",
@@ -4,13 +4,19 @@
 
 import logging
 import re
-from typing import Optional, Tuple
+import uuid
+from collections import Counter
+from collections.abc import Sequence
+from typing import Any, Optional, Tuple
 
 from apps.common.models import CustomerSyncLog
 from apps.users.models import User
 
 logger = logging.getLogger(__name__)
 
+# Сколько не найденных onec_id сохранять в сводке пакета
+BATCH_SUMMARY_SAMPLE_SIZE = 20
+
 
 class CustomerIdentityResolver:
     """
@@ -76,6 +82,68 @@ class CustomerIdentityResolver:
         self._log_identification("not_found", None, onec_customer_data)
         return None, None
 
+    def identify_many(self, records: Sequence[dict]) -> list[Tuple[Optional[User], Optional[str]]]:
+        """
+        Пакетная идентификация клиентов.
+
+        Приоритет методов тот же, что в identify_customer, но каждый уровень
+        выполняется одним запросом по всем ещё не найденным записям пакета —
+        не более четырёх запросов на пакет. ИНН и email нормализуются заранее.
+        Если ИНН принадлежит нескольким пользователям, уровень tax_id для
+        записи пропускается (однозначного совпадения нет).
+
+        Args:
+            records: Данные клиентов из 1С
+
+        Returns:
+            list: (User|None, str|None) для каждой записи в исходном порядке
+        """
+        results: list[Tuple[Optional[User], Optional[str]]] = [(None, None)] * len(records)
+        pending = set(range(len(records)))
+        ambiguous_tax_ids: set[str] = set()
+
+        for method in self.IDENTIFICATION_METHODS:
+            keys = {index: key for index in pending if (key := self._batch_key(method, records[index]))}
+            if not keys:
+                continue
+
+            candidates: dict[str, list[User]] = {}
+            for user in User.objects.filter(**{f"{method}__in": set(keys.values())}):
+                candidates.setdefault(str(getattr(user, method)), []).append(user)
+
+            for index, key in keys.items():
+                matched = candidates.get(key)
+                if not matched:
+                    continue
+                if len(matched) > 1:
+                    # Дубликаты возможны только у ИНН: onec_id, onec_guid и email уникальны
+                    if method == "tax_id":
+                        ambiguous_tax_ids.add(key)
+                    continue
+                results[index] = (matched[0], method)
+                pending.discard(index)
+
+        self._log_identification_batch(records, results, ambiguous_tax_ids)
+        return results
+
+    def _batch_key(self, method: str, onec_customer_data: dict) -> Optional[str]:
+        """Нормализованное значение идентификатора записи для уровня method."""
+        value = onec_customer_data.get(method)
+        if not value:
+            return None
+        if method == "onec_guid":
+            try:
+                return str(value if isinstance(value, uuid.UUID) else uuid.UUID(str(value)))
+            except ValueError:
+                logger.warning(f"Invalid onec_guid format: {value}")
+                return None
+        if method == "tax_id":
+            normalized_inn = self.normalize_inn(value)
+            return normalized_inn if normalized_inn and self._validate_inn(normalized_inn) else None
+        if method == "email":
+            return self.normalize_email(value)
+        return str(value)
+
     def _find_by_onec_id(self, onec_id: str) -> Optional[User]:
         """Точный поиск по onec_id"""
         try:
@@ -201,3 +269,46 @@ class CustomerIdentityResolver:
                 "email": onec_data.get("email"),
             },
         )
+
+    def _log_identification_batch(
+        self,
+        records: Sequence[dict],
+        results: Sequence[Tuple[Optional[User], Optional[str]]],
+        ambiguous_tax_ids: set[str],
+    ) -> None:
+        """
+        Одна структурированная сводка на пакет вместо записи на каждого клиента.
+
+        Args:
+            records: Данные клиентов из 1С
+            results: Результаты identify_many
+            ambiguous_tax_ids: ИНН, найденные у нескольких пользователей
+        """
+        methods = Counter(method or "not_found" for _customer, method in results)
+        not_found = [
+            str(record.get("onec_id") or "")
+            for record, (customer, _method) in zip(records, results)
+            if customer is None
+        ]
+        summary: dict[str, Any] = {
+            "batch_size": len(records),
+            "identification_methods": dict(methods),
+            "ambiguous_tax_ids": sorted(ambiguous_tax_ids),
+            "not_found_onec_ids": [onec_id for onec_id in not_found if onec_id][:BATCH_SUMMARY_SAMPLE_SIZE],
+        }
+        logger.info("Customer identification batch", extra={"identification_summary": summary})
+
+        # Сессия берётся из записей пакета; без неё (unit-тесты) пишем только в лог
+        session = next((record.get("session") for record in records if record.get("session")), None)
+        if not session or not records:
+            return
+
+        CustomerSyncLog.objects.create(
+            session=session,
+            customer=None,
+            onec_id="",
+            operation_type=CustomerSyncLog.OperationType.CUSTOMER_IDENTIFICATION,
+            status=(CustomerSyncLog.StatusType.SUCCESS if not not_found else CustomerSyncLog.StatusType.WARNING),
+            details=summary,
+            correlation_id=uuid.uuid4(),
+        )
@@ -6,15 +6,19 @@ from __future__ import annotations
 
 import logging
 import re
+import uuid
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Any
 
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 
 from apps.common.models import CustomerSyncLog
+from apps.common.signals import log_records_bulk_created
 from apps.users.models import Company, User
 
 if TYPE_CHECKING:
@@ -23,6 +27,37 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CHUNK_SIZE = 500
+
+B2B_CUSTOMER_TYPES = ("legal_entity", "individual_entrepreneur")
+
+# Поля пользователя, которые импорт из 1С перезаписывает у существующих клиентов
+USER_UPDATE_FIELDS = [
+    "first_name",
+    "last_name",
+    "role",
+    "phone",
+    "company_name",
+    "tax_id",
+    "onec_id",
+    "sync_status",
+    "last_sync_at",
+    "updated_at",
+]
+COMPANY_UPDATE_FIELDS = ["legal_name", "tax_id", "kpp", "legal_address", "updated_at"]
+
+
+@dataclass
+class CustomerChunkWrites:
+    """Изменения одного пакета клиентов, накопленные в памяти до bulk-записи."""
+
+    users_to_create: list[User] = field(default_factory=list)
+    users_to_update: dict[int, User] = field(default_factory=dict)  # pk → изменённый пользователь
+    companies_to_create: dict[int, Company] = field(default_factory=dict)  # id(user) → новая компания
+    companies_to_update: dict[int, Company] = field(default_factory=dict)  # pk → изменённая компания
+    sync_logs: list[CustomerSyncLog] = field(default_factory=list)
+    stats: dict[str, int] = field(default_factory=lambda: {"created": 0, "updated": 0, "skipped": 0, "errors": 0})
+
 
 class CustomerDataProcessor:
     """
@@ -154,10 +189,19 @@ class CustomerDataProcessor:
             )
             return None
 
-    def process_customers(self, customers_data: list[dict[str, Any]], chunk_size: int = 100) -> dict[str, int]:
+    def process_customers(
+        self, customers_data: list[dict[str, Any]], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> dict[str, int]:
         """
         Обрабатывает список клиентов пакетами.
 
+        Для каждого пакета кандидаты-дубликаты загружаются одним запросом
+        (onec_id__in / email__in), решение создать/обновить принимается в
+        памяти, пользователи, компании и CustomerSyncLog пишутся через
+        bulk_create/bulk_update. Если запись пакета не удалась (например,
+        конфликт уникальности с параллельным импортом), пакет откатывается и
+        обрабатывается поштучно через process_customer.
+
         Args:
             customers_data: Список словарей с данными клиентов
             chunk_size: Размер пакета для обработки
@@ -165,6 +209,9 @@ class CustomerDataProcessor:
         Returns:
             Dict: Статистика обработки (total, created, updated, skipped, errors)
         """
+        if chunk_size < 1:
+            raise ValueError("chunk_size должен быть больше либо равен 1.")
+
         stats = {
             "total": len(customers_data),
             "created": 0,
@@ -173,35 +220,23 @@ class CustomerDataProcessor:
             "errors": 0,
         }
 
-        for i, customer_data in enumerate(customers_data, 1):
-            logger.debug(f"Обработка клиента {i}/{len(customers_data)}")
+        for start in range(0, len(customers_data), chunk_size):
+            chunk = customers_data[start : start + chunk_size]
+            logger.debug(f"Обработка клиентов {start + 1}-{start + len(chunk)}/{len(customers_data)}")
 
-            # Получаем onec_id перед обработкой для логирования
-            onec_id = customer_data.get("onec_id", f"unknown-{i}")
+            try:
+                with transaction.atomic():
+                    chunk_stats = self._process_chunk(chunk)
+            except Exception as e:
+                logger.warning(
+                    f"Пакетная запись клиентов {start + 1}-{start + len(chunk)} не удалась ({e}), "
+                    f"переход на поштучную обработку",
+                    exc_info=True,
+                )
+                chunk_stats = self._process_chunk_one_by_one(chunk)
 
-            # Проверяем, существует ли уже пользователь
-            existing_user = self._find_duplicate(customer_data)
-
-            result = self.process_customer(customer_data)
-
-            if result:
-                # Определяем, была ли это операция создания или обновления
-                if existing_user:
-                    stats["updated"] += 1
-                else:
-                    stats["created"] += 1
-            else:
-                # Проверяем логи на наличие записи с типом SKIPPED
-                skipped_log = CustomerSyncLog.objects.filter(
-                    session=str(self.session.pk),
-                    onec_id=onec_id,
-                    operation_type="skipped",
-                ).exists()
-
-                if skipped_log:
-                    stats["skipped"] += 1
-                else:
-                    stats["errors"] += 1
+            for key, value in chunk_stats.items():
+                stats[key] += value
 
         logger.info(
             f"Обработка завершена. Статистика: "
@@ -211,6 +246,194 @@ class CustomerDataProcessor:
 
         return stats
 
+    def _process_chunk(self, chunk: list[dict[str, Any]]) -> dict[str, int]:
+        """
+        Обрабатывает пакет клиентов за фиксированное число запросов.
+
+        Порядок поиска дубликатов совпадает с _find_duplicate (onec_id, затем
+        email). Клиенты, созданные раньше в этом же пакете, тоже участвуют в
+        поиске — повторная запись в файле обновляет их, как при поштучной
+        обработке.
+        """
+        writes = CustomerChunkWrites()
+        valid: list[tuple[str, str, dict[str, Any]]] = []
+
+        for customer_data in chunk:
+            onec_id = customer_data.get("onec_id")
+            if not onec_id:
+                logger.error("Отсутствует onec_id в данных клиента")
+                writes.stats["errors"] += 1
+                continue
+
+            email = customer_data.get("email", "").strip()
+            if email and not self._validate_email(email):
+                logger.warning(f"Невалидный email для клиента {onec_id}: {email}")
+                writes.sync_logs.append(
+                    self._build_log_entry(
+                        user=None,
+                        onec_id=onec_id,
+                        operation_type="error",
+                        status="failed",
+                        error_message=f"Невалидный формат email: {email}",
+                    )
+                )
+                writes.stats["errors"] += 1
+                continue
+
+            valid.append((onec_id, email, customer_data))
+
+        users_by_onec_id, users_by_email = self._preload_candidates(valid)
+        b2b_user_ids = []
+        for onec_id, email, customer_data in valid:
+            candidate = users_by_onec_id.get(onec_id) or users_by_email.get(email)
+            if candidate is not None and customer_data.get("customer_type", "") in B2B_CUSTOMER_TYPES:
+                b2b_user_ids.append(candidate.pk)
+        companies_by_user_id = self._preload_companies(b2b_user_ids)
+        sync_time = timezone.now()
+
+        for onec_id, email, customer_data in valid:
+            role = self.map_role(customer_data.get("customer_type", ""))
+            existing_user = users_by_onec_id.get(onec_id) or (users_by_email.get(email) if email else None)
+
+            if existing_user is not None:
+                previous_role = existing_user.role
+                user = self._apply_customer_update(existing_user, customer_data, role)
+                if user.pk is not None:
+                    user.updated_at = sync_time  # bulk_update не применяет auto_now
+                    writes.users_to_update[user.pk] = user
+                writes.sync_logs.append(
+                    self._build_log_entry(
+                        user=user,
+                        onec_id=onec_id,
+                        operation_type="updated",
+                        status="success",
+                        details={"previous_role": previous_role, "new_role": role},
+                    )
+                )
+                writes.stats["updated"] += 1
+            else:
+                user = self._build_customer(customer_data, role)
+                writes.users_to_create.append(user)
+                writes.sync_logs.append(
+                    self._build_log_entry(
+                        user=user,
+                        onec_id=onec_id,
+                        operation_type="created",
+                        status="success",
+                        details={
+                            "role": role,
+                            "has_email": bool(email),
+                            "customer_type": customer_data.get("customer_type"),
+                        },
+                    )
+                )
+                if not email:
+                    writes.sync_logs.append(
+                        self._build_log_entry(
+                            user=user,
+                            onec_id=onec_id,
+                            operation_type="created",
+                            status="warning",
+                            details={"notes": "Клиент создан без email адреса"},
+                        )
+                    )
+                writes.stats["created"] += 1
+
+            # Новые клиенты пакета видны последующим записям этого же пакета
+            if user.onec_id:
+                users_by_onec_id.setdefault(user.onec_id, user)
+            if user.email:
+                users_by_email.setdefault(user.email, user)
+
+            if customer_data.get("customer_type", "") in B2B_CUSTOMER_TYPES:
+                self._stage_company(user, customer_data, companies_by_user_id, writes)
+
+        self._flush_chunk(writes)
+        return writes.stats
+
+    def _process_chunk_one_by_one(self, chunk: list[dict[str, Any]]) -> dict[str, int]:
+        """Поштучная обработка пакета: каждый клиент в своей транзакции."""
+        stats = {"created": 0, "updated": 0, "skipped": 0, "errors": 0}
+        for customer_data in chunk:
+            existing_user = self._find_duplicate(customer_data)
+            if self.process_customer(customer_data) is None:
+                stats["errors"] += 1
+            elif existing_user:
+                stats["updated"] += 1
+            else:
+                stats["created"] += 1
+        return stats
+
+    def _preload_candidates(
+        self, records: list[tuple[str, str, dict[str, Any]]]
+    ) -> tuple[dict[str, User], dict[str, User]]:
+        """Загружает существующих пользователей пакета одним запросом по onec_id и email."""
+        onec_ids = {onec_id for onec_id, _email, _data in records}
+        emails = {email for _onec_id, email, _data in records if email}
+        if not onec_ids and not emails:
+            return {}, {}
+
+        query = Q(onec_id__in=onec_ids)
+        if emails:
+            query |= Q(email__in=emails)
+
+        users_by_onec_id: dict[str, User] = {}
+        users_by_email: dict[str, User] = {}
+        for user in User.objects.filter(query).order_by("pk"):
+            if user.onec_id in onec_ids:
+                users_by_onec_id.setdefault(user.onec_id, user)
+            if user.email in emails:
+                users_by_email.setdefault(user.email, user)
+        return users_by_onec_id, users_by_email
+
+    def _preload_companies(self, user_ids: list[int]) -> dict[int, Company]:
+        """Загружает компании существующих B2B клиентов пакета одним запросом."""
+        if not user_ids:
+            return {}
+        return {company.user_id: company for company in Company.objects.filter(user_id__in=user_ids)}
+
+    def _stage_company(
+        self,
+        user: User,
+        customer_data: dict[str, Any],
+        companies_by_user_id: dict[int, Company],
+        writes: CustomerChunkWrites,
+    ) -> None:
+        """Готовит создание или обновление компании B2B клиента без записи в БД."""
+        company = companies_by_user_id.get(user.pk) if user.pk is not None else None
+        if company is None:
+            company = writes.companies_to_create.get(id(user))
+        if company is None:
+            company = Company(user=user)
+            writes.companies_to_create[id(user)] = company
+
+        self._apply_company_data(company, customer_data)
+        if company.pk is not None:
+            company.updated_at = timezone.now()  # bulk_update не применяет auto_now
+            writes.companies_to_update[company.pk] = company
+
+    def _flush_chunk(self, writes: CustomerChunkWrites) -> None:
+        """Записывает изменения пакета: по одному bulk-запросу на модель."""
+        if writes.users_to_create:
+            User.objects.bulk_create(writes.users_to_create)
+        if writes.users_to_update:
+            User.objects.bulk_update(list(writes.users_to_update.values()), USER_UPDATE_FIELDS)
+
+        # user_id новых компаний и логов берётся из pk, полученных bulk_create выше
+        new_companies = list(writes.companies_to_create.values())
+        if new_companies:
+            Company.objects.bulk_create(new_companies)
+        if writes.companies_to_update:
+            Company.objects.bulk_update(list(writes.companies_to_update.values()), COMPANY_UPDATE_FIELDS)
+        if writes.sync_logs:
+            CustomerSyncLog.objects.bulk_create(writes.sync_logs)
+            log_records_bulk_created.send(sender=CustomerSyncLog, records=writes.sync_logs)
+
+        logger.info(
+            f"Пакет клиентов записан: создано={len(writes.users_to_create)}, "
+            f"обновлено={len(writes.users_to_update)}, компаний={len(new_companies) + len(writes.companies_to_update)}"
+        )
+
     def _find_duplicate(self, customer_data: dict[str, Any]) -> User | None:
         """
         Ищет дубликаты клиента по onec_id и email.
@@ -310,6 +533,28 @@ class CustomerDataProcessor:
         Returns:
             User: Созданный пользователь
         """
+        user = self._build_customer(customer_data, role)
+        user.save(force_insert=True)
+
+        # Создаем объект Company для B2B клиентов (юр.лиц и ИП)
+        customer_type = customer_data.get("customer_type", "")
+        if customer_type in B2B_CUSTOMER_TYPES:
+            self._create_or_update_company(user, customer_data)
+
+        logger.info(f"Создан новый пользователь: {str(user.email or user.onec_id)} (role={role})")
+        return user
+
+    def _build_customer(self, customer_data: dict[str, Any], role: str) -> User:
+        """
+        Собирает несохранённого пользователя из данных клиента.
+
+        Args:
+            customer_data: Словарь с данными клиента
+            role: Роль пользователя
+
+        Returns:
+            User: Новый пользователь (без pk)
+        """
         email = customer_data.get("email", "").strip()
         first_name = customer_data.get("first_name", "").strip()
         last_name = customer_data.get("last_name", "").strip()
@@ -328,7 +573,7 @@ class CustomerDataProcessor:
             else:
                 last_name = name
 
-        user = User.objects.create(
+        return User(
             email=email or None,  # None для пустого email (уникальность)
             first_name=first_name,
             last_name=last_name,
@@ -342,17 +587,32 @@ class CustomerDataProcessor:
             last_sync_at=timezone.now(),
         )
 
-        # Создаем объект Company для B2B клиентов (юр.лиц и ИП)
+    def _update_customer(self, user: User, customer_data: dict[str, Any], role: str) -> User:
+        """
+        Обновляет существующего пользователя данными из 1С.
+
+        Args:
+            user: Существующий пользователь
+            customer_data: Словарь с данными клиента
+            role: Новая роль пользователя
+
+        Returns:
+            User: Обновленный пользователь
+        """
+        self._apply_customer_update(user, customer_data, role)
+        user.save()
+
+        # Создаем/обновляем объект Company для B2B клиентов
         customer_type = customer_data.get("customer_type", "")
-        if customer_type in ["legal_entity", "individual_entrepreneur"]:
+        if customer_type in B2B_CUSTOMER_TYPES:
             self._create_or_update_company(user, customer_data)
 
-        logger.info(f"Создан новый пользователь: {str(user.email or onec_id)} (role={role})")
+        logger.info(f"Обновлен пользователь: {str(user.email or user.onec_id)} (role={role})")
         return user
 
-    def _update_customer(self, user: User, customer_data: dict[str, Any], role: str) -> User:
+    def _apply_customer_update(self, user: User, customer_data: dict[str, Any], role: str) -> User:
         """
-        Обновляет существующего пользователя данными из 1С.
+        Переносит данные из 1С в существующего пользователя без сохранения.
 
         Args:
             user: Существующий пользователь
@@ -360,7 +620,7 @@ class CustomerDataProcessor:
             role: Новая роль пользователя
 
         Returns:
-            User: Обновленный пользователь
+            User: Тот же пользователь с обновлёнными полями
         """
         # Обновляем поля из 1С
         user.first_name = customer_data.get("first_name", user.first_name)
@@ -377,15 +637,6 @@ class CustomerDataProcessor:
             user.onec_id = customer_data.get("onec_id")
         user.sync_status = "synced"
         user.last_sync_at = timezone.now()
-
-        user.save()
-
-        # Создаем/обновляем объект Company для B2B клиентов
-        customer_type = customer_data.get("customer_type", "")
-        if customer_type in ["legal_entity", "individual_entrepreneur"]:
-            self._create_or_update_company(user, customer_data)
-
-        logger.info(f"Обновлен пользователь: {str(user.email or user.onec_id)} (role={role})")
         return user
 
     def _log_operation(
@@ -408,9 +659,19 @@ class CustomerDataProcessor:
             error_message: Сообщение об ошибке
             details: Дополнительные детали операции
         """
-        import uuid
+        self._build_log_entry(user, onec_id, operation_type, status, error_message, details).save()
 
-        CustomerSyncLog.objects.create(
+    def _build_log_entry(
+        self,
+        user: User | None,
+        onec_id: str,
+        operation_type: str,
+        status: str,
+        error_message: str = "",
+        details: dict[str, Any] | None = None,
+    ) -> CustomerSyncLog:
+        """Собирает несохранённую запись CustomerSyncLog (см. _log_operation)."""
+        return CustomerSyncLog(
             session=str(self.session.pk),  # CharField - преобразуем ID в строку
             customer=user,  # Поле называется customer, не user
             onec_id=onec_id,
@@ -432,31 +693,31 @@ class CustomerDataProcessor:
         Returns:
             Company: Созданный или обновленный объект компании
         """
-        # Получаем данные компании из customer_data
-        legal_name = customer_data.get("full_name", "") or customer_data.get("name", "")
-        tax_id = customer_data.get("tax_id", "").strip()
-        kpp = customer_data.get("kpp", "").strip()
-        legal_address = customer_data.get("address", "").strip()
-
         # Пытаемся найти существующую компанию
         try:
             company = Company.objects.get(user=user)
             # Обновляем данные компании
-            company.legal_name = legal_name
-            company.tax_id = tax_id
-            company.kpp = kpp
-            company.legal_address = legal_address
+            self._apply_company_data(company, customer_data)
             company.save()
             logger.debug(f"Обновлена компания для пользователя {user.onec_id}")
         except Company.DoesNotExist:
             # Создаем новую компанию
-            company = Company.objects.create(
-                user=user,
-                legal_name=legal_name,
-                tax_id=tax_id,
-                kpp=kpp,
-                legal_address=legal_address,
-            )
-            logger.info(f"Создана компания '{legal_name}' для пользователя {user.onec_id}")
+            company = Company(user=user)
+            self._apply_company_data(company, customer_data)
+            company.save(force_insert=True)
+            logger.info(f"Создана компания '{company.legal_name}' для пользователя {user.onec_id}")
 
         return company
+
+    def _apply_company_data(self, company: Company, customer_data: dict[str, Any]) -> None:
+        """
+        Переносит реквизиты компании из данных клиента без сохранения.
+
+        Args:
+            company: Новая или существующая компания
+            customer_data: Словарь с данными клиента из парсера
+        """
+        company.legal_name = customer_data.get("full_name", "") or customer_data.get("name", "")
+        company.tax_id = customer_data.get("tax_id", "").strip()
+        company.kpp = customer_data.get("kpp", "").strip()
+        company.legal_address = customer_data.get("address", "").strip()
@@ -5,13 +5,14 @@ Views для личного кабинета пользователя
 from dataclasses import dataclass
 from typing import Any
 
-from django.db.models import Avg, Count, Sum
 from drf_spectacular.utils import extend_schema
 from rest_framework import permissions, status, viewsets
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.common.services.query_budget import query_budget
 from apps.orders.models import Order
+from apps.orders.services import OrderStatisticsService
 
 from ..models import Address, Favorite, User
 from ..serializers import (
@@ -89,26 +90,23 @@ class UserDashboardView(APIView):
         """
         Получение статистики заказов пользователя
 
+        Читает материализованную сводку `UserOrderStatistics` одним запросом
+        по первичному ключу. Учитываются только мастер-заказы — субзаказы
+        являются техническими документами для 1С.
+
         Args:
             user: Пользователь для которого получаем статистику
 
         Returns:
             dict: Словарь со статистикой заказов
         """
-        # Получаем QuerySet заказов пользователя
-        user_orders = Order.objects.filter(user=user)
-
-        # Получаем агрегированную статистику заказов
-        stats = user_orders.aggregate(
-            orders_count=Count("id"),
-            total_sum=Sum("total_amount"),
-            average_amount=Avg("total_amount"),
-        )
+        stats = OrderStatisticsService.get_for_user(user)
+        avg_amount = stats.avg_amount
 
         return {
-            "count": stats["orders_count"] or 0,
-            "total_amount": (float(stats["total_sum"]) if stats["total_sum"] else None),
-            "avg_amount": (float(stats["average_amount"]) if stats["average_amount"] else None),
+            "count": stats.orders_count,
+            "total_amount": (float(stats.total_amount) if stats.total_amount else None),
+            "avg_amount": (float(avg_amount) if avg_amount else None),
         }
 
 
@@ -184,6 +182,7 @@ class FavoriteViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
+@query_budget(12)
 class OrderHistoryView(APIView):
     """История заказов пользователя"""
 
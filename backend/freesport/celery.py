@@ -41,6 +41,22 @@ app.conf.beat_schedule = {
             "expires": 3500,
         },
     },
+    # Ночная сверка статистики заказов личного кабинета
+    "reconcile-user-order-statistics-nightly": {
+        "task": "apps.orders.tasks.reconcile_user_order_statistics",
+        "schedule": crontab(minute="15", hour="3"),  # Ежедневно в 03:15
+        "options": {
+            "expires": 60 * 60 * 6,
+        },
+    },
+    # Повторная постановка импорта orders.xml, оставшихся во входящей папке
+    "requeue-orders-xml-sessions": {
+        "task": "apps.orders.tasks.requeue_orders_xml_sessions",
+        "schedule": crontab(minute="*/10"),  # Каждые 10 минут
+        "options": {
+            "expires": 60 * 10,
+        },
+    },
 }
 
 
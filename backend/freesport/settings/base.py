@@ -76,6 +76,8 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 # Middleware в порядке выполнения
 MIDDLEWARE = [
+    "apps.common.middleware.PrometheusMiddleware",
+    "apps.common.middleware.QueryBudgetMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -232,6 +234,9 @@ CELERY_RESULT_BACKEND = config(
     default=CELERY_BROKER_URL,
 )
 
+# Цены и остатки 1С — в приоритетную очередь (apps.products.services.import_lanes)
+CELERY_TASK_ROUTES = ("apps.products.services.import_lanes.route_import_task",)
+
 # Celery Beat Schedule (Story 29.4 - мониторинг pending верификаций)
 CELERY_BEAT_SCHEDULE = {
     "monitor-pending-verification-queue": {
@@ -306,6 +311,29 @@ ONEC_EXCHANGE = {
     "COMMERCEML_VERSION": "3.1",  # CommerceML protocol version
     "TEMP_DIR": ONEC_PRIVATE_DIR / "1c_temp",  # Temporary directory for chunked uploads
     "IMPORT_DIR": ONEC_PRIVATE_DIR / "1c_import",  # Private directory for routed import files
+    # Файлы обмена только ценами/остатками — по каталогу на сессию (import_lanes.priority_data_dir)
+    "PRIORITY_IMPORT_DIR": ONEC_PRIVATE_DIR / "1c_import_priority",
+    # Конвейерный обмен: сегмент разбирается в staging сразу по mode=import (пока 1С грузит
+    # остальные), строки применяются на mode=complete. Только для полной выгрузки —
+    # инкрементальная выгрузка 1С не присылает mode=complete
+    "PIPELINED_IMPORT": config("ONEC_PIPELINED_IMPORT", default=False, cast=bool),
+    # Цены и остатки применяются COPY во временные таблицы и одним UPDATE ... FROM на фазу
+    # (PostgreSQL): витрина не видит наполовину обновленные цены/остатки
+    "SET_BASED_APPLY": config("ONEC_SET_BASED_APPLY", default=False, cast=bool),
+    # Объединение mode=import: один импорт после N секунд без новых файлов, файлы,
+    # пришедшие во время импорта, — следующим инкрементом. 0 — импорт на каждый mode=import
+    "IMPORT_QUIET_WINDOW_SECONDS": config("ONEC_IMPORT_QUIET_WINDOW_SECONDS", default=0, cast=int),
+    # Обмен только ценами/остатками — в отдельную очередь Celery со своим воркером
+    # (celery-priority в docker-compose). Пустое значение — все импорты в общей очереди
+    "PRIORITY_IMPORT_QUEUE": config("ONEC_PRIORITY_IMPORT_QUEUE", default="imports_priority"),
+    # Импорт каталога ждет приоритетные импорты между фазами не дольше N секунд
+    # за весь импорт. 0 — без вытеснения
+    "PRIORITY_PREEMPTION_MAX_WAIT_SECONDS": config("ONEC_PRIORITY_PREEMPTION_MAX_WAIT_SECONDS", default=120, cast=int),
+    # orders.xml из mode=file: тело пишется на диск (EXCHANGE_LOG_DIR/inbox), 1С сразу получает
+    # success, статусы применяет задача Celery (сессия импорта «Статусы заказов»).
+    # False — разбор и применение в запросе 1С (лимит ORDERS_XML_MAX_SIZE)
+    "ORDERS_XML_ASYNC": config("ONEC_ORDERS_XML_ASYNC", default=False, cast=bool),
+    "ORDERS_XML_ASYNC_MAX_BYTES": config("ONEC_ORDERS_XML_ASYNC_MAX_BYTES", default=100 * 1024 * 1024, cast=int),
     # Реквизиты заказа для УТ 11 (фиксированные значения — операция и статус)
     "ORDER_DEFAULTS": {
         "OPERATION": "Реализация",
@@ -561,6 +589,51 @@ LOGGING = {
     },
 }
 
+# Буферизованная запись CustomerSyncLog/AuditLog (apps.common.services.log_buffer)
+LOG_BUFFER = {
+    "ENABLED": config("LOG_BUFFER_ENABLED", default=True, cast=bool),
+    "BATCH_SIZE": config("LOG_BUFFER_BATCH_SIZE", default=200, cast=int),
+    "FLUSH_INTERVAL_SECONDS": config("LOG_BUFFER_FLUSH_INTERVAL", default=5.0, cast=float),
+}
+
+# Предагрегированные метрики CustomerSyncLog в Redis (apps.common.services.sync_metrics).
+# Метрики читаются из бакетов только за период, покрытый `manage.py rebuild_sync_metrics
+# --days=N` (после включения или потери данных Redis), до этого — по таблице логов
+SYNC_METRICS = {
+    "ENABLED": config("SYNC_METRICS_ENABLED", default=True, cast=bool),
+    "KEY_PREFIX": "sync_metrics",
+}
+
+# Токен для /api/v1/monitoring/metrics/prometheus/ (Authorization: Bearer <token>).
+# Метрики включаются переменной PROMETHEUS_METRICS_ENABLED, под gunicorn
+# дополнительно задаётся PROMETHEUS_MULTIPROC_DIR.
+PROMETHEUS_METRICS_TOKEN = config("PROMETHEUS_METRICS_TOKEN", default="")
+
+# Бюджет SQL-запросов на HTTP-запрос (apps.common.middleware.QueryBudgetMiddleware):
+# MODE = off | log | enforce; в режиме log проверяется доля SAMPLE_RATE запросов.
+QUERY_BUDGET = {
+    "MODE": config("QUERY_BUDGET_MODE", default="off"),
+    "SAMPLE_RATE": config("QUERY_BUDGET_SAMPLE_RATE", default=0.01, cast=float),
+    "DUPLICATE_THRESHOLD": config("QUERY_BUDGET_DUPLICATE_THRESHOLD", default=10, cast=int),
+    "STACK_DEPTH": 8,
+}
+
+# Профилирование обменов с 1С (apps.common.services.profiling): MODE = off | phases | sampling.
+# Действует для обменов, запущенных 1С; сессии из админки задают режим сами.
+EXCHANGE_PROFILING = {
+    "MODE": config("EXCHANGE_PROFILING_MODE", default="off"),
+    "SAMPLE_INTERVAL": config("EXCHANGE_PROFILING_SAMPLE_INTERVAL", default=0.01, cast=float),
+}
+
+# Архив журналов обмена с 1С (apps.integrations.onec_exchange.exchange_archive):
+# orders.xml и ответы mode=query сжимаются фоновым потоком в EXCHANGE_LOG_DIR/archive
+# с индексом index.sqlite3; ротация по суммарному размеру (байт) и возрасту (дней).
+EXCHANGE_ARCHIVE = {
+    "ENABLED": config("EXCHANGE_ARCHIVE_ENABLED", default=True, cast=bool),
+    "MAX_BYTES": config("EXCHANGE_ARCHIVE_MAX_BYTES", default=2 * 1024**3, cast=int),
+    "MAX_AGE_DAYS": config("EXCHANGE_ARCHIVE_MAX_AGE_DAYS", default=30, cast=int),
+}
+
 # Banner limits (Story 32.4)
 MARKETING_BANNER_LIMIT = 5
 HERO_BANNER_LIMIT = 10
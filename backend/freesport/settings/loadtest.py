@@ -0,0 +1,63 @@
+"""
+Настройки для нагрузочного прогона обмена с 1С (manage.py onec_exchange_load_test).
+
+Только локальные заменители внешних сервисов:
+- БД: PostgreSQL из docker/docker-compose.test.yml (переменные DB_* как в test.py;
+  SQLite не подходит — миграции products на нем не применяются);
+- Redis: fakeredis в процессе (если установлен), иначе LocMemCache;
+- Celery: брокер memory:// — задачи импорта ставятся в очередь, но не выполняются,
+  если не задан CELERY_BROKER_URL с реальным воркером.
+
+Пример:
+    docker compose -f docker/docker-compose.test.yml up -d db
+    DB_PORT=5433 DB_PASSWORD=password123 python manage.py migrate --settings=freesport.settings.loadtest
+    DB_PORT=5433 DB_PASSWORD=password123 python manage.py onec_exchange_load_test \\
+        --settings=freesport.settings.loadtest --offers=100000
+"""
+
+# pylint: disable=wildcard-import, unused-wildcard-import
+import os
+
+from .test import *  # noqa: F403, F401, F405
+
+try:
+    from fakeredis import FakeConnection, FakeServer
+
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": "redis://loadtest:6379/0",
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "CONNECTION_POOL_KWARGS": {"connection_class": FakeConnection, "server": FakeServer()},
+            },
+        }
+    }
+except ImportError:
+    # Сервер прогона — один процесс, поэтому локальный кеш для него общий
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "loadtest"}}
+    SILENCED_SYSTEM_CHECKS = ["django_ratelimit.E003", "django_ratelimit.W001"]
+
+CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "memory://")
+CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "cache+memory://")
+
+ALLOWED_HOSTS = ["*"]
+
+# Бюджеты запросов только логируются: нагрузка не должна обрываться исключением
+QUERY_BUDGET = {**QUERY_BUDGET, "MODE": "log"}  # noqa: F405
+
+# Каталоги обмена отдельно от разработки; короткий таймаут блокировки,
+# чтобы без fcntl конкуренция за файл проявлялась как FileLockError («File busy»)
+ONEC_PRIVATE_DIR = Path(os.environ.get("ONEC_PRIVATE_DIR", str(BASE_DIR / "var" / "loadtest")))  # noqa: F405
+ONEC_EXCHANGE = {
+    **ONEC_EXCHANGE,  # noqa: F405
+    "TEMP_DIR": ONEC_PRIVATE_DIR / "1c_temp",
+    "IMPORT_DIR": ONEC_PRIVATE_DIR / "1c_import",
+    "PRIORITY_IMPORT_DIR": ONEC_PRIVATE_DIR / "1c_import_priority",
+    "LOCK_TIMEOUT_SECONDS": float(os.environ.get("LOADTEST_LOCK_TIMEOUT", "2")),
+}
+ONEC_DATA_DIR = str(ONEC_EXCHANGE["IMPORT_DIR"])
+EXCHANGE_LOG_DIR = str(ONEC_PRIVATE_DIR / "logs")
+
+# Разрешение для manage.py onec_exchange_load_test (создает пользователя и заказы в БД)
+ONEC_LOAD_TEST_ENABLED = True
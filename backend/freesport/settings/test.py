@@ -1,7 +1,11 @@
 """Настройки окружения для тестов FREESPORT."""
 
 # pylint: disable=wildcard-import, unused-wildcard-import
+import atexit
 import os
+import shutil
+import tempfile
+from pathlib import Path
 from typing import Any  # pylint: disable=unused-import
 
 from .base import *  # noqa: F403, F401, F405
@@ -92,6 +96,29 @@ DEFAULT_FROM_EMAIL = os.environ.get(
 # Отключаем логирование в консоль, чтобы вывод тестов был чистым.
 LOGGING: dict[str, Any] = {}  # type: ignore[no-redef]
 
+# Синхронная запись журналов: тесты проверяют записи сразу после действия.
+LOG_BUFFER = {**LOG_BUFFER, "ENABLED": False}
+
+# Redis общий для всех тестов — метрики синхронизации считаются по БД.
+SYNC_METRICS = {**SYNC_METRICS, "ENABLED": False}
+
+# Бюджеты @query_budget проверяются на каждом запросе тестового клиента.
+QUERY_BUDGET = {**QUERY_BUDGET, "MODE": "enforce"}
+
+# Каталоги обмена с 1С и журналы — во временном каталоге процесса, а не в backend/var.
+# Архиватор журналов (фоновый поток) включают только его тесты.
+TEST_VAR_DIR = Path(tempfile.mkdtemp(prefix="freesport-test-"))
+atexit.register(shutil.rmtree, TEST_VAR_DIR, ignore_errors=True)
+ONEC_PRIVATE_DIR = TEST_VAR_DIR / "onec"
+ONEC_EXCHANGE = {
+    **ONEC_EXCHANGE,
+    "TEMP_DIR": ONEC_PRIVATE_DIR / "1c_temp",
+    "IMPORT_DIR": ONEC_PRIVATE_DIR / "1c_import",
+    "PRIORITY_IMPORT_DIR": ONEC_PRIVATE_DIR / "1c_import_priority",
+}
+EXCHANGE_LOG_DIR = str(TEST_VAR_DIR / "1c_exchange" / "logs")
+EXCHANGE_ARCHIVE = {**EXCHANGE_ARCHIVE, "ENABLED": False}
+
 # В тестах throttle не должен пересекаться между кейсами/worker-ами.
 REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] = {
     **REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"],
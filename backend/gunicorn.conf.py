@@ -0,0 +1,27 @@
+"""
+Настройки gunicorn, общие для Dockerfile и docker/entrypoint_backend.sh.
+
+gunicorn загружает ./gunicorn.conf.py из рабочего каталога автоматически;
+параметры командной строки имеют приоритет над значениями отсюда.
+
+Метрики prometheus_client: воркеры — отдельные процессы, поэтому при
+PROMETHEUS_METRICS_ENABLED значения пишутся в PROMETHEUS_MULTIPROC_DIR.
+Переменная задаётся здесь, до загрузки приложения (--preload), а каталог
+очищается при старте мастера, чтобы не суммировать счётчики прошлых запусков.
+"""
+
+import os
+import shutil
+
+if os.environ.get("PROMETHEUS_METRICS_ENABLED", "false").lower() in ("true", "1", "yes"):
+    multiproc_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Пометить завершившийся воркер в файлах метрик prometheus_client."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -446,6 +446,27 @@ def client():
     return Client()
 
 
+@pytest.fixture
+def assert_query_budget():
+    """
+    Проверка бюджета SQL-запросов для блока кода с отчётом о повторах (N+1).
+
+        with assert_query_budget(12):
+            api_client.get(url)
+    """
+    from contextlib import contextmanager
+
+    from apps.common.services.query_budget import QueryRecorder
+
+    @contextmanager
+    def _assert_query_budget(max_queries: int):
+        with QueryRecorder(capture_stacks=True) as recorder:
+            yield recorder
+        recorder.assert_within(max_queries)
+
+    return _assert_query_budget
+
+
 @pytest.fixture
 def user_factory():
     """
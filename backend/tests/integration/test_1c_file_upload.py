@@ -345,6 +345,64 @@ class Test1CFileUpload:
         assert expected_file.read_bytes() == large_content
 
 
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestResumableUpload:
+    """mode=file with offset/checksum/file_checksum: resumable, idempotent chunks"""
+
+    URL = "/api/integration/1c/exchange/?mode=file&filename=goods_1.zip&sessid={sessid}"
+
+    def post(self, client, body: bytes, **params: Any):
+        sessid = get_session_id(client)
+        query = "".join(f"&{key}={value}" for key, value in params.items())
+        return client.post(self.URL.format(sessid=sessid) + query, data=body, content_type="application/octet-stream")
+
+    def test_resent_chunk_writes_only_missing_bytes(self, authenticated_client, temp_1c_dir):
+        import hashlib
+
+        data = bytes(range(256)) * 400
+        first, second = data[:60000], data[40000:]
+
+        assert self.post(authenticated_client, first, offset=0).content == b"success\nreceived=60000"
+        # Connection dropped: the client resends from its last acknowledged offset
+        response = self.post(authenticated_client, second, offset=40000, checksum=hashlib.sha256(second).hexdigest())
+
+        assert response.content == f"success\nreceived={len(data)}".encode()
+        assert (temp_1c_dir / get_session_id(authenticated_client) / "goods_1.zip").read_bytes() == data
+        # Empty body is a status probe
+        assert (
+            self.post(authenticated_client, b"", offset=len(data)).content == f"success\nreceived={len(data)}".encode()
+        )
+
+    def test_gap_and_bad_checksum_keep_received_bytes(self, authenticated_client, temp_1c_dir):
+        self.post(authenticated_client, b"A" * 100, offset=0)
+
+        gap = self.post(authenticated_client, b"C" * 100, offset=200)
+        corrupted = self.post(authenticated_client, b"B" * 100, offset=100, checksum="0" * 64)
+
+        assert gap.content == b"failure\nOffset mismatch\nreceived=100"
+        assert corrupted.content == b"failure\nChecksum mismatch\nreceived=100"
+        assert (temp_1c_dir / get_session_id(authenticated_client) / "goods_1.zip").read_bytes() == b"A" * 100
+
+    def test_file_checksum_is_verified_before_routing(self, authenticated_client, temp_1c_dir, tmp_path, monkeypatch):
+        import hashlib
+
+        from apps.integrations.onec_exchange.file_service import FileStreamService, UploadChecksumError
+        from apps.integrations.onec_exchange.routing_service import FileRoutingService
+
+        monkeypatch.setitem(settings.ONEC_EXCHANGE, "IMPORT_DIR", tmp_path / "1c_import")
+        sessid = get_session_id(authenticated_client)
+        self.post(authenticated_client, b"payload", offset=0, file_checksum=hashlib.sha256(b"payload").hexdigest())
+        assert FileStreamService(sessid).list_files() == ["goods_1.zip"]
+
+        assert FileRoutingService(sessid).move_to_import("goods_1.zip").read_bytes() == b"payload"
+
+        self.post(authenticated_client, b"truncated", offset=0, file_checksum="f" * 64)
+        with pytest.raises(UploadChecksumError):
+            FileRoutingService(sessid).move_to_import("goods_1.zip")
+        assert FileStreamService(sessid).list_files() == []
+
+
 @pytest.mark.django_db
 class TestFileStreamService:
     """
@@ -541,25 +599,62 @@ class TestFileStreamService:
         assert not lock_path.exists(), "Lock file should be removed after write"
 
     def test_file_lock_timeout(self, temp_1c_dir):
-        """FileLock raises FileLockError when timeout exceeded."""
-        import os
-
+        """Without fcntl the O_EXCL fallback raises FileLockError when timeout exceeded."""
+        from apps.integrations.onec_exchange import file_service
         from apps.integrations.onec_exchange.file_service import FileLock, FileLockError
 
         lock_path = temp_1c_dir / "test.lock"
+        lock_path.touch()
+
+        with patch.object(file_service, "fcntl", None):
+            lock = FileLock(lock_path, timeout=0.2)
+            with pytest.raises(FileLockError, match="Could not acquire lock"):
+                lock.acquire()
+
+        assert lock.contended is True
+        assert lock._fd is None
 
-        # Manually create a lock file to simulate held lock
+    def test_stale_lock_file_does_not_block(self, temp_1c_dir):
+        """A lock file left by a crashed holder is not a lock: flock died with the process."""
+        import os
+
+        from apps.integrations.onec_exchange.file_service import FileLock
+
+        lock_path = temp_1c_dir / "stale.lock"
         fd = os.open(str(lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
         os.close(fd)
 
-        # Try to acquire lock with very short timeout
         lock = FileLock(lock_path, timeout=0.2)
+        with lock:
+            assert lock.contended is False
+
+        assert not lock_path.exists()
+
+    def test_waiter_wakes_up_on_release(self, temp_1c_dir):
+        """A contended acquire returns as soon as the holder releases, and the wait is recorded."""
+        import threading
+
+        from prometheus_client import REGISTRY
+
+        from apps.integrations.onec_exchange.file_service import FileLock
+
+        lock_path = temp_1c_dir / "contended.lock"
+        labels = {"outcome": "contended"}
+        before = REGISTRY.get_sample_value("freesport_onec_file_lock_wait_seconds_count", labels) or 0.0
+        holder = FileLock(lock_path)
+        holder.acquire()
+        timer = threading.Timer(0.2, holder.release)
+        timer.start()
 
-        with pytest.raises(FileLockError, match="Could not acquire lock"):
-            lock.acquire()
+        # flock waits in the kernel until release: the timeout does not apply
+        waiter = FileLock(lock_path, timeout=0.05)
+        with waiter:
+            assert waiter.contended is True
+            assert 0.1 < waiter.wait_seconds < 2
+            assert lock_path.exists()
 
-        # Cleanup
-        os.unlink(str(lock_path))
+        timer.join()
+        assert REGISTRY.get_sample_value("freesport_onec_file_lock_wait_seconds_count", labels) == before + 1
 
     def test_file_has_correct_permissions(self, temp_1c_dir):
         """Files created via open_for_write have explicit permissions (0o644)."""
@@ -0,0 +1,105 @@
+"""
+Интеграционные тесты пакетов изменений 1С (СодержитТолькоИзменения="true")
+"""
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from apps.products.models import Category, ImportSession, ProductVariant
+from apps.products.services.commerceml_generator import CommerceMLDatasetGenerator, DatasetSpec
+from apps.products.services.parser import XMLDataParser
+from tests.factories import CategoryFactory, ProductFactory
+
+COMMAND_MODULE = "apps.products.management.commands.import_products_from_1c"
+
+
+def mark_changes_only(data_dir: Path) -> None:
+    for path in data_dir.rglob("*.xml"):
+        text = path.read_text(encoding="utf-8")
+        path.write_text(text.replace('СодержитТолькоИзменения="false"', 'СодержитТолькоИзменения="true"'), "utf-8")
+
+
+@pytest.fixture
+def dataset_dir(tmp_path, settings):
+    settings.EXCHANGE_LOG_DIR = str(tmp_path / "logs")
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    data_dir = tmp_path / "1c_import"
+    CommerceMLDatasetGenerator(DatasetSpec(offers=8, segment_size=0)).generate(data_dir)
+    return data_dir
+
+
+@pytest.mark.integration
+class TestChangesOnlyParser:
+    """XMLDataParser.is_changes_only читает только заголовок пакета"""
+
+    def test_full_and_changes_only_packages(self, dataset_dir):
+        parser = XMLDataParser()
+        goods = str(dataset_dir / "goods" / "goods.xml")
+        offers = str(dataset_dir / "offers" / "offers.xml")
+        assert parser.is_changes_only(goods) is False
+        assert parser.is_changes_only(offers) is False
+
+        mark_changes_only(dataset_dir)
+        assert parser.is_changes_only(goods) is True
+        assert parser.is_changes_only(offers) is True
+
+    def test_flag_after_first_item_is_ignored(self, tmp_path):
+        path = tmp_path / "offers_1.xml"
+        path.write_text(
+            '<?xml version="1.0" encoding="UTF-8"?>\n<КоммерческаяИнформация><ПакетПредложений>'
+            "<Предложения><Предложение><Ид>1</Ид></Предложение></Предложения>"
+            '<Каталог СодержитТолькоИзменения="true"/></ПакетПредложений></КоммерческаяИнформация>',
+            encoding="utf-8",
+        )
+        assert XMLDataParser().is_changes_only(str(path)) is False
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+class TestChangesOnlyImport:
+    """Пакет изменений не делает проходов по всему каталогу"""
+
+    def run_import(self, data_dir: Path) -> list:
+        devnull = open(os.devnull, "w")
+        call_command("import_attributes", data_dir=str(data_dir), stdout=devnull)
+        with patch(f"{COMMAND_MODULE}.call_command") as nested_commands:
+            call_command("import_products_from_1c", data_dir=str(data_dir), keep_files=True, stdout=devnull)
+        return [call.args[0] for call in nested_commands.call_args_list]
+
+    @pytest.mark.parametrize("changes_only", [False, True])
+    def test_catalog_wide_passes(self, dataset_dir, changes_only):
+        outside = ProductFactory(create_variant=False)
+        stale_category = CategoryFactory(onec_id="stale-group")
+        if changes_only:
+            mark_changes_only(dataset_dir)
+
+        nested_commands = self.run_import(dataset_dir)
+
+        stale_category.refresh_from_db()
+        assert ("backup_db" in nested_commands) is not changes_only
+        assert stale_category.is_active is changes_only
+        assert ProductVariant.objects.filter(product=outside).exists() is not changes_only
+        # Товары и варианты пакета импортированы в обоих режимах
+        assert ProductVariant.objects.exclude(product=outside).count() == 8
+        assert Category.objects.filter(onec_id__isnull=False, is_active=True).exists()
+
+    def test_unreadable_package_header_fails_session(self, dataset_dir):
+        (dataset_dir / "goods" / "goods.xml").write_bytes(b"<?xml version='1.0'?><broken")
+        session = ImportSession.objects.create(status=ImportSession.ImportStatus.PENDING)
+
+        with pytest.raises(CommandError, match="Invalid XML structure"), open(os.devnull, "w") as devnull:
+            call_command(
+                "import_products_from_1c",
+                data_dir=str(dataset_dir),
+                skip_backup=True,
+                import_session_id=session.pk,
+                stdout=devnull,
+            )
+
+        session.refresh_from_db()
+        assert session.status == ImportSession.ImportStatus.FAILED
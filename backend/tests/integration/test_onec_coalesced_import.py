@@ -0,0 +1,79 @@
+"""
+Интеграционные тесты объединения mode=import (ONEC_EXCHANGE["IMPORT_QUIET_WINDOW_SECONDS"])
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from apps.integrations.onec_exchange.file_service import FileStreamService
+from apps.integrations.onec_exchange.import_orchestrator import ImportOrchestratorService
+from apps.products.models import ImportSession
+
+SESSID = "coalesced-sessid"
+
+
+@pytest.fixture
+def coalescing_dirs(settings, tmp_path):
+    settings.ONEC_EXCHANGE = {
+        **settings.ONEC_EXCHANGE,
+        "TEMP_DIR": tmp_path / "1c_temp",
+        "IMPORT_DIR": tmp_path / "1c_import",
+        "PRIORITY_IMPORT_DIR": tmp_path / "1c_import_priority",
+        "IMPORT_QUIET_WINDOW_SECONDS": 30,
+    }
+    return tmp_path
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+class TestCoalescedImport:
+    """Один импорт на окно тишины, поздние файлы — следующим инкрементом"""
+
+    def test_repeated_imports_are_coalesced_into_one_run(self, coalescing_dirs):
+        file_service = FileStreamService(SESSID)
+        with patch("apps.products.tasks.dispatch_coalesced_import_task.apply_async") as schedule, patch(
+            "apps.products.tasks.process_1c_import_task.delay"
+        ) as dispatch:
+            for name in ("goods_1.xml", "offers_1.xml"):
+                file_service.append_chunk(name, b"<a/>")
+                assert ImportOrchestratorService(SESSID, name).execute() == (True, "success")
+
+            session = ImportSession.objects.get(session_key=SESSID)
+            assert schedule.call_count == 2
+            assert schedule.call_args.kwargs == {"args": (session.pk, SESSID), "countdown": 30}
+            dispatch.assert_not_called()
+
+            # Задача первого mode=import сработала раньше конца окна второго
+            assert ImportOrchestratorService(SESSID).dispatch_when_quiet(session.pk) == "rescheduled"
+
+            ImportSession.objects.filter(pk=session.pk).update(updated_at=timezone.now() - timedelta(seconds=31))
+            assert ImportOrchestratorService(SESSID).dispatch_when_quiet(session.pk) == "dispatched"
+            assert ImportOrchestratorService(SESSID).dispatch_when_quiet(session.pk) == "skipped"
+
+        dispatch.assert_called_once_with(session.pk, str(coalescing_dirs / "1c_import"), coalesced=True)
+        assert (coalescing_dirs / "1c_import" / "goods" / "goods_1.xml").exists()
+        assert (coalescing_dirs / "1c_import" / "offers" / "offers_1.xml").exists()
+
+    def test_file_arriving_during_import_becomes_follow_up(self, coalescing_dirs):
+        running = ImportSession.objects.create(session_key=SESSID, status=ImportSession.ImportStatus.IN_PROGRESS)
+        file_service = FileStreamService(SESSID)
+        file_service.append_chunk("rests_1.xml", b"<a/>")
+
+        assert ImportOrchestratorService(SESSID, "rests_1.xml").execute() == (True, "already_in_progress")
+        assert file_service.list_files() == ["rests_1.xml"]
+
+        running.status = ImportSession.ImportStatus.COMPLETED
+        running.save(update_fields=["status"])
+        with patch("apps.products.tasks.dispatch_coalesced_import_task.apply_async") as schedule:
+            assert ImportOrchestratorService(SESSID, "follow-up").dispatch_followup() is True
+            assert ImportOrchestratorService(SESSID, "follow-up").dispatch_followup() is False
+
+        followup = ImportSession.objects.get(session_key=SESSID, status=ImportSession.ImportStatus.PENDING)
+        schedule.assert_called_once_with(args=(followup.pk, SESSID), countdown=30)
+        # Инкремент только с остатками — приоритетный обмен в своем каталоге
+        assert followup.priority is True
+        assert (coalescing_dirs / "1c_import_priority" / SESSID / "rests" / "rests_1.xml").exists()
+        assert file_service.list_files() == []
@@ -0,0 +1,154 @@
+"""
+Интеграционные тесты архива журналов обмена с 1С
+(apps.integrations.onec_exchange.exchange_archive)
+"""
+
+import io
+import os
+import time
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+from django.core.management import call_command
+
+from apps.integrations.onec_exchange.exchange_archive import (
+    RECOVERY_MIN_AGE_SECONDS,
+    ArchiveJob,
+    ExchangeArchive,
+    exchange_archive,
+)
+from apps.integrations.onec_exchange.views import _save_exchange_log
+
+
+def orders_xml(*numbers: str) -> bytes:
+    documents = "".join(f"<Документ><Ид>{n}</Ид><Номер>{n}</Номер></Документ>" for n in numbers)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<КоммерческаяИнформация ВерсияСхемы="3.1">{documents}</КоммерческаяИнформация>'
+    ).encode("utf-8")
+
+
+def write_raw(log_dir, name: str, content: bytes, age_seconds: float = 0):
+    log_dir.mkdir(parents=True, exist_ok=True)
+    path = log_dir / name
+    path.write_bytes(content)
+    if age_seconds:
+        stamp = time.time() - age_seconds
+        os.utime(path, (stamp, stamp))
+    return path
+
+
+@pytest.fixture
+def log_dir(tmp_path, settings):
+    settings.EXCHANGE_LOG_DIR = str(tmp_path / "logs")
+    settings.EXCHANGE_ARCHIVE = {"ENABLED": True, "MAX_BYTES": 10 * 1024**2, "MAX_AGE_DAYS": 30}
+    return tmp_path / "logs"
+
+
+@pytest.mark.integration
+class TestExchangeArchive:
+    """Сжатие, индекс и ротация журналов"""
+
+    def test_payload_is_compressed_and_indexed(self, log_dir):
+        content = orders_xml("FS-1", "FS-2")
+        raw = write_raw(log_dir, "20260202_101500_orders.xml", content)
+        archive = ExchangeArchive(log_dir)
+
+        payload = archive.archive_now(ArchiveJob(raw, mode="file", sessid="sess-1"))
+
+        assert not raw.exists()
+        assert payload.path.name.endswith(".xml.gz")
+        assert payload.orders == ("FS-1", "FS-2")
+        assert payload.size == len(content)
+        with archive.open(payload) as f:
+            assert f.read() == content
+
+        (found,) = archive.find(order="FS-2")
+        assert (found.sessid, found.mode, found.filename) == ("sess-1", "file", raw.name)
+        assert archive.find(sessid="sess-1", mode="query") == []
+        assert archive.find(since=datetime.now() + timedelta(days=1)) == []
+
+    def test_order_numbers_are_read_from_zip_members(self, log_dir):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("orders.xml", orders_xml("FS-ZIP"))
+        raw = write_raw(log_dir, "20260202_101500_orders.zip", buffer.getvalue())
+
+        payload = ExchangeArchive(log_dir).archive_now(ArchiveJob(raw, mode="query"))
+
+        assert payload.orders == ("FS-ZIP",)
+
+    def test_truncated_xml_is_still_archived(self, log_dir):
+        content = orders_xml("FS-1", "FS-2")
+        raw = write_raw(log_dir, "20260202_101500_orders.xml", content[: content.rindex("<Номер>".encode())])
+
+        payload = ExchangeArchive(log_dir).archive_now(ArchiveJob(raw))
+
+        # Номера до места обрыва попадают в индекс
+        assert payload.orders == ("FS-1",)
+        assert payload.path.exists()
+
+    def test_rotation_by_size_and_age(self, log_dir):
+        archive = ExchangeArchive(log_dir, max_bytes=10 * 1024**2, max_age_days=30)
+        old = archive.archive_now(ArchiveJob(write_raw(log_dir, "1_orders.xml", orders_xml("OLD"), 40 * 86400)))
+        first = archive.archive_now(ArchiveJob(write_raw(log_dir, "2_orders.xml", orders_xml("A"), 60)))
+        second = archive.archive_now(ArchiveJob(write_raw(log_dir, "3_orders.xml", orders_xml("B"))))
+
+        assert not old.path.exists()
+        assert [p.orders for p in archive.find()] == [("B",), ("A",)]
+
+        archive._max_bytes = second.stored_size
+        assert archive.rotate() == 1
+        assert not first.path.exists()
+        assert [p.orders for p in archive.find()] == [("B",)]
+
+
+@pytest.mark.integration
+class TestExchangeLogHandOff:
+    """Запрос только передает записанный журнал фоновому архиватору"""
+
+    def test_saved_log_is_archived_in_background(self, log_dir):
+        _save_exchange_log("orders.xml", orders_xml("FS-7"), is_binary=True, archive=True, mode="file", sessid="s7")
+
+        archive = exchange_archive(log_dir)
+        assert archive.flush(timeout=10)
+        (payload,) = archive.find(order="FS-7")
+        assert (payload.mode, payload.sessid) == ("file", "s7")
+        assert not list(log_dir.glob("*orders.xml"))
+
+    def test_disabled_archive_keeps_raw_logs(self, log_dir, settings):
+        settings.EXCHANGE_ARCHIVE = {**settings.EXCHANGE_ARCHIVE, "ENABLED": False}
+
+        _save_exchange_log("orders.xml", orders_xml("FS-8"), is_binary=True, archive=True)
+
+        assert exchange_archive(log_dir) is None
+        assert len(list(log_dir.glob("*orders.xml"))) == 1
+
+    def test_leftover_raw_logs_are_recovered(self, log_dir):
+        stale = write_raw(log_dir, "20260101_000000_orders.xml", orders_xml("FS-9"), RECOVERY_MIN_AGE_SECONDS + 60)
+        fresh = write_raw(log_dir, "20260101_000001_orders.xml", orders_xml("FS-10"))
+        profile = write_raw(log_dir, "20260101_000000_orders_export.profile.json", b"{}", 2 * RECOVERY_MIN_AGE_SECONDS)
+
+        archive = exchange_archive(log_dir)
+        assert archive.flush(timeout=10)
+
+        assert not stale.exists()
+        assert fresh.exists() and profile.exists()
+        assert [p.orders for p in archive.find()] == [("FS-9",)]
+
+
+@pytest.mark.integration
+class TestFindExchangePayloadCommand:
+    """find_exchange_payload находит и распаковывает журналы"""
+
+    def test_find_and_extract(self, log_dir, tmp_path):
+        raw = write_raw(log_dir, "20260202_101500_orders.xml", orders_xml("FS-42"))
+        ExchangeArchive(log_dir).archive_now(ArchiveJob(raw, mode="file", sessid="s42"))
+        out = io.StringIO()
+
+        call_command("find_exchange_payload", order="FS-42", extract=str(tmp_path / "out"), stdout=out)
+
+        assert "Найдено журналов: 1" in out.getvalue()
+        assert "sessid=s42" in out.getvalue()
+        assert (tmp_path / "out" / raw.name).read_bytes() == orders_xml("FS-42")
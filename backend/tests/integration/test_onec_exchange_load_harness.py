@@ -0,0 +1,102 @@
+"""
+Интеграционные тесты нагрузочного прогона обмена с 1С (ExchangeLoadTest)
+
+Прогон в миниатюре против live_server: каталог порциями, конкуренция за файл
+и циклы query/success выгрузки заказов.
+"""
+
+import math
+from unittest.mock import patch
+
+import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from apps.integrations.onec_exchange.load_harness import (
+    FILE_BUSY,
+    ExchangeLoadTest,
+    LoadTestConfig,
+    OperationStats,
+    percentile,
+    seed_orders,
+)
+from apps.orders.models import Order
+from apps.products.services.commerceml_generator import CommerceMLDatasetGenerator, DatasetSpec
+
+User = get_user_model()
+
+
+@pytest.mark.unit
+class TestOperationStats:
+    """Перцентили и сводка по операциям"""
+
+    def test_percentiles_and_throughput(self):
+        stats = OperationStats()
+        for ms in range(1, 101):
+            stats.record("file", ms / 1000, ok=ms <= 98, nbytes=1024 * 1024, error=FILE_BUSY)
+
+        summary = stats.summary(elapsed=10)["file"]
+
+        assert percentile([], 50) == 0.0
+        assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"], summary["max_ms"]) == (50, 95, 99, 100)
+        assert summary["requests"] == 100
+        assert summary["rps"] == 10
+        assert summary["errors"] == {FILE_BUSY: 2}
+        assert summary["mb"] == 100
+        assert stats.count("file", FILE_BUSY) == 2
+
+
+@pytest.mark.integration
+@pytest.mark.django_db(transaction=True)
+class TestExchangeLoadTest:
+    """Полный прогон сценариев против live_server"""
+
+    def test_all_scenarios(self, live_server, tmp_path, monkeypatch):
+        monkeypatch.setitem(settings.ONEC_EXCHANGE, "TEMP_DIR", tmp_path / "1c_temp")
+        monkeypatch.setitem(settings.ONEC_EXCHANGE, "IMPORT_DIR", tmp_path / "1c_import")
+        monkeypatch.setitem(settings.ONEC_EXCHANGE, "LOCK_TIMEOUT_SECONDS", 0.2)
+        user = User.objects.create_user(email="load-1c@example.com", password="load-password", is_staff=True)
+        seed_orders(3, user)
+        CommerceMLDatasetGenerator(DatasetSpec(offers=40, segment_size=0)).generate(tmp_path / "dataset")
+        files = list((tmp_path / "dataset").rglob("*.xml"))
+        config = LoadTestConfig(
+            base_url=live_server.url,
+            username="load-1c@example.com",
+            password="load-password",
+            dataset_dir=tmp_path / "dataset",
+            sessions=2,
+            chunk_size=4096,
+            contention_writers=3,
+            contention_file_size=256 * 1024,
+            contention_upload_seconds=1.0,
+            query_workers=2,
+            query_cycles=2,
+            poll_interval=0.05,
+        )
+
+        with patch("apps.products.tasks.process_1c_import_task.delay") as delay:
+            delay.return_value.id = "load-task"
+            report = ExchangeLoadTest(config).run()
+
+        operations = report["operations"]
+        contention = report["lock_contention"]
+        chunks = sum(math.ceil(path.stat().st_size / config.chunk_size) for path in files)
+        # Число «File busy» зависит от планирования потоков — проверяются только инварианты
+        assert (
+            operations["file"]["requests"]
+            == chunks * config.sessions + config.contention_writers + contention["file_busy"]
+        )
+        assert operations["file"]["failures"] == contention["file_busy"]
+        assert contention["accepted"] == contention["writers"] == config.contention_writers
+        uploaded = (tmp_path / "1c_temp" / contention["sessid"] / "contention.xml").read_bytes()
+        size = config.contention_file_size
+        bodies = [uploaded[start : start + size] for start in range(0, len(uploaded), size)]
+        assert len(uploaded) == size * config.contention_writers
+        assert sorted(body[:1] for body in bodies) == [b"a", b"b", b"c"]
+        assert all(body == body[:1] * size for body in bodies)
+        assert operations["import"]["failures"] == operations["complete"]["failures"] == 0
+        assert operations["import_queued"]["requests"] == config.sessions
+        assert [record["status"] for record in report["imports"]] == ["in_progress"] * config.sessions
+        assert operations["query"]["failures"] == operations["success"]["failures"] == 0
+        assert not Order.objects.filter(is_master=False, sent_to_1c=False).exists()
+        assert "password" not in report["config"]
@@ -32,7 +32,11 @@ User = get_user_model()
 
 
 def get_response_content(response) -> bytes:
-    """Helper to get content from both HttpResponse and FileResponse."""
+    """Helper to get content from both HttpResponse and FileResponse.
+
+    mode=query is generated while it is streamed: exported ids and the audit log
+    are recorded only once the body is consumed, as 1C does before mode=success.
+    """
     if hasattr(response, "streaming_content"):
         # FileResponse uses streaming_content
         return b"".join(response.streaming_content)
@@ -309,9 +313,11 @@ class TestModeQuery:
 
     def test_mode_query_saves_audit_log(self, authenticated_client, order_for_export, log_dir):
         """AC6: Audit log file is saved."""
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         assert log_dir.exists()
         log_files = list(log_dir.glob("*"))
@@ -331,9 +337,11 @@ class TestModeSuccess:
     def test_mode_success_updates_status(self, authenticated_client, order_for_export, log_dir):
         """AC4+AC5: query then success marks orders as sent."""
         # First, perform query to set session timestamp
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         # Then confirm success
         response = authenticated_client.get(
@@ -371,9 +379,11 @@ class TestModeSuccess:
     ):
         """AC5: Orders created after query should NOT be marked as sent (race condition)."""
         # Query existing orders
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         # Create a new order AFTER query
         new_order = Order.objects.create(
@@ -495,6 +505,7 @@ class TestFullExportCycle:
         )
         assert resp_query.status_code == 200
         assert resp_query["Content-Type"] == "application/zip"
+        get_response_content(resp_query)
 
         resp_success = authenticated_client.get(
             "/api/integration/1c/exchange/",
@@ -506,9 +517,11 @@ class TestFullExportCycle:
 
     def test_audit_logging(self, authenticated_client, order_for_export, log_dir):
         """AC6: Audit files saved to private log directory (NOT MEDIA_ROOT)."""
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         assert log_dir.exists()
         log_files = list(log_dir.glob("*"))
@@ -605,9 +618,11 @@ class TestSessionBloatFix:
         from django.core.cache import cache as django_cache
 
         # Perform query
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         # Verify session has query_time but NOT exported_order_ids
         session = authenticated_client.session
@@ -619,9 +634,11 @@ class TestSessionBloatFix:
         from django.core.cache import cache as django_cache
 
         # Perform query to populate session + cache
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         # Simulate cache eviction — delete exported_ids but keep session query_time
         session = authenticated_client.session
@@ -642,9 +659,11 @@ class TestSessionBloatFix:
 
     def test_cache_based_ids_work_in_full_cycle(self, authenticated_client, order_for_export, log_dir):
         """Cache-based exported_ids still work for query->success cycle."""
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         response = authenticated_client.get(
             "/api/integration/1c/exchange/",
@@ -673,25 +692,74 @@ class TestStreamingBehavior:
 
     def test_audit_logs_not_in_media_root(self, authenticated_client, order_for_export, log_dir):
         """Exchange logs must not be saved in public MEDIA_ROOT."""
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         media_log_dir = Path(settings.MEDIA_ROOT) / "1c_exchange" / "logs"
         assert not media_log_dir.exists(), "Exchange logs must not be saved in public MEDIA_ROOT"
 
-    def test_audit_log_uses_file_copy(self, authenticated_client, order_for_export, log_dir):
+    def test_audit_log_uses_file_copy(self, authenticated_client, order_for_export, log_dir, settings):
         """HIGH: Audit logging must use file copy, not f.read() into RAM."""
+        from apps.integrations.onec_exchange.exchange_archive import exchange_archive
+
+        settings.EXCHANGE_ARCHIVE = {**settings.EXCHANGE_ARCHIVE, "ENABLED": True}
+
         # Perform query to trigger logging
-        authenticated_client.get(
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
+        )
+        # The raw log is compressed into the exchange archive in the background
+        archive = exchange_archive(log_dir)
+        assert archive.flush(timeout=10)
+        payloads = archive.find(mode="query")
+        assert len(payloads) == 1, "Audit log should be archived"
+        assert payloads[0].filename.endswith("_orders.xml")
+        assert payloads[0].orders == ("FS-TEST-001",)
+        assert not list(log_dir.glob("*orders.xml"))
+
+    def test_zip_is_streamed_and_tee_ed_to_audit_log(self, authenticated_client, order_for_export, log_dir, settings):
+        """ZIP is deflated straight into the response; the audit log holds the same bytes."""
+        from apps.integrations.onec_exchange.exchange_archive import exchange_archive
+
+        settings.EXCHANGE_ARCHIVE = {**settings.EXCHANGE_ARCHIVE, "ENABLED": True}
+
+        response = authenticated_client.get(
             "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+            data={"mode": "query", "zip": "yes"},
         )
-        # Verify log file was created
-        from apps.integrations.onec_exchange.views import _get_exchange_log_dir
+        assert response.streaming
+        assert 'filename="orders.zip"' in response["Content-Disposition"]
+        content = get_response_content(response)
+
+        archive = exchange_archive(log_dir)
+        assert archive.flush(timeout=10)
+        payloads = archive.find(order="FS-TEST-001")
+        assert len(payloads) == 1
+        assert payloads[0].filename.endswith("_orders.zip")
+        with archive.open(payloads[0]) as f:
+            assert f.read() == content
+        with zipfile.ZipFile(io.BytesIO(content)) as zf:
+            assert "FS-TEST-001" in zf.read("orders.xml").decode("utf-8")
+
+    def test_exported_ids_recorded_only_after_stream_completes(self, authenticated_client, order_for_export, log_dir):
+        """Until the body is fully generated, mode=success has nothing to confirm."""
+        from django.core.cache import cache as django_cache
 
-        log_files = list(_get_exchange_log_dir().glob("*orders.xml"))
-        assert len(log_files) >= 1, "Audit log should be created"
+        response = authenticated_client.get(
+            "/api/integration/1c/exchange/",
+            data={"mode": "query", "zip": "yes"},
+        )
+        cache_key = f"1c_exported_ids_{authenticated_client.session.session_key}"
+        assert django_cache.get(cache_key) == []
+
+        get_response_content(response)
+        assert django_cache.get(cache_key) == [order_for_export.pk]
 
 
 @pytest.mark.django_db
@@ -858,9 +926,11 @@ class TestSignalPayloadAccuracy:
         orders_bulk_updated.connect(handler)
         try:
             # Perform query + success cycle
-            authenticated_client.get(
-                "/api/integration/1c/exchange/",
-                data={"mode": "query"},
+            get_response_content(
+                authenticated_client.get(
+                    "/api/integration/1c/exchange/",
+                    data={"mode": "query"},
+                )
             )
             authenticated_client.get(
                 "/api/integration/1c/exchange/",
@@ -994,9 +1064,11 @@ class TestSubOrderSuccess:
     def test_success_aggregates_master_when_all_subs_sent(self, authenticated_client, master_with_two_subs, log_dir):
         """AC9: success помечает оба субзаказа → мастер тоже помечается."""
         master, sub5, sub22 = master_with_two_subs
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         authenticated_client.get(
             "/api/integration/1c/exchange/",
@@ -1036,6 +1108,7 @@ class TestSubOrderSuccess:
                 data={"mode": "query"},
             )
             assert first_response.status_code == 200
+            get_response_content(first_response)
 
             second_response = authenticated_client.get(
                 "/api/integration/1c/exchange/",
@@ -1123,9 +1196,11 @@ class TestSubOrderSuccess:
             vat_group=Decimal("5.00"),
         )
 
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         authenticated_client.get(
             "/api/integration/1c/exchange/",
@@ -1157,6 +1232,7 @@ class TestSubOrderSuccess:
         с `created_at` после query_time, чтобы он не попал в queryset).
         """
         from decimal import Decimal
+
         from django.utils import timezone
 
         # Master A: пройдёт полный цикл query+success, должен агрегироваться.
@@ -1229,9 +1305,11 @@ class TestSubOrderSuccess:
         future = timezone.now() + timezone.timedelta(hours=1)
         Order.objects.filter(pk=sub_b.pk).update(created_at=future)
 
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         authenticated_client.get(
             "/api/integration/1c/exchange/",
@@ -1264,9 +1342,11 @@ class TestSubOrderSuccess:
 
         orders_bulk_updated.connect(handler)
         try:
-            authenticated_client.get(
-                "/api/integration/1c/exchange/",
-                data={"mode": "query"},
+            get_response_content(
+                authenticated_client.get(
+                    "/api/integration/1c/exchange/",
+                    data={"mode": "query"},
+                )
             )
             authenticated_client.get(
                 "/api/integration/1c/exchange/",
@@ -1283,9 +1363,11 @@ class TestSubOrderSuccess:
 
         master, sub5, sub22 = master_with_two_subs
 
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         # Evict cache to trigger fallback
         session = authenticated_client.session
@@ -1310,6 +1392,7 @@ class TestSubOrderSuccess:
     def test_fallback_emits_orders_bulk_updated_signal(self, authenticated_client, master_with_two_subs, log_dir):
         """AC11: fallback-ветка эмитит orders_bulk_updated с master_order_ids."""
         from django.core.cache import cache as django_cache
+
         from apps.orders.signals import orders_bulk_updated
 
         master, sub5, sub22 = master_with_two_subs
@@ -1318,9 +1401,11 @@ class TestSubOrderSuccess:
         def handler(sender, **kwargs):
             received_kwargs.update(kwargs)
 
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
         # Evict cache to trigger fallback
         session = authenticated_client.session
@@ -1363,9 +1448,11 @@ class TestSubOrderSuccess:
         master, sub5, sub22 = master_with_two_subs
 
         # Query — фиксирует last_query_time в сессии
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
 
         # Subs уже отправлены (минуя handle_success), master остался.
@@ -1400,13 +1487,16 @@ class TestSubOrderSuccess:
         фактически затронутыми записями.
         """
         from django.core.cache import cache as django_cache
+
         from apps.orders.signals import orders_bulk_updated
 
         master, sub5, sub22 = master_with_two_subs
 
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
 
         # Subs уже отправлены → fallback update пометит 0 записей
@@ -1449,10 +1539,10 @@ class TestSubOrderSuccess:
         (через cache) подмешан PK мастера. Мастер НЕ должен быть обновлён
         напрямую через основной update(), а только через агрегацию.
         """
-        from django.core.cache import cache as django_cache
-
         from decimal import Decimal
 
+        from django.core.cache import cache as django_cache
+
         master = Order.objects.create(
             user=customer_user,
             order_number="FS-NO-DIRECT-MASTER",
@@ -1507,9 +1597,11 @@ class TestSubOrderSuccess:
         )
 
         # Query — экспортирует оба субзаказа
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
 
         # Подменяем cache, добавляя master PK к exported_ids
@@ -1549,9 +1641,10 @@ class TestSubOrderSuccess:
         но _aggregate_master_sent_to_1c должен пометить мастера,
         и сигнал ДОЛЖЕН быть эмитирован с master_order_ids.
         """
-        from apps.orders.signals import orders_bulk_updated
         from decimal import Decimal
 
+        from apps.orders.signals import orders_bulk_updated
+
         master = Order.objects.create(
             user=customer_user,
             order_number="FS-SIG-MASTER",
@@ -1585,9 +1678,11 @@ class TestSubOrderSuccess:
         )
 
         # Query — экспортирует sub
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
 
         # Предзаписываем sub как sent_to_1c=True (минуя handle_success),
@@ -1639,9 +1734,11 @@ class TestSubOrderSuccess:
 
         master, sub5, sub22 = master_with_two_subs
 
-        authenticated_client.get(
-            "/api/integration/1c/exchange/",
-            data={"mode": "query"},
+        get_response_content(
+            authenticated_client.get(
+                "/api/integration/1c/exchange/",
+                data={"mode": "query"},
+            )
         )
 
         # Внешнее обновление sub5 (например, через _mark_previous_query_as_sent
@@ -1655,9 +1752,11 @@ class TestSubOrderSuccess:
 
         orders_bulk_updated.connect(handler)
         try:
-            authenticated_client.get(
-                "/api/integration/1c/exchange/",
-                data={"mode": "query"},
+            get_response_content(
+                authenticated_client.get(
+                    "/api/integration/1c/exchange/",
+                    data={"mode": "query"},
+                )
             )
         finally:
             orders_bulk_updated.disconnect(handler)
@@ -22,7 +22,7 @@ import pytest
 from rest_framework.test import APIClient
 
 from tests.conftest import OrderFactory, OrderItemFactory, ProductVariantFactory, UserFactory
-from tests.utils import ONEC_PASSWORD, parse_commerceml_response, perform_1c_checkauth
+from tests.utils import ONEC_PASSWORD, get_response_content, parse_commerceml_response, perform_1c_checkauth
 
 pytestmark = pytest.mark.django_db
 
@@ -137,6 +137,7 @@ class TestFullExportCycleWithTaxId:
         # ACT — query
         resp_q = auth_client.get("/api/integration/1c/exchange/", data={"mode": "query"})
         assert resp_q.status_code == 200
+        get_response_content(resp_q)
 
         # ACT — success
         resp_s = auth_client.get("/api/integration/1c/exchange/", data={"mode": "success"})
@@ -320,7 +321,7 @@ class TestFullExportCycleGuestOrder:
         )
 
         # ACT
-        auth_client.get("/api/integration/1c/exchange/", data={"mode": "query"})
+        get_response_content(auth_client.get("/api/integration/1c/exchange/", data={"mode": "query"}))
         resp_s = auth_client.get("/api/integration/1c/exchange/", data={"mode": "success"})
         assert resp_s.status_code == 200
 
@@ -347,7 +348,7 @@ class TestFullExportCycleRepeat:
         master, sub = _create_master_with_sub(user=user)
 
         # ACT — first cycle
-        auth_client.get("/api/integration/1c/exchange/", data={"mode": "query"})
+        get_response_content(auth_client.get("/api/integration/1c/exchange/", data={"mode": "query"}))
         auth_client.get("/api/integration/1c/exchange/", data={"mode": "success"})
 
         # ACT — repeat query
@@ -367,7 +368,7 @@ class TestFullExportCycleRepeat:
         variant = ProductVariantFactory.create()
         master1, sub1 = _create_master_with_sub(user=user, variant=variant)
 
-        auth_client.get("/api/integration/1c/exchange/", data={"mode": "query"})
+        get_response_content(auth_client.get("/api/integration/1c/exchange/", data={"mode": "query"}))
         auth_client.get("/api/integration/1c/exchange/", data={"mode": "success"})
 
         # ARRANGE — new sub-order
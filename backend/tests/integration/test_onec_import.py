@@ -159,6 +159,7 @@ class TestAsyncImportDispatch:
                 mock_session = MagicMock()
                 mock_session.status = ImportSession.ImportStatus.PENDING
                 mock_session.pk = 999
+                mock_session.priority = False
                 mock_session.ImportStatus = ImportSession.ImportStatus
                 mock_resolve.return_value = mock_session
 
@@ -239,6 +240,7 @@ class TestFinalizeBatchReliability:
         ) as mock_resolve:
             mock_session = MagicMock()
             mock_session.report = ""
+            mock_session.status = "pending"
             mock_resolve.return_value = mock_session
 
             with patch("apps.integrations.onec_exchange.import_orchestrator.FileStreamService") as mock_fs_cls:
@@ -248,6 +250,29 @@ class TestFinalizeBatchReliability:
                 assert success is False
                 assert "disk full" in msg
 
+    @pytest.mark.django_db
+    def test_complete_after_import_reuses_running_session(self, settings, tmp_path):
+        """mode=complete после mode=import не создает вторую активную сессию (unique_active_session_key)."""
+        settings.ONEC_EXCHANGE = {
+            **settings.ONEC_EXCHANGE,
+            "TEMP_DIR": tmp_path / "1c_temp",
+            "IMPORT_DIR": tmp_path / "1c_import",
+        }
+
+        from apps.integrations.onec_exchange.file_service import FileStreamService
+        from apps.integrations.onec_exchange.import_orchestrator import ImportOrchestratorService
+        from apps.products.models import ImportSession
+
+        FileStreamService("test-import-complete").append_chunk("goods_1.xml", b"<a/>")
+        with patch("apps.products.tasks.process_1c_import_task.delay") as dispatch:
+            assert ImportOrchestratorService("test-import-complete", "goods_1.xml").execute() == (True, "success")
+            assert ImportOrchestratorService("test-import-complete", "complete").finalize_batch() == (True, "success")
+
+        session = ImportSession.objects.get(session_key="test-import-complete")
+        assert session.status == ImportSession.ImportStatus.IN_PROGRESS
+        dispatch.assert_called_once()
+        assert FileStreamService("test-import-complete").is_complete()
+
     def test_transfer_files_reports_partial_failure(self, settings, tmp_path):
         """MEDIUM: _transfer_files returns failure when some files fail to move."""
         settings.MEDIA_ROOT = str(tmp_path)
@@ -0,0 +1,125 @@
+"""
+Интеграционные тесты конвейерного обмена с 1С (ONEC_EXCHANGE["PIPELINED_IMPORT"])
+
+Сегменты разбираются в ImportStagedRecord по mode=import во время загрузки,
+а mode=complete применяет подготовленные строки.
+"""
+
+import os
+import shutil
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+
+from apps.integrations.onec_exchange.file_service import FileStreamService
+from apps.integrations.onec_exchange.import_orchestrator import ImportOrchestratorService
+from apps.products.models import ImportSession, ImportStagedRecord, Product, ProductVariant
+from apps.products.services.commerceml_generator import CommerceMLDatasetGenerator, DatasetSpec
+from apps.products.services.import_staging import ImportStagingService
+from apps.products.tasks import stage_1c_import_file_task
+
+SESSID = "pipelined-sessid"
+
+
+@pytest.fixture
+def pipelined_dirs(settings, tmp_path):
+    settings.ONEC_EXCHANGE = {
+        **settings.ONEC_EXCHANGE,
+        "TEMP_DIR": tmp_path / "1c_temp",
+        "IMPORT_DIR": tmp_path / "1c_import",
+        "PIPELINED_IMPORT": True,
+    }
+    settings.EXCHANGE_LOG_DIR = str(tmp_path / "logs")
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    return tmp_path
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+class TestPipelinedOrchestrator:
+    """mode=import ставит сегмент на подготовку, mode=complete — применение"""
+
+    def test_import_stages_only_finished_file(self, pipelined_dirs):
+        file_service = FileStreamService(SESSID)
+        file_service.append_chunk("goods_1_1_a.xml", b"<a/>")
+        file_service.append_chunk("offers_1_1_b.xml", b"<partial")
+
+        with patch("apps.products.tasks.stage_1c_import_file_task.delay") as stage, patch(
+            "apps.products.tasks.process_1c_import_task.delay"
+        ) as dispatch:
+            success, _ = ImportOrchestratorService(SESSID, "goods_1_1_a.xml").execute()
+
+        staged_path = pipelined_dirs / "1c_import" / "goods" / "goods_1_1_a.xml"
+        session = ImportSession.objects.get(session_key=SESSID)
+        assert success is True
+        stage.assert_called_once_with(session.pk, str(staged_path))
+        dispatch.assert_not_called()
+        assert staged_path.exists()
+        # Файл, который еще загружается, остается во временном каталоге
+        assert file_service.list_files() == ["offers_1_1_b.xml"]
+        assert session.status == ImportSession.ImportStatus.PENDING
+
+    def test_complete_dispatches_staged_apply(self, pipelined_dirs):
+        session = ImportSession.objects.create(session_key=SESSID, status=ImportSession.ImportStatus.PENDING)
+
+        with patch("apps.products.tasks.process_1c_import_task.delay") as dispatch:
+            dispatch.return_value.id = "apply-task"
+            success, _ = ImportOrchestratorService(SESSID, "complete").finalize_batch()
+
+        assert success is True
+        dispatch.assert_called_once_with(session.pk, str(pipelined_dirs / "1c_import"), staged=True)
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+class TestStagedApply:
+    """import_products_from_1c --staged применяет подготовленные строки"""
+
+    def test_staged_segments_and_leftovers_are_applied(self, pipelined_dirs):
+        data_dir = pipelined_dirs / "1c_import"
+        dataset = CommerceMLDatasetGenerator(DatasetSpec(offers=12, segment_size=5)).generate(data_dir)
+        session = ImportSession.objects.create(session_key=SESSID, status=ImportSession.ImportStatus.IN_PROGRESS)
+        segments = sorted((data_dir / "offers").glob("offers_*.xml")) + sorted((data_dir / "goods").glob("goods*.xml"))
+
+        staged = [stage_1c_import_file_task(session.pk, str(path)) for path in segments]
+
+        assert sum(counts.get("offers", 0) for counts in staged) == dataset["offers"]
+        assert not any(path.exists() for path in segments)
+
+        devnull = open(os.devnull, "w")
+        call_command("import_attributes", data_dir=str(data_dir), stdout=devnull)
+        call_command(
+            "import_products_from_1c",
+            data_dir=str(data_dir),
+            skip_backup=True,
+            staged=True,
+            import_session_id=session.pk,
+            stdout=devnull,
+        )
+
+        session.refresh_from_db()
+        assert session.status == ImportSession.ImportStatus.COMPLETED, session.error_message
+        assert Product.objects.count() == dataset["products"]
+        assert ProductVariant.objects.count() == dataset["offers"]
+        # Цены и остатки не успели подготовить при загрузке — разобраны при применении
+        assert not ProductVariant.objects.filter(retail_price__isnull=True).exists()
+        assert not ImportStagedRecord.objects.filter(session=session).exists()
+
+    def test_same_name_in_other_subdir_keeps_its_rows(self, pipelined_dirs):
+        data_dir = pipelined_dirs / "1c_import"
+        CommerceMLDatasetGenerator(DatasetSpec(offers=3, segment_size=5)).generate(data_dir)
+        session = ImportSession.objects.create(session_key=SESSID, status=ImportSession.ImportStatus.IN_PROGRESS)
+        service = ImportStagingService(session.pk)
+        for subdir in ("groups", "goods"):
+            shutil.copy(data_dir / "groups" / "groups.xml", data_dir / subdir / "import.xml")
+
+        assert service.stage_file(data_dir / "groups" / "import.xml")
+        assert service.stage_file(data_dir / "goods" / "import.xml")
+
+        assert [source.name for source in service.sources("groups")] == ["goods/import.xml", "groups/import.xml"]
+
+    def test_vanished_file_is_skipped(self, pipelined_dirs):
+        session = ImportSession.objects.create(session_key=SESSID, status=ImportSession.ImportStatus.IN_PROGRESS)
+
+        assert ImportStagingService(session.pk).stage_file(pipelined_dirs / "1c_import" / "goods" / "goods.xml") == {}
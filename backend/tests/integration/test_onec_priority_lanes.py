@@ -0,0 +1,194 @@
+"""
+Интеграционные тесты приоритетной очереди импорта цен/остатков
+(apps.products.services.import_lanes)
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from apps.integrations.onec_exchange.file_service import FileStreamService
+from apps.integrations.onec_exchange.import_orchestrator import ImportOrchestratorService
+from apps.products.models import ImportSession
+from apps.products.services.import_lanes import PriorityImportGate, route_import_task
+from apps.products.tasks import process_1c_import_task
+from freesport.celery import app
+
+SESSID = "priority-sessid"
+PROCESS_TASK = "apps.products.tasks.process_1c_import_task"
+SELECTIVE_TASK = "apps.integrations.tasks.run_selective_import_task"
+
+
+@pytest.fixture
+def lane_dirs(settings, tmp_path):
+    settings.ONEC_EXCHANGE = {
+        **settings.ONEC_EXCHANGE,
+        "TEMP_DIR": tmp_path / "1c_temp",
+        "IMPORT_DIR": tmp_path / "1c_import",
+        "PRIORITY_IMPORT_DIR": tmp_path / "1c_import_priority",
+        "PRIORITY_IMPORT_QUEUE": "imports_priority",
+    }
+    return tmp_path
+
+
+@pytest.mark.integration
+class TestImportRouting:
+    """Маршрутизация задач импорта по типу файлов"""
+
+    def test_priority_imports_go_to_dedicated_queue(self, lane_dirs):
+        assert route_import_task(PROCESS_TASK, (1, "/dir"), {"priority": True}, {}) == {"queue": "imports_priority"}
+        assert route_import_task(PROCESS_TASK, (1, "/dir"), {"coalesced": True}, {}) is None
+        assert route_import_task(SELECTIVE_TASK, (["stocks"],), {}, {}) == {"queue": "imports_priority"}
+        assert route_import_task(SELECTIVE_TASK, (), {"selected_types": ["prices"]}, {}) == {
+            "queue": "imports_priority"
+        }
+        assert route_import_task(SELECTIVE_TASK, (["catalog"],), {}, {}) is None
+        assert route_import_task("apps.products.tasks.stage_1c_import_file_task", (1, "/f"), {}, {}) is None
+
+    def test_router_is_wired_into_celery(self, lane_dirs):
+        route = app.amqp.router.route({}, PROCESS_TASK, args=(1, "/dir"), kwargs={"priority": True})
+        assert route["queue"].name == "imports_priority"
+        route = app.amqp.router.route({}, PROCESS_TASK, args=(1, "/dir"), kwargs={})
+        assert route["queue"].name == app.conf.task_default_queue
+
+    def test_empty_queue_disables_routing(self, lane_dirs, settings):
+        settings.ONEC_EXCHANGE = {**settings.ONEC_EXCHANGE, "PRIORITY_IMPORT_QUEUE": ""}
+        assert route_import_task(SELECTIVE_TASK, (["stocks"],), {}, {}) is None
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+class TestPriorityDispatch:
+    """mode=import и mode=complete помечают обмен только ценами/остатками"""
+
+    def test_rests_only_exchange_is_priority(self, lane_dirs):
+        FileStreamService(SESSID).append_chunk("rests_1.xml", b"<a/>")
+
+        with patch("apps.products.tasks.process_1c_import_task.delay") as dispatch:
+            assert ImportOrchestratorService(SESSID, "rests_1.xml").execute() == (True, "success")
+
+        session = ImportSession.objects.get(session_key=SESSID)
+        assert session.priority is True
+        priority_dir = lane_dirs / "1c_import_priority" / SESSID
+        dispatch.assert_called_once_with(session.pk, str(priority_dir), priority=True, file_types=["rests"])
+        assert (priority_dir / "rests" / "rests_1.xml").exists()
+
+    def test_rests_exchange_during_catalog_import_is_priority(self, lane_dirs):
+        # Идущий импорт каталога держит свои файлы в общем каталоге до завершения
+        import_dir = lane_dirs / "1c_import"
+        catalog_files = [import_dir / "goods" / "goods_1.xml", import_dir / "offers" / "offers_1.xml"]
+        for path in catalog_files:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"<a/>")
+        FileStreamService(SESSID).append_chunk("rests_1.xml", b"<a/>")
+
+        with patch("apps.products.tasks.process_1c_import_task.delay") as dispatch:
+            assert ImportOrchestratorService(SESSID, "rests_1.xml").execute() == (True, "success")
+
+        session = ImportSession.objects.get(session_key=SESSID)
+        priority_dir = lane_dirs / "1c_import_priority" / SESSID
+        assert session.priority is True
+        dispatch.assert_called_once_with(session.pk, str(priority_dir), priority=True, file_types=["rests"])
+        assert not (import_dir / "rests").exists()
+
+        with patch("apps.products.tasks.call_command") as command:
+            result = process_1c_import_task.apply(
+                args=(session.pk, str(priority_dir)), kwargs={"priority": True, "file_types": ["rests"]}
+            ).get()
+
+        assert result == "success"
+        assert command.call_args.kwargs["data_dir"] == str(priority_dir)
+        assert not priority_dir.exists()
+        assert all(path.exists() for path in catalog_files)
+
+    def test_catalog_upload_merges_priority_files(self, lane_dirs):
+        file_service = FileStreamService(SESSID)
+        file_service.append_chunk("prices_1.xml", b"<a/>")
+        orchestrator = ImportOrchestratorService(SESSID, "prices_1.xml")
+        session = ImportSession.objects.create(session_key=SESSID, status=ImportSession.ImportStatus.PENDING)
+        assert orchestrator._transfer_files(session) == (True, "")
+        assert session.priority is True
+
+        file_service.append_chunk("goods_1.xml", b"<a/>")
+        assert ImportOrchestratorService(SESSID, "goods_1.xml")._transfer_files(session) == (True, "")
+
+        session.refresh_from_db()
+        assert session.priority is False
+        assert session.report_details["upload_types"] == ["goods", "prices"]
+        assert (lane_dirs / "1c_import" / "prices" / "prices_1.xml").exists()
+        assert (lane_dirs / "1c_import" / "goods" / "goods_1.xml").exists()
+        assert not (lane_dirs / "1c_import_priority" / SESSID).exists()
+
+    def test_priority_task_imports_only_batch_types(self, lane_dirs):
+        import_dir = lane_dirs / "1c_import"
+        (import_dir / "goods").mkdir(parents=True)
+        upload = import_dir / "goods" / "goods_1.xml"
+        upload.write_bytes(b"<a/>")
+        priority_dir = lane_dirs / "1c_import_priority" / SESSID
+        session = ImportSession.objects.create(
+            session_key=SESSID, status=ImportSession.ImportStatus.IN_PROGRESS, priority=True
+        )
+
+        with patch("apps.products.tasks.call_command") as command:
+            result = process_1c_import_task.apply(
+                args=(session.pk, str(priority_dir)), kwargs={"priority": True, "file_types": ["prices", "rests"]}
+            ).get()
+
+        assert result == "success"
+        assert [call.kwargs["file_type"] for call in command.call_args_list] == ["prices", "rests"]
+        # Файлы импорта каталога в общем каталоге не удаляются
+        assert upload.exists()
+
+    def test_catalog_files_keep_default_lane(self, lane_dirs):
+        file_service = FileStreamService(SESSID)
+        file_service.append_chunk("prices_1.xml", b"<a/>")
+        file_service.append_chunk("goods_1.xml", b"<a/>")
+        session = ImportSession.objects.create(session_key=SESSID, status=ImportSession.ImportStatus.PENDING)
+
+        with patch("apps.products.tasks.process_1c_import_task.delay") as dispatch:
+            assert ImportOrchestratorService(SESSID, "complete").finalize_batch() == (True, "success")
+
+        session.refresh_from_db()
+        assert session.priority is False
+        dispatch.assert_called_once_with(session.pk, str(lane_dirs / "1c_import"))
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+class TestPriorityImportGate:
+    """Импорт каталога уступает приоритетным импортам между фазами"""
+
+    def test_catalog_waits_for_active_priority_import(self):
+        catalog = ImportSession.objects.create(status=ImportSession.ImportStatus.IN_PROGRESS)
+        rests = ImportSession.objects.create(status=ImportSession.ImportStatus.IN_PROGRESS, priority=True)
+        messages: list[str] = []
+
+        def finish_rests(seconds):
+            ImportSession.objects.filter(pk=rests.pk).update(status=ImportSession.ImportStatus.COMPLETED)
+
+        gate = PriorityImportGate(catalog, max_wait=60)
+        with patch("apps.products.services.import_lanes.time.sleep", side_effect=finish_rests) as sleep:
+            gate.wait("goods", messages.append)
+            assert gate.wait("offers", messages.append) == 0.0
+
+        sleep.assert_called_once_with(PriorityImportGate.POLL_SECONDS)
+        assert len(messages) == 2
+        assert "завершены" in messages[-1]
+
+    def test_wait_budget_is_shared_by_all_phases(self):
+        catalog = ImportSession.objects.create(status=ImportSession.ImportStatus.IN_PROGRESS)
+        ImportSession.objects.create(status=ImportSession.ImportStatus.STARTED, priority=True)
+        messages: list[str] = []
+
+        gate = PriorityImportGate(catalog, max_wait=0.05)
+        gate.wait("goods", messages.append)
+
+        assert gate.enabled is False
+        assert "исчерпан" in messages[-1]
+        assert gate.wait("offers", messages.append) == 0.0
+
+    def test_priority_import_never_yields(self):
+        ImportSession.objects.create(status=ImportSession.ImportStatus.IN_PROGRESS, priority=True)
+        own = ImportSession.objects.create(status=ImportSession.ImportStatus.IN_PROGRESS, priority=True)
+
+        assert PriorityImportGate(own, max_wait=60).wait("rests", print) == 0.0
@@ -0,0 +1,78 @@
+"""
+Интеграционные тесты применения цен и остатков множественными SQL-операциями
+(import_products_from_1c --set-based-apply)
+"""
+
+import os
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+
+from apps.products.models import ImportSession, ProductVariant
+from apps.products.services.commerceml_generator import CommerceMLDatasetGenerator, DatasetSpec
+
+SNAPSHOT_FIELDS = (
+    "onec_id",
+    "retail_price",
+    "opt1_price",
+    "opt2_price",
+    "opt3_price",
+    "trainer_price",
+    "federation_price",
+    "rrp",
+    "msrp",
+    "stock_quantity",
+    "warehouse_id",
+)
+
+
+def snapshot() -> list[tuple]:
+    return list(ProductVariant.objects.order_by("onec_id").values_list(*SNAPSHOT_FIELDS))
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+class TestSetBasedApply:
+    """Построчный и множественный режимы дают одинаковые цены и остатки"""
+
+    def test_prices_and_rests_match_row_by_row_apply(self, tmp_path, settings):
+        settings.EXCHANGE_LOG_DIR = str(tmp_path / "logs")
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+        data_dir = tmp_path / "1c_import"
+        dataset = CommerceMLDatasetGenerator(DatasetSpec(offers=12, segment_size=5, warehouses=3)).generate(data_dir)
+        devnull = open(os.devnull, "w")
+        call_command("import_attributes", data_dir=str(data_dir), stdout=devnull)
+        call_command(
+            "import_products_from_1c", data_dir=str(data_dir), skip_backup=True, keep_files=True, stdout=devnull
+        )
+        expected = snapshot()
+
+        ProductVariant.objects.update(
+            retail_price=Decimal("0"),
+            opt1_price=None,
+            rrp=None,
+            stock_quantity=0,
+            warehouse_id="",
+        )
+        for file_type in ("prices", "rests"):
+            call_command(
+                "import_products_from_1c",
+                data_dir=str(data_dir),
+                file_type=file_type,
+                set_based_apply=True,
+                keep_files=True,
+                stdout=devnull,
+            )
+
+        assert snapshot() == expected
+        assert not ProductVariant.objects.filter(retail_price=0).exists()
+        report = ImportSession.objects.latest("pk").report_details
+        assert report["apply"]["rests"] == {
+            "staged": dataset["offers"] * 3,
+            "missing": 0,
+            "variants": dataset["offers"],
+            "updated": dataset["offers"],
+        }
+        # rests.xml: строка на каждый склад предложения, как в построчном режиме
+        assert report["stocks_updated"] == dataset["offers"] * 3
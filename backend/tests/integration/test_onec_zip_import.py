@@ -0,0 +1,140 @@
+"""
+Интеграционные тесты импорта из архивов 1С без распаковки (ZipImportSource)
+"""
+
+import io
+import os
+import zipfile
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from django.core.management import call_command
+
+from apps.integrations.onec_exchange.zip_source import ZipImportSource, prepare_archives
+from apps.products.models import ImportSession, Product, ProductVariant
+from apps.products.services.commerceml_generator import CommerceMLDatasetGenerator, DatasetSpec
+
+
+def zip_dataset(dataset_dir: Path, archive: Path) -> None:
+    """Упаковать выгрузку как 1С: XML в корне, изображения в import_files/"""
+    images_dir = dataset_dir / "goods" / "import_files"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for path in sorted(dataset_dir.rglob("*")):
+            if path.suffix == ".xml":
+                zf.write(path, path.name)
+            elif path.suffix == ".jpg":
+                zf.write(path, f"import_files/{path.relative_to(images_dir).as_posix()}")
+
+
+def make_zip(path: Path, members: dict[str, bytes]) -> Path:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, content in members.items():
+            zf.writestr(name, content)
+    path.write_bytes(buf.getvalue())
+    return path
+
+
+@pytest.mark.integration
+class TestZipImportSource:
+    """Маршрутизация членов архива и Zip Slip"""
+
+    def test_members_are_routed_without_extraction(self, tmp_path):
+        make_zip(
+            tmp_path / "import.zip",
+            {
+                "offers_1_2_b.xml": b"<a/>",
+                "offers.xml": b"<a/>",
+                "offers_1_1_a.xml": b"<a/>",
+                "priceLists_1.xml": b"<a/>",
+                "contragents_1.xml": b"<a/>",
+                "import_files/ab/photo.jpg": b"jpeg",
+            },
+        )
+
+        with ZipImportSource(tmp_path).open() as source:
+            offers = [member.name for member in source.xml_members("offers", "offers")]
+            assert offers == ["offers.xml", "offers_1_1_a.xml", "offers_1_2_b.xml"]
+            assert [member.name for member in source.xml_members("priceLists", "priceLists")] == ["priceLists_1.xml"]
+            assert source.image("ab/photo.jpg").open().read() == b"jpeg"
+            assert source.extract_unstreamed() == 1
+            assert source.extract_unstreamed() == 0
+
+        assert sorted(str(p.relative_to(tmp_path)) for p in tmp_path.rglob("*") if p.is_file()) == [
+            "contragents/contragents_1.xml",
+            "import.zip",
+        ]
+
+    def test_consumed_archives_depend_on_read_subdirs(self, tmp_path):
+        rests = make_zip(tmp_path / "rests.zip", {"rests_1.xml": b"<a/>", "contragents_1.xml": b"<a/>"})
+        catalog = make_zip(tmp_path / "catalog.zip", {"goods_1.xml": b"<a/>", "import_files/ab/photo.jpg": b"jpeg"})
+
+        with ZipImportSource(tmp_path).open() as source:
+            assert source.consumed_paths({"rests"}, images=False) == [rests]
+            assert source.consumed_paths({"goods", "groups"}, images=False) == []
+            assert sorted(source.consumed_paths({"goods", "rests"}, images=True)) == [catalog, rests]
+
+    def test_zip_slip_archive_is_rejected_and_deleted(self, tmp_path):
+        import_dir = tmp_path / "1c_import"
+        import_dir.mkdir()
+        archive = make_zip(import_dir / "malicious.zip", {"../../etc/contragents.xml": b"pwned"})
+        log_event = MagicMock()
+
+        prepare_archives(import_dir, log_event)
+
+        assert not archive.exists()
+        assert not (tmp_path / "etc").exists()
+        assert "Zip Slip" in log_event.call_args.args[0]
+        assert log_event.call_args.kwargs == {"level": "error"}
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+class TestImportFromArchive:
+    """import_products_from_1c читает XML и изображения прямо из архива"""
+
+    def test_catalog_imported_from_zip(self, tmp_path, settings):
+        settings.EXCHANGE_LOG_DIR = str(tmp_path / "logs")
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+        spec = DatasetSpec(offers=12, segment_size=5, images=True)
+        dataset = CommerceMLDatasetGenerator(spec).generate(tmp_path / "dataset")
+        data_dir = tmp_path / "1c_import"
+        data_dir.mkdir()
+        zip_dataset(tmp_path / "dataset", data_dir / "import.zip")
+
+        devnull = open(os.devnull, "w")
+        prepare_archives(data_dir, MagicMock())
+        call_command("import_attributes", data_dir=str(data_dir), stdout=devnull)
+        call_command("import_products_from_1c", data_dir=str(data_dir), skip_backup=True, stdout=devnull)
+
+        session = ImportSession.objects.latest("pk")
+        assert session.status == ImportSession.ImportStatus.COMPLETED, session.error_message
+        assert Product.objects.count() == dataset["products"]
+        assert ProductVariant.objects.count() == dataset["offers"]
+        assert not ProductVariant.objects.filter(retail_price__isnull=True).exists()
+        assert Product.objects.exclude(base_images=[]).count() == dataset["images"]
+        assert len(list((tmp_path / "media" / "products" / "base").rglob("*.jpg"))) == dataset["images"]
+        assert not (data_dir / "goods").exists()
+        assert not (data_dir / "import.zip").exists()
+
+    def test_typed_import_deletes_only_consumed_archives(self, tmp_path, settings):
+        settings.EXCHANGE_LOG_DIR = str(tmp_path / "logs")
+        CommerceMLDatasetGenerator(DatasetSpec(offers=6, segment_size=5)).generate(tmp_path / "dataset")
+        data_dir = tmp_path / "1c_import"
+        data_dir.mkdir()
+        with (
+            zipfile.ZipFile(data_dir / "rests.zip", "w") as rests_zip,
+            zipfile.ZipFile(data_dir / "catalog.zip", "w") as catalog_zip,
+        ):
+            for path in sorted((tmp_path / "dataset").rglob("*.xml")):
+                (rests_zip if path.name.startswith("rests") else catalog_zip).write(path, path.name)
+
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "import_products_from_1c", data_dir=str(data_dir), file_type="rests", skip_backup=True, stdout=devnull
+            )
+
+        # Повторный импорт не должен снова читать примененные остатки
+        assert not (data_dir / "rests.zip").exists()
+        assert (data_dir / "catalog.zip").exists()
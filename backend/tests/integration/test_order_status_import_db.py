@@ -7,9 +7,10 @@ Story 5.1: [AI-Review][Medium] Test Quality — проверка save(update_fie
 
 from datetime import datetime, timedelta
 from typing import Any, cast
+from unittest.mock import patch
 
 import pytest
-from django.db import OperationalError
+from django.db import IntegrityError, OperationalError
 from django.test import TestCase
 from django.utils import timezone
 
@@ -298,21 +299,17 @@ class TestOrderStatusImportDBIntegration(TestCase):
 """
 
         # ACT
-        # Query count breakdown (11 total) после Story 34-5 (master+sub):
+        # Query count breakdown (7 total), число запросов не зависит от размера пакета:
         # 1. SAVEPOINT — transaction.atomic() start
         # 2. SELECT ... FOR UPDATE — bulk fetch all 3 sub-orders in one query
-        # (no EXISTS: is_master=False short-circuits master-guard)
-        # 3. UPDATE sub1 — save() with update_fields
-        # 4. UPDATE sub2 — save() with update_fields
-        # 5. UPDATE sub3 — save() with update_fields
+        # (no master-guard query: в пакете нет is_master=True заказов)
+        # 3. UPDATE sub1, sub2, sub3 — один bulk_update
         # [Master aggregation — 1 shared master]
-        # 6. SELECT FOR UPDATE master — get master by pk
-        # 7. SELECT sub_orders.status — _aggregate_master_status
-        # 8. SELECT sub_orders.payment_status — _aggregate_master_payment_status
-        # 9. SELECT sub_orders.sent_to_1c_at — _aggregate_master_sent_to_1c_at
-        # 10. UPDATE master — save() with update_fields
-        # 11. RELEASE SAVEPOINT — transaction.atomic() commit
-        with cast(Any, self).assertNumQueries(11):
+        # 4. SELECT FOR UPDATE masters — все мастера пакета одним запросом
+        # 5. SELECT ... GROUP BY parent_order_id, status, payment_status — сводка субзаказов
+        # 6. UPDATE masters — один bulk_update
+        # 7. RELEASE SAVEPOINT — transaction.atomic() commit
+        with cast(Any, self).assertNumQueries(7):
             result = self.service.process(xml_data)
 
         # ASSERT — все 3 заказа обновлены
@@ -648,6 +645,103 @@ class TestMasterAggregationDB(TestCase):
         finally:
             orders_bulk_updated.disconnect(handler)
 
+    def test_rolled_back_batch_is_not_reported(self):
+        """Пакет, откатанный ошибкой bulk_update, не попадает в счетчики и сигнал; следующие пакеты применяются."""
+        from apps.orders.signals import orders_bulk_updated
+
+        received_kwargs = {}
+
+        def handler(sender, **kwargs):
+            received_kwargs.update(kwargs)
+
+        bulk_save = self.service._bulk_save_orders
+        calls = []
+
+        def failing_first_write(pending):
+            calls.append(pending)
+            if len(calls) == 1:
+                raise IntegrityError("bulk_update failed")
+            bulk_save(pending)
+
+        xml_data = _build_multi_sub_xml(
+            [
+                {
+                    "order_id": f"{ORDER_ID_PREFIX}{sub.pk}",
+                    "order_number": sub.order_number,
+                    "status": "Подтвержден",
+                }
+                for sub in (self.sub5, self.sub22)
+            ]
+        )
+        orders_bulk_updated.connect(handler)
+        try:
+            with patch.object(self.service, "_get_batch_size", return_value=1), patch.object(
+                self.service, "_bulk_save_orders", side_effect=failing_first_write
+            ):
+                result = self.service.process(xml_data)
+        finally:
+            orders_bulk_updated.disconnect(handler)
+
+        self.assertEqual(result.processed, 2)
+        self.assertEqual(result.updated, 1)
+        self.assertIn("Database error", result.errors[0])
+        self.assertEqual(received_kwargs["order_ids"], [self.sub22.pk])
+        self.assertEqual(received_kwargs["updated_count"], 1)
+        self.sub5.refresh_from_db()
+        self.sub22.refresh_from_db()
+        self.assertEqual(self.sub5.status, "pending")
+        self.assertEqual(self.sub22.status, "confirmed")
+
+    def test_query_count_does_not_grow_with_documents_and_masters(self):
+        """Пакет из субзаказов нескольких мастеров — фиксированное число запросов."""
+        from decimal import Decimal
+
+        # ARRANGE — ещё 2 мастера по 2 субзаказа в дополнение к sub5/sub22
+        subs = [self.sub5, self.sub22]
+        for master_index in range(2):
+            master = Order.objects.create(
+                order_number=f"FS-AGG-M{master_index}-{get_unique_suffix()}",
+                is_master=True,
+                status="pending",
+                total_amount=Decimal("2000.00"),
+                delivery_address="Test",
+                delivery_method="courier",
+                payment_method="card",
+            )
+            for sub_index in range(2):
+                subs.append(
+                    Order.objects.create(
+                        order_number=f"FS-AGG-M{master_index}S{sub_index}-{get_unique_suffix()}",
+                        is_master=False,
+                        parent_order=master,
+                        status="pending",
+                        total_amount=Decimal("1000.00"),
+                        delivery_address="Test",
+                        delivery_method="courier",
+                        payment_method="card",
+                    )
+                )
+        xml_data = _build_multi_sub_xml(
+            [
+                {"order_id": f"{ORDER_ID_PREFIX}{sub.pk}", "order_number": sub.order_number, "status": "Отгружен"}
+                for sub in subs
+            ]
+        )
+
+        # ACT — те же 7 запросов, что и для одного мастера (см. test_bulk_fetch_orders_optimization)
+        with cast(Any, self).assertNumQueries(7):
+            result = self.service.process(xml_data)
+
+        # ASSERT
+        self.assertEqual(result.updated, 6)
+        self.assertEqual(result.aggregated_master_count, 3)
+        self.assertEqual(
+            set(Order.objects.filter(pk__in=[sub.pk for sub in subs]).values_list("status", flat=True)),
+            {"shipped"},
+        )
+        self.master.refresh_from_db()
+        self.assertEqual(self.master.status, "shipped")
+
     def test_idempotent_repeat_import_no_master_save(self):
         """AC12: повторный импорт — aggregated_master_count=0."""
         # ARRANGE
@@ -767,7 +861,18 @@ class TestMasterAggregationDB(TestCase):
             ]
         )
 
-        with patch("apps.orders.models.Order.save", side_effect=OperationalError("DB error")):
+        from django.db.models.query import QuerySet
+
+        real_bulk_update = QuerySet.bulk_update
+        master_pk = self.master.pk
+
+        def fail_on_master_write(queryset, objs, fields, *args, **kwargs):
+            # Субзаказы уже записаны в этой транзакции — падает только запись мастера
+            if any(obj.pk == master_pk for obj in objs):
+                raise OperationalError("DB error")
+            return real_bulk_update(queryset, objs, fields, *args, **kwargs)
+
+        with patch.object(QuerySet, "bulk_update", autospec=True, side_effect=fail_on_master_write):
             # ACT
             result = self.service.process(xml_data)
 
@@ -0,0 +1,219 @@
+"""
+Интеграционные тесты асинхронного приема orders.xml (ONEC_EXCHANGE["ORDERS_XML_ASYNC"])
+"""
+
+import io
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import cast
+from unittest.mock import patch
+
+import pytest
+from django.db import OperationalError
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.integrations.onec_exchange.exchange_archive import exchange_archive
+from apps.integrations.onec_exchange.orders_inbox import OrdersInbox, OrdersInboxError, Utf8XmlTranscoder
+from apps.orders.models import Order
+from apps.orders.tasks import ORDERS_XML_REQUEUE_AFTER, import_orders_xml_task, requeue_orders_xml_sessions
+from apps.products.models import ImportSession
+from tests.conftest import UserFactory, get_unique_suffix
+from tests.utils import EXCHANGE_URL, ONEC_PASSWORD, build_multi_orders_xml, build_orders_xml, perform_1c_checkauth
+
+QUEUE_TASK = "apps.orders.tasks.import_orders_xml_task.delay"
+
+
+def cp1251_orders_xml(order_number: str) -> bytes:
+    xml = build_orders_xml(order_number=order_number, status_1c="Подтвержден", encoding="windows-1251")
+    return xml.decode("utf-8").encode("windows-1251")
+
+
+def create_order(order_number: str) -> Order:
+    return Order.objects.create(
+        order_number=order_number,
+        status="pending",
+        status_1c="",
+        sent_to_1c=False,
+        delivery_address="Test",
+        delivery_method="courier",
+        payment_method="card",
+        total_amount=Decimal("100.00"),
+    )
+
+
+@pytest.fixture
+def async_orders(settings, tmp_path):
+    settings.EXCHANGE_LOG_DIR = str(tmp_path / "logs")
+    settings.ONEC_EXCHANGE = {**settings.ONEC_EXCHANGE, "ORDERS_XML_ASYNC": True}
+    settings.EXCHANGE_ARCHIVE = {**settings.EXCHANGE_ARCHIVE, "ENABLED": True}
+    return tmp_path / "logs"
+
+
+@pytest.mark.integration
+class TestOrdersInbox:
+    """Потоковая запись и перекодирование orders.xml"""
+
+    def test_streaming_transcoding_matches_whole_document(self):
+        xml_data = cp1251_orders_xml("FS-ENC-1")
+        transcoder = Utf8XmlTranscoder()
+
+        # Порции по 1 байту режут объявление и многобайтные символы
+        transcoded = b"".join(transcoder.feed(xml_data[i : i + 1]) for i in range(len(xml_data)))
+        transcoded += transcoder.finish()
+
+        expected = xml_data.decode("windows-1251").replace('encoding="windows-1251"', 'encoding="utf-8"')
+        assert transcoded == expected.encode("utf-8")
+        assert transcoder.declared == "windows-1251"
+
+    def test_utf8_is_passed_through(self):
+        xml_data = build_orders_xml()
+        transcoder = Utf8XmlTranscoder()
+        assert transcoder.feed(xml_data) + transcoder.finish() == xml_data
+
+    def test_spool_counts_documents_across_chunks(self, tmp_path):
+        xml_data = build_multi_orders_xml([{"order_number": f"FS-{i}"} for i in range(25)])
+        inbox = OrdersInbox(tmp_path / "inbox", max_bytes=len(xml_data))
+
+        payload = inbox.spool(io.BytesIO(xml_data), chunk_size=7)
+
+        assert payload.path.read_bytes() == xml_data
+        assert payload.documents == 25
+        assert payload.received == payload.size == len(xml_data)
+        assert list((tmp_path / "inbox").iterdir()) == [payload.path]
+
+    def test_spool_rejects_oversized_body(self, tmp_path):
+        inbox = OrdersInbox(tmp_path / "inbox", max_bytes=100)
+        with pytest.raises(OrdersInboxError, match="too large"):
+            inbox.spool(io.BytesIO(build_orders_xml()), chunk_size=64)
+        assert list((tmp_path / "inbox").iterdir()) == []
+
+
+@pytest.mark.django_db
+@pytest.mark.integration
+class TestOrdersXmlAsyncExchange:
+    """mode=file отвечает success после постановки в очередь, статусы применяет задача"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = UserFactory.create(is_staff=True, password=ONEC_PASSWORD)
+        perform_1c_checkauth(self.client, self.user.email, ONEC_PASSWORD)
+
+    def post_orders_xml(self, xml_data: bytes, content_length: int | None = None) -> HttpResponse:
+        return cast(
+            HttpResponse,
+            self.client.post(
+                f"{EXCHANGE_URL}?mode=file&filename=orders.xml",
+                data=xml_data,
+                content_type="application/xml",
+                CONTENT_LENGTH=str(len(xml_data) if content_length is None else content_length),
+            ),
+        )
+
+    def test_payload_is_queued_and_imported_by_task(self, async_orders):
+        order_number = f"FS-ASYNC-{get_unique_suffix()}"
+        order = create_order(order_number)
+
+        with patch(QUEUE_TASK) as queue_task:
+            response = self.post_orders_xml(cp1251_orders_xml(order_number))
+
+        assert response.content.decode("utf-8") == "success"
+        session = ImportSession.objects.get(import_type=ImportSession.ImportType.ORDERS)
+        queue_task.assert_called_once_with(session.pk)
+        assert session.status == ImportSession.ImportStatus.PENDING
+        assert session.report_details["total_items"] == 1
+        assert session.report_details["encoding"] == "windows-1251"
+        spooled = Path(session.report_details["file"])
+        assert 'encoding="utf-8"' in spooled.read_text(encoding="utf-8")
+        order.refresh_from_db()
+        assert order.status == "pending"
+
+        assert import_orders_xml_task.apply(args=(session.pk,)).get() == "success"
+
+        order.refresh_from_db()
+        session.refresh_from_db()
+        assert order.status == "confirmed"
+        assert session.status == ImportSession.ImportStatus.COMPLETED
+        assert session.report_details["updated"] == 1
+        assert session.report_details["processed_items"] == session.report_details["total_items"] == 1
+        assert not spooled.exists()
+        (archived,) = exchange_archive(async_orders).find(order=order_number)
+        assert archived.mode == "file"
+
+    def test_malformed_xml_fails_session(self, async_orders):
+        with patch(QUEUE_TASK):
+            response = self.post_orders_xml(b'<?xml version="1.0" encoding="UTF-8"?><broken>')
+        assert response.content.decode("utf-8") == "success"
+
+        session = ImportSession.objects.get(import_type=ImportSession.ImportType.ORDERS)
+        assert import_orders_xml_task.apply(args=(session.pk,)).get() == "failure"
+
+        session.refresh_from_db()
+        assert session.status == ImportSession.ImportStatus.FAILED
+        assert "parse error" in session.error_message.lower()
+
+    def test_stale_and_truncated_payloads_are_rejected(self, async_orders):
+        stale = build_orders_xml(timestamp=(timezone.now() - timedelta(days=2)).strftime("%Y-%m-%dT%H:%M:%S"))
+        with patch(QUEUE_TASK) as queue_task:
+            stale_response = self.post_orders_xml(stale)
+            truncated_response = self.post_orders_xml(build_orders_xml(), content_length=len(build_orders_xml()) + 10)
+
+        assert stale_response.content.decode("utf-8") == "failure\nXML timestamp too old"
+        truncated = truncated_response.content.decode("utf-8")
+        assert truncated.startswith("failure")
+        assert "Incomplete" in truncated or "Internal" in truncated
+        queue_task.assert_not_called()
+        assert not ImportSession.objects.filter(import_type=ImportSession.ImportType.ORDERS).exists()
+        assert list((async_orders / "inbox").glob("*.xml")) == []
+
+    def test_queue_failure_asks_1c_to_retry(self, async_orders):
+        with patch(QUEUE_TASK, side_effect=ConnectionError("broker down")):
+            response = self.post_orders_xml(build_orders_xml())
+
+        assert response.content.decode("utf-8").startswith("failure")
+        session = ImportSession.objects.get(import_type=ImportSession.ImportType.ORDERS)
+        assert session.status == ImportSession.ImportStatus.FAILED
+        assert list((async_orders / "inbox").glob("*.xml")) == []
+
+    def test_db_failure_keeps_file_and_session_is_requeued(self, async_orders):
+        order_number = f"FS-REQUEUE-{get_unique_suffix()}"
+        order = create_order(order_number)
+        with patch(QUEUE_TASK):
+            self.post_orders_xml(build_orders_xml(order_number=order_number, status_1c="Подтвержден"))
+        session = ImportSession.objects.get(import_type=ImportSession.ImportType.ORDERS)
+        spooled = Path(session.report_details["file"])
+
+        with patch(
+            "apps.orders.tasks.OrderStatusImportService.process_with_retries",
+            side_effect=OperationalError("db down"),
+        ):
+            # Повторы задачи исчерпаны
+            assert import_orders_xml_task.apply(args=(session.pk,), retries=3).get() == "failure"
+
+        session.refresh_from_db()
+        assert session.status == ImportSession.ImportStatus.FAILED
+        assert spooled.exists()
+
+        # Свежие сессии не трогаются
+        with patch(QUEUE_TASK) as queue_task:
+            assert requeue_orders_xml_sessions() == 0
+        queue_task.assert_not_called()
+
+        ImportSession.objects.filter(pk=session.pk).update(
+            updated_at=timezone.now() - ORDERS_XML_REQUEUE_AFTER - timedelta(minutes=1)
+        )
+        with patch(QUEUE_TASK) as queue_task:
+            assert requeue_orders_xml_sessions() == 1
+        queue_task.assert_called_once_with(session.pk)
+        session.refresh_from_db()
+        assert session.status == ImportSession.ImportStatus.PENDING
+        assert session.report_details["requeued"] == 1
+
+        assert import_orders_xml_task.apply(args=(session.pk,)).get() == "success"
+        order.refresh_from_db()
+        assert order.status == "confirmed"
+        assert not spooled.exists()
+        # Повторная доставка после обработки ничего не делает
+        assert import_orders_xml_task.apply(args=(session.pk,)).get() == "skipped"
@@ -0,0 +1,141 @@
+"""
+Интеграционные тесты материализованной статистики заказов личного кабинета.
+
+Проверяют инкрементальное обновление `UserOrderStatistics` при создании
+мастер-заказа, отмене заказа и импорте статусов из 1С, а также ночную сверку.
+"""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from rest_framework.test import APIClient
+
+from apps.orders.models import Order, UserOrderStatistics
+from apps.orders.services import OrderStatisticsService, OrderStatusImportService
+from apps.orders.tasks import reconcile_user_order_statistics
+
+
+def build_status_xml(order_number: str, status: str) -> str:
+    """Минимальный orders.xml с одним документом."""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<КоммерческаяИнформация ВерсияСхемы="3.1" ДатаФормирования="2026-02-02T12:00:00">
+    <Контейнер>
+        <Документ>
+            <Ид>{order_number}</Ид>
+            <Номер>{order_number}</Номер>
+            <Дата>2026-02-02</Дата>
+            <ХозОперация>Заказ товара</ХозОперация>
+            <ЗначенияРеквизитов>
+                <ЗначениеРеквизита>
+                    <Наименование>СтатусЗаказа</Наименование>
+                    <Значение>{status}</Значение>
+                </ЗначениеРеквизита>
+            </ЗначенияРеквизитов>
+        </Документ>
+    </Контейнер>
+</КоммерческаяИнформация>
+"""
+
+
+@pytest.fixture(autouse=True)
+def _mute_order_emails():
+    with (
+        patch("apps.orders.tasks.send_order_confirmation_to_customer.delay"),
+        patch("apps.orders.tasks.send_order_notification_email.delay"),
+    ):
+        yield
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+class TestUserOrderStatistics:
+    """Инкрементальное обновление и сверка UserOrderStatistics."""
+
+    def test_created_master_orders_are_counted_and_sub_orders_are_not(self, user_factory, order_factory):
+        user = user_factory.create()
+        master = order_factory.create(user=user, status="pending", total_amount=Decimal("3000.00"))
+        order_factory.create(
+            user=user, is_master=False, parent_order=master, status="pending", total_amount=Decimal("3000.00")
+        )
+        order_factory.create(user=user, status="confirmed", total_amount=Decimal("1500.50"))
+
+        stats = UserOrderStatistics.objects.get(pk=user.pk)
+
+        assert stats.orders_count == 2
+        assert stats.total_amount == Decimal("4500.50")
+        assert stats.status_counts == {"pending": 1, "confirmed": 1}
+        assert stats.last_order_at == Order.objects.filter(user=user, is_master=True).latest("created_at").created_at
+
+    def test_get_for_user_is_single_pk_lookup(self, user_factory, order_factory, django_assert_num_queries):
+        user = user_factory.create()
+        order_factory.create(user=user, total_amount=Decimal("100.00"))
+
+        with django_assert_num_queries(1):
+            stats = OrderStatisticsService.get_for_user(user)
+
+        assert stats.orders_count == 1
+
+    def test_get_for_user_computes_missing_summary_without_saving(self, user_factory, order_factory):
+        user = user_factory.create()
+        order_factory.create(user=user, status="delivered", total_amount=Decimal("700.00"))
+        UserOrderStatistics.objects.filter(pk=user.pk).delete()
+
+        stats = OrderStatisticsService.get_for_user(user)
+
+        assert stats.orders_count == 1
+        assert stats.total_amount == Decimal("700.00")
+        assert stats.status_counts == {"delivered": 1}
+        assert not UserOrderStatistics.objects.filter(pk=user.pk).exists()
+
+    def test_cancel_moves_order_between_statuses(self, user_factory, order_factory):
+        user = user_factory.create()
+        master = order_factory.create(user=user, status="pending", total_amount=Decimal("1000.00"))
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.post(f"/api/v1/orders/{master.id}/cancel/")
+
+        assert response.status_code == 200
+        stats = UserOrderStatistics.objects.get(pk=user.pk)
+        assert stats.orders_count == 1
+        assert stats.status_counts == {"cancelled": 1}
+
+    def test_status_import_updates_master_aggregation_and_legacy_master(self, user_factory, order_factory):
+        user = user_factory.create()
+        master = order_factory.create(user=user, status="pending")
+        sub = order_factory.create(user=user, is_master=False, parent_order=master, status="pending")
+        legacy = order_factory.create(user=user, status="pending")
+
+        OrderStatusImportService().process(build_status_xml(sub.order_number, "Отгружен"))
+        OrderStatusImportService().process(build_status_xml(legacy.order_number, "Доставлен"))
+
+        master.refresh_from_db()
+        legacy.refresh_from_db()
+        assert master.status == "shipped"
+        assert legacy.status == "delivered"
+        stats = UserOrderStatistics.objects.get(pk=user.pk)
+        assert stats.orders_count == 2
+        assert stats.status_counts == {"shipped": 1, "delivered": 1}
+
+    def test_reconcile_corrects_drift(self, user_factory, order_factory):
+        user = user_factory.create()
+        order = order_factory.create(user=user, status="pending", total_amount=Decimal("250.00"))
+        order_factory.create(user=user, status="pending", total_amount=Decimal("750.00"))
+        # Изменения в обход сервиса: bulk update и удаление заказа
+        Order.objects.filter(pk=order.pk).update(status="delivered")
+        other = user_factory.create()
+        removed = order_factory.create(user=other, total_amount=Decimal("10.00"))
+        removed.delete()
+
+        assert reconcile_user_order_statistics() == 2
+
+        stats = UserOrderStatistics.objects.get(pk=user.pk)
+        assert stats.orders_count == 2
+        assert stats.total_amount == Decimal("1000.00")
+        assert stats.status_counts == {"pending": 1, "delivered": 1}
+        other_stats = UserOrderStatistics.objects.get(pk=other.pk)
+        assert other_stats.orders_count == 0
+        assert other_stats.status_counts == {}
+        assert other_stats.last_order_at is None
+        assert OrderStatisticsService.reconcile() == 0
@@ -0,0 +1,109 @@
+"""
+Performance тесты импорта каталога из 1С на синтетической выгрузке
+
+Полный конвейер import_products_from_1c на данных CommerceMLDatasetGenerator
+с профилированием фаз. Масштаб и отчет задаются переменными окружения:
+
+    IMPORT_BENCHMARK_OFFERS=100000 IMPORT_BENCHMARK_REPORT=/tmp/import.json \
+        pytest tests/performance/test_import_benchmark.py
+
+Пороги регрессии:
+- SQL-запросов на строку фазы — детерминированы и не зависят от машины;
+- пиковый RSS и пропускная способность — с запасом для медленных CI.
+"""
+
+import json
+import os
+import resource
+import sys
+
+import pytest
+from django.core.management import call_command
+
+from apps.products.models import Brand, Category, ImportSession, Product, ProductVariant
+from apps.products.services.commerceml_generator import CommerceMLDatasetGenerator, DatasetSpec
+
+BENCHMARK_OFFERS = int(os.environ.get("IMPORT_BENCHMARK_OFFERS", "400"))
+BENCHMARK_REPORT = os.environ.get("IMPORT_BENCHMARK_REPORT")
+
+# Фаза -> (основной счетчик строк, максимум SQL-запросов на строку)
+QUERIES_PER_ROW = {
+    "goods": ("products_created", 7),
+    "offers": ("variants_created", 11),
+    "prices": ("prices_updated", 9),
+    "rests": ("stocks_updated", 2),
+}
+MIN_OFFERS_PER_SECOND = 20
+MAX_PEAK_RSS_MB = 1024
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS процесса (ru_maxrss: КБ в Linux, байты в macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def phase_throughput(phase: dict, row_key: str | None) -> dict:
+    rows = phase["rows"].get(row_key, 0)
+    return {
+        "rows": rows,
+        "counters": phase["rows"],
+        "wall_s": phase["wall_s"],
+        "queries": phase["queries"],
+        "rows_per_s": round(rows / phase["wall_s"], 1) if phase["wall_s"] else None,
+        "queries_per_row": round(phase["queries"] / rows, 2) if rows else None,
+    }
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+class TestImportBenchmark:
+    """Сквозной бенчмарк import_products_from_1c"""
+
+    def test_full_import_pipeline(self, tmp_path, settings):
+        settings.EXCHANGE_LOG_DIR = str(tmp_path / "logs")
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+        spec = DatasetSpec(offers=BENCHMARK_OFFERS, segment_size=max(100, BENCHMARK_OFFERS // 3), images=True)
+        dataset = CommerceMLDatasetGenerator(spec).generate(tmp_path / "1c")
+
+        with open(os.devnull, "w") as devnull:
+            call_command("import_attributes", data_dir=str(tmp_path / "1c"), stdout=devnull)
+            call_command(
+                "import_products_from_1c",
+                data_dir=str(tmp_path / "1c"),
+                skip_backup=True,
+                profile="phases",
+                stdout=devnull,
+            )
+
+        session = ImportSession.objects.latest("pk")
+        profile = session.report_details["profile"]
+        phases = {
+            name: phase_throughput(phase, QUERIES_PER_ROW.get(name, (None,))[0])
+            for name, phase in profile["phases"].items()
+        }
+        report = {
+            "dataset": dataset,
+            "status": session.status,
+            "wall_s": profile["wall_s"],
+            "offers_per_s": round(spec.offers / profile["wall_s"], 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "phases": phases,
+        }
+        if BENCHMARK_REPORT:
+            with open(BENCHMARK_REPORT, "w", encoding="utf-8") as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+
+        assert session.status == ImportSession.ImportStatus.COMPLETED, session.error_message
+        assert Category.objects.count() >= dataset["categories"]
+        assert Brand.objects.count() >= dataset["brands"]
+        assert Product.objects.count() == dataset["products"]
+        assert ProductVariant.objects.count() == dataset["offers"]
+        assert not ProductVariant.objects.filter(retail_price__isnull=True).exists()
+
+        for name, (_, max_queries) in QUERIES_PER_ROW.items():
+            phase = phases[name]
+            assert phase["rows"] > 0, f"phase {name} processed no rows: {report}"
+            assert phase["queries_per_row"] <= max_queries, f"phase {name} regressed: {phase}"
+        assert report["offers_per_s"] >= MIN_OFFERS_PER_SECOND, report
+        assert report["peak_rss_mb"] <= MAX_PEAK_RSS_MB, report
@@ -345,3 +345,99 @@ class OrderCreationPerformanceTest(TestCase):
         self.assertEqual(response.status_code, 201)
 
         print(f"Order creation memory usage: {memory_mb:.2f}MB")
+
+
+class OrderCreateServiceQueryCountTest(TestCase):
+    """Число запросов checkout не зависит от количества VAT/складских групп и позиций."""
+
+    WAREHOUSES = [None, "1 СДВ склад", "Intex ОСНОВНОЙ", "2 ТЛВ склад"]
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Query Count Category", slug="query-count-category")
+        self.brand = Brand.objects.create(name="Query Count Brand", slug="query-count-brand")
+        self.user_sequence = 0
+
+    def _build_cart(self, groups: int, lines_per_group: int):
+        from apps.cart.models import Cart, CartItem
+
+        self.user_sequence += 1
+        user = User.objects.create_user(
+            email=f"query_count_{self.user_sequence}@example.com",
+            password="testpass123",
+            role="retail",
+            customer_code=f"{90000 + self.user_sequence:05d}",
+        )
+        cart = Cart.objects.create(user=user)
+        for group_index in range(groups):
+            for line_index in range(lines_per_group):
+                variant = ProductVariantFactory.create(
+                    product__category=self.category,
+                    product__brand=self.brand,
+                    product__is_active=True,
+                    warehouse_name=self.WAREHOUSES[group_index],
+                    retail_price=100,
+                    stock_quantity=100,
+                )
+                CartItem.objects.create(
+                    cart=cart,
+                    variant=variant,
+                    quantity=line_index + 1,
+                    price_snapshot=variant.retail_price,
+                )
+        return user, cart
+
+    def _create_order(self, groups: int, lines_per_group: int):
+        from decimal import Decimal
+        from unittest.mock import patch
+
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from apps.orders.services.order_create import OrderCreateService
+
+        user, cart = self._build_cart(groups, lines_per_group)
+        service = OrderCreateService(
+            cart=cart,
+            user=user,
+            validated_data={
+                "delivery_address": "Query Count Address",
+                "delivery_method": "pickup",
+                "payment_method": "card",
+            },
+            delivery_cost=Decimal("0"),
+        )
+        with (
+            patch("apps.orders.tasks.send_order_confirmation_to_customer.delay"),
+            patch("apps.orders.tasks.send_order_notification_email.delay"),
+            CaptureQueriesContext(connection) as ctx,
+        ):
+            master = service.create()
+        return master, len(ctx.captured_queries)
+
+    def test_query_count_is_constant_for_groups_and_lines(self):
+        small_master, small_queries = self._create_order(groups=1, lines_per_group=1)
+        large_master, large_queries = self._create_order(groups=4, lines_per_group=5)
+
+        self.assertEqual(small_master.sub_orders.count(), 1)
+        self.assertEqual(large_master.sub_orders.count(), 4)
+        self.assertEqual(
+            small_queries,
+            large_queries,
+            f"Checkout query count grows with order size: {small_queries} vs {large_queries}",
+        )
+
+        print(f"Order creation queries (1x1 vs 4x5): {small_queries} / {large_queries}")
+
+    def test_response_is_built_without_rereading_order(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from apps.orders.serializers import OrderDetailSerializer
+
+        master, _ = self._create_order(groups=2, lines_per_group=3)
+
+        with CaptureQueriesContext(connection) as ctx:
+            data = OrderDetailSerializer(master).data
+
+        self.assertEqual(len(data["items"]), 6)
+        self.assertEqual(len(ctx.captured_queries), 0)
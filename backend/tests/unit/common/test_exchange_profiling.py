@@ -0,0 +1,181 @@
+"""
+Unit тесты профилирования обменов с 1С (ExchangeProfiler)
+"""
+
+import json
+import time
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from apps.common.models import News
+from apps.common.services.profiling import ExchangeProfiler, ProfilingMode
+from apps.integrations.onec_exchange.views import _exchange_profiler, _profile_stream
+from apps.orders.models import Order, OrderItem
+from apps.orders.services import OrderExportService
+from apps.products.models import ImportSession
+from apps.products.services.variant_import import VariantImportProcessor
+from tests.factories import ProductVariantFactory, UserFactory
+
+User = get_user_model()
+
+
+def busy_loop(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestExchangeProfiler:
+    """Замер фаз и сэмплирование стека"""
+
+    def test_mode_off_disables_profiling(self):
+        assert ExchangeProfiler.from_mode(ProfilingMode.OFF, "import") is None
+        assert ExchangeProfiler.from_mode(None, "import") is None
+        assert ExchangeProfiler.from_mode("phases", "import").sampling is False
+
+    def test_repeated_phase_accumulates_queries_and_rows(self):
+        profiler = ExchangeProfiler("import")
+        profiler.start()
+
+        for _ in range(2):
+            with profiler.phase("goods") as phase:
+                News.objects.count()
+                phase.rows["products"] += 5
+        report = profiler.finish()
+
+        goods = report["phases"]["goods"]
+        assert report["mode"] == "phases"
+        assert "sampling" not in report
+        assert goods["calls"] == 2
+        assert goods["queries"] == 2
+        assert goods["rows"] == {"products": 10}
+        assert goods["wall_s"] <= report["wall_s"]
+
+    def test_sampling_profile_is_saved_as_collapsed_and_speedscope(self, tmp_path):
+        profiler = ExchangeProfiler("import_session_1", sampling=True, interval=0.001)
+        profiler.start()
+        with profiler.phase("offers"):
+            busy_loop(0.2)
+        report = profiler.finish(tmp_path)
+
+        assert report["sampling"]["samples"] > 0
+        collapsed, speedscope = (tmp_path / name for name in report["sampling"]["files"])
+        assert collapsed.name.endswith("_import_session_1.collapsed")
+        assert "busy_loop (tests/unit/common/test_exchange_profiling.py:" in collapsed.read_text()
+
+        document = json.loads(speedscope.read_text())
+        frames = document["shared"]["frames"]
+        profile = document["profiles"][0]
+        assert profile["type"] == "sampled"
+        assert len(profile["samples"]) == len(profile["weights"])
+        assert any(frames[stack[-1]]["name"] == "busy_loop" for stack in profile["samples"])
+        assert profiler.finish(tmp_path) == report
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestImportProfiling:
+    """Профиль импорта каталога в report_details сессии"""
+
+    def test_phase_rows_are_stat_deltas_and_profile_is_stored(self):
+        session = ImportSession.objects.create(profiling=ImportSession.ProfilingMode.PHASES)
+        profiler = ExchangeProfiler.from_mode(session.profiling, label=f"import_session_{session.pk}")
+        profiler.start()
+        processor = VariantImportProcessor(session_id=session.pk, profiler=profiler)
+
+        with processor.phase("prices"):
+            processor.stats["prices_updated"] += 3
+            processor.stats["warnings"] += 1
+        processor.finalize_session(status=ImportSession.ImportStatus.COMPLETED)
+        session.refresh_from_db()
+
+        prices = session.report_details["profile"]["phases"]["prices"]
+        assert prices["rows"] == {"prices_updated": 3, "warnings": 1}
+        assert session.report_details["prices_updated"] == 3
+
+        session.store_profile(profiler.finish())
+        session.refresh_from_db()
+        assert session.report_details["prices_updated"] == 3
+        assert session.report_details["profile"]["phases"]["prices"]["calls"] == 1
+
+    def test_admin_form_passes_profiling_mode_to_task(self, client, settings, tmp_path, monkeypatch):
+        settings.ONEC_DATA_DIR = str(tmp_path)
+        for subdir in ("goods", "offers", "prices", "rests"):
+            (tmp_path / subdir).mkdir()
+        calls = []
+        monkeypatch.setattr(
+            "apps.integrations.views.run_selective_import_task.delay",
+            lambda *args, **kwargs: calls.append((args, kwargs)) or type("Task", (), {"id": "task-1"})(),
+        )
+
+        admin = User.objects.create_superuser(email="admin@example.com", password="password")
+        client.force_login(admin)
+
+        client.post("/admin/integrations/import_1c/", {"import_type": "catalog", "profiling": "sampling"})
+
+        assert calls == [((["catalog"],), {"profiling": "sampling"})]
+        assert ImportSession.objects.get(celery_task_id="task-1").profiling == ImportSession.ProfilingMode.SAMPLING
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestOrderExportProfiling:
+    """Фазы выгрузки заказов"""
+
+    def test_read_and_build_phases(self):
+        user = UserFactory()
+        variant = ProductVariantFactory(retail_price=Decimal("1000.00"))
+        order_fields = {
+            "user": user,
+            "total_amount": Decimal("1000.00"),
+            "delivery_address": "Адрес",
+            "delivery_method": "courier",
+            "payment_method": "card",
+        }
+        master = Order.objects.create(is_master=True, **order_fields)
+        order = Order.objects.create(is_master=False, parent_order=master, **order_fields)
+        Order.objects.create(is_master=False, parent_order=master, **order_fields)  # без позиций — пропускается
+        OrderItem.objects.create(
+            order=order,
+            product=variant.product,
+            variant=variant,
+            quantity=1,
+            unit_price=Decimal("1000.00"),
+            total_price=Decimal("1000.00"),
+            product_name="Товар",
+            product_sku=variant.sku,
+        )
+        profiler = ExchangeProfiler("orders_export")
+        profiler.start()
+
+        xml = "".join(
+            OrderExportService(profiler=profiler).generate_xml_streaming(Order.objects.filter(is_master=False))
+        )
+        phases = profiler.finish()["phases"]
+
+        assert xml.count("<Документ>") == 1
+        assert phases["read"]["calls"] == 3
+        assert phases["read"]["queries"] > 0
+        assert phases["build"]["rows"] == {"exported": 1, "skipped": 1}
+
+    def test_exchange_stream_profile_is_saved_next_to_exchange_logs(self, settings, tmp_path):
+        settings.EXCHANGE_LOG_DIR = str(tmp_path)
+        settings.EXCHANGE_PROFILING = {"MODE": "sampling", "SAMPLE_INTERVAL": 0.001}
+        profiler = _exchange_profiler("orders_export")
+
+        with profiler.phase("build"):
+            chunks = list(_profile_stream(iter(["<a/>", str(busy_loop(0.05))]), profiler))
+
+        assert chunks[0] == "<a/>"
+        (report_file,) = tmp_path.glob("*_orders_export.profile.json")
+        report = json.loads(report_file.read_text())
+        assert report["mode"] == "sampling"
+        assert sorted(p.name for p in tmp_path.glob("*_orders_export.*")) == sorted(
+            [report_file.name, *report["sampling"]["files"]]
+        )
@@ -0,0 +1,180 @@
+"""
+Unit тесты для буферизованной записи журналов (BufferedLogWriter)
+"""
+
+import threading
+import uuid
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, transaction
+
+from apps.common.models import AuditLog, CustomerSyncLog
+from apps.common.services import BufferedLogWriter, CustomerSyncLogger, flush_log_buffers, get_log_writer
+
+User = get_user_model()
+
+
+def make_sync_log(**kwargs) -> CustomerSyncLog:
+    defaults = {
+        "operation_type": CustomerSyncLog.OperationType.IMPORT_FROM_1C,
+        "status": CustomerSyncLog.StatusType.SUCCESS,
+        "onec_id": "1C_1",
+        "correlation_id": uuid.uuid4(),
+    }
+    defaults.update(kwargs)
+    return CustomerSyncLog(**defaults)
+
+
+@pytest.fixture
+def buffered_logs(settings):
+    """Включает буферизацию и очищает общие буферы процесса после теста."""
+    settings.LOG_BUFFER = {"ENABLED": True, "BATCH_SIZE": 100, "FLUSH_INTERVAL_SECONDS": 60}
+    yield
+    for model in (CustomerSyncLog, AuditLog):
+        get_log_writer(model).discard()
+
+
+# Буфер пишет только вне транзакций — тестам нужен реальный autocommit
+@pytest.mark.unit
+@pytest.mark.django_db(transaction=True)
+class TestBufferedLogWriter:
+    """Тесты для BufferedLogWriter"""
+
+    def test_sync_mode_saves_immediately(self):
+        writer = BufferedLogWriter(CustomerSyncLog, enabled=False)
+
+        log = writer.add(make_sync_log())
+
+        assert log.pk is not None
+        assert len(writer) == 0
+        assert CustomerSyncLog.objects.count() == 1
+
+    def test_flushes_when_batch_is_full(self, django_assert_num_queries):
+        writer = BufferedLogWriter(CustomerSyncLog, batch_size=3, flush_interval=60, enabled=True)
+
+        writer.add(make_sync_log())
+        writer.add(make_sync_log())
+        assert CustomerSyncLog.objects.count() == 0
+
+        # Один INSERT на весь пакет (плюс BEGIN/COMMIT вокруг него)
+        with django_assert_num_queries(3):
+            writer.add(make_sync_log())
+
+        assert CustomerSyncLog.objects.count() == 3
+        assert len(writer) == 0
+
+    def test_flushes_when_interval_expires(self):
+        writer = BufferedLogWriter(CustomerSyncLog, batch_size=100, flush_interval=5, enabled=True)
+
+        with patch("apps.common.services.log_buffer.time.monotonic", return_value=1000.0):
+            writer.add(make_sync_log())
+        assert CustomerSyncLog.objects.count() == 0
+
+        with patch("apps.common.services.log_buffer.time.monotonic", return_value=1006.0):
+            writer.add(make_sync_log())
+
+        assert CustomerSyncLog.objects.count() == 2
+
+    def test_context_manager_flushes_on_exit(self):
+        with BufferedLogWriter(CustomerSyncLog, batch_size=100, flush_interval=60, enabled=True) as writer:
+            writer.extend(make_sync_log() for _ in range(5))
+            assert CustomerSyncLog.objects.count() == 0
+
+        assert CustomerSyncLog.objects.count() == 5
+
+    def test_database_error_keeps_records_for_retry(self):
+        writer = BufferedLogWriter(CustomerSyncLog, batch_size=100, flush_interval=60, enabled=True)
+        writer.extend(make_sync_log() for _ in range(2))
+
+        with patch.object(CustomerSyncLog.objects, "bulk_create", side_effect=OperationalError("db is down")):
+            assert writer.flush() == 0
+
+        assert len(writer) == 2
+        assert writer.flush() == 2
+        assert CustomerSyncLog.objects.count() == 2
+
+    def test_invalid_record_does_not_lose_the_batch(self):
+        writer = BufferedLogWriter(CustomerSyncLog, batch_size=100, flush_interval=60, enabled=True)
+        CustomerSyncLog.objects.create(
+            pk=10_000,
+            operation_type=CustomerSyncLog.OperationType.IMPORT_FROM_1C,
+            status=CustomerSyncLog.StatusType.SUCCESS,
+            correlation_id=uuid.uuid4(),
+        )
+        writer.add(make_sync_log())
+        writer.add(make_sync_log(pk=10_000))
+        writer.add(make_sync_log())
+
+        assert writer.flush() == 2
+        assert CustomerSyncLog.objects.count() == 3
+
+    def test_buffer_is_capped_while_database_is_unavailable(self):
+        writer = BufferedLogWriter(CustomerSyncLog, batch_size=2, flush_interval=60, enabled=True)
+
+        with patch.object(CustomerSyncLog.objects, "bulk_create", side_effect=OperationalError("db is down")):
+            writer.extend(make_sync_log() for _ in range(30))
+
+        assert len(writer) == 20
+
+    def test_records_wait_for_commit_and_are_written_outside_it(self):
+        writer = BufferedLogWriter(CustomerSyncLog, batch_size=100, flush_interval=60, enabled=True)
+
+        with transaction.atomic():
+            writer.add(make_sync_log())
+            assert len(writer) == 0
+            assert writer.flush() == 0
+
+        # Отложенный до фиксации сброс записал строку отдельной транзакцией
+        assert CustomerSyncLog.objects.count() == 1
+        assert len(writer) == 0
+
+    def test_rolled_back_records_are_not_written(self):
+        writer = BufferedLogWriter(CustomerSyncLog, batch_size=100, flush_interval=60, enabled=True)
+
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                writer.add(make_sync_log())
+                raise RuntimeError("rollback")
+
+        assert writer.flush() == 0
+        assert CustomerSyncLog.objects.count() == 0
+
+    def test_flush_writes_only_current_thread_records(self):
+        writer = BufferedLogWriter(CustomerSyncLog, batch_size=100, flush_interval=60, enabled=True)
+        other = threading.Thread(target=writer.add, args=(make_sync_log(onec_id="1C_OTHER"),))
+        other.start()
+        other.join()
+        writer.add(make_sync_log())
+
+        assert writer.flush() == 1
+        assert list(CustomerSyncLog.objects.values_list("onec_id", flat=True)) == ["1C_1"]
+
+        assert writer.flush_all() == 1
+        assert CustomerSyncLog.objects.count() == 2
+
+
+@pytest.mark.unit
+@pytest.mark.django_db(transaction=True)
+class TestBufferedSyncLogging:
+    """CustomerSyncLogger и AuditLog.log_action в буферизованном режиме"""
+
+    def test_sync_logger_writes_batch_at_session_end(self, buffered_logs):
+        with CustomerSyncLogger() as sync_logger:
+            for _ in range(3):
+                sync_logger.log_batch_operation("import_customers", total_count=10, success_count=10, error_count=0)
+            assert CustomerSyncLog.objects.count() == 0
+
+        logs = CustomerSyncLog.objects.all()
+        assert logs.count() == 3
+        assert {str(log.correlation_id) for log in logs} == {sync_logger.correlation_id}
+
+    def test_audit_log_is_flushed_with_process_buffers(self, buffered_logs):
+        admin = User.objects.create_user(email="admin@example.com", password="testpass123")
+
+        AuditLog.log_action(user=admin, action="approve_b2b", resource_type="User", resource_id=admin.pk)
+        assert AuditLog.objects.count() == 0
+
+        assert flush_log_buffers() == 1
+        assert AuditLog.objects.get().resource_id == str(admin.pk)
@@ -0,0 +1,152 @@
+"""
+Unit тесты метрик Prometheus (HTTP, кеши каталога, Celery, фазы импорта)
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from prometheus_client import REGISTRY
+
+from apps.common.services.prometheus import (
+    PUBLISHED_AT_HEADER,
+    _add_published_at_header,
+    _on_task_postrun,
+    _on_task_prerun,
+)
+from apps.products.constants import FEATURED_BRANDS_CACHE_KEY
+from apps.products.services.variant_import import VariantImportProcessor
+
+User = get_user_model()
+
+METRICS_URL = "/api/v1/monitoring/metrics/prometheus/"
+
+
+def sample(name: str, labels: dict[str, str]) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def metrics_enabled(monkeypatch, settings):
+    monkeypatch.setenv("PROMETHEUS_METRICS_ENABLED", "true")
+    settings.PROMETHEUS_METRICS_TOKEN = "scrape-token"
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestPrometheusMiddleware:
+    """Метрики HTTP-запросов"""
+
+    def test_function_view_is_labelled_by_name(self, client, metrics_enabled):
+        labels = {"view": "health_check", "action": "", "method": "GET", "status": "200"}
+        before = sample("freesport_http_request_duration_seconds_count", labels)
+
+        client.get("/api/v1/health/")
+
+        assert sample("freesport_http_request_duration_seconds_count", labels) == before + 1
+
+    def test_viewset_action_records_latency_queries_and_cache(self, client, metrics_enabled):
+        cache.delete(FEATURED_BRANDS_CACHE_KEY)
+        db_labels = {"view": "BrandViewSet", "action": "featured"}
+        queries_before = sample("freesport_http_request_db_queries_sum", db_labels)
+        miss_before = sample("freesport_cache_requests_total", {"cache": "featured_brands", "result": "miss"})
+        hit_before = sample("freesport_cache_requests_total", {"cache": "featured_brands", "result": "hit"})
+
+        client.get("/api/v1/brands/featured/")
+        client.get("/api/v1/brands/featured/")
+
+        latency_labels = {**db_labels, "method": "GET", "status": "200"}
+        assert sample("freesport_http_request_duration_seconds_count", latency_labels) >= 2
+        assert sample("freesport_http_request_db_queries_sum", db_labels) > queries_before
+        assert sample("freesport_cache_requests_total", {"cache": "featured_brands", "result": "miss"}) == (
+            miss_before + 1
+        )
+        assert sample("freesport_cache_requests_total", {"cache": "featured_brands", "result": "hit"}) == hit_before + 1
+
+    def test_unresolved_request_is_grouped(self, client, metrics_enabled):
+        labels = {"view": "<unresolved>", "action": "", "method": "GET", "status": "404"}
+        before = sample("freesport_http_request_duration_seconds_count", labels)
+
+        client.get("/definitely-missing/")
+
+        assert sample("freesport_http_request_duration_seconds_count", labels) == before + 1
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestPrometheusEndpoint:
+    """Выгрузка /monitoring/metrics/prometheus/"""
+
+    def test_disabled_by_default(self, client):
+        assert client.get(METRICS_URL).status_code == 404
+
+    def test_requires_token_or_staff(self, client, metrics_enabled):
+        assert client.get(METRICS_URL).status_code == 403
+        assert client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+
+    def test_exports_registry_and_sync_metrics(self, client, metrics_enabled):
+        response = client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer scrape-token")
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain")
+        body = response.content.decode()
+        assert "# TYPE freesport_http_request_duration_seconds histogram" in body
+        assert "sync_operations_total 0" in body
+
+    def test_staff_session_is_allowed(self, client, metrics_enabled):
+        admin = User.objects.create_superuser(email="admin@example.com", password="password")
+        client.force_login(admin)
+
+        assert client.get(METRICS_URL).status_code == 200
+
+
+@pytest.mark.unit
+class TestCeleryTaskMetrics:
+    """Длительность и задержка Celery-задач"""
+
+    def test_queue_lag_and_duration_are_observed(self):
+        headers: dict = {}
+        _add_published_at_header(headers=headers)
+        headers[PUBLISHED_AT_HEADER] -= 3.0
+        task = SimpleNamespace(
+            name="apps.products.tasks.test_task",
+            request=SimpleNamespace(delivery_info={"routing_key": "imports"}, **headers),
+        )
+        lag_labels = {"task": task.name, "queue": "imports"}
+        duration_labels = {"task": task.name, "state": "SUCCESS"}
+        lag_before = sample("freesport_celery_task_queue_lag_seconds_sum", lag_labels)
+        count_before = sample("freesport_celery_task_duration_seconds_count", duration_labels)
+
+        _on_task_prerun(task_id="task-1", task=task)
+        _on_task_postrun(task_id="task-1", task=task, state="SUCCESS")
+
+        assert sample("freesport_celery_task_queue_lag_seconds_sum", lag_labels) - lag_before >= 3.0
+        assert sample("freesport_celery_task_duration_seconds_count", duration_labels) == count_before + 1
+
+    def test_task_without_header_records_duration_only(self):
+        task = SimpleNamespace(name="apps.products.tasks.eager_task", request=SimpleNamespace())
+
+        _on_task_prerun(task_id="task-2", task=task)
+        _on_task_postrun(task_id="task-2", task=task, state="FAILURE")
+
+        assert sample("freesport_celery_task_duration_seconds_count", {"task": task.name, "state": "FAILURE"}) >= 1
+        assert sample("freesport_celery_task_queue_lag_seconds_count", {"task": task.name, "queue": "default"}) == 0
+
+
+@pytest.mark.unit
+class TestImportPhaseMetrics:
+    """Длительность фаз VariantImportProcessor"""
+
+    def test_phase_is_recorded_even_on_error(self):
+        processor = VariantImportProcessor(session_id=0)
+        before = sample("freesport_import_phase_duration_seconds_count", {"phase": "offers"})
+
+        with processor.phase("goods"):
+            pass
+        with pytest.raises(RuntimeError):
+            with processor.phase("offers"):
+                raise RuntimeError("broken offers.xml")
+
+        assert set(processor.stats["phase_durations"]) == {"goods", "offers"}
+        assert sample("freesport_import_phase_duration_seconds_count", {"phase": "offers"}) == before + 1
@@ -0,0 +1,124 @@
+"""
+Unit тесты бюджета SQL-запросов и обнаружения N+1 (QueryBudgetMiddleware)
+"""
+
+import logging
+from types import SimpleNamespace
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.common.models import News
+from apps.common.services.query_budget import (
+    QueryBudgetExceeded,
+    QueryRecorder,
+    fingerprint,
+    get_query_budget,
+    query_budget,
+)
+from apps.products.factories import ProductFactory, ProductVariantFactory
+from apps.products.views import BrandViewSet, ProductViewSet
+
+
+def make_request(func, method="GET"):
+    return SimpleNamespace(method=method, resolver_match=SimpleNamespace(func=func))
+
+
+@pytest.mark.unit
+class TestQueryFingerprint:
+    """Нормализация SQL"""
+
+    def test_literals_and_in_lists_are_collapsed(self):
+        first = fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'a'  AND n > 5")
+        second = fingerprint("SELECT * FROM t WHERE id IN (%s) AND name = 'bb' AND n > 10")
+
+        assert first == second == "SELECT * FROM t WHERE id IN (...) AND name = ? AND n > ?"
+
+
+@pytest.mark.unit
+class TestGetQueryBudget:
+    """Поиск бюджета, объявленного для view"""
+
+    def test_action_budget_overrides_class_budget(self):
+        retrieve = ProductViewSet.as_view({"get": "retrieve"})
+        featured = BrandViewSet.as_view({"get": "featured"})
+
+        assert get_query_budget(make_request(retrieve)) == ProductViewSet.retrieve.query_budget
+        assert get_query_budget(make_request(featured)) == BrandViewSet.query_budget
+
+    def test_decorated_function_view(self):
+        @query_budget(3)
+        def view(request):
+            return None
+
+        assert get_query_budget(make_request(view)) == 3
+        assert get_query_budget(SimpleNamespace(method="GET", resolver_match=None)) is None
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestQueryRecorder:
+    """Счётчик запросов для тестов"""
+
+    def test_counts_duplicates_and_reports_call_site(self):
+        with QueryRecorder(capture_stacks=True) as recorder:
+            for pk in range(3):
+                News.objects.filter(pk=pk).first()
+            News.objects.count()
+
+        assert recorder.count == 4
+        assert [n for _, n in recorder.duplicates()] == [3]
+        assert "3x SELECT" in recorder.report()
+        assert "test_query_budget.py" in recorder.report()
+
+        with pytest.raises(QueryBudgetExceeded, match="exceeded query budget of 3"):
+            recorder.assert_within(3)
+
+    def test_fixture_checks_block(self, assert_query_budget):
+        with pytest.raises(QueryBudgetExceeded):
+            with assert_query_budget(1):
+                News.objects.count()
+                News.objects.count()
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestQueryBudgetMiddleware:
+    """Проверка бюджетов на запросах API"""
+
+    @pytest.fixture
+    def product_url(self):
+        product = ProductFactory(create_variant=False)
+        ProductVariantFactory.create_batch(5, product=product)
+        return reverse("products:product-detail", kwargs={"slug": product.slug})
+
+    def test_enforce_mode_raises_when_budget_is_exceeded(self, product_url, monkeypatch):
+        monkeypatch.setattr(ProductViewSet.retrieve, "query_budget", 2)
+
+        with pytest.raises(QueryBudgetExceeded, match=r"ProductViewSet\.retrieve"):
+            APIClient().get(product_url)
+
+    def test_product_detail_does_not_query_per_variant(self, assert_query_budget):
+        small = ProductFactory(create_variant=False)
+        ProductVariantFactory.create_batch(2, product=small)
+        large = ProductFactory(create_variant=False)
+        ProductVariantFactory.create_batch(30, product=large)
+        client = APIClient()
+
+        with QueryRecorder() as small_queries:
+            client.get(reverse("products:product-detail", kwargs={"slug": small.slug}))
+        with assert_query_budget(small_queries.count):
+            response = client.get(reverse("products:product-detail", kwargs={"slug": large.slug}))
+
+        assert len(response.json()["variants"]) == 30
+
+    def test_log_mode_reports_repeated_queries(self, product_url, settings, monkeypatch, caplog):
+        settings.QUERY_BUDGET = {"MODE": "log", "SAMPLE_RATE": 1.0, "DUPLICATE_THRESHOLD": 2}
+        monkeypatch.setattr(ProductViewSet.retrieve, "query_budget", 2)
+
+        with caplog.at_level(logging.WARNING, logger="apps.common.middleware"):
+            response = APIClient().get(product_url)
+
+        assert response.status_code == 200
+        assert "exceeded query budget of 2" in caplog.text
@@ -0,0 +1,220 @@
+"""
+Unit тесты для предагрегированных метрик синхронизации (SyncMetricsAggregator)
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from unittest.mock import patch
+
+import pytest
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from apps.common.models import CustomerSyncLog
+from apps.common.services import (
+    BufferedLogWriter,
+    CustomerSyncMonitor,
+    DurationSketch,
+    PrometheusMetrics,
+    SyncMetricsAggregator,
+)
+
+
+def make_log(status=CustomerSyncLog.StatusType.SUCCESS, duration_ms=None, **kwargs) -> CustomerSyncLog:
+    return CustomerSyncLog(
+        operation_type=kwargs.pop("operation_type", CustomerSyncLog.OperationType.IMPORT_FROM_1C),
+        status=status,
+        duration_ms=duration_ms,
+        correlation_id=uuid.uuid4(),
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def sync_metrics(settings):
+    """
+    Включает агрегатор с изолированным префиксом ключей и удаляет ключи после теста.
+
+    Бакеты пересобраны за последние сутки — метрики читаются из них.
+    """
+    prefix = f"test_sync_metrics:{uuid.uuid4().hex}"
+    settings.SYNC_METRICS = {"ENABLED": True, "KEY_PREFIX": prefix}
+    aggregator = SyncMetricsAggregator()
+    aggregator.rebuild(datetime.now(dt_timezone.utc) - timedelta(days=1))
+    yield aggregator
+    redis = get_redis_connection("default")
+    keys = list(redis.scan_iter(match=f"{prefix}:*"))
+    if keys:
+        redis.delete(*keys)
+
+
+@pytest.mark.unit
+class TestDurationSketch:
+    """Тесты для DurationSketch"""
+
+    def test_quantiles_within_relative_accuracy(self):
+        values = list(range(1, 10_001))
+        sketch = DurationSketch()
+        for value in values:
+            sketch.add(value)
+
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            assert abs(sketch.quantile(q) - exact) / exact <= 0.01
+
+    def test_merge_equals_single_sketch(self):
+        left, right, combined = DurationSketch(), DurationSketch(), DurationSketch()
+        for value in range(0, 500):
+            (left if value % 2 else right).add(value)
+            combined.add(value)
+
+        left.merge(right)
+
+        assert left.count == combined.count == 500
+        assert left.quantile(0.95) == combined.quantile(0.95)
+
+    def test_empty_sketch(self):
+        assert DurationSketch().quantile(0.99) == 0.0
+
+
+@pytest.mark.unit
+class TestCoveringKeys:
+    """Разбиение периода на бакеты"""
+
+    def test_window_uses_hours_inside_and_minutes_at_edges(self):
+        aggregator = SyncMetricsAggregator(key_prefix="m")
+        start = datetime(2026, 10, 19, 10, 30, tzinfo=dt_timezone.utc)
+        end = datetime(2026, 10, 20, 12, 15, tzinfo=dt_timezone.utc)
+
+        keys = aggregator._covering_keys(start, end, now=end)
+
+        assert keys[0] == "m:m:202610191030"
+        assert keys[30] == "m:h:2026101911"
+        assert "m:h:2026102011" in keys
+        assert keys[-1] == "m:m:202610201214"
+        assert len(keys) == 30 + 13 + 12 + 15
+
+    def test_full_days_use_day_buckets(self):
+        aggregator = SyncMetricsAggregator(key_prefix="m")
+        start = datetime(2026, 10, 1, tzinfo=dt_timezone.utc)
+        end = datetime(2026, 10, 8, tzinfo=dt_timezone.utc)
+
+        keys = aggregator._covering_keys(start, end, now=end)
+
+        assert keys == [f"m:d:202610{day:02d}" for day in range(1, 8)]
+
+    def test_old_edges_fall_back_to_coarser_buckets(self):
+        aggregator = SyncMetricsAggregator(key_prefix="m")
+        now = datetime(2026, 10, 19, 12, 0, tzinfo=dt_timezone.utc)
+        start = now - timedelta(days=3, minutes=30)
+
+        keys = aggregator._covering_keys(start, now, now=now)
+
+        # Минутные бакеты трёхдневной давности уже истекли — край берётся часом
+        assert keys[0] == "m:h:2026101611"
+        assert not any(key.startswith("m:m:") for key in keys)
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestSyncMetricsAggregator:
+    """Запись метрик при сохранении логов и чтение из бакетов"""
+
+    def test_operation_metrics_are_read_from_buckets(
+        self, sync_metrics, django_assert_num_queries, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            for i in range(40):
+                make_log(duration_ms=100 + i * 10).save()
+            for i in range(10):
+                make_log(status=CustomerSyncLog.StatusType.ERROR, duration_ms=50 + i).save()
+            make_log(
+                status=CustomerSyncLog.StatusType.WARNING, operation_type=CustomerSyncLog.OperationType.ERROR
+            ).save()
+        end = datetime.now(dt_timezone.utc) + timedelta(minutes=1)
+        start = end - timedelta(hours=1)
+
+        with django_assert_num_queries(0):
+            metrics = CustomerSyncMonitor().get_operation_metrics(start, end)
+
+        assert metrics["total_operations"] == 51
+        assert metrics["success_count"] == 40
+        assert metrics["error_count"] == 10
+        assert metrics["warning_count"] == 1
+        assert metrics["operations_by_type"] == {"import_from_1c": 50, "error": 1}
+        assert metrics["duration_min_ms"] == 50
+        assert metrics["duration_max_ms"] == 490
+        exact_p95 = CustomerSyncMonitor()._calculate_percentile(start, end, 95)
+        assert abs(metrics["duration_p95_ms"] - exact_p95) / exact_p95 <= 0.02
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bulk_written_logs_are_counted(self, sync_metrics):
+        writer = BufferedLogWriter(CustomerSyncLog, batch_size=100, flush_interval=60, enabled=True)
+        writer.extend(make_log(duration_ms=5) for _ in range(7))
+        writer.flush()
+        now = datetime.now(dt_timezone.utc)
+
+        metrics = sync_metrics.get_operation_metrics(now - timedelta(minutes=5), now)
+        hourly = sync_metrics.get_hourly_breakdown(now - timedelta(hours=2), now)
+
+        assert metrics["total_operations"] == 7
+        assert hourly[-1]["total_operations"] == 7
+
+    def test_prometheus_metrics_use_buckets(self, sync_metrics, monkeypatch, django_capture_on_commit_callbacks):
+        monkeypatch.setenv("PROMETHEUS_METRICS_ENABLED", "true")
+        with django_capture_on_commit_callbacks(execute=True):
+            make_log(duration_ms=10).save()
+            make_log(status=CustomerSyncLog.StatusType.FAILED, duration_ms=30).save()
+
+        metrics = PrometheusMetrics.get_sync_metrics()
+
+        assert metrics["sync_operations_total"] == 2
+        assert metrics["sync_errors_total"] == 1
+        assert metrics["sync_duration_avg_ms"] == 20.0
+
+    def test_rebuild_replays_logs_from_database(self, sync_metrics, settings):
+        settings.SYNC_METRICS = {**settings.SYNC_METRICS, "ENABLED": False}
+        for _ in range(3):
+            make_log(duration_ms=1).save()
+        settings.SYNC_METRICS = {**settings.SYNC_METRICS, "ENABLED": True}
+        now = datetime.now(dt_timezone.utc)
+
+        assert sync_metrics.rebuild(now) == 3
+        assert sync_metrics.get_operation_metrics(now - timedelta(hours=1), now)["total_operations"] == 3
+
+    def test_monitor_falls_back_to_database_when_redis_fails(self, sync_metrics):
+        make_log(duration_ms=10).save()
+        now = datetime.now(dt_timezone.utc) + timedelta(seconds=1)
+
+        with patch.object(SyncMetricsAggregator, "get_operation_metrics", side_effect=ConnectionError("down")):
+            metrics = CustomerSyncMonitor().get_operation_metrics(now - timedelta(hours=1), now)
+
+        assert metrics["total_operations"] == 1
+
+    def test_rolled_back_logs_are_not_counted(self, sync_metrics, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            with pytest.raises(RuntimeError):
+                with transaction.atomic():
+                    make_log(duration_ms=10).save()
+                    raise RuntimeError("rollback")
+            make_log(duration_ms=20).save()
+        now = datetime.now(dt_timezone.utc)
+
+        assert len(callbacks) == 1
+        assert sync_metrics.get_operation_metrics(now - timedelta(minutes=5), now)["total_operations"] == 1
+
+    def test_monitor_reads_database_until_buckets_are_rebuilt(self, sync_metrics):
+        get_redis_connection("default").delete(sync_metrics._rebuilt_since_key)
+        make_log(duration_ms=10).save()
+        now = datetime.now(dt_timezone.utc) + timedelta(seconds=1)
+
+        with patch.object(SyncMetricsAggregator, "get_operation_metrics") as from_buckets:
+            metrics = CustomerSyncMonitor().get_operation_metrics(now - timedelta(days=7), now)
+        from_buckets.assert_not_called()
+        assert metrics["total_operations"] == 1
+
+        # Пересборка за 2 суток покрывает окно 24 ч, но не 7 суток
+        sync_metrics.rebuild(now - timedelta(days=1))
+        assert sync_metrics.covers(now - timedelta(hours=24))
+        assert not sync_metrics.covers(now - timedelta(days=7))
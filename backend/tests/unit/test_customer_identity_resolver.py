@@ -459,3 +459,52 @@ class TestCustomerIdentityResolver:
         customer3, method3 = resolver.identify_customer({"email": "user3@example.com"})
         assert customer3.id == user3.id
         assert method3 == "email"
+
+    # Тесты пакетной идентификации
+    def test_identify_many_matches_single_record_priority(
+        self, resolver, b2b_user, b2c_user, user_with_guid, django_assert_max_num_queries
+    ):
+        """identify_many даёт те же результаты, что identify_customer, за ≤4 запроса"""
+        records = [
+            {"onec_id": "1C-B2B-001", "email": "b2c@example.com"},
+            {"onec_guid": str(user_with_guid.onec_guid), "tax_id": "1234567890"},
+            {"tax_id": "12-34-56-78-90", "email": "b2c@example.com"},
+            {"email": "  B2C@Example.com "},
+            {"onec_id": "1C-UNKNOWN", "tax_id": "123", "email": "invalid"},
+            {},
+        ]
+        expected = [resolver.identify_customer(record) for record in records]
+
+        with django_assert_max_num_queries(4):
+            results = resolver.identify_many(records)
+
+        assert results == expected
+        assert [method for _customer, method in results] == ["onec_id", "onec_guid", "tax_id", "email", None, None]
+
+    @patch("apps.users.services.identity_resolution.CustomerSyncLog")
+    def test_identify_many_skips_ambiguous_tax_id(self, mock_log, resolver, b2b_user, b2c_user):
+        """ИНН у нескольких пользователей не даёт совпадения — используется следующий уровень"""
+        User.objects.create_user(email="branch@example.com", password="pass123", tax_id="1234567890")
+
+        results = resolver.identify_many([{"session": "42", "tax_id": "1234567890", "email": "b2c@example.com"}])
+
+        assert results == [(b2c_user, "email")]
+        details = mock_log.objects.create.call_args[1]["details"]
+        assert details["ambiguous_tax_ids"] == ["1234567890"]
+
+    @patch("apps.users.services.identity_resolution.CustomerSyncLog")
+    def test_identify_many_logs_one_summary_per_batch(self, mock_log, resolver, b2b_user):
+        """Одна запись CustomerSyncLog со сводкой на весь пакет"""
+        records = [
+            {"session": "42", "onec_id": "1C-B2B-001"},
+            {"session": "42", "onec_id": "1C-MISSING-001"},
+            {"session": "42", "email": "b2b@example.com"},
+        ]
+
+        resolver.identify_many(records)
+
+        mock_log.objects.create.assert_called_once()
+        details = mock_log.objects.create.call_args[1]["details"]
+        assert details["batch_size"] == 3
+        assert details["identification_methods"] == {"onec_id": 1, "email": 1, "not_found": 1}
+        assert details["not_found_onec_ids"] == ["1C-MISSING-001"]
@@ -601,12 +601,12 @@ class TestShouldRoute:
 
 
 # ============================================================================
-# ImportOrchestratorService._route_unpacked_files — параллельный routing для
-# содержимого распакованных ZIP. Здесь жил тот же case-insensitive bug.
+# ZipImportSource — routing членов ZIP без распаковки (раньше
+# ImportOrchestratorService._route_unpacked_files с тем же case-insensitive bug).
 # ============================================================================
 
 
-class TestImportOrchestratorServiceRouteUnpackedFiles:
+class TestZipImportSourceRouting:
     """Регрессия: priceLists.xml внутри ZIP должен попадать в priceLists/, не в root."""
 
     @pytest.mark.parametrize(
@@ -624,19 +624,23 @@ class TestImportOrchestratorServiceRouteUnpackedFiles:
             ("propertiesgoods_1.xml", "propertiesGoods"),
         ],
     )
-    def test_route_unpacked_xml_by_prefix(self, tmp_path, filename, expected_subdir):
-        from apps.integrations.onec_exchange.import_orchestrator import ImportOrchestratorService
+    def test_route_zip_member_by_prefix(self, tmp_path, filename, expected_subdir):
+        import zipfile
+
+        from apps.integrations.onec_exchange.zip_source import STREAMED_SUBDIRS, ZipImportSource
 
         import_dir = tmp_path / "1c_import"
         import_dir.mkdir()
-        (import_dir / filename).write_bytes(b"<root/>")
-
-        orch = ImportOrchestratorService.__new__(ImportOrchestratorService)
-        orch.import_dir = import_dir
-
-        routed = orch._route_unpacked_files([filename])
-
-        assert routed == 1
-        expected_path = import_dir / expected_subdir / filename
-        assert expected_path.exists(), f"{filename} должен лежать в {expected_subdir}/"
-        assert not (import_dir / filename).exists(), "оригинал должен быть перемещён"
+        with zipfile.ZipFile(import_dir / "import.zip", "w") as zf:
+            zf.writestr(filename, "<root/>")
+
+        with ZipImportSource(import_dir).open() as source:
+            source.extract_unstreamed()
+            if expected_subdir in STREAMED_SUBDIRS:
+                # Читается импортом из архива — на диск не пишется
+                assert source.has_xml(expected_subdir), f"{filename} должен читаться из {expected_subdir}/"
+                assert not (import_dir / expected_subdir).exists()
+            else:
+                expected_path = import_dir / expected_subdir / filename
+                assert expected_path.exists(), f"{filename} должен лежать в {expected_subdir}/"
+        assert not (import_dir / filename).exists(), "в корень ничего не распаковывается"
@@ -286,7 +286,7 @@ class TestHandleImportRequest:
         assert response.status_code == 302
         assert "/admin/integrations/session/" in response.url
         mock_validate.assert_called_once_with(["catalog"])
-        mock_create_import.assert_called_once_with("catalog")
+        mock_create_import.assert_called_once_with("catalog", profiling="off")
         mock_lock.release.assert_called_once()
 
     @patch("apps.integrations.views.get_redis_connection")
@@ -82,13 +82,21 @@ class TestCartModel:
     def test_cart_clear(self):
         """Тест очистки корзины"""
         cart = CartFactory.create()
-        CartItemFactory.create(cart=cart)
-        CartItemFactory.create(cart=cart)
+        first = CartItemFactory.create(cart=cart)
+        second = CartItemFactory.create(cart=cart)
+        reserved = {}
+        for item in (first, second):
+            item.variant.refresh_from_db()
+            reserved[item.variant.pk] = item.variant.reserved_quantity
 
         assert cart.items.count() == 2
 
         cart.clear()
         assert cart.items.count() == 0
+        # Резерв позиций снят одним UPDATE, без сигнала на каждую позицию
+        for item in (first, second):
+            item.variant.refresh_from_db()
+            assert item.variant.reserved_quantity == max(reserved[item.variant.pk] - item.quantity, 0)
 
     def test_cart_meta_configuration(self):
         """Тест настроек Meta класса Cart"""
@@ -2548,3 +2548,84 @@ class TestLegacyOrderWithoutSubOrders:
         assert len(docs) == 0
         assert legacy_order.pk in skipped_ids
         assert legacy_order.pk not in exported_ids
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestOrderExportReader:
+    """OrderExportReader: keyset-чанки по pk с ограниченным числом запросов на чанк."""
+
+    def _create_sub_orders(self, count: int) -> list[Order]:
+        subs = []
+        for i in range(count):
+            user = UserFactory(email=f"reader-{i}-{get_unique_suffix()}@example.com")
+            variant = ProductVariantFactory(onec_id=f"v-reader-{i}-{get_unique_suffix()}")
+            master = Order.objects.create(
+                user=user,
+                total_amount=Decimal("100.00"),
+                delivery_address="Адрес",
+                delivery_method="courier",
+                payment_method="card",
+                is_master=True,
+            )
+            sub = Order.objects.create(
+                user=user,
+                total_amount=Decimal("100.00"),
+                delivery_address="Адрес",
+                delivery_method="courier",
+                payment_method="card",
+                is_master=False,
+                parent_order=master,
+                vat_group=Decimal("22.00"),
+            )
+            OrderItem.objects.create(
+                order=sub,
+                product=variant.product,
+                variant=variant,
+                quantity=1,
+                unit_price=Decimal("100.00"),
+                total_price=Decimal("100.00"),
+                product_name=variant.product.name,
+                product_sku=variant.sku,
+            )
+            subs.append(sub)
+        return subs
+
+    def test_reader_pages_by_pk_in_fixed_chunks(self):
+        from apps.orders.services.order_export_reader import OrderExportReader
+
+        subs = self._create_sub_orders(5)
+        reader = OrderExportReader(Order.objects.filter(is_master=False), chunk_size=2)
+
+        chunks = list(reader.iter_chunks())
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert [order.pk for chunk in chunks for order in chunk] == sorted(sub.pk for sub in subs)
+
+    def test_export_query_count_is_bounded_per_chunk(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self._create_sub_orders(6)
+        service = OrderExportService()
+        queryset = Order.objects.filter(is_master=False)
+
+        with CaptureQueriesContext(connection) as ctx:
+            xml_str = "".join(service.generate_xml_streaming(queryset, chunk_size=2))
+
+        assert len(ET.fromstring(xml_str).findall("Контейнер/Документ")) == 6
+        # 3 полных чанка × (субзаказы + позиции) + завершающий пустой SELECT.
+        assert len(ctx.captured_queries) == 3 * 2 + 1
+
+    def test_lookups_are_read_from_settings_once_per_export(self, settings):
+        from unittest.mock import patch
+
+        from apps.orders.services.order_export_reader import ExportLookups
+
+        self._create_sub_orders(3)
+        service = OrderExportService()
+
+        with patch.object(ExportLookups, "from_settings", wraps=ExportLookups.from_settings) as from_settings:
+            "".join(service.generate_xml_streaming(Order.objects.filter(is_master=False)))
+
+        assert from_settings.call_count == 1
@@ -8,7 +8,7 @@ Unit-тесты для OrderStatusImportService.
 import logging
 from datetime import date, timedelta
 from typing import cast
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, PropertyMock, patch
 from zoneinfo import ZoneInfo
 
 import pytest
@@ -117,6 +117,7 @@ def _make_mock_order(**overrides):
     mock.is_master = True
     mock.sub_orders.exists.return_value = False
     mock.parent_order_id = None
+    mock.user_id = None
     mock.status = "pending"
     mock.status_1c = ""
     mock.paid_at = None
@@ -129,6 +130,11 @@ def _make_mock_order(**overrides):
     return mock
 
 
+def _saved_orders(bulk_save: MagicMock) -> list:
+    """Заказы, переданные в пакетную запись _bulk_save_orders."""
+    return [order for call in bulk_save.call_args_list for order in call.args[0].orders.values()]
+
+
 # =============================================================================
 # Test Classes
 # =============================================================================
@@ -418,7 +424,9 @@ class TestOrderProcessing:
         # [AI-Review][High] Используем num: префикс для избежания коллизий
         mock_cache = {f"num:{order_number}": mock_order}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
@@ -426,7 +434,7 @@ class TestOrderProcessing:
             assert result.updated == 1
             assert mock_order.status == "shipped"  # Mapped from "Отгружен"
             assert mock_order.status_1c == "Отгружен"  # Original 1C status (AC4)
-            mock_order.save.assert_called_once()
+            assert mock_order in _saved_orders(bulk_save)
 
     def test_unknown_status_logs_warning_and_skips(self):
         """AC9 4.6: Неизвестный статус — пропуск заказа (AC6)."""
@@ -446,7 +454,9 @@ class TestOrderProcessing:
         # [AI-Review][High] Используем num: префикс для избежания коллизий
         mock_cache = {f"num:{order_number}": mock_order}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
@@ -454,7 +464,7 @@ class TestOrderProcessing:
             assert result.skipped_unknown_status == 1
             assert result.skipped_up_to_date == 0
             assert result.updated == 0
-            mock_order.save.assert_not_called()
+            assert mock_order not in _saved_orders(bulk_save)
 
     def test_idempotent_updates_sent_to_1c_when_status_unchanged(self):
         # [AI-Review][High] sent_to_1c обновляется даже без изменений статуса.
@@ -481,7 +491,9 @@ class TestOrderProcessing:
         # [AI-Review][High] Используем num: префикс для избежания коллизий
         mock_cache = {f"num:{order_number}": mock_order}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
@@ -490,7 +502,7 @@ class TestOrderProcessing:
             assert result.skipped_up_to_date == 0
             assert mock_order.sent_to_1c is True
             assert mock_order.sent_to_1c_at is not None
-            mock_order.save.assert_called_once()
+            assert mock_order in _saved_orders(bulk_save)
 
     def test_missing_order_logs_error_and_continues(self):
         """AC9 4.7: Отсутствующий заказ — продолжение обработки (AC7)."""
@@ -522,7 +534,9 @@ class TestOrderProcessing:
         # [AI-Review][High] Используем num: префикс для избежания коллизий
         mock_cache = {"num:EXISTS-1": mock_existing_order}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
@@ -530,7 +544,7 @@ class TestOrderProcessing:
             assert result.processed == 2
             assert result.updated == 1  # EXISTS-1 updated
             assert result.not_found == 1  # MISSING-1 not found
-            mock_existing_order.save.assert_called_once()
+            assert mock_existing_order in _saved_orders(bulk_save)
 
     def test_idempotent_processing_no_duplicate_updates(self):
         """AC9 4.8: Идемпотентность — повторная обработка не дублирует (AC8)."""
@@ -559,7 +573,9 @@ class TestOrderProcessing:
         # [AI-Review][High] Используем num: префикс для избежания коллизий
         mock_cache = {f"num:{order_number}": mock_order}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
@@ -568,7 +584,7 @@ class TestOrderProcessing:
         assert result.skipped_unknown_status == 0
         assert result.updated == 0
         assert mock_order.sent_to_1c_at != previous_sent_to_1c_at
-        mock_order.save.assert_called_once()
+        assert mock_order in _saved_orders(bulk_save)
 
     def test_idempotent_updates_dates_even_if_status_unchanged(self):
         """
@@ -598,7 +614,9 @@ class TestOrderProcessing:
         # [AI-Review][High] Используем num: префикс для избежания коллизий
         mock_cache = {f"num:{order_number}": mock_order}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
@@ -608,7 +626,7 @@ class TestOrderProcessing:
         assert result.skipped_unknown_status == 0
         assert mock_order.paid_at is not None
         assert mock_order.shipped_at is not None
-        mock_order.save.assert_called_once()
+        assert mock_order in _saved_orders(bulk_save)
 
     def test_process_sets_payment_status_paid_when_paid_at_present(self):
         # [AI-Review][Medium] paid_at из 1С выставляет payment_status='paid'.
@@ -636,14 +654,16 @@ class TestOrderProcessing:
         service = OrderStatusImportService()
         mock_cache = {f"num:{order_number}": mock_order}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
         # ASSERT
         assert result.updated == 1
         assert mock_order.payment_status == "paid"
-        mock_order.save.assert_called_once()
+        assert mock_order in _saved_orders(bulk_save)
 
     def test_payment_status_refunded_not_regressed_by_paid_at(self):
         # [AI-Review][Medium] refunded payment_status не регрессирует в paid.
@@ -671,14 +691,16 @@ class TestOrderProcessing:
         service = OrderStatusImportService()
         mock_cache = {f"num:{order_number}": mock_order}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
         # ASSERT
         assert result.updated == 1
         assert mock_order.payment_status == "refunded"
-        mock_order.save.assert_called_once()
+        assert mock_order in _saved_orders(bulk_save)
 
     def test_process_uses_batch_size_from_settings(self):
         # [AI-Review][Medium] process() обрабатывает заказы батчами.
@@ -752,7 +774,9 @@ class TestOrderProcessing:
             service = OrderStatusImportService()
             mock_cache = {f"num:{order_number}": mock_order}
 
-            with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+            with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+                service, "_bulk_save_orders"
+            ) as bulk_save:
                 # ACT
                 result = service.process(xml_data)
 
@@ -761,7 +785,7 @@ class TestOrderProcessing:
                 # status_1c должен быть обрезан до 255 символов
                 assert len(mock_order.status_1c) == 255
                 assert mock_order.status_1c == long_status[:255]
-                mock_order.save.assert_called_once()
+                assert mock_order in _saved_orders(bulk_save)
 
 
 @pytest.mark.unit
@@ -832,6 +856,7 @@ class TestFindOrder:
         xml_data = build_test_xml(order_id="order-42", order_number="")
 
         mock_order = _make_mock_order()
+        mock_order.pk = 42
         mock_order.status = "pending"
         mock_order.status_1c = ""
         mock_order.order_number = "FOUND-BY-ID"
@@ -1047,7 +1072,7 @@ class TestReviewFollowups:
 
     def test_error_isolation_continues_processing(self):
         """[AI-Review][High] Изоляция ошибок — одна ошибка не останавливает обработку."""
-        # ARRANGE — 3 заказа: 1й вызывает исключение при save, 2й и 3й нормальные
+        # ARRANGE — 3 заказа: 1й вызывает исключение при обработке, 2й и 3й нормальные
         xml_data = build_multi_order_xml(
             [
                 {
@@ -1074,7 +1099,7 @@ class TestReviewFollowups:
         # [AI-Review][Medium] Data Integrity:
         # pk должен соответствовать order_id=order-1
         error_order.pk = 1
-        error_order.save.side_effect = Exception("Database error!")
+        type(error_order).status = PropertyMock(side_effect=Exception("Database error!"))
 
         good_order_1 = _make_mock_order()
         good_order_1.order_number = "GOOD-ORDER-1"
@@ -1096,7 +1121,9 @@ class TestReviewFollowups:
             "num:GOOD-ORDER-2": good_order_2,
         }
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
@@ -1105,8 +1132,8 @@ class TestReviewFollowups:
             assert result.updated == 2  # GOOD-ORDER-1 и GOOD-ORDER-2
             assert len(result.errors) == 1  # ERROR-ORDER
             assert "Database error" in result.errors[0]
-            good_order_1.save.assert_called_once()
-            good_order_2.save.assert_called_once()
+            assert good_order_1 in _saved_orders(bulk_save)
+            assert good_order_2 in _saved_orders(bulk_save)
 
     def test_errors_collected_in_import_result(self):
         """[AI-Review][Medium] Ошибки собираются в ImportResult.errors."""
@@ -1181,14 +1208,16 @@ class TestReviewFollowups:
         # [AI-Review][High] Используем num: префикс для избежания коллизий
         mock_cache = {f"num:{order_number}": mock_order}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
             # ASSERT — sent_to_1c должен быть установлен в True
             assert result.updated == 1
             assert mock_order.sent_to_1c is True
-            mock_order.save.assert_called_once()
+            assert mock_order in _saved_orders(bulk_save)
 
     def test_processed_count_includes_invalid_documents(self):
         """[AI-Review][Low] result.processed включает все <Документ>, включая некорректные."""
@@ -1394,14 +1423,16 @@ class TestRound6ReviewFollowups:
             "pk:1000": mock_order_by_pk,  # pk:1000 -> другой заказ
         }
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
             # ASSERT — должен быть найден по order_number (приоритет)
             assert result.updated == 1
-            mock_order_by_number.save.assert_called_once()
-            mock_order_by_pk.save.assert_not_called()
+            assert mock_order_by_number in _saved_orders(bulk_save)
+            assert mock_order_by_pk not in _saved_orders(bulk_save)
 
     def test_bulk_fetch_creates_correct_cache_keys(self):
         """
@@ -1717,7 +1748,9 @@ class TestRound7ReviewFollowups:
         service = OrderStatusImportService()
         mock_cache = {f"num:{order_number}": mock_order}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
@@ -1725,7 +1758,7 @@ class TestRound7ReviewFollowups:
             assert result.updated == 0
             assert result.skipped_status_regression == 1
             assert result.skipped_unknown_status == 0
-            mock_order.save.assert_not_called()
+            assert mock_order not in _saved_orders(bulk_save)
             assert mock_order.status == current_status
 
     @pytest.mark.parametrize(
@@ -1769,14 +1802,16 @@ class TestRound7ReviewFollowups:
         service = OrderStatusImportService()
         mock_cache = {f"num:{order_number}": mock_order}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             # ACT
             result = service.process(xml_data)
 
             # ASSERT — переход между финальными статусами блокируется
             assert result.updated == 0
             assert result.skipped_status_regression == 1
-            mock_order.save.assert_not_called()
+            assert mock_order not in _saved_orders(bulk_save)
             # Статус не изменился
             assert mock_order.status == current_status
 
@@ -2559,12 +2594,14 @@ class TestModernSubOrderImportUnit:
         service = OrderStatusImportService()
         mock_cache = {f"num:{order_number}": mock_sub}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             result = service.process(xml_data)
 
         assert result.updated == 1
         assert result.skipped_master_unexpected == 0
-        mock_sub.save.assert_called_once()
+        assert mock_sub in _saved_orders(bulk_save)
 
     def test_sub_order_status_updated_to_shipped(self):
         """XML Отгружен → sub.status='shipped' после обработки."""
@@ -2645,10 +2682,12 @@ class TestModernSubOrderImportUnit:
         service = OrderStatusImportService()
         mock_cache = {f"num:{order_number}": mock_sub}
 
-        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache):
+        with patch.object(service, "_bulk_fetch_orders", return_value=mock_cache), patch.object(
+            service, "_bulk_save_orders"
+        ) as bulk_save:
             result = service.process(xml_data)
 
         assert result.skipped_status_regression == 1
         assert result.updated == 0
         assert mock_sub.status == "shipped"
-        mock_sub.save.assert_not_called()
+        assert mock_sub not in _saved_orders(bulk_save)
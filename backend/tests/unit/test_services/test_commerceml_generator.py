@@ -0,0 +1,55 @@
+"""
+Unit-тесты генератора синтетической выгрузки 1С (CommerceMLDatasetGenerator)
+"""
+
+from __future__ import annotations
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from apps.products.services.commerceml_generator import CommerceMLDatasetGenerator, DatasetSpec
+from apps.products.services.parser import XMLDataParser
+
+
+@pytest.mark.unit
+class TestCommerceMLDatasetGenerator:
+    """Выгрузка читается парсером импорта и детерминирована"""
+
+    def test_segmented_dataset_is_parsed_by_importer(self, tmp_path):
+        spec = DatasetSpec(offers=10, variants_per_product=4, segment_size=4, warehouses=3, images=True)
+        stats = CommerceMLDatasetGenerator(spec).generate(tmp_path)
+        parser = XMLDataParser()
+
+        offer_files = sorted((tmp_path / "offers").glob("offers_1_*.xml"))
+        offers = [offer for path in offer_files for offer in parser.parse_offers_xml(str(path))]
+        (goods_file,) = (tmp_path / "goods").glob("goods.xml")
+        goods = parser.parse_goods_xml(str(goods_file))
+        prices = parser.parse_prices_xml(str(next((tmp_path / "prices").glob("prices_1_1_*.xml"))))
+        rests = parser.parse_rests_xml(str(next((tmp_path / "rests").glob("rests_1_1_*.xml"))))
+        groups = parser.parse_groups_xml(str(tmp_path / "groups" / "groups.xml"))
+
+        assert stats["products"] == len(goods) == 3
+        assert len(offer_files) == 3
+        assert len(offers) == 10
+        assert {offer["id"].split("#")[0] for offer in offers} == {product["id"] for product in goods}
+        assert {product["category_id"] for product in goods} <= {group["id"] for group in groups}
+        assert [group["name"] for group in groups if "parent_id" not in group] == ["СПОРТ"]
+        assert len(prices[0]["prices"]) == len(
+            parser.parse_price_lists_xml(str(tmp_path / "priceLists" / "priceLists.xml"))
+        )
+        assert len(rests) == 4 * spec.warehouses
+        assert stats["images"] == len(list((tmp_path / "goods" / "import_files").rglob("*.jpg"))) == 3
+
+    def test_same_seed_gives_same_ids(self, tmp_path):
+        for name in ("first", "second"):
+            CommerceMLDatasetGenerator(DatasetSpec(offers=8, seed=7)).generate(tmp_path / name)
+
+        first = XMLDataParser().parse_offers_xml(str(tmp_path / "first" / "offers" / "offers.xml"))
+        second = XMLDataParser().parse_offers_xml(str(tmp_path / "second" / "offers" / "offers.xml"))
+        assert [offer["id"] for offer in first] == [offer["id"] for offer in second]
+
+    def test_command_refuses_non_empty_output(self, tmp_path):
+        (tmp_path / "goods").mkdir()
+
+        with pytest.raises(CommandError, match="не пуст"):
+            call_command("generate_1c_dataset", output=str(tmp_path), offers=4)
@@ -6,13 +6,16 @@ Unit-тесты для CustomerDataProcessor
 from __future__ import annotations
 
 from decimal import Decimal
+from unittest.mock import patch
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.utils import timezone
 
 from apps.common.models import CustomerSyncLog
 from apps.products.models import ImportSession
+from apps.users.models import Company
 from apps.users.services.processor import CustomerDataProcessor
 
 User = get_user_model()
@@ -295,3 +298,93 @@ class TestCustomerDataProcessor:
         assert log.operation_type == CustomerSyncLog.OperationType.CREATED
         assert log.status == CustomerSyncLog.StatusType.SUCCESS
         assert log.details == {"test": "data"}
+
+    def test_process_customers_query_count_does_not_grow_with_chunk(self, processor, django_assert_num_queries):
+        """Пакет клиентов обрабатывается фиксированным числом запросов"""
+        User.objects.create(email="chunk-existing@example.com", onec_id="TEST-CHUNK-000", role="retail")
+        customers_data = [
+            {
+                "onec_id": f"TEST-CHUNK-{i:03d}",
+                "email": f"chunk{i}@example.com" if i else "chunk-existing@example.com",
+                "first_name": f"Клиент{i}",
+                "last_name": "Пакетный",
+                "customer_type": "Опт 1",
+            }
+            for i in range(30)
+        ]
+
+        # SAVEPOINT, SELECT кандидатов, INSERT users, UPDATE users, INSERT логов, RELEASE SAVEPOINT
+        with django_assert_num_queries(6):
+            result = processor.process_customers(customers_data, chunk_size=30)
+
+        assert result == {"total": 30, "created": 29, "updated": 1, "skipped": 0, "errors": 0}
+        assert User.objects.filter(onec_id__startswith="TEST-CHUNK-").count() == 30
+        assert CustomerSyncLog.objects.filter(onec_id__startswith="TEST-CHUNK-").count() == 30
+        assert User.objects.get(onec_id="TEST-CHUNK-000").role == "wholesale_level1"
+
+    def test_process_customers_repeated_record_in_chunk_updates_created_user(self, processor):
+        """Повтор клиента в одном пакете обновляет созданного, как при поштучной обработке"""
+        customers_data = [
+            {"onec_id": "TEST-REPEAT-001", "email": "repeat@example.com", "first_name": "Первый", "last_name": "А"},
+            {"onec_id": "TEST-REPEAT-002", "email": "repeat@example.com", "first_name": "Второй", "last_name": "Б"},
+        ]
+
+        result = processor.process_customers(customers_data)
+
+        assert result["created"] == 1
+        assert result["updated"] == 1
+        user = User.objects.get(email="repeat@example.com")
+        assert user.onec_id == "TEST-REPEAT-001"
+        assert user.first_name == "Второй"
+
+    def test_process_customers_creates_and_updates_companies(self, processor):
+        """B2B клиенты пакета получают компании через bulk-запись"""
+        existing = User.objects.create(email="b2b-existing@example.com", onec_id="TEST-B2B-001")
+        Company.objects.create(user=existing, legal_name="Старое название", tax_id="1111111111")
+        customers_data = [
+            {
+                "onec_id": "TEST-B2B-001",
+                "email": "b2b-existing@example.com",
+                "full_name": "ООО Обновлённое",
+                "tax_id": "7707083893",
+                "kpp": "773601001",
+                "customer_type": "legal_entity",
+            },
+            {
+                "onec_id": "TEST-B2B-002",
+                "email": "b2b-new@example.com",
+                "full_name": "ИП Новый",
+                "tax_id": "500100732259",
+                "customer_type": "individual_entrepreneur",
+            },
+        ]
+
+        result = processor.process_customers(customers_data)
+
+        assert result["created"] == 1
+        assert result["updated"] == 1
+        updated = Company.objects.get(user=existing)
+        assert updated.legal_name == "ООО Обновлённое"
+        assert updated.kpp == "773601001"
+        created = Company.objects.get(user__onec_id="TEST-B2B-002")
+        assert created.legal_name == "ИП Новый"
+        assert created.tax_id == "500100732259"
+
+    def test_process_customers_falls_back_to_single_records_on_bulk_failure(self, processor):
+        """При ошибке bulk-записи пакет обрабатывается поштучно"""
+        customers_data = [
+            {"onec_id": "TEST-FALLBACK-001", "email": "fallback1@example.com", "first_name": "А"},
+            {"onec_id": "TEST-FALLBACK-002", "email": "bad-email", "first_name": "Б"},
+        ]
+
+        with patch.object(processor, "_flush_chunk", side_effect=IntegrityError("duplicate key")):
+            result = processor.process_customers(customers_data)
+
+        assert result["created"] == 1
+        assert result["errors"] == 1
+        assert User.objects.filter(onec_id="TEST-FALLBACK-001").exists()
+
+    def test_process_customers_rejects_invalid_chunk_size(self, processor):
+        """chunk_size меньше 1 отклоняется"""
+        with pytest.raises(ValueError):
+            processor.process_customers([], chunk_size=0)